@@ -41,6 +41,8 @@ CREATE TABLE device_ips (
     subnet_mask TEXT, -- CIDR or dotted decimal
     vlan_id INTEGER,
     is_primary BOOLEAN NOT NULL DEFAULT 0, -- Only one primary IP per device
+    ip_start INTEGER, -- ip_address as an integer (IPv4) or 16-byte BLOB (IPv6), see ip_ranges.py
+    ip_end INTEGER, -- same as ip_start: a single address
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     
@@ -77,6 +79,17 @@ CREATE TABLE collection_runs (
     CONSTRAINT check_napalm_driver CHECK (napalm_driver IN ('ios', 'eos', 'junos', 'nxos', 'iosxr', 'vyos', 'fortios', 'panos'))
 );
 
+-- Devices that stayed unreachable across runs (maintained by the collector)
+CREATE TABLE device_reachability (
+    device_id INTEGER PRIMARY KEY,
+    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+    last_failure DATETIME,
+    last_error TEXT,
+    skip_until DATETIME, -- Collector skips the device until this time
+    
+    FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE
+);
+
 -- Interface inventory
 CREATE TABLE interfaces (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -118,6 +131,8 @@ CREATE TABLE interface_ips (
     prefix_length INTEGER NOT NULL,
     ip_version INTEGER NOT NULL, -- 4 or 6
     is_secondary BOOLEAN NOT NULL DEFAULT 0,
+    ip_start INTEGER, -- first address of the interface subnet, integer (IPv4) or BLOB (IPv6)
+    ip_end INTEGER, -- last address of the interface subnet
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     
     FOREIGN KEY (interface_id) REFERENCES interfaces(id) ON DELETE CASCADE,
@@ -162,6 +177,12 @@ CREATE TABLE arp_entries (
     mac_address TEXT NOT NULL, -- Normalized format
     age REAL, -- Age in seconds
     entry_type TEXT, -- dynamic, static, permanent
+    first_seen DATETIME, -- collection time of the first run that saw this tuple
+    last_seen DATETIME, -- collection time of the latest run that saw it
+    run_count INTEGER NOT NULL DEFAULT 1, -- runs that saw it in this interval
+    is_current BOOLEAN NOT NULL DEFAULT 1, -- seen by the latest run that collected the table
+    ip_start INTEGER, -- ip_address as an integer (IPv4) or 16-byte BLOB (IPv6)
+    ip_end INTEGER, -- same as ip_start: a single address
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     
     FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE,
@@ -185,6 +206,10 @@ CREATE TABLE mac_address_table (
     is_active BOOLEAN NOT NULL DEFAULT 1,
     moves INTEGER DEFAULT 0,
     last_move REAL, -- Timestamp of last move
+    first_seen DATETIME, -- collection time of the first run that saw this tuple
+    last_seen DATETIME, -- collection time of the latest run that saw it
+    run_count INTEGER NOT NULL DEFAULT 1, -- runs that saw it in this interval
+    is_current BOOLEAN NOT NULL DEFAULT 1, -- seen by the latest run that collected the table
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     
     FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE,
@@ -227,13 +252,15 @@ CREATE TABLE environment_data (
 CREATE TABLE device_configs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     device_id INTEGER NOT NULL,
-    collection_run_id INTEGER NOT NULL,
+    collection_run_id INTEGER NOT NULL, -- run that first stored this content
     config_type TEXT NOT NULL, -- running, startup, candidate
-    config_content TEXT NOT NULL,
-    config_hash TEXT NOT NULL, -- SHA256 hash for change detection
+    config_content TEXT NOT NULL, -- '' when the text is held in config_blobs
+    config_hash TEXT NOT NULL, -- SHA256 hash for change detection, key into config_blobs
     size_bytes INTEGER NOT NULL,
     line_count INTEGER NOT NULL,
-    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, -- first time this content was collected
+    last_seen DATETIME, -- last run that found this content unchanged
+    change_marker TEXT, -- device "last changed" indicator seen with this running config
     
     FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE,
     FOREIGN KEY (collection_run_id) REFERENCES collection_runs(id) ON DELETE CASCADE,
@@ -245,6 +272,16 @@ CREATE TABLE device_configs (
     CONSTRAINT check_hash_format CHECK (LENGTH(config_hash) = 64) -- SHA256
 );
 
+-- Config text, compressed and stored once per distinct SHA256
+CREATE TABLE config_blobs (
+    config_hash TEXT PRIMARY KEY, -- SHA256 of the uncompressed config text
+    compression TEXT NOT NULL DEFAULT 'zlib',
+    content BLOB NOT NULL,
+    size_bytes INTEGER NOT NULL, -- uncompressed size
+    stored_bytes INTEGER NOT NULL, -- compressed size
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 -- User accounts discovered on devices
 CREATE TABLE device_users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -327,6 +364,8 @@ CREATE TABLE routes (
     administrative_distance INTEGER,
     age INTEGER, -- Route age in seconds
     is_active BOOLEAN NOT NULL DEFAULT 1,
+    ip_start INTEGER, -- first address of the destination network, integer (IPv4) or BLOB (IPv6)
+    ip_end INTEGER, -- last address of the destination network
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     
     FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE,
@@ -447,6 +486,7 @@ CREATE INDEX idx_device_ips_device ON device_ips(device_id);
 CREATE INDEX idx_device_ips_address ON device_ips(ip_address);
 CREATE INDEX idx_device_ips_primary ON device_ips(device_id, is_primary);
 CREATE INDEX idx_device_ips_type ON device_ips(ip_type);
+CREATE INDEX idx_device_ips_range ON device_ips(ip_start, ip_end);
 
 -- Collection runs indexes
 CREATE INDEX idx_collection_device_time ON collection_runs(device_id, collection_time DESC);
@@ -465,6 +505,7 @@ CREATE INDEX idx_interfaces_mac ON interfaces(mac_address);
 -- Interface IPs indexes
 CREATE INDEX idx_interface_ips_interface ON interface_ips(interface_id);
 CREATE INDEX idx_interface_ips_address ON interface_ips(ip_address);
+CREATE INDEX idx_interface_ips_range ON interface_ips(ip_start, ip_end);
 
 -- LLDP indexes
 CREATE INDEX idx_lldp_device_interface ON lldp_neighbors(device_id, local_interface);
@@ -476,6 +517,10 @@ CREATE INDEX idx_arp_device ON arp_entries(device_id);
 CREATE INDEX idx_arp_ip ON arp_entries(ip_address);
 CREATE INDEX idx_arp_mac ON arp_entries(mac_address);
 CREATE INDEX idx_arp_interface ON arp_entries(interface_name);
+CREATE INDEX idx_arp_current_device ON arp_entries(device_id, ip_address, mac_address, interface_name) WHERE is_current = 1;
+CREATE INDEX idx_arp_current_ip ON arp_entries(ip_address) WHERE is_current = 1;
+CREATE INDEX idx_arp_current_mac ON arp_entries(mac_address) WHERE is_current = 1;
+CREATE INDEX idx_arp_current_range ON arp_entries(ip_start, ip_end) WHERE is_current = 1;
 
 -- MAC table indexes
 CREATE INDEX idx_mac_device ON mac_address_table(device_id);
@@ -483,6 +528,12 @@ CREATE INDEX idx_mac_address ON mac_address_table(mac_address);
 CREATE INDEX idx_mac_vlan ON mac_address_table(vlan_id);
 CREATE INDEX idx_mac_interface ON mac_address_table(interface_name);
 CREATE INDEX idx_mac_type ON mac_address_table(entry_type);
+CREATE INDEX idx_mac_current_device ON mac_address_table(device_id, mac_address, vlan_id, interface_name) WHERE is_current = 1;
+CREATE INDEX idx_mac_current_mac ON mac_address_table(mac_address) WHERE is_current = 1;
+
+-- Route indexes
+CREATE INDEX idx_routes_device_run ON routes(device_id, collection_run_id);
+CREATE INDEX idx_routes_range ON routes(ip_start, ip_end);
 
 -- Environment indexes
 CREATE INDEX idx_env_device_time ON environment_data(device_id, created_at DESC);
@@ -491,6 +542,13 @@ CREATE INDEX idx_env_device_time ON environment_data(device_id, created_at DESC)
 CREATE INDEX idx_config_device_type ON device_configs(device_id, config_type);
 CREATE INDEX idx_config_hash ON device_configs(config_hash);
 CREATE INDEX idx_config_time ON device_configs(created_at DESC);
+-- Full-text search over the latest configs: config_fts (FTS5 trigrams) and config_fts_docs are
+-- created by config_search.py, which falls back to scanning when SQLite lacks FTS5
+
+-- Config change history
+CREATE INDEX idx_config_changes_device_time ON config_changes(device_id, detected_at DESC);
+CREATE INDEX idx_config_changes_time ON config_changes(detected_at DESC);
+CREATE INDEX idx_config_changes_configs ON config_changes(new_config_id, old_config_id);
 
 -- Hardware indexes
 CREATE INDEX idx_hardware_device ON hardware_inventory(device_id);
@@ -660,39 +718,8 @@ BEGIN
     AND d.id != NEW.device_id; -- Don't create self-loops
 END;
 
--- Auto-detect configuration changes
-CREATE TRIGGER detect_config_changes
-    AFTER INSERT ON device_configs
-    FOR EACH ROW
-BEGIN
-    INSERT INTO config_changes (
-        device_id,
-        old_config_id,
-        new_config_id,
-        change_type,
-        change_size
-    )
-    SELECT
-        NEW.device_id,
-        old_config.id,
-        NEW.id,
-        CASE 
-            WHEN old_config.id IS NULL THEN 'added'
-            WHEN old_config.config_hash != NEW.config_hash THEN 'modified'
-            ELSE 'replaced'
-        END,
-        ABS(NEW.line_count - COALESCE(old_config.line_count, 0))
-    FROM (
-        SELECT id, config_hash, line_count
-        FROM device_configs
-        WHERE device_id = NEW.device_id 
-        AND config_type = NEW.config_type
-        AND id != NEW.id
-        ORDER BY created_at DESC
-        LIMIT 1
-    ) old_config
-    WHERE old_config.config_hash IS NULL OR old_config.config_hash != NEW.config_hash;
-END;
+-- config_changes rows are written by the importer (config_diff.py) with the unified diff,
+-- change size and summary; a trigger cannot compute diffs
 
 -- ========================
 -- INITIAL DATA SETUP
@@ -0,0 +1,668 @@
+#!/usr/bin/env python3
+"""
+Asyncio SSH Collection Engine
+Collects the common NAPALM getters over asyncssh sessions, parsing CLI output with
+ntc-templates TextFSM into the structures NAPALM returns, so results import the same way
+as DatabaseDeviceCollector.collect_single_device_sequential. Commands run in one
+interactive shell per device, which enters enable mode when the credential has an enable
+password. Hundreds of devices run concurrently in one event loop under a global session
+cap and per-site caps; drivers and getters the engine does not cover, and config getters
+on sessions left in user EXEC, run on the collector's NAPALM thread pool
+"""
+
+import asyncio
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import asyncssh
+    from ntc_templates.parse import parse_output
+    ASYNC_ENGINE_AVAILABLE = True
+except ImportError:
+    asyncssh = None
+    parse_output = None
+    ASYNC_ENGINE_AVAILABLE = False
+
+
+UPTIME_UNITS = {
+    'year': 31536000,
+    'week': 604800,
+    'day': 86400,
+    'hour': 3600,
+    'minute': 60,
+    'second': 1
+}
+
+# Last line of shell output: a prompt before the session knows its own, and enable's password prompt
+ANY_PROMPT = re.compile(r"^\S+[>#]\s*$")
+PASSWORD_PROMPT = re.compile(r"[Pp]assword:\s*$")
+COMMAND_ERROR = re.compile(r"^% ?(Invalid|Incomplete|Ambiguous)", re.MULTILINE)
+
+# Getters whose commands need privileged EXEC
+PRIVILEGED_GETTERS = {'get_config'}
+
+CONFIG_HEADER = re.compile(r"^(Building configuration\.\.\.\s*|Current configuration : \d+ bytes\s*|! Command: .*)\n",
+                           re.MULTILINE)
+
+
+class CommandError(Exception):
+    """Device rejected a CLI command"""
+
+
+class CLISession:
+    """
+    One interactive shell on a device, the way NAPALM's netmiko drivers talk to it. Many
+    IOS builds refuse a second exec channel on a session, and user-EXEC logins cannot show
+    configs, so every command runs here, one after another, after paging is disabled and
+    enable mode entered when a secret is given
+    """
+
+    def __init__(self, process, timeout: float):
+        self.process = process
+        self.timeout = timeout
+        self.prompt = None
+        self.privileged = False
+
+    @classmethod
+    async def open(cls, conn, setup_commands: List[str], secret: str, timeout: float) -> 'CLISession':
+        process = await conn.create_process(term_type='vt100', term_size=(511, 24),
+                                            encoding='utf-8', errors='replace')
+        session = cls(process, timeout)
+        session._set_prompt(await session._read_until(ANY_PROMPT))
+        if not session.privileged and secret:
+            await session._enable(secret)
+        for command in setup_commands:
+            try:
+                await session.run(command)
+            except CommandError as e:
+                logging.debug(f"Session setup command failed: {str(e)}")
+        return session
+
+    def _set_prompt(self, output: str):
+        prompt = output[output.rfind('\n') + 1:].strip()
+        self.privileged = prompt.endswith('#')
+        self.prompt = re.compile(rf"^{re.escape(prompt[:-1])}(\([\w.-]+\))?[>#]\s*$")
+
+    async def _read_until(self, *patterns: re.Pattern) -> str:
+        """Read until the last line of output matches one of the patterns"""
+        output = ''
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            chunk = await asyncio.wait_for(self.process.stdout.read(65536), timeout=remaining)
+            if not chunk:
+                raise CommandError("Shell closed by device")
+            output += chunk.replace('\r', '')
+            last_line = output[output.rfind('\n') + 1:]
+            if any(pattern.search(last_line) for pattern in patterns):
+                return output
+
+    async def _enable(self, secret: str):
+        self.process.stdin.write('enable\n')
+        output = await self._read_until(PASSWORD_PROMPT, self.prompt)
+        # A wrong secret is asked for again; empty answers run out the retries back to the prompt
+        answer = secret
+        while PASSWORD_PROMPT.search(output):
+            self.process.stdin.write(answer + '\n')
+            answer = ''
+            output = await self._read_until(PASSWORD_PROMPT, self.prompt)
+        self._set_prompt(output)
+
+    async def run(self, command: str) -> str:
+        """Run a command and return its output, without the echoed command and the prompt"""
+        self.process.stdin.write(command + '\n')
+        lines = (await self._read_until(self.prompt)).split('\n')[:-1]
+        if lines and lines[0].strip().endswith(command):
+            lines = lines[1:]
+        output = '\n'.join(lines) + '\n' if lines else ''
+        if COMMAND_ERROR.search(output):
+            raise CommandError(f"{command}: {output.strip()[:200]}")
+        return output
+
+    def close(self):
+        self.process.close()
+
+
+def uptime_seconds(text: str) -> float:
+    """Convert '1 year, 2 weeks, 3 days, 4 hours, 5 minutes' style uptime to seconds"""
+    total = 0
+    for value, unit in re.findall(r"(\d+)\s+(year|week|day|hour|minute|second)s?", text or ''):
+        total += int(value) * UPTIME_UNITS[unit]
+    return float(total)
+
+
+def age_seconds(text: str) -> float:
+    """ARP age as seconds: IOS reports minutes, EOS reports H:MM:SS, '-' means local"""
+    text = (text or '').strip()
+    if re.match(r"^\d+:\d+:\d+$", text):
+        hours, minutes, seconds = (int(p) for p in text.split(':'))
+        return float(hours * 3600 + minutes * 60 + seconds)
+    if text.isdigit():
+        return float(int(text) * 60)
+    return 0.0
+
+
+def normalize_mac(value: str) -> str:
+    """Convert dotted or colon MAC addresses to NAPALM's upper-case colon format"""
+    digits = re.sub(r"[^0-9a-fA-F]", "", value or '')
+    if len(digits) != 12:
+        return value or ''
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2)).upper()
+
+
+def bandwidth_mbps(text: str) -> float:
+    """Convert '1000000 Kbit' bandwidth to Mbps as NAPALM reports interface speed"""
+    match = re.match(r"(\d+)\s*(\w+)", text or '')
+    if not match:
+        return -1.0
+    value, unit = int(match.group(1)), match.group(2).lower()
+    if unit.startswith('kbit'):
+        return value / 1000.0
+    if unit.startswith('mbit'):
+        return float(value)
+    if unit.startswith('gbit'):
+        return value * 1000.0
+    return -1.0
+
+
+def strip_config_header(text: str) -> str:
+    """Drop the banner lines devices print before a configuration"""
+    return CONFIG_HEADER.sub('', text or '', count=3)
+
+
+def _interfaces(rows: List[Dict]) -> Dict:
+    interfaces = {}
+    for row in rows:
+        link_status = row.get('link_status', '').lower()
+        interfaces[row['interface']] = {
+            'is_up': row.get('protocol_status', '').lower().startswith('up'),
+            'is_enabled': 'administratively' not in link_status and 'disabled' not in link_status,
+            'description': row.get('description', ''),
+            'last_flapped': -1.0,
+            'speed': bandwidth_mbps(row.get('bandwidth', '')),
+            'mtu': int(row['mtu']) if row.get('mtu') else -1,
+            'mac_address': normalize_mac(row.get('mac_address', ''))
+        }
+    return interfaces
+
+
+def _mac_table(rows: List[Dict], mac_field: str) -> List[Dict]:
+    entries = []
+    for row in rows:
+        ports = row.get('destination_port') or ['']
+        entries.append({
+            'mac': normalize_mac(row.get(mac_field, '')),
+            'interface': ports[0],
+            'vlan': int(row['vlan_id']) if str(row.get('vlan_id', '')).isdigit() else 0,
+            'static': row.get('type', '').lower() == 'static',
+            'active': True,
+            'moves': int(row['moves']) if row.get('moves') else -1,
+            'last_move': -1.0
+        })
+    return entries
+
+
+def _arp_table(rows: List[Dict]) -> List[Dict]:
+    return [{
+        'interface': row.get('interface', ''),
+        'mac': normalize_mac(row.get('mac_address', '')),
+        'ip': row.get('ip_address', ''),
+        'age': age_seconds(row.get('age', ''))
+    } for row in rows]
+
+
+def _lldp_neighbors(rows: List[Dict]) -> Dict:
+    neighbors = {}
+    for row in rows:
+        local = row.get('local_interface')
+        if not local:
+            continue
+        neighbors.setdefault(local, []).append({
+            'hostname': row.get('neighbor_name', ''),
+            'port': row.get('neighbor_port_id') or row.get('neighbor_interface', ''),
+            'system_description': row.get('neighbor_description', ''),
+            'chassis_id': row.get('chassis_id', ''),
+            'port_id': row.get('neighbor_port_id') or row.get('neighbor_interface', '')
+        })
+    return neighbors
+
+
+def _config(outputs: Dict[str, str], running: str, startup: str) -> Dict:
+    return {
+        'running': strip_config_header(outputs[running]),
+        'startup': strip_config_header(outputs[startup]),
+        'candidate': ''
+    }
+
+
+def _ios_facts(parsed: Dict[str, List[Dict]]) -> Dict:
+    version = (parsed['show version'] or [{}])[0]
+    hostname = version.get('hostname', '')
+    return {
+        'vendor': 'Cisco',
+        'model': (version.get('hardware') or [''])[0],
+        'serial_number': (version.get('serial') or [''])[0],
+        'os_version': version.get('version', ''),
+        'hostname': hostname,
+        'fqdn': hostname,
+        'uptime': uptime_seconds(version.get('uptime', '')),
+        'interface_list': []
+    }
+
+
+def _ios_interfaces_ip(rows: List[Dict]) -> Dict:
+    addresses = {}
+    for row in rows:
+        for ip, prefix in zip(row.get('ip_address') or [], row.get('prefix_length') or []):
+            if ip and prefix:
+                addresses.setdefault(row['interface'], {'ipv4': {}})['ipv4'][ip] = {'prefix_length': int(prefix)}
+    return addresses
+
+
+def _eos_facts(parsed: Dict[str, List[Dict]]) -> Dict:
+    version = (parsed['show version'] or [{}])[0]
+    host = (parsed['show hostname'] or [{}])[0]
+    return {
+        'vendor': 'Arista',
+        'model': version.get('model', ''),
+        'serial_number': version.get('serial_number', ''),
+        'os_version': version.get('image', ''),
+        'hostname': host.get('hostname', ''),
+        'fqdn': host.get('fqdn', host.get('hostname', '')),
+        'uptime': uptime_seconds(version.get('uptime', '')),
+        'interface_list': []
+    }
+
+
+def _eos_interfaces_ip(rows: List[Dict]) -> Dict:
+    addresses = {}
+    for row in rows:
+        if row.get('ip_address') and '/' in row['ip_address']:
+            ip, prefix = row['ip_address'].split('/')
+            addresses[row['interface']] = {'ipv4': {ip: {'prefix_length': int(prefix)}}}
+    return addresses
+
+
+# Per NAPALM driver: ntc-templates platform and, per getter, the commands to run, whether their
+# output is parsed with TextFSM, and the converter building the NAPALM structure
+PLATFORMS = {
+    'ios': {
+        'platform': 'cisco_ios',
+        'session_setup': ['terminal length 0', 'terminal width 511'],
+        'getters': {
+            'get_facts': (['show version'], True, _ios_facts),
+            'get_config': (['show running-config', 'show startup-config'], False,
+                           lambda out: _config(out, 'show running-config', 'show startup-config')),
+            'get_arp_table': (['show ip arp'], True, lambda p: _arp_table(p['show ip arp'])),
+            'get_mac_address_table': (['show mac address-table'], True,
+                                      lambda p: _mac_table(p['show mac address-table'], 'destination_address')),
+            'get_lldp_neighbors': (['show lldp neighbors detail'], True,
+                                   lambda p: _lldp_neighbors(p['show lldp neighbors detail'])),
+            'get_interfaces': (['show interfaces'], True, lambda p: _interfaces(p['show interfaces'])),
+            'get_interfaces_ip': (['show ip interface'], True, lambda p: _ios_interfaces_ip(p['show ip interface']))
+        }
+    },
+    'eos': {
+        'platform': 'arista_eos',
+        'session_setup': ['terminal length 0', 'terminal width 32767'],
+        'getters': {
+            'get_facts': (['show version', 'show hostname'], True, _eos_facts),
+            'get_config': (['show running-config', 'show startup-config'], False,
+                           lambda out: _config(out, 'show running-config', 'show startup-config')),
+            'get_arp_table': (['show ip arp'], True, lambda p: _arp_table(p['show ip arp'])),
+            'get_mac_address_table': (['show mac address-table'], True,
+                                      lambda p: _mac_table(p['show mac address-table'], 'mac_address')),
+            'get_lldp_neighbors': (['show lldp neighbors detail'], True,
+                                   lambda p: _lldp_neighbors(p['show lldp neighbors detail'])),
+            'get_interfaces': (['show interfaces'], True, lambda p: _interfaces(p['show interfaces'])),
+            'get_interfaces_ip': (['show interfaces'], True, lambda p: _eos_interfaces_ip(p['show interfaces']))
+        }
+    }
+}
+
+
+class AsyncCollectionEngine:
+    """Event-loop collection engine with NAPALM thread-pool fallback"""
+
+    def __init__(self, collector, credentials: List[Dict], settings: Dict = None):
+        settings = settings or {}
+        self.collector = collector
+        self.credentials = credentials
+        self.max_sessions = settings.get('max_sessions', 200)
+        self.per_site_limit = settings.get('per_site_limit', 20)
+        self.connect_timeout = settings.get('connect_timeout', 15)
+        self.command_timeout = settings.get('command_timeout', collector.config.get('timeout', 60))
+        self.port = settings.get('port', 22)
+        self.ssh_options = settings.get('ssh_options', {}) or {}
+        self.counters = {'async_devices': 0, 'napalm_devices': 0, 'mixed_devices': 0}
+        # site_concurrency.site_limits and pacing apply here too; per_site_limit is the engine's default
+        self.budget = collector.site_budget(self.max_sessions, self.per_site_limit)
+
+        self._global_slots = None
+        self._site_slots = {}
+        self._pool = None
+
+    @staticmethod
+    def covered_methods(driver: Optional[str], methods: List[str]) -> List[str]:
+        """Getters from methods the engine can collect for a driver"""
+        spec = PLATFORMS.get(driver)
+        if not spec:
+            return []
+        return [m for m in methods if m in spec['getters']]
+
+    def run(self, plan: List[Tuple[Dict, List[str]]], writer) -> Dict:
+        """Collect every planned device, handing results to the writer; returns engine counters"""
+        asyncio.run(self._run(plan, writer))
+        logging.info(f"Async engine: {self.counters['async_devices']} devices over SSH, "
+                     f"{self.counters['mixed_devices']} with NAPALM for remaining getters, "
+                     f"{self.counters['napalm_devices']} on NAPALM only")
+        return dict(self.counters)
+
+    async def _run(self, plan: List[Tuple[Dict, List[str]]], writer):
+        self._global_slots = asyncio.Semaphore(self.max_sessions)
+        self._pool = ThreadPoolExecutor(max_workers=self.collector.max_workers)
+        loop = asyncio.get_running_loop()
+
+        submitted = {}
+        tasks = []
+        for device, methods in self.budget.interleave(plan):
+            if device['primary_ip'] in submitted:
+                logging.warning(f"Skipping duplicate device {device['device_name']} ({device['primary_ip']}) "
+                                f"- already submitted for collection")
+                continue
+            submitted[device['primary_ip']] = (device, methods)
+            self.collector.stats.site_enqueued(self.budget.site_of(device), device['primary_ip'])
+            tasks.append(asyncio.ensure_future(self._collect_device(device, methods)))
+
+        logging.info(f"Async engine: {len(tasks)} devices, {self.max_sessions} sessions max, "
+                     f"{self.per_site_limit} per site")
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                # The writer queue is bounded, so block a worker thread rather than the event loop
+                await loop.run_in_executor(None, writer.put, result)
+                device, methods = submitted[result['device_ip']]
+                self.collector.record_result(device, methods, result)
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def _site_slots_for(self, device: Dict) -> asyncio.Semaphore:
+        site = self.budget.site_of(device) if self.budget.enabled else 'ALL'
+        if site not in self._site_slots:
+            self._site_slots[site] = asyncio.Semaphore(self.budget.limit_for(site))
+        return self._site_slots[site]
+
+    async def _pace(self, site: str):
+        """Hold a site's next session start until its minimum connect interval has passed"""
+        delay = self.budget.pacing_delay(site)
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.budget.pacing_delay(site)
+        self.budget.mark_started(site)
+
+    async def _collect_device(self, device: Dict, methods: List[str]) -> Dict:
+        site = self.budget.site_of(device)
+        async with self._site_slots_for(device):
+            await self._pace(site)
+            async with self._global_slots:
+                self.collector.stats.site_started(site, device['primary_ip'])
+                result = await self._collect_device_session(device, methods)
+                self.collector.stats.site_finished(site, device['primary_ip'], result)
+                return result
+
+    async def _collect_device_session(self, device: Dict, methods: List[str]) -> Dict:
+        driver = self.collector.get_napalm_driver(device)
+        async_methods = self.covered_methods(driver, methods)
+        napalm_methods = [m for m in methods if m not in async_methods]
+
+        try:
+            if not async_methods:
+                self.counters['napalm_devices'] += 1
+                return await self._collect_napalm(device, methods)
+
+            result, connected, deferred = await self._collect_ssh(device, driver, async_methods)
+            napalm_methods += deferred
+            if napalm_methods and connected:
+                self.counters['mixed_devices'] += 1
+                # Keep the device timing spanning both sessions
+                timing = dict(self.collector.stats.device_times.get(device['primary_ip'], {}))
+                extra = await self._collect_napalm(device, napalm_methods)
+                self._merge_results(result, extra)
+                if 'start' in timing:
+                    self.collector.stats.device_times[device['primary_ip']] = {'start': timing['start']}
+                    self.collector.stats.end_device_collection(device['primary_ip'])
+            else:
+                self.counters['async_devices'] += 1
+            return result
+        except Exception as e:
+            logging.error(f"Error processing device {device['device_name']}: {str(e)}")
+            return {
+                'device_ip': device['primary_ip'],
+                'device_name': device['device_name'],
+                'database_id': device.get('id'),
+                'success': False,
+                'errors': [f"Async engine error: {str(e)}"],
+                'collection_time': datetime.now().isoformat(),
+                'methods_collected': [],
+                'methods_failed': []
+            }
+
+    async def _collect_napalm(self, device: Dict, methods: List[str]) -> Dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self.collector.collect_single_device_sequential,
+                                          device, self.credentials, methods)
+
+    def _merge_results(self, result: Dict, extra: Dict):
+        """Fold the NAPALM fallback result for the remaining getters into the SSH result"""
+        result['data'].update(extra.get('data', {}))
+        result['errors'].extend(extra.get('errors', []))
+        result['methods_collected'].extend(extra.get('methods_collected', []))
+        result['methods_failed'].extend(extra.get('methods_failed', []))
+        result['credential_attempts'] += extra.get('credential_attempts', 0)
+        result['collection_duration'] += extra.get('collection_duration', 0)
+        if extra.get('config_check'):
+            result['config_check'] = extra['config_check']
+        result['success'] = bool(result['methods_collected'])
+        if result['success'] and not result['credential_used']:
+            result['credential_used'] = extra.get('credential_used')
+            result['credential_source'] = extra.get('credential_source')
+
+    def _timing_key(self, driver: str) -> str:
+        """Driver label for latency histograms, kept apart from the same driver over NAPALM"""
+        return f"{driver}/asyncssh"
+
+    async def _connect(self, device: Dict, result: Dict):
+        """Open an SSH session trying affinity, cached, then priority-ordered credentials"""
+        device_name = device['device_name']
+        timing_key = self._timing_key(self.collector.get_napalm_driver(device))
+        for cred, source in self.collector.order_credentials(device, self.credentials):
+            result['credential_attempts'] += 1
+            open_started = time.time()
+            try:
+                conn = await asyncio.wait_for(asyncssh.connect(
+                    device['primary_ip'], port=self.port, username=cred['username'], password=cred['password'],
+                    known_hosts=None, client_keys=None, agent_path=None, **self.ssh_options
+                ), timeout=self.connect_timeout)
+                self.collector.stats.record_timing(timing_key, 'connect', time.time() - open_started)
+                logging.info(f"[{device_name}] Connected over SSH with {source} credentials: {cred['name']}")
+                self.collector.remember_credential(device, cred)
+                return conn, cred, source
+
+            except asyncssh.PermissionDenied as e:
+                self.collector.stats.record_timing(timing_key, 'auth_failed', time.time() - open_started,
+                                                   success=False)
+                logging.warning(f"[{device_name}] Authentication failed with {source} credentials {cred['name']}")
+                result['errors'].append(f"Credential {cred['name']} ({source}): {str(e)}")
+                if source != 'tested':
+                    self.collector.forget_credential(device, cred)
+
+            except (OSError, asyncio.TimeoutError, asyncssh.Error) as e:
+                # Transport failures are not credential specific - trying the next set would only wait again
+                self.collector.stats.record_timing(timing_key, 'connect_failed', time.time() - open_started,
+                                                   success=False)
+                message = str(e) or type(e).__name__
+                logging.warning(f"[{device_name}] SSH connection failed: {message}")
+                result['errors'].append(f"Credential {cred['name']} ({source}): {message}")
+                result['failure_type'] = 'unreachable'
+                break
+
+        if not result.get('failure_type'):
+            result['failure_type'] = 'auth'
+        return None, None, None
+
+    async def _check_config_change(self, session: CLISession, device: Dict, driver: str) -> Optional[Dict]:
+        """SSH counterpart of the collector's change marker pre-check"""
+        for command in self.collector.config_check_commands(driver):
+            try:
+                output = await session.run(command)
+            except (CommandError, asyncio.TimeoutError, asyncssh.Error) as e:
+                logging.debug(f"[{device.get('device_name')}] Config marker command '{command}' failed: {str(e)}")
+                continue
+            if output.strip():
+                return self.collector.evaluate_config_marker(device, command, output)
+        return None
+
+    async def _collect_ssh(self, device: Dict, driver: str, methods: List[str]) -> Tuple[Dict, bool, List[str]]:
+        """
+        Collect the covered getters over one SSH session; also reports whether a session was
+        opened and the getters left for NAPALM: all of them when no shell could be opened,
+        privileged ones when the shell stayed in user EXEC
+        """
+        device_ip = device['primary_ip']
+        device_name = device.get('device_name', device_ip)
+        spec = PLATFORMS[driver]
+        timing_key = self._timing_key(driver)
+        started = time.monotonic()
+        self.collector.stats.start_device_collection(device_ip)
+
+        result = {
+            'device_ip': device_ip,
+            'device_name': device_name,
+            'site_code': device.get('site_code'),
+            'napalm_driver': driver,
+            'success': False,
+            'data': {},
+            'errors': [],
+            'credential_used': None,
+            'credential_source': None,
+            'credential_attempts': 0,
+            'failure_type': None,
+            'collection_time': datetime.now().isoformat(),
+            'collection_duration': 0,
+            'methods_collected': [],
+            'methods_failed': []
+        }
+
+        conn, cred, source = await self._connect(device, result)
+        if conn is None:
+            logging.error(f"[{device_name}] Could not establish connection with any credentials")
+            self.collector.stats.end_device_collection(device_ip)
+            result['collection_duration'] = time.monotonic() - started
+            return result, False, []
+
+        try:
+            session = await CLISession.open(conn, spec['session_setup'], cred.get('enable_password', ''),
+                                            self.command_timeout)
+        except (CommandError, asyncio.TimeoutError, asyncssh.Error, OSError) as e:
+            logging.warning(f"[{device_name}] Could not open a CLI shell, using NAPALM: {str(e) or type(e).__name__}")
+            conn.close()
+            self.collector.stats.end_device_collection(device_ip)
+            result['collection_duration'] = time.monotonic() - started
+            return result, True, list(methods)
+
+        deferred = []
+        if not session.privileged:
+            deferred = [m for m in methods if m in PRIVILEGED_GETTERS]
+            methods = [m for m in methods if m not in PRIVILEGED_GETTERS]
+            if deferred:
+                logging.info(f"[{device_name}] Shell is in user EXEC, leaving {', '.join(deferred)} to NAPALM")
+
+        outputs = {}
+        try:
+            for method_name in self.collector._order_methods(methods):
+                commands, parsed, convert = spec['getters'][method_name]
+                method_start_time = time.time()
+                try:
+                    if method_name == 'get_config' and self.collector.config_check_commands(driver):
+                        config_check = await self._check_config_change(session, device, driver)
+                        self.collector.stats.record_timing(timing_key, 'config_check',
+                                                           time.time() - method_start_time,
+                                                           success=config_check is not None)
+                        if config_check:
+                            result['config_check'] = config_check
+                            if config_check['unchanged']:
+                                result['methods_collected'].append({
+                                    'method': method_name,
+                                    'duration': time.time() - method_start_time,
+                                    'success': True,
+                                    'unchanged': True
+                                })
+                                logging.info(f"[{device_name}] Config unchanged per '{config_check['command']}'")
+                                continue
+                        method_start_time = time.time()
+
+                    for command in commands:
+                        if command not in outputs:
+                            outputs[command] = await session.run(command)
+
+                    if parsed:
+                        method_data = convert({c: parse_output(platform=spec['platform'], command=c, data=outputs[c])
+                                               for c in commands})
+                    else:
+                        method_data = convert(outputs)
+
+                    method_duration = time.time() - method_start_time
+                    self.collector.stats.record_timing(timing_key, method_name, method_duration)
+                    result['data'][method_name] = method_data
+                    result['methods_collected'].append({
+                        'method': method_name,
+                        'duration': method_duration,
+                        'data_size': sum(len(outputs[c]) for c in commands),
+                        'success': True
+                    })
+
+                    if method_name == 'get_facts' and method_data.get('hostname'):
+                        clean_hostname = self.collector._clean_device_name(method_data['hostname'])
+                        if clean_hostname != device_ip:
+                            result['device_name'] = device_name = clean_hostname
+
+                except Exception as method_error:
+                    self.collector.stats.record_timing(timing_key, method_name, time.time() - method_start_time,
+                                                       success=False)
+                    result['methods_failed'].append({
+                        'method': method_name,
+                        'duration': time.time() - method_start_time,
+                        'error': str(method_error),
+                        'success': False
+                    })
+                    logging.warning(f"[{device_name}] Failed to collect {method_name}: {str(method_error)}")
+
+            if 'get_facts' in result['data'] and 'get_interfaces' in result['data']:
+                result['data']['get_facts']['interface_list'] = list(result['data']['get_interfaces'])
+
+            if result['methods_collected']:
+                result['success'] = True
+                result['credential_used'] = cred['name']
+                result['credential_source'] = source
+                logging.info(f"[{device_name}] SSH collection completed - {len(result['methods_collected'])} "
+                             f"methods succeeded, {len(result['methods_failed'])} failed")
+        finally:
+            close_started = time.time()
+            session.close()
+            conn.close()
+            try:
+                await asyncio.wait_for(conn.wait_closed(), timeout=self.connect_timeout)
+            except (asyncio.TimeoutError, asyncssh.Error, OSError):
+                pass
+            self.collector.stats.record_timing(timing_key, 'close', time.time() - close_started)
+
+        self.collector.stats.end_device_collection(device_ip)
+        result['collection_duration'] = time.monotonic() - started
+        return result, True, deferred
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Config Search Benchmark
+Imports synthetic devices with several config revisions each, then times config searches
+through the config_fts index against the LIKE scan over the latest configs they replace,
+and checks both find the same configs and match counts, including for terms that start or
+end inside a word
+
+Example:
+  python bench_config_search.py --devices 1000 --revisions 3 --config-lines 1500
+"""
+
+import argparse
+import logging
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import db_manager
+from bench_import import SCHEMA_PATH, build_device
+from config_search import LATEST_CONFIG_IDS, search_latest_configs
+from config_store import register_config_functions
+
+# The search the blueprints ran before the index: a LIKE scan of every latest config, then
+# each result's config fetched again to count matches
+LIKE_SCAN = f"""
+    SELECT dc.id FROM device_configs dc
+    JOIN devices d ON dc.device_id = d.id
+    WHERE dc.id IN ({LATEST_CONFIG_IDS})
+    AND config_text(dc.config_hash, dc.config_content) LIKE ?
+    ORDER BY d.device_name, dc.config_type
+    LIMIT ?
+"""
+
+CONFIG_TEXT = "SELECT config_text(config_hash, config_content) FROM device_configs WHERE id = ?"
+
+
+def like_search(conn: sqlite3.Connection, term: str, limit: int) -> dict:
+    counts = {}
+    for (config_id,) in conn.execute(LIKE_SCAN, (f"%{term}%", limit)).fetchall():
+        counts[config_id] = conn.execute(CONFIG_TEXT, (config_id,)).fetchone()[0].lower().count(term.lower())
+    return counts
+
+
+def time_searches(terms, search) -> (float, dict):
+    """Mean milliseconds per search and what each term found"""
+    found = {}
+    started = time.perf_counter()
+    for term in terms:
+        found[term] = search(term)
+    elapsed = time.perf_counter() - started
+    return elapsed * 1000 / len(terms), found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed config search against LIKE scans")
+    parser.add_argument("--devices", type=int, default=1000, help="Synthetic devices")
+    parser.add_argument("--revisions", type=int, default=3, help="Config revisions imported per device")
+    parser.add_argument("--config-lines", type=int, default=1500, help="Approximate lines per config")
+    parser.add_argument("--limit", type=int, default=100, help="Results per search, as the search page asks for")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--keep", metavar='DIR', help="Keep the database in DIR")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    work_dir = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix='bench_config_search_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    db_path = str(work_dir / 'config_search.db')
+    try:
+        Path(db_path).unlink(missing_ok=True)
+        rng = random.Random(args.seed)
+        sizes = {'arp': 0, 'mac': 0, 'interfaces': 48, 'lldp': 0, 'config_lines': args.config_lines}
+        records = [build_device(index, rng, sizes) for index in range(args.devices)]
+        for record in records:
+            record['data'] = {getter: record['data'][getter] for getter in ('get_facts', 'get_config')}
+
+        cmdb = db_manager.NapalmCMDB(db_path, str(SCHEMA_PATH))
+        started = time.time()
+        for revision in range(args.revisions):
+            for index, record in enumerate(records):
+                config = record['data']['get_config']
+                config['running'] += (f"\ninterface Loopback{revision + 1}\n"
+                                      f" description revision-{revision}\n"
+                                      f" ip address 10.{revision}.{index // 250}.{index % 250 + 1} 255.255.255.255\n")
+                cmdb.import_napalm_data(record)
+        print(f"Imported {args.devices * args.revisions:,} device runs in {time.time() - started:.1f}s "
+              f"(index maintained: {cmdb.config_index})")
+        cmdb.close()
+
+        latest = args.revisions - 1
+        terms = [f"ip address 10.{latest}.0.{rng.randrange(1, 251)} 255.255.255.255" for _ in range(10)]
+        terms += ['description uplink-0', f'revision-{latest}', 'Loopback1', 'access-list 110', 'no-such-token',
+                  'Ethernet1/0/4', 'link-1', 'ss-list']
+
+        conn = register_config_functions(sqlite3.connect(db_path))
+        fts_search = lambda term: {row['config_id']: row['match_count']
+                                   for row in search_latest_configs(conn, term, 'contains', limit=args.limit)}
+        for label, group in (('one device', terms[:10]), ('every device', terms[10:])):
+            like_ms, _ = time_searches(group, lambda term: like_search(conn, term, args.limit))
+            fts_ms, _ = time_searches(group, fts_search)
+            print(f"{label:<14} LIKE scan + recount {like_ms:9.2f} ms   config_fts {fts_ms:8.2f} ms   "
+                  f"(limit {args.limit})")
+        # Unlimited, both must find the same configs with the same counts
+        all_like = {term: like_search(conn, term, -1) for term in terms}
+        all_fts = {term: {row['config_id']: row['match_count']
+                          for row in search_latest_configs(conn, term, 'contains', limit=-1)} for term in terms}
+        conn.close()
+
+        for term in terms:
+            print(f"  {term:<40} {len(all_fts[term]):>6} configs")
+        mismatched = [term for term in terms if all_like[term] != all_fts[term]]
+        if mismatched:
+            print(f"MISMATCH for {', '.join(mismatched)}")
+            return 1
+        print(f"Results and match counts identical for {len(terms)} terms")
+        return 0
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Config Blob Store Benchmark
+Imports several synthetic collection runs, where a share of the devices change their
+running config each run, then compares a database holding config text inline in
+device_configs (the layout before config_blobs) with the same database after
+config_store.py --migrate --vacuum. Reports file size, latest-config read latency with a
+cold and a warm decompression cache, and a LIKE search across every latest config
+
+Example:
+  python bench_config_store.py --devices 2000 --runs 4
+"""
+
+import argparse
+import logging
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import db_manager
+from bench_import import SCHEMA_PATH, build_device
+from config_store import config_cache, migrate_inline_configs, register_config_functions
+
+LATEST_RUNNING = """
+    SELECT d.device_name, config_text(dc.config_hash, dc.config_content) AS config_content
+    FROM devices d
+    JOIN device_configs dc ON d.id = dc.device_id
+    WHERE d.device_name = ? AND dc.config_type = 'running'
+    ORDER BY dc.created_at DESC, dc.id DESC
+    LIMIT 1
+"""
+
+SEARCH_LATEST = """
+    SELECT COUNT(*)
+    FROM device_configs dc
+    WHERE dc.config_type = 'running'
+      AND dc.id IN (SELECT MAX(id) FROM device_configs WHERE config_type = 'running' GROUP BY device_id)
+      AND config_text(dc.config_hash, dc.config_content) LIKE ?
+"""
+
+
+def build_history(db_path: str, devices: int, runs: int, change_rate: float, config_lines: int, seed: int) -> int:
+    """Import the runs through NapalmCMDB; returns the device_configs row count"""
+    rng = random.Random(seed)
+    sizes = {'arp': 0, 'mac': 0, 'interfaces': 24, 'lldp': 0, 'config_lines': config_lines}
+    cmdb = db_manager.NapalmCMDB(db_path, str(SCHEMA_PATH))
+    records = [build_device(index, rng, sizes) for index in range(devices)]
+    for record in records:
+        # Startup matches running until something changes, so the pair shares one blob
+        record['data']['get_config']['startup'] = record['data']['get_config']['running']
+
+    for run in range(runs):
+        for record in records:
+            if run and rng.random() < change_rate:
+                config = record['data']['get_config']
+                config['running'] += f"\nlogging host 10.9.{run}.{rng.randrange(256)}"
+            cmdb.import_napalm_data(record)
+    cmdb.close()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM device_configs").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def inline_copy(source: str, target: str):
+    """Rewrite a blob-store database into the old layout, every row holding its own text"""
+    shutil.copyfile(source, target)
+    conn = sqlite3.connect(target)
+    register_config_functions(conn)
+    conn.execute("UPDATE device_configs SET config_content = config_text(config_hash, config_content)")
+    conn.execute("DROP TABLE config_blobs")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def time_reads(db_path: str, names, repeat: int = 1) -> float:
+    """Mean milliseconds to fetch one device's latest running config"""
+    conn = sqlite3.connect(db_path)
+    register_config_functions(conn)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for name in names:
+            conn.execute(LATEST_RUNNING, (name,)).fetchone()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed * 1000 / (len(names) * repeat)
+
+
+def time_search(db_path: str, pattern: str) -> (float, int):
+    conn = sqlite3.connect(db_path)
+    register_config_functions(conn)
+    started = time.perf_counter()
+    matches = conn.execute(SEARCH_LATEST, (pattern,)).fetchone()[0]
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed * 1000, matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inline vs blob-store device config storage")
+    parser.add_argument("--devices", type=int, default=2000, help="Synthetic devices")
+    parser.add_argument("--runs", type=int, default=4, help="Collection runs imported per device")
+    parser.add_argument("--change-rate", type=float, default=0.2, help="Share of devices changing config per run")
+    parser.add_argument("--config-lines", type=int, default=600, help="Running config lines per device")
+    parser.add_argument("--reads", type=int, default=500, help="Devices sampled for read latency")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--keep", metavar='DIR', help="Keep the databases in DIR")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    work_dir = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix='bench_config_store_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    blob_db, inline_db = str(work_dir / 'blobs.db'), str(work_dir / 'inline.db')
+    try:
+        for path in (blob_db, inline_db):
+            Path(path).unlink(missing_ok=True)
+        started = time.time()
+        rows = build_history(blob_db, args.devices, args.runs, args.change_rate, args.config_lines, args.seed)
+        inline_copy(blob_db, inline_db)
+        print(f"History: {args.devices} devices x {args.runs} runs, {rows} device_configs rows, "
+              f"built in {time.time() - started:.1f}s")
+
+        # Migrate the inline copy the way an existing installation would
+        migrated_db = str(work_dir / 'migrated.db')
+        shutil.copyfile(inline_db, migrated_db)
+        conn = sqlite3.connect(migrated_db)
+        started = time.time()
+        stats = migrate_inline_configs(conn)
+        migrate_seconds = time.time() - started
+        conn.execute("VACUUM")
+        conn.close()
+
+        inline_size = Path(inline_db).stat().st_size
+        migrated_size = Path(migrated_db).stat().st_size
+        print(f"Migration: {stats['rows_migrated']} rows into {stats['blobs_added']} blobs in {migrate_seconds:.1f}s")
+        print(f"{'database size':<26} inline {inline_size / 1e6:8.1f} MB   blob store {migrated_size / 1e6:8.1f} MB   "
+              f"{inline_size / migrated_size:5.1f}x smaller")
+        print(f"{'config text':<26} inline {stats['inline_bytes'] / 1e6:8.1f} MB   blob store "
+              f"{stats['stored_bytes'] / 1e6:8.1f} MB")
+
+        names = [f"{['frc', 'dal', 'nyc', 'sea', 'atl'][i % 5]}-b{i // 250:02d}-swl-{i:05d}"
+                 for i in random.Random(args.seed).sample(range(args.devices), min(args.reads, args.devices))]
+        inline_ms = time_reads(inline_db, names)
+        config_cache.clear()
+        cold_ms = time_reads(migrated_db, names)
+        warm_ms = time_reads(migrated_db, names, repeat=3)
+        print(f"{'latest config read':<26} inline {inline_ms:8.3f} ms   cold cache {cold_ms:8.3f} ms   "
+              f"warm cache {warm_ms:8.3f} ms")
+
+        pattern = '%logging host 10.9.1.%'
+        inline_search, inline_matches = time_search(inline_db, pattern)
+        config_cache.clear()
+        cold_search, blob_matches = time_search(migrated_db, pattern)
+        warm_search, _ = time_search(migrated_db, pattern)
+        print(f"{'LIKE over latest configs':<26} inline {inline_search:8.1f} ms   cold cache {cold_search:8.1f} ms   "
+              f"warm cache {warm_search:8.1f} ms")
+        if inline_matches != blob_matches:
+            print(f"MISMATCH: inline search found {inline_matches}, blob store {blob_matches}")
+            return 1
+        print(f"Search matches identical: {inline_matches}")
+        return 0
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
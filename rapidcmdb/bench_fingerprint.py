@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Fingerprint Engine Micro-Benchmark
+Compares the compiled FingerprintEngine in pyscanner3 against the original
+per-vendor substring/regex implementation on a synthetic device corpus and
+verifies both produce identical results
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from typing import Dict, List, Any
+
+from pyscanner3 import FingerprintEngine
+
+
+class ReferenceFingerprintEngine(FingerprintEngine):
+    """Original uncompiled matcher: walks raw YAML rules and re-runs re.search per device"""
+
+    def fingerprint_device(self, snmp_data: Dict[str, str]) -> Dict[str, Any]:
+        result = self._ref_check_definitive_oids(snmp_data)
+        if result['confidence_score'] > 0:
+            return result
+        return self._ref_pattern_based_fingerprint(snmp_data)
+
+    def _ref_check_definitive_oids(self, snmp_data: Dict[str, str]) -> Dict[str, Any]:
+        for vendor_name in self.vendor_priority:
+            if vendor_name not in self.rules.get('vendors', {}):
+                continue
+
+            vendor_config = self.rules['vendors'][vendor_name]
+            definitive_matches = {}
+            for oid_config in vendor_config.get('fingerprint_oids', []):
+                if not oid_config.get('definitive', False):
+                    continue
+
+                oid = oid_config.get('oid', '')
+                if oid in snmp_data and snmp_data[oid]:
+                    name = oid_config.get('name', '').lower()
+                    value = snmp_data[oid]
+                    expected_values = oid_config.get('expected_values', [])
+                    if expected_values and value.lower() not in [v.lower() for v in expected_values]:
+                        continue
+                    definitive_matches[name] = value
+
+            if definitive_matches:
+                return self._ref_process_definitive_match(vendor_name, vendor_config, definitive_matches, snmp_data)
+
+        return {"confidence_score": 0, "vendor": "", "device_type": ""}
+
+    def _ref_process_definitive_match(self, vendor_name, vendor_config, definitive_matches, snmp_data):
+        model, serial, firmware = self._ref_smart_field_extraction(snmp_data, vendor_config)
+        device_type = self._ref_determine_device_type(vendor_config, " ".join(definitive_matches.values()).lower())
+
+        if not model:
+            model = self._ref_extract_field(vendor_config, 'model_extraction', " ".join(snmp_data.values()), device_type)
+        if not serial:
+            serial = self._ref_extract_field(vendor_config, 'serial_extraction', " ".join(snmp_data.values()), device_type)
+        if not firmware:
+            firmware = self._ref_extract_field(vendor_config, 'firmware_extraction', " ".join(snmp_data.values()), device_type)
+
+        return {
+            "vendor": vendor_name,
+            "device_type": device_type if device_type != "unknown" else "device",
+            "model": model,
+            "serial_number": serial,
+            "os_version": firmware,
+            "confidence_score": 100,
+            "detection_method": "definitive_oid_match",
+            "matched_oids": list(definitive_matches.keys())
+        }
+
+    def _ref_smart_field_extraction(self, snmp_data, vendor_config):
+        oid_name_map = {}
+        for oid_config in vendor_config.get('fingerprint_oids', []):
+            oid = oid_config.get('oid', '')
+            name = oid_config.get('name', '').lower()
+            if oid and name:
+                oid_name_map[oid] = name
+        return self._smart_field_extraction(snmp_data, {"oid_name_map": oid_name_map})
+
+    def _ref_pattern_based_fingerprint(self, snmp_data: Dict[str, str]) -> Dict[str, Any]:
+        sys_descr = snmp_data.get("1.3.6.1.2.1.1.1.0", "").lower()
+        sys_name = snmp_data.get("1.3.6.1.2.1.1.5.0", "").lower()
+
+        all_text = f"{sys_descr} {sys_name}"
+        for oid, value in snmp_data.items():
+            if value and value not in ["<nil>", ""]:
+                all_text += f" {str(value).lower()}"
+
+        for vendor_name in self.vendor_priority:
+            if vendor_name not in self.rules.get('vendors', {}):
+                continue
+            result = self._ref_test_vendor(vendor_name, self.rules['vendors'][vendor_name], all_text)
+            if result['confidence_score'] > 0:
+                return result
+
+        return {
+            "vendor": "",
+            "device_type": "",
+            "model": "",
+            "serial_number": "",
+            "os_version": "",
+            "confidence_score": 30,
+            "detection_method": "no_vendor_detected"
+        }
+
+    def _ref_test_vendor(self, vendor_name, vendor_rule, all_text):
+        for exclusion in vendor_rule.get('exclusion_patterns', []):
+            if exclusion.lower() in all_text:
+                return {"confidence_score": 0, "vendor": "", "device_type": ""}
+
+        confidence = 0
+        matched_patterns = []
+        detection_method = "pattern_match"
+
+        definitive_patterns = vendor_rule.get('definitive_patterns', [])
+        if not definitive_patterns:
+            definitive_patterns = vendor_rule.get('detection_patterns', [])
+
+        definitive_matches = 0
+        for pattern in definitive_patterns:
+            pattern_str = pattern.get('pattern', pattern) if isinstance(pattern, dict) else pattern
+            if pattern_str.lower() in all_text:
+                definitive_matches += 1
+                matched_patterns.append(pattern_str)
+                confidence += 90
+                detection_method = "definitive_pattern_match"
+
+        if definitive_patterns and definitive_matches == 0:
+            return {"confidence_score": 0, "vendor": "", "device_type": ""}
+        if confidence == 0:
+            return {"confidence_score": 0, "vendor": "", "device_type": ""}
+
+        device_type = self._ref_determine_device_type(vendor_rule, all_text)
+        return {
+            "vendor": vendor_name,
+            "device_type": device_type,
+            "model": self._ref_extract_field(vendor_rule, 'model_extraction', all_text, device_type),
+            "serial_number": self._ref_extract_field(vendor_rule, 'serial_extraction', all_text, device_type),
+            "os_version": self._ref_extract_field(vendor_rule, 'firmware_extraction', all_text, device_type),
+            "confidence_score": min(confidence, 100),
+            "detection_method": detection_method,
+            "matched_patterns": matched_patterns
+        }
+
+    def _ref_determine_device_type(self, vendor_rule, all_text):
+        best_type = ""
+        best_score = 0
+
+        for device_type, type_rule in vendor_rule.get('device_type_rules', {}).items():
+            score = 0
+            for pattern in type_rule.get('definitive_patterns', []):
+                if pattern.lower() in all_text:
+                    score += 100
+
+            mandatory_patterns = type_rule.get('mandatory_patterns', [])
+            mandatory_matches = 0
+            for pattern in mandatory_patterns:
+                if pattern.lower() in all_text:
+                    mandatory_matches += 1
+                    score += 50
+            if mandatory_patterns and mandatory_matches == 0:
+                continue
+
+            for pattern in type_rule.get('optional_patterns', []):
+                if pattern.lower() in all_text:
+                    score += 20
+
+            score += (100 - type_rule.get('priority', 99)) * 5
+            if score > best_score:
+                best_score = score
+                best_type = device_type
+
+        return best_type if best_type else "unknown"
+
+    def _ref_extract_field(self, vendor_rule, field_type, all_text, device_type):
+        for rule in vendor_rule.get(field_type, []):
+            device_types = rule.get('device_types', [])
+            if device_types and device_type not in device_types:
+                continue
+            try:
+                pattern = rule.get('regex', '')
+                if not pattern:
+                    continue
+                match = re.search(pattern, all_text, re.IGNORECASE)
+                if match:
+                    capture_group = rule.get('capture_group', 1)
+                    if len(match.groups()) >= capture_group:
+                        extracted = match.group(capture_group).strip()
+                        if extracted:
+                            return extracted
+            except Exception:
+                continue
+        return ""
+
+
+def build_corpus(rules: Dict, size: int, seed: int) -> List[Dict[str, str]]:
+    """Build synthetic SNMP data from the rule file's own patterns plus noise"""
+    rng = random.Random(seed)
+    vendors = rules.get('vendors', {})
+
+    vocabulary = []
+    definitive_oids = []
+    for vendor_rule in vendors.values():
+        for key in ('definitive_patterns', 'detection_patterns', 'exclusion_patterns'):
+            for pattern in vendor_rule.get(key, []) or []:
+                vocabulary.append(pattern.get('pattern', '') if isinstance(pattern, dict) else pattern)
+        for type_rule in (vendor_rule.get('device_type_rules', {}) or {}).values():
+            for key in ('definitive_patterns', 'mandatory_patterns', 'optional_patterns'):
+                vocabulary.extend(type_rule.get(key, []) or [])
+        for oid_config in vendor_rule.get('fingerprint_oids', []) or []:
+            if oid_config.get('definitive'):
+                definitive_oids.append(oid_config)
+    vocabulary = [str(v) for v in vocabulary if v]
+
+    noise = ["Software", "Version", "Release", "Copyright", "Inc.", "Technologies", "build",
+             "Model:", "serial number:", "SN:", "running", "Linux", "kernel", "firmware", "(c)"]
+
+    corpus = []
+    for i in range(size):
+        words = rng.sample(vocabulary, k=rng.randint(1, 4)) + rng.sample(noise, k=rng.randint(2, 6))
+        rng.shuffle(words)
+        words.append(f"Version {rng.randint(1, 20)}.{rng.randint(0, 9)}.{rng.randint(0, 99)}")
+        if rng.random() < 0.3:
+            words.append(f"Serial Number: {rng.randint(10 ** 8, 10 ** 9):x}")
+        sys_descr = " ".join(words)
+        if rng.random() < 0.5:
+            sys_descr = sys_descr.title()
+
+        snmp_data = {
+            "1.3.6.1.2.1.1.1.0": sys_descr,
+            "1.3.6.1.2.1.1.5.0": f"dev-{i:05d}",
+            "1.3.6.1.2.1.1.2.0": f"1.3.6.1.4.1.{rng.randint(1, 50000)}.1.{rng.randint(1, 999)}",
+        }
+        if rng.random() < 0.2:
+            snmp_data["1.3.6.1.2.1.47.1.1.1.1.13.1"] = f"MDL-{rng.randint(100, 9999)}"
+        if definitive_oids and rng.random() < 0.1:
+            oid_config = rng.choice(definitive_oids)
+            expected = oid_config.get('expected_values') or [f"value-{rng.randint(1, 99)}"]
+            snmp_data[oid_config['oid']] = rng.choice(expected)
+        corpus.append(snmp_data)
+
+    return corpus
+
+
+def run_engine(engine: FingerprintEngine, corpus: List[Dict[str, str]]):
+    start = time.perf_counter()
+    results = [engine.fingerprint_device(snmp_data) for snmp_data in corpus]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compiled vs reference fingerprint matching")
+    parser.add_argument("--rules", default="config/vendor_fingerprints.yaml", help="Fingerprint rules file")
+    parser.add_argument("--devices", type=int, default=50000, help="Synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus random seed")
+    args = parser.parse_args()
+
+    load_start = time.perf_counter()
+    compiled = FingerprintEngine(args.rules)
+    load_time = time.perf_counter() - load_start
+    reference = ReferenceFingerprintEngine(args.rules)
+
+    corpus = build_corpus(compiled.rules, args.devices, args.seed)
+    print(f"Corpus: {len(corpus)} synthetic devices, {len(compiled.rules.get('vendors', {}))} vendors")
+    print(f"Compiled rule load: {load_time * 1000:.1f} ms")
+
+    ref_results, ref_time = run_engine(reference, corpus)
+    new_results, new_time = run_engine(compiled, corpus)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(ref_results, new_results)) if a != b]
+    detected = sum(1 for r in new_results if r.get('vendor'))
+
+    print(f"Reference engine: {ref_time:.2f}s ({len(corpus) / ref_time:,.0f} devices/s)")
+    print(f"Compiled engine:  {new_time:.2f}s ({len(corpus) / new_time:,.0f} devices/s)")
+    print(f"Speedup: {ref_time / new_time:.1f}x")
+    print(f"Vendors detected: {detected}/{len(corpus)}")
+
+    if mismatches:
+        print(f"MISMATCH: {len(mismatches)} devices differ, first at index {mismatches[0]}")
+        print(f"  reference: {ref_results[mismatches[0]]}")
+        print(f"  compiled:  {new_results[mismatches[0]]}")
+        sys.exit(1)
+
+    print("Results identical")
+
+
+if __name__ == "__main__":
+    main()
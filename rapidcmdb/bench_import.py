@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+CMDB Import Benchmark
+Generates a synthetic capture set (legacy *_complete.json files or one capture archive)
+and imports it into fresh databases three ways: the serial path that commits after every
+table, the single-writer path on one process, and the process-pool parser feeding the
+single writer. Reports devices/s for each and checks every database ends with the same
+row counts
+
+Example:
+  python bench_import.py --devices 5000 --workers 8
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+import db_manager
+from capture_archive import CaptureArchiveWriter
+
+SCHEMA_PATH = Path(__file__).resolve().parent / 'cmdb.sql'
+COUNTED_TABLES = ['devices', 'device_ips', 'collection_runs', 'interfaces', 'lldp_neighbors', 'arp_entries',
+                  'mac_address_table', 'environment_data', 'device_configs', 'device_users', 'vlans', 'routes',
+                  'hardware_inventory']
+
+
+def random_mac(rng: random.Random) -> str:
+    mac = ''.join(f"{rng.randrange(256):02x}" for _ in range(6))
+    return '.'.join(mac[i:i + 4] for i in range(0, 12, 4))  # Cisco dotted form, normalised on import
+
+
+def build_device(index: int, rng: random.Random, sizes: Dict[str, int]) -> Dict:
+    """One successful collector result with every getter the importer understands"""
+    site = ['FRC', 'DAL', 'NYC', 'SEA', 'ATL'][index % 5]
+    name = f"{site.lower()}-b{index // 250:02d}-swl-{index:05d}"
+    mgmt_ip = f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"
+    interfaces = [f"GigabitEthernet1/0/{port}" for port in range(1, sizes['interfaces'] + 1)]
+    interfaces += ['Vlan10', 'Loopback0', 'Port-channel1']
+
+    config_lines = [f"hostname {name}", "!"]
+    for port, interface in enumerate(interfaces):
+        config_lines += [f"interface {interface}", f" description uplink-{port}",
+                         f" switchport access vlan {10 + port % 20}", "!"]
+    while len(config_lines) < sizes['config_lines']:
+        config_lines.append(f"access-list 110 permit tcp any host 10.200.{len(config_lines) % 256}.1 eq 443")
+
+    return {
+        'device_name': name,
+        'device_ip': mgmt_ip,
+        'site_code': site,
+        'napalm_driver': 'ios',
+        'success': True,
+        'credential_used': 'primary',
+        'errors': [],
+        'collection_time': datetime.now().isoformat(),
+        'data': {
+            'get_facts': {'hostname': name, 'fqdn': f"{name}.example.net", 'vendor': 'Cisco', 'model': 'C9300-48P',
+                          'serial_number': f"FOC{index:08d}", 'os_version': '17.9.4', 'uptime': 86400.0 * (index % 90),
+                          'interface_list': interfaces},
+            'get_interfaces': {
+                interface: {'is_up': rng.random() > 0.3, 'is_enabled': True, 'description': f"port {interface}",
+                            'speed': 1000, 'mtu': 1500, 'last_flapped': float(rng.randrange(100000)),
+                            'mac_address': random_mac(rng)}
+                for interface in interfaces
+            },
+            'get_interfaces_ip': {
+                'Vlan10': {'ipv4': {f"172.{16 + index // 65536 % 16}.{index // 256 % 256}.{index % 256}":
+                                    {'prefix_length': 24}}},
+                'Loopback0': {'ipv4': {f"192.{168 - index // 65536 % 16}.{index // 256 % 256}.{index % 256}":
+                                       {'prefix_length': 32}}},
+            },
+            'get_lldp_neighbors': {
+                f"GigabitEthernet1/0/{port}": [{'hostname': f"{site.lower()}-dist-{port:02d}",
+                                                'port': f"TenGigabitEthernet1/1/{port}"}]
+                for port in range(1, sizes['lldp'] + 1)
+            },
+            'get_arp_table': [
+                {'interface': 'Vlan10', 'mac': random_mac(rng), 'ip': f"10.250.{n // 256}.{n % 256}",
+                 'age': float(rng.randrange(14400))}
+                for n in range(sizes['arp'])
+            ],
+            'get_mac_address_table': [
+                {'mac': random_mac(rng), 'interface': interfaces[n % len(interfaces)], 'vlan': 10 + n % 20,
+                 'static': False, 'active': True, 'moves': n % 3, 'last_move': float(rng.randrange(86400))}
+                for n in range(sizes['mac'])
+            ],
+            'get_environment': {
+                'cpu': {'0': {'%usage': float(rng.randrange(100))}},
+                'memory': {'used_ram': 400000000, 'available_ram': 1200000000},
+                'temperature': {'inlet': {'temperature': 31.0, 'is_alert': False, 'is_critical': False}},
+                'power': {'PS1': {'status': True, 'capacity': 715.0, 'output': 210.0}},
+                'fans': {'FAN1': {'status': True}}
+            },
+            'get_config': {'running': '\n'.join(config_lines), 'startup': '', 'candidate': ''},
+            'get_users': {'admin': {'level': 15, 'password': '$9$abcdef', 'sshkeys': []}},
+            'get_vlans': {str(10 + n): {'name': f"VLAN{10 + n}", 'interfaces': interfaces[n::20]} for n in range(20)},
+        }
+    }
+
+
+def write_capture_set(directory: Path, devices: int, seed: int, capture_format: str, sizes: Dict[str, int]) -> int:
+    """Write the synthetic capture set; returns the bytes written"""
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    if capture_format == 'archive':
+        writer = CaptureArchiveWriter(directory, 'bench_capture')
+        for index in range(devices):
+            writer.write(build_device(index, rng, sizes))
+        writer.close()
+        return writer.path.stat().st_size
+
+    total = 0
+    for index in range(devices):
+        device = build_device(index, rng, sizes)
+        device_dir = directory / device['device_name']
+        device_dir.mkdir(exist_ok=True)
+        path = device_dir / f"{device['device_name']}_complete.json"
+        with open(path, 'w') as f:
+            json.dump(device, f)
+        total += path.stat().st_size
+    return total
+
+
+def import_serial_per_table(db_path: str, capture_dir: Path) -> Dict:
+    """Reference path: parse and write on one thread, committing after every table"""
+    from capture_archive import find_archives, iter_archive
+
+    cmdb = db_manager.NapalmCMDB(db_path, str(SCHEMA_PATH))
+    started = time.time()
+    imported = 0
+
+    def records():
+        for json_file in sorted(capture_dir.glob("**/*_complete.json")):
+            with open(json_file) as f:
+                yield json.load(f)
+        for archive in find_archives(capture_dir)[-1:]:
+            yield from iter_archive(archive)
+
+    for napalm_data in records():
+        cmdb.import_napalm_data(napalm_data)
+        imported += 1
+    cmdb.close()
+    return {'imported': imported, 'seconds': round(time.time() - started, 2)}
+
+
+def row_counts(db_path: str) -> Dict[str, int]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in COUNTED_TABLES}
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel CMDB capture import")
+    parser.add_argument("--devices", type=int, default=5000, help="Synthetic devices in the capture set")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parser processes for the parallel run")
+    parser.add_argument("--format", choices=['files', 'archive'], default='files',
+                        help="Legacy per-device JSON files or one capture archive")
+    parser.add_argument("--arp", type=int, default=150, help="ARP entries per device")
+    parser.add_argument("--mac", type=int, default=200, help="MAC table entries per device")
+    parser.add_argument("--interfaces", type=int, default=48, help="Physical interfaces per device")
+    parser.add_argument("--config-lines", type=int, default=600, help="Running config lines per device")
+    parser.add_argument("--seed", type=int, default=42, help="Capture set random seed")
+    parser.add_argument("--skip-serial", action='store_true', help="Skip the per-table commit reference run")
+    parser.add_argument("--keep", metavar='DIR', help="Keep the capture set and databases in DIR")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sizes = {'arp': args.arp, 'mac': args.mac, 'interfaces': args.interfaces, 'lldp': 4,
+             'config_lines': args.config_lines}
+
+    work_dir = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix='bench_import_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    capture_dir = work_dir / 'captures'
+    try:
+        if capture_dir.exists():
+            shutil.rmtree(capture_dir)
+        started = time.time()
+        size = write_capture_set(capture_dir, args.devices, args.seed, args.format, sizes)
+        print(f"Capture set: {args.devices} devices as {args.format}, {size / 1e6:.1f} MB, "
+              f"generated in {time.time() - started:.1f}s")
+
+        runs = []
+        if not args.skip_serial:
+            runs.append(('serial, commit per table', 'serial.db',
+                         lambda db: import_serial_per_table(db, capture_dir)))
+        runs.append(('single writer, 1 process', 'single.db',
+                     lambda db: db_manager.import_napalm_files(db, str(capture_dir), str(SCHEMA_PATH), workers=1)))
+        runs.append((f"single writer, {args.workers} parsers", 'parallel.db',
+                     lambda db: db_manager.import_napalm_files(db, str(capture_dir), str(SCHEMA_PATH),
+                                                               workers=args.workers)))
+
+        baseline = None
+        reference_counts = None
+        for label, db_name, run in runs:
+            db_path = work_dir / db_name
+            if db_path.exists():
+                db_path.unlink()
+            started = time.time()
+            result = run(str(db_path))
+            elapsed = time.time() - started
+            baseline = baseline or elapsed
+            counts = row_counts(str(db_path))
+            print(f"{label:<28} {elapsed:7.2f}s  {result['imported'] / elapsed:8,.0f} devices/s  "
+                  f"{baseline / elapsed:5.1f}x")
+            if 'write_seconds' in result:
+                # Parsing overlaps the writer once it runs on the pool, so writer time bounds the import
+                print(f"{'':<28} writer busy {result['write_seconds']:.2f}s - ceiling "
+                      f"{result['imported'] / max(result['write_seconds'], 0.001):,.0f} devices/s "
+                      f"with enough parser processes")
+            if reference_counts is None:
+                reference_counts = counts
+            elif counts != reference_counts:
+                differing = {t: (reference_counts[t], counts[t]) for t in COUNTED_TABLES
+                             if reference_counts[t] != counts[t]}
+                print(f"MISMATCH in {label}: {differing}")
+                return 1
+
+        print("Row counts identical: " + ', '.join(f"{t}={reference_counts[t]}" for t in COUNTED_TABLES))
+        return 0
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+ARP/MAC Interval Storage Benchmark
+Imports several synthetic collection runs in which a share of each device's ARP and MAC
+entries change between runs, then reports how many rows each run wrote against the full
+copy the tables used to take per run, the resulting table sizes, and the cost of reading
+current state through is_current = 1 against the latest-run subquery it replaces
+
+Example:
+  python bench_interval_store.py --devices 500 --runs 6 --churn 0.02
+"""
+
+import argparse
+import logging
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import db_manager
+from bench_import import SCHEMA_PATH, build_device, random_mac
+from interval_store import INTERVAL_KEYS
+
+CURRENT_MAC = """
+    SELECT COUNT(*) FROM mac_address_table mat
+    JOIN devices d ON mat.device_id = d.id
+    WHERE mat.mac_address = ? AND mat.is_current = 1
+"""
+
+LATEST_RUN_MAC = """
+    SELECT COUNT(*) FROM mac_address_table mat
+    JOIN devices d ON mat.device_id = d.id
+    JOIN collection_runs cr ON mat.collection_run_id = cr.id
+    WHERE mat.mac_address = ?
+    AND cr.id IN (
+        SELECT id FROM collection_runs cr2
+        WHERE cr2.device_id = mat.device_id
+        ORDER BY cr2.collection_time DESC
+        LIMIT 1
+    )
+"""
+
+
+def churn(record: dict, rng: random.Random, rate: float):
+    """Replace a share of the device's ARP and MAC entries, as hosts come and go between runs"""
+    data = record['data']
+    for entry in data['get_arp_table']:
+        if rng.random() < rate:
+            entry['mac'] = random_mac(rng)
+        entry['age'] = float(rng.randrange(14400))
+    for entry in data['get_mac_address_table']:
+        if rng.random() < rate:
+            entry['mac'] = random_mac(rng)
+
+
+def table_counts(conn: sqlite3.Connection) -> dict:
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in INTERVAL_KEYS}
+
+
+def time_lookups(db_path: str, query: str, macs) -> (float, int):
+    """Mean milliseconds per MAC lookup and the total rows found"""
+    conn = sqlite3.connect(db_path)
+    found = 0
+    started = time.perf_counter()
+    for mac in macs:
+        found += conn.execute(query, (mac,)).fetchone()[0]
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed * 1000 / len(macs), found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark interval storage of ARP and MAC tables")
+    parser.add_argument("--devices", type=int, default=500, help="Synthetic devices")
+    parser.add_argument("--runs", type=int, default=6, help="Collection runs imported per device")
+    parser.add_argument("--churn", type=float, default=0.02, help="Share of ARP/MAC entries replaced per run")
+    parser.add_argument("--arp", type=int, default=150, help="ARP entries per device")
+    parser.add_argument("--mac", type=int, default=400, help="MAC table entries per device")
+    parser.add_argument("--lookups", type=int, default=500, help="MAC addresses looked up for read latency")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--keep", metavar='DIR', help="Keep the database in DIR")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    work_dir = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix='bench_interval_store_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    db_path = str(work_dir / 'intervals.db')
+    try:
+        Path(db_path).unlink(missing_ok=True)
+        rng = random.Random(args.seed)
+        sizes = {'arp': args.arp, 'mac': args.mac, 'interfaces': 48, 'lldp': 0, 'config_lines': 50}
+        records = [build_device(index, rng, sizes) for index in range(args.devices)]
+        for record in records:
+            # Keep the runs to the tables under test
+            record['data'] = {getter: record['data'][getter]
+                              for getter in ('get_facts', 'get_arp_table', 'get_mac_address_table')}
+
+        cmdb = db_manager.NapalmCMDB(db_path, str(SCHEMA_PATH))
+        entries_per_run = args.devices * (args.arp + args.mac)
+        full_copy_rows = 0
+        previous = {table: 0 for table in INTERVAL_KEYS}
+        print(f"{'run':<5} {'new rows':>10} {'full copy':>10} {'written':>8} {'seconds':>8}")
+        for run in range(args.runs):
+            collection_time = datetime.now().isoformat()
+            for record in records:
+                record['collection_time'] = collection_time
+                if run:
+                    churn(record, rng, args.churn)
+            started = time.time()
+            for record in records:
+                cmdb.import_napalm_data(record)
+            elapsed = time.time() - started
+            counts = table_counts(cmdb.connection)
+            new_rows = sum(counts[table] - previous[table] for table in INTERVAL_KEYS)
+            previous = counts
+            full_copy_rows += entries_per_run
+            print(f"{run + 1:<5} {new_rows:>10,} {entries_per_run:>10,} {new_rows / entries_per_run:>7.1%} "
+                  f"{elapsed:>8.2f}")
+
+        current = {table: cmdb.connection.execute(f"SELECT COUNT(*) FROM {table} WHERE is_current = 1").fetchone()[0]
+                   for table in INTERVAL_KEYS}
+        macs = [row[0] for row in cmdb.connection.execute(
+            "SELECT mac_address FROM mac_address_table WHERE is_current = 1 ORDER BY RANDOM() LIMIT ?",
+            (args.lookups,))]
+        cmdb.close()
+
+        stored = sum(previous.values())
+        print(f"Stored rows: {stored:,} ({', '.join(f'{t}={previous[t]:,}' for t in INTERVAL_KEYS)}); "
+              f"full copy would hold {full_copy_rows:,} - {1 - stored / full_copy_rows:.1%} fewer")
+        print(f"Current rows: {', '.join(f'{t}={current[t]:,}' for t in INTERVAL_KEYS)}")
+
+        current_ms, current_found = time_lookups(db_path, CURRENT_MAC, macs)
+        latest_ms, latest_found = time_lookups(db_path, LATEST_RUN_MAC, macs)
+        print(f"{'current MAC lookup':<26} is_current {current_ms:8.3f} ms   latest-run subquery {latest_ms:8.3f} ms")
+        if current_found != latest_found:
+            print(f"MISMATCH: is_current found {current_found}, latest-run subquery {latest_found}")
+            return 1
+        print(f"Lookup results identical: {current_found} rows")
+        return 0
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+IP Range Search Benchmark
+Imports synthetic devices with ARP tables and routing tables, then times subnet and
+longest-prefix-match lookups through the ip_start/ip_end range indexes against parsing the
+text addresses of every row in Python, and checks both find the same rows
+
+Example:
+  python bench_ip_ranges.py --devices 500 --arp 200 --routes 300
+"""
+
+import argparse
+import ipaddress
+import logging
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import db_manager
+from bench_import import SCHEMA_PATH, build_device
+from ip_ranges import LATEST_ROUTES, parse_network, subnet_addresses, subnet_routes
+
+# Without range columns every stored address has to be parsed to answer a subnet question
+ADDRESS_SCAN = """
+    SELECT d.device_name, di.ip_address FROM device_ips di JOIN devices d ON di.device_id = d.id
+    UNION ALL
+    SELECT d.device_name, ae.ip_address FROM arp_entries ae JOIN devices d ON ae.device_id = d.id
+    WHERE ae.is_current = 1
+"""
+
+ROUTE_SCAN = f"""
+    SELECT d.device_name, r.destination_network, r.prefix_length FROM routes r
+    JOIN devices d ON r.device_id = d.id
+    WHERE {LATEST_ROUTES}
+"""
+
+
+def scan_addresses(conn: sqlite3.Connection, network) -> set:
+    found = set()
+    for device_name, address in conn.execute(ADDRESS_SCAN):
+        try:
+            if ipaddress.ip_address(address) in network:
+                found.add((device_name, address))
+        except ValueError:
+            continue
+    return found
+
+
+def scan_longest_matches(conn: sqlite3.Connection, network) -> set:
+    best = {}
+    for device_name, destination, prefix_length in conn.execute(ROUTE_SCAN):
+        route = ipaddress.ip_network(f"{destination}/{prefix_length}", strict=False)
+        if route.version == network.version and network.subnet_of(route):
+            if device_name not in best or route.prefixlen > best[device_name].prefixlen:
+                best[device_name] = route
+    return {(device_name, str(route)) for device_name, route in best.items()}
+
+
+def indexed_addresses(conn: sqlite3.Connection, network) -> set:
+    return {(row['device_name'], row['ip_address']) for row in subnet_addresses(conn, network, limit=-1)}
+
+
+def indexed_longest_matches(conn: sqlite3.Connection, network) -> set:
+    return {(route['device_name'], f"{route['destination_network']}/{route['prefix_length']}")
+            for route in subnet_routes(conn, network, limit=-1) if route['longest_match']}
+
+
+def time_lookups(networks, lookup) -> (float, dict):
+    """Mean milliseconds per lookup and what each network found"""
+    found = {}
+    started = time.perf_counter()
+    for network in networks:
+        found[network] = lookup(network)
+    elapsed = time.perf_counter() - started
+    return elapsed * 1000 / len(networks), found
+
+
+def build_routes(index: int, routes: int):
+    """A default, an aggregate and per-site /24s, so a host has matches at several lengths"""
+    table = [{'destination': '0.0.0.0/0', 'next_hop': '10.0.0.1', 'outgoing_interface': 'Vlan10',
+              'protocol': 'static', 'preference': 1},
+             {'destination': '172.16.0.0/12', 'next_hop': '10.0.0.2', 'outgoing_interface': 'Vlan10',
+              'protocol': 'ospf', 'metric': 20, 'preference': 110}]
+    for n in range(routes):
+        table.append({'destination': f"172.{16 + n // 256 % 16}.{n % 256}.0/24", 'next_hop': f"10.0.{index % 256}.1",
+                      'outgoing_interface': 'Vlan10', 'protocol': 'bgp', 'preference': 20})
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed subnet lookups against parsing text addresses")
+    parser.add_argument("--devices", type=int, default=500, help="Synthetic devices")
+    parser.add_argument("--arp", type=int, default=200, help="ARP entries per device")
+    parser.add_argument("--routes", type=int, default=300, help="/24 routes per device")
+    parser.add_argument("--lookups", type=int, default=20, help="Lookups of each kind")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--keep", metavar='DIR', help="Keep the database in DIR")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    work_dir = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix='bench_ip_ranges_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    db_path = str(work_dir / 'ip_ranges.db')
+    try:
+        Path(db_path).unlink(missing_ok=True)
+        rng = random.Random(args.seed)
+        sizes = {'arp': args.arp, 'mac': 0, 'interfaces': 4, 'lldp': 0, 'config_lines': 10}
+        cmdb = db_manager.NapalmCMDB(db_path, str(SCHEMA_PATH))
+        started = time.time()
+        for index in range(args.devices):
+            record = build_device(index, rng, sizes)
+            # Give each device its own ARP subnet, inside the routed 172.16.0.0/12
+            for n, entry in enumerate(record['data']['get_arp_table']):
+                entry['ip'] = f"172.{16 + index // 256 % 16}.{index % 256}.{n % 254 + 1}"
+            record['data']['get_route_to'] = build_routes(index, args.routes)
+            cmdb.import_napalm_data(record)
+        print(f"Imported {args.devices:,} devices in {time.time() - started:.1f}s")
+        cmdb.close()
+
+        conn = sqlite3.connect(db_path)
+        hosts = [parse_network(f"172.{16 + n // 256 % 16}.{n % 256}.{rng.randrange(1, 255)}")
+                 for n in (rng.randrange(args.devices) for _ in range(args.lookups))]
+        subnets = [parse_network(f"172.{16 + n // 256 % 16}.{n % 256}.0/{rng.choice((24, 25, 28))}")
+                   for n in (rng.randrange(args.devices) for _ in range(args.lookups))]
+        subnets += [parse_network('172.16.0.0/14'), parse_network('192.0.2.0/24')]
+
+        scan_ms, scanned = time_lookups(subnets, lambda network: scan_addresses(conn, network))
+        range_ms, ranged = time_lookups(subnets, lambda network: indexed_addresses(conn, network))
+        print(f"{'subnet':<16} parse every address {scan_ms:9.2f} ms   range index {range_ms:8.2f} ms")
+        mismatched = [str(network) for network in subnets if scanned[network] != ranged[network]]
+
+        scan_ms, scanned = time_lookups(hosts, lambda network: scan_longest_matches(conn, network))
+        range_ms, ranged = time_lookups(hosts, lambda network: indexed_longest_matches(conn, network))
+        print(f"{'longest match':<16} parse every route   {scan_ms:9.2f} ms   range index {range_ms:8.2f} ms")
+        mismatched += [str(network) for network in hosts if scanned[network] != ranged[network]]
+        conn.close()
+
+        if mismatched:
+            print(f"MISMATCH for {', '.join(mismatched)}")
+            return 1
+        print(f"Results identical for {len(subnets) + len(hosts)} lookups")
+        return 0
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Scanner End-to-End Benchmark
+Starts the SNMP agent simulator in a separate process, then drives OptimizedSNMPScanner
+(full TCP pre-filter + SNMP + fingerprint pipeline) and/or SNMPCollector against it.
+Reports hosts/sec, per-stage latency histograms and CPU time per host for this
+process only - the simulator's CPU is not counted.
+
+Example:
+  python bench_scanner.py --devices 254 --latency-ms 1-5 --loss 0.01 --mode both
+"""
+
+import argparse
+import asyncio
+import contextlib
+import ipaddress
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any
+
+from pyscanner3 import (OptimizedSNMPScanner, SNMPCollector, FingerprintEngine, ScanConfig, SNMPCredentials,
+                        count_network_hosts)
+import snmp_simulator
+
+
+class LatencyHistogram:
+    """Latency samples with exact percentiles and power-of-two millisecond buckets"""
+
+    BUCKETS_MS = [0.25 * 2 ** i for i in range(17)]  # 0.25 ms .. 16 s
+
+    def __init__(self):
+        self.samples: List[float] = []
+
+    def record(self, seconds: float):
+        self.samples.append(seconds * 1000)
+
+    def percentile(self, pct: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def summary(self) -> Dict[str, float]:
+        count = len(self.samples)
+        return {
+            "count": count,
+            "mean_ms": round(sum(self.samples) / count, 3) if count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p90_ms": round(self.percentile(90), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(max(self.samples), 3) if count else 0.0,
+        }
+
+    def buckets(self) -> List[int]:
+        counts = [0] * (len(self.BUCKETS_MS) + 1)
+        for sample in self.samples:
+            for index, edge in enumerate(self.BUCKETS_MS):
+                if sample <= edge:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+    def render(self, width: int = 40) -> List[str]:
+        counts = self.buckets()
+        if not self.samples:
+            return []
+        used = [index for index, count in enumerate(counts) if count]
+        peak = max(counts)
+        lines = []
+        for index in range(used[0], used[-1] + 1):
+            label = f"<= {self.BUCKETS_MS[index]:>8.2f} ms" if index < len(self.BUCKETS_MS) else \
+                f" > {self.BUCKETS_MS[-1]:>8.2f} ms"
+            bar = "#" * max(1 if counts[index] else 0, int(counts[index] / peak * width))
+            lines.append(f"    {label} | {bar:<{width}} | {counts[index]}")
+        return lines
+
+
+class StageRecorder:
+    """Wraps scanner/collector methods on the instance to time each pipeline stage"""
+
+    def __init__(self):
+        self.stages: Dict[str, LatencyHistogram] = OrderedDict()
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        if stage not in self.stages:
+            self.stages[stage] = LatencyHistogram()
+        return self.stages[stage]
+
+    def wrap_async(self, owner, attribute: str, stage: str):
+        func = getattr(owner, attribute)
+        histogram = self.histogram(stage)
+
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter() - start)
+
+        setattr(owner, attribute, timed)
+
+    def wrap_sync(self, owner, attribute: str, stage: str):
+        func = getattr(owner, attribute)
+        histogram = self.histogram(stage)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter() - start)
+
+        setattr(owner, attribute, timed)
+
+
+def build_credentials(args) -> SNMPCredentials:
+    return SNMPCredentials(
+        version=args.scan_version,
+        communities=args.scan_communities,
+        username=args.v3_user if args.scan_version == "v3" else "",
+        auth_protocol=args.v3_auth_protocol,
+        auth_key=args.v3_auth_key,
+        priv_protocol=args.v3_priv_protocol,
+        priv_key=args.v3_priv_key,
+        timeout=args.snmp_timeout,
+        retries=args.retries,
+        port=args.port
+    )
+
+
+async def bench_scan(args) -> Dict[str, Any]:
+    """Full scan_network pipeline over the simulator CIDR"""
+    config = ScanConfig(
+        credentials=build_credentials(args),
+        fingerprint_rules=args.rules,
+        concurrent_scans=args.concurrent,
+        tcp_check_timeout=args.tcp_timeout,
+        tcp_check_ports=[args.tcp_port] if args.tcp_port else None,
+        skip_tcp_check=not args.tcp_port,
+        max_varbinds=args.max_varbinds,
+        adaptive_timeouts=args.adaptive_timeouts
+    )
+    scanner = OptimizedSNMPScanner(config)
+    recorder = StageRecorder()
+    recorder.wrap_async(scanner, "_scan_single_device", "host")
+    recorder.wrap_async(scanner.tcp_checker, "check_host_responsive", "tcp_check")
+    recorder.wrap_async(scanner.collector, "collect_device_data", "snmp_collect")
+    recorder.wrap_async(scanner.collector, "_get_cmd", "snmp_pdu")
+    recorder.wrap_sync(scanner.fingerprint_engine, "fingerprint_device", "fingerprint")
+
+    hosts = count_network_hosts(ipaddress.ip_network(args.cidr, strict=False))
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results = await scanner.scan_network(args.cidr)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    return {
+        "mode": "scan",
+        "hosts": hosts,
+        "devices_found": results.get("total_devices", 0),
+        "devices_expected": args.devices,
+        "wall_s": round(wall, 3),
+        "hosts_per_sec": round(hosts / wall, 1),
+        "cpu_s": round(cpu, 3),
+        "cpu_ms_per_host": round(cpu / hosts * 1000, 3),
+        "stages": recorder.stages,
+    }
+
+
+async def bench_collector(args, addresses: List[str]) -> Dict[str, Any]:
+    """SNMPCollector.collect_device_data + fingerprinting on every simulated device"""
+    fingerprint_engine = FingerprintEngine(args.rules)
+    collector = SNMPCollector(build_credentials(args), fingerprint_engine, args.max_varbinds)
+    recorder = StageRecorder()
+    recorder.wrap_async(collector, "collect_device_data", "snmp_collect")
+    recorder.wrap_async(collector, "_get_cmd", "snmp_pdu")
+    recorder.wrap_sync(fingerprint_engine, "fingerprint_device", "fingerprint")
+
+    semaphore = asyncio.Semaphore(args.concurrent)
+    found = 0
+    pdus = 0
+
+    async def collect(address):
+        nonlocal found, pdus
+        async with semaphore:
+            snmp_data, metadata = await collector.collect_device_data(address)
+            pdus += metadata.get("get_pdus_sent", 0)
+            if "1.3.6.1.2.1.1.1.0" in snmp_data:
+                fingerprint_engine.fingerprint_device(snmp_data)
+                found += 1
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    await asyncio.gather(*[collect(address) for address in addresses])
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    return {
+        "mode": "collector",
+        "hosts": len(addresses),
+        "devices_found": found,
+        "devices_expected": len(addresses),
+        "get_pdus": pdus,
+        "wall_s": round(wall, 3),
+        "hosts_per_sec": round(len(addresses) / wall, 1),
+        "cpu_s": round(cpu, 3),
+        "cpu_ms_per_host": round(cpu / len(addresses) * 1000, 3),
+        "stages": recorder.stages,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print("=" * 90)
+    print(f"{report['mode'].upper()} BENCHMARK")
+    print("=" * 90)
+    print(f"Hosts: {report['hosts']}  Devices found: {report['devices_found']}/{report['devices_expected']}")
+    print(f"Wall: {report['wall_s']:.2f}s  Throughput: {report['hosts_per_sec']:,.1f} hosts/sec")
+    print(f"CPU: {report['cpu_s']:.2f}s  ({report['cpu_ms_per_host']:.2f} ms per host)")
+    if "get_pdus" in report:
+        print(f"SNMP GET PDUs: {report['get_pdus']}")
+    print(f"\n{'Stage':<14} {'count':>7} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  (ms)")
+    for stage, histogram in report["stages"].items():
+        s = histogram.summary()
+        print(f"{stage:<14} {s['count']:>7} {s['mean_ms']:>9.2f} {s['p50_ms']:>9.2f} {s['p90_ms']:>9.2f} "
+              f"{s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}")
+    for stage, histogram in report["stages"].items():
+        lines = histogram.render()
+        if lines:
+            print(f"\n  {stage}")
+            print("\n".join(lines))
+
+
+def serialisable(report: Dict[str, Any]) -> Dict[str, Any]:
+    result = dict(report)
+    result["stages"] = {stage: dict(histogram.summary(), buckets=histogram.buckets())
+                        for stage, histogram in report["stages"].items()}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SNMP scanner against a local agent simulator")
+    snmp_simulator.add_simulator_arguments(parser)
+    parser.set_defaults(cidr="127.16.0.0/24", devices=254, tcp_port=16022)
+    parser.add_argument("--mode", choices=["scan", "collector", "both"], default="both")
+    parser.add_argument("--rules", default="config/vendor_fingerprints.yaml", help="Fingerprint rules file")
+    parser.add_argument("--concurrent", type=int, default=100, help="Concurrent hosts")
+    parser.add_argument("--scan-version", choices=["v2c", "v3"], default="v2c", help="Scanner's preferred SNMP version")
+    parser.add_argument("--scan-communities", nargs='+', default=["public"], help="Communities the scanner tries")
+    parser.add_argument("--snmp-timeout", type=int, default=1, help="Scanner SNMP timeout (s)")
+    parser.add_argument("--retries", type=int, default=0, help="Scanner SNMP retries")
+    parser.add_argument("--tcp-timeout", type=int, default=1, help="Scanner TCP pre-filter timeout (s)")
+    parser.add_argument("--max-varbinds", type=int, default=24, help="Scanner OIDs per GET PDU")
+    parser.add_argument("--adaptive-timeouts", action="store_true", help="Scanner RTT-derived timeouts")
+    parser.add_argument("--json-out", default="", help="Also write the report as JSON (for run-to-run comparison)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.rules):
+        print(f"Error: Fingerprint rules file not found: {args.rules}")
+        sys.exit(1)
+
+    devices = snmp_simulator.build_devices(args.cidr, args.devices, snmp_simulator.DEFAULT_PROFILES)
+    addresses = [device.address for device in devices]
+
+    ready, stop = multiprocessing.Event(), multiprocessing.Event()
+    sim_stats = multiprocessing.Queue()
+    simulator = multiprocessing.Process(target=snmp_simulator.run_simulator_process,
+                                        args=(args, ready, stop, sim_stats), daemon=True)
+    simulator.start()
+    if not ready.wait(60) or not simulator.is_alive():
+        print("Error: SNMP simulator failed to start")
+        sys.exit(1)
+
+    print(f"Simulator: {args.devices} agents in {args.cidr} (UDP {args.port}"
+          f"{f', TCP {args.tcp_port}' if args.tcp_port else ''}), latency {args.latency_ms} ms, loss {args.loss:.1%}")
+    print(f"Scanner: {args.scan_version}, {args.concurrent} concurrent, timeout {args.snmp_timeout}s, "
+          f"retries {args.retries}, max varbinds {args.max_varbinds}")
+
+    reports = []
+    try:
+        if args.mode in ("scan", "both"):
+            reports.append(asyncio.run(bench_scan(args)))
+            print_report(reports[-1])
+        if args.mode in ("collector", "both"):
+            reports.append(asyncio.run(bench_collector(args, addresses)))
+            print_report(reports[-1])
+    finally:
+        stop.set()
+        simulator.join(10)
+
+    try:
+        stats = sim_stats.get(timeout=5)
+        print(f"\nSimulator: {stats['requests']} requests, {stats['responses']} answered, "
+              f"{stats['dropped']} dropped, {stats['too_big']} tooBig, {stats.get('cpu_s', 0):.2f}s CPU")
+    except queue.Empty:
+        pass
+
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump({"args": vars(args), "reports": [serialisable(r) for r in reports]}, f, indent=2)
+        print(f"Report saved to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
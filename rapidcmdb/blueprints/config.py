@@ -7,12 +7,16 @@ from flask import Blueprint, render_template, jsonify, request, redirect, url_fo
 import sqlite3
 from datetime import datetime, timedelta
 
+from config_search import search_latest_configs
+from config_store import register_config_functions
+
 config_bp = Blueprint('config', __name__, template_folder='../templates')
 
 
 def get_db_connection():
     conn = sqlite3.connect('napalm_cmdb.db')
     conn.row_factory = sqlite3.Row
+    register_config_functions(conn)
     return conn
 
 
@@ -119,153 +123,31 @@ def index():
 
 
 def search_configurations(search_term, device_filter='', config_type_filter='', search_mode='contains'):
-    """Search configurations with various modes - only latest configs, no duplicates"""
-    try:
-        # Fixed query with proper table aliases to avoid ambiguous column names
-        base_query = """
-            WITH latest_configs AS (
-                SELECT 
-                    dc.device_id,
-                    dc.config_type,
-                    MAX(dc.created_at) as latest_time
-                FROM device_configs dc
-                GROUP BY dc.device_id, dc.config_type
-            ),
-            latest_config_ids AS (
-                SELECT 
-                    dc.id,
-                    dc.device_id,
-                    dc.config_type,
-                    dc.created_at
-                FROM device_configs dc
-                INNER JOIN latest_configs lc ON 
-                    dc.device_id = lc.device_id 
-                    AND dc.config_type = lc.config_type 
-                    AND dc.created_at = lc.latest_time
-            )
-            SELECT DISTINCT
-                dc.id as config_id,
-                dc.config_type,
-                dc.size_bytes as config_size,
-                dc.created_at,
-                d.device_name,
-                d.vendor,
-                d.model,
-                1 as match_count
-            FROM device_configs dc
-            INNER JOIN devices d ON dc.device_id = d.id
-            INNER JOIN latest_config_ids lci ON dc.id = lci.id
-            WHERE 1=1
-        """
-
-        params = []
-        conditions = []
-
-        # Search mode conditions
-        if search_mode == 'contains':
-            conditions.append("dc.config_content LIKE ?")
-            params.append(f"%{search_term}%")
-        elif search_mode == 'exact':
-            conditions.append("dc.config_content LIKE ?")
-            params.append(f"%{search_term}%")
-        elif search_mode == 'regex':
-            conditions.append("dc.config_content LIKE ?")
-            params.append(f"%{search_term}%")
-        elif search_mode == 'ip':
-            # Search for IP patterns
-            ip_patterns = [
-                f"%{search_term}%",
-                f"%ip address {search_term}%",
-                f"%{search_term}/%"
-            ]
-            ip_conditions = " OR ".join(["dc.config_content LIKE ?" for _ in ip_patterns])
-            conditions.append(f"({ip_conditions})")
-            params.extend(ip_patterns)
-
-        # Device filter - use the alias 'd' to be explicit
-        if device_filter:
-            conditions.append("d.device_name = ?")
-            params.append(device_filter)
-
-        # Config type filter - use the alias 'dc' to be explicit
-        if config_type_filter:
-            conditions.append("dc.config_type = ?")
-            params.append(config_type_filter)
-
-        # Add conditions to query
-        if conditions:
-            base_query += " AND " + " AND ".join(conditions)
-
-        base_query += """
-            ORDER BY d.device_name, dc.config_type
-            LIMIT 50
-        """
+    """Search the latest configs through the full-text index; regex mode matches patterns"""
+    conditions = []
+    params = []
 
-        results = execute_query(base_query, params)
-
-        # Remove any remaining duplicates and calculate match counts
-        seen = set()
-        unique_results = []
-
-        for result in results:
-            key = f"{result['device_name']}_{result['config_type']}"
-            if key not in seen:
-                seen.add(key)
-                # Calculate actual match count
-                try:
-                    match_count = count_matches_in_config(result['config_id'], search_term, search_mode)
-                    if match_count > 0:  # Only include if there are actual matches
-                        result['match_count'] = match_count
-                        unique_results.append(result)
-                except Exception as e:
-                    print(f"Error counting matches for config {result['config_id']}: {e}")
-                    # Include with default count if match counting fails
-                    result['match_count'] = 1
-                    unique_results.append(result)
-
-        return unique_results
+    # Device filter - use the alias 'd' to be explicit
+    if device_filter:
+        conditions.append("d.device_name = ?")
+        params.append(device_filter)
 
-    except Exception as e:
-        print(f"Error searching configurations: {e}")
-        return []
+    # Config type filter - use the alias 'dc' to be explicit
+    if config_type_filter:
+        conditions.append("dc.config_type = ?")
+        params.append(config_type_filter)
 
+    # 'ip' searches are phrase searches too: the address's octets must appear in order
+    mode = search_mode if search_mode in ('exact', 'regex') else 'contains'
 
-def count_matches_in_config(config_id, search_term, search_mode):
-    """Count actual matches in a specific configuration"""
+    conn = get_db_connection()
     try:
-        config_query = "SELECT config_content FROM device_configs WHERE id = ?"
-        config_result = execute_query(config_query, [config_id])
-
-        if not config_result:
-            return 0
-
-        config_content = config_result[0]['config_content']
-
-        if search_mode == 'contains':
-            # Count occurrences (case insensitive)
-            return config_content.lower().count(search_term.lower())
-        elif search_mode == 'exact':
-            # Count exact phrase matches (case insensitive)
-            return config_content.lower().count(search_term.lower())
-        elif search_mode == 'ip':
-            # Count IP-related matches
-            count = 0
-            search_lower = search_term.lower()
-            content_lower = config_content.lower()
-
-            # Count various IP patterns
-            count += content_lower.count(search_lower)
-            count += content_lower.count(f"ip address {search_lower}")
-            count += content_lower.count(f"{search_lower}/")
-
-            return count
-        else:
-            # Default to simple count
-            return config_content.lower().count(search_term.lower())
-
+        return search_latest_configs(conn, search_term, mode, conditions, params, limit=50)
     except Exception as e:
-        print(f"Error counting matches: {e}")
-        return 0
+        print(f"Error searching configurations: {e}")
+        return []
+    finally:
+        conn.close()
 
 
 @config_bp.route('/api/config/<int:config_id>')
@@ -278,7 +160,7 @@ def api_get_config(config_id):
                 dc.device_id,
                 dc.collection_run_id,
                 dc.config_type,
-                dc.config_content,
+                config_text(dc.config_hash, dc.config_content) AS config_content,
                 dc.config_hash,
                 dc.size_bytes,
                 dc.line_count,
@@ -308,6 +190,39 @@ def api_get_config(config_id):
         return jsonify({'error': str(e)}), 500
 
 
+@config_bp.route('/api/change/<int:change_id>')
+def api_get_change(change_id):
+    """API endpoint to get a recorded config change with its stored unified diff"""
+    try:
+        change_query = """
+            SELECT
+                cc.id,
+                cc.device_id,
+                cc.old_config_id,
+                cc.new_config_id,
+                cc.change_type,
+                cc.change_summary,
+                cc.diff_content,
+                cc.change_size,
+                cc.detected_at,
+                d.device_name,
+                nc.config_type
+            FROM config_changes cc
+            JOIN devices d ON cc.device_id = d.id
+            JOIN device_configs nc ON cc.new_config_id = nc.id
+            WHERE cc.id = ?
+        """
+        change_result = execute_query(change_query, [change_id])
+
+        if not change_result:
+            return jsonify({'error': 'Change not found'}), 404
+
+        return jsonify(change_result[0])
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @config_bp.route('/device/<device_name>')
 def device_configs(device_name):
     """Show configurations for a specific device"""
@@ -384,7 +299,7 @@ def view_config(config_id):
                 dc.device_id,
                 dc.collection_run_id,
                 dc.config_type,
-                dc.config_content,
+                config_text(dc.config_hash, dc.config_content) AS config_content,
                 dc.config_hash,
                 dc.size_bytes,
                 dc.line_count,
@@ -422,7 +337,7 @@ def compare_configs(old_id, new_id):
                 dc.device_id,
                 dc.collection_run_id,
                 dc.config_type,
-                dc.config_content,
+                config_text(dc.config_hash, dc.config_content) AS config_content,
                 dc.config_hash,
                 dc.size_bytes,
                 dc.line_count,
@@ -14,6 +14,10 @@ import json
 import ipaddress
 import re
 
+from config_search import unindex_device
+from config_store import delete_orphan_blobs, register_config_functions
+from ip_ranges import address_range
+
 device_crud_bp = Blueprint('device_crud', __name__)
 
 
@@ -22,6 +26,7 @@ def get_db_connection():
     """Get database connection with row factory"""
     conn = sqlite3.connect('napalm_cmdb.db')
     conn.row_factory = sqlite3.Row
+    register_config_functions(conn)
     return conn
 
 
@@ -353,10 +358,10 @@ def create_device():
         if primary_ip:
             ip_query = """
                 INSERT INTO device_ips (
-                    device_id, ip_address, ip_type, is_primary, created_at, updated_at
-                ) VALUES (?, ?, 'management', 1, ?, ?)
+                    device_id, ip_address, ip_type, is_primary, created_at, updated_at, ip_start, ip_end
+                ) VALUES (?, ?, 'management', 1, ?, ?, ?, ?)
             """
-            execute_query(ip_query, [device_id, primary_ip, now, now])
+            execute_query(ip_query, [device_id, primary_ip, now, now, *address_range(primary_ip)])
 
         flash(f'Device "{device_name}" created successfully', 'success')
         return redirect(url_for('device_crud.view_device', device_id=device_id))
@@ -687,10 +692,10 @@ def update_device(device_id):
             # Add new primary IP
             ip_query = """
                 INSERT INTO device_ips (
-                    device_id, ip_address, ip_type, is_primary, created_at, updated_at
-                ) VALUES (?, ?, 'management', 1, ?, ?)
+                    device_id, ip_address, ip_type, is_primary, created_at, updated_at, ip_start, ip_end
+                ) VALUES (?, ?, 'management', 1, ?, ?, ?, ?)
             """
-            execute_query(ip_query, [device_id, primary_ip, now, now])
+            execute_query(ip_query, [device_id, primary_ip, now, now, *address_range(primary_ip)])
         else:
             # Remove primary IP if none provided
             execute_query("DELETE FROM device_ips WHERE device_id = ? AND is_primary = 1", [device_id])
@@ -723,7 +728,17 @@ def delete_device(device_id):
             flash(f'Device "{device_name}" deactivated successfully', 'success')
         else:
             # Hard delete - remove completely (cascades to related data)
-            execute_query("DELETE FROM devices WHERE id = ?", [device_id])
+            conn = get_db_connection()
+            try:
+                # The search index entries need the config text, so they go first
+                unindex_device(conn, device_id)
+                conn.commit()
+                execute_query("DELETE FROM devices WHERE id = ?", [device_id])
+                # Drop stored configs no other device shares
+                delete_orphan_blobs(conn)
+                conn.commit()
+            finally:
+                conn.close()
             flash(f'Device "{device_name}" deleted permanently', 'success')
 
         return redirect(url_for('device_crud.list_devices'))
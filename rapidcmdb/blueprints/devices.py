@@ -318,23 +318,13 @@ def device_detail(device_name):
         hardware = execute_query(hardware_query, [device_id])
         hardware = parse_hardware_status(hardware)
 
-        # NEW: Get ARP entries from latest successful collection (FIXED table name)
+        # NEW: Get current ARP entries (rows still seen by the latest collection of the table)
         arp_query = """
-            WITH latest_successful_collection AS (
-                SELECT 
-                    device_id, 
-                    id as collection_run_id,
-                    collection_time,
-                    ROW_NUMBER() OVER (ORDER BY collection_time DESC) as rn
-                FROM collection_runs
-                WHERE device_id = ? AND success = 1
-            )
             SELECT 
                 ae.*,
-                lsc.collection_time
+                ae.last_seen as collection_time
             FROM arp_entries ae
-            JOIN latest_successful_collection lsc ON ae.collection_run_id = lsc.collection_run_id
-            WHERE lsc.rn = 1
+            WHERE ae.device_id = ? AND ae.is_current = 1
             ORDER BY 
                 -- Simple IP address sorting (convert to numeric for proper ordering)
                 CAST(SUBSTR(ae.ip_address, 1, INSTR(ae.ip_address||'.', '.') - 1) AS INTEGER),
@@ -344,23 +334,13 @@ def device_detail(device_name):
         """
         arp_table = execute_query(arp_query, [device_id])
 
-        # NEW: Get MAC address table from latest successful collection (FIXED field names)
+        # NEW: Get current MAC address table (FIXED field names)
         mac_query = """
-            WITH latest_successful_collection AS (
-                SELECT 
-                    device_id, 
-                    id as collection_run_id,
-                    collection_time,
-                    ROW_NUMBER() OVER (ORDER BY collection_time DESC) as rn
-                FROM collection_runs
-                WHERE device_id = ? AND success = 1
-            )
             SELECT 
                 mat.*,
-                lsc.collection_time
+                mat.last_seen as collection_time
             FROM mac_address_table mat
-            JOIN latest_successful_collection lsc ON mat.collection_run_id = lsc.collection_run_id
-            WHERE lsc.rn = 1
+            WHERE mat.device_id = ? AND mat.is_current = 1
             ORDER BY mat.vlan_id, mat.interface_name, mat.mac_address
         """
         mac_address_table = execute_query(mac_query, [device_id])
@@ -1460,6 +1460,10 @@ def build_database_collector_command_with_creds(data):
     workers = data.get('max_workers', 10)
     command.extend(['--workers', str(workers)])
 
+    # Commit devices into the database during collection instead of re-importing captures afterwards
+    if data.get('stream_to_database'):
+        command.append('--write-db')
+
     # Add filters
     filters = data.get('filters', {})
     for filter_type, values in filters.items():
@@ -1643,6 +1647,12 @@ def start_database_collector_process_with_creds(command, session_id):
                 except UnicodeError:
                     line = "Database collector output (encoding issue)"
 
+                # Latency snapshots go to the metrics channel rather than the console
+                metrics = parse_collection_metrics(line)
+                if metrics is not None:
+                    socketio.emit('database_collection_metrics', metrics, room=session_id)
+                    continue
+
                 logging.debug(f"Database collector output: {line}")
 
                 # Parse database collector output and update stats
@@ -1674,7 +1684,10 @@ def start_database_collector_process_with_creds(command, session_id):
                     'processed': stats['processed'],
                     'successful': stats['processed'] - stats['failed']
                 }, room=session_id)
-                trigger_database_import(session_id, 'database_collection_output')
+                if '--write-db' in command:
+                    logging.info("Collector streamed results into the database - skipping capture import")
+                else:
+                    trigger_database_import(session_id, 'database_collection_output')
 
             else:
                 socketio.emit('database_collection_error', {
@@ -1698,6 +1711,17 @@ def start_database_collector_process_with_creds(command, session_id):
     thread.start()
 
 
+def parse_collection_metrics(line):
+    """Decode a COLLECTION_METRICS snapshot line from the database collector, None for other output"""
+    marker = 'COLLECTION_METRICS '
+    if marker not in line:
+        return None
+    try:
+        return json.loads(line.split(marker, 1)[1])
+    except ValueError:
+        return None
+
+
 def parse_database_collector_output(line, stats, start_time):
     """Parse database collector output to extract progress information"""
     new_stats = stats.copy()
@@ -2070,6 +2094,7 @@ def trigger_database_import(session_id, emit_channel='collection_output'):
             capture_files = os.listdir(captures_path)
             device_folders = [f for f in capture_files if os.path.isdir(os.path.join(captures_path, f))]
             json_files = [f for f in capture_files if f.endswith('.json')]
+            archives = [f for f in capture_files if f.endswith('.ndjson.gz')]
 
             socketio.emit(emit_channel, {
                 'message': f'✓ Captures folder exists: {abs_captures_path}',
@@ -2077,11 +2102,12 @@ def trigger_database_import(session_id, emit_channel='collection_output'):
             }, room=session_id)
 
             socketio.emit(emit_channel, {
-                'message': f'✓ Found {len(device_folders)} device folders and {len(json_files)} JSON files',
+                'message': f'✓ Found {len(archives)} capture archives, {len(device_folders)} device folders '
+                           f'and {len(json_files)} JSON files',
                 'type': 'info'
             }, room=session_id)
 
-            if len(device_folders) == 0 and len(json_files) == 0:
+            if len(device_folders) == 0 and len(json_files) == 0 and len(archives) == 0:
                 socketio.emit(emit_channel, {
                     'message': 'Warning: Captures folder is empty - no data to import',
                     'type': 'warning'
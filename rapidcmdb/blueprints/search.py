@@ -11,12 +11,17 @@ import re
 import json
 import logging
 
+from config_search import search_latest_configs
+from config_store import register_config_functions
+from ip_ranges import parse_network, search_subnet, subnet_addresses, subnet_routes
+
 search_bp = Blueprint('search', __name__, template_folder='../templates')
 
 
 def get_db_connection():
     conn = sqlite3.connect('napalm_cmdb.db')
     conn.row_factory = sqlite3.Row
+    register_config_functions(conn)
     return conn
 
 
@@ -289,16 +294,10 @@ def get_arp_query():
                 ae.mac_address,
                 ae.interface_name,
                 ae.created_at,
-                cr.collection_time as last_seen
+                ae.last_seen
             FROM arp_entries ae
             JOIN devices d ON ae.device_id = d.id
-            JOIN collection_runs cr ON ae.collection_run_id = cr.id
-            WHERE cr.id IN (
-                SELECT id FROM collection_runs cr2 
-                WHERE cr2.device_id = ae.device_id 
-                ORDER BY cr2.collection_time DESC 
-                LIMIT 1
-            )
+            WHERE ae.is_current = 1
         """
 
         params = []
@@ -325,16 +324,10 @@ def get_mac_table_query():
                 mat.interface_name,
                 mat.entry_type,
                 mat.created_at,
-                cr.collection_time as last_seen
+                mat.last_seen
             FROM mac_address_table mat
             JOIN devices d ON mat.device_id = d.id
-            JOIN collection_runs cr ON mat.collection_run_id = cr.id
-            WHERE cr.id IN (
-                SELECT id FROM collection_runs cr2 
-                WHERE cr2.device_id = mat.device_id 
-                ORDER BY cr2.collection_time DESC 
-                LIMIT 1
-            )
+            WHERE mat.is_current = 1
         """
 
         params = []
@@ -638,13 +631,13 @@ def determine_search_strategy(search_term, search_mode):
     elif search_mode == 'contains':
         return 'contains'
     elif search_mode == 'smart':
-        # Auto-detect based on pattern
-        if re.match(r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}', search_term):
+        # Auto-detect based on pattern; subnets first, as they also start like an IP address
+        if '/' in search_term and parse_network(search_term):
+            return 'subnet'
+        elif re.match(r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}', search_term):
             return 'ip_address'
         elif re.match(r'^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$', search_term):
             return 'mac_address'
-        elif re.match(r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}/\d{1,2}$', search_term):
-            return 'subnet'
         elif re.match(r'^vlan\s*\d+$', search_term, re.IGNORECASE):
             return 'vlan'
         elif re.match(r'^(Gi|Te|Eth|Fa|Lo|Tu|Po)', search_term, re.IGNORECASE):
@@ -707,91 +700,95 @@ def build_time_filter(time_range):
 
 
 def search_configurations(search_term, search_strategy, base_filters):
-    """Search device configurations"""
+    """Search the latest device configurations through the full-text index"""
+    # Exact and regex keep their meaning; every other strategy is a word/prefix search
+    mode = search_strategy if search_strategy in ('exact', 'regex') else 'contains'
+    conn = get_db_connection()
     try:
-        # Build search condition based on strategy
-        if search_strategy == 'exact':
-            search_condition = "dc.config_content = ?"
-            search_params = [search_term]
-        elif search_strategy == 'regex':
-            # SQLite doesn't have full regex, use LIKE with wildcards
-            search_condition = "dc.config_content LIKE ?"
-            search_params = [f"%{search_term}%"]
-        else:
-            search_condition = "dc.config_content LIKE ?"
-            search_params = [f"%{search_term}%"]
-
-        # Get latest configs only
-        query = f"""
-            WITH latest_configs AS (
-                SELECT device_id, config_type, MAX(created_at) as latest_time
-                FROM device_configs
-                GROUP BY device_id, config_type
-            )
-            SELECT DISTINCT
-                dc.id as config_id,
-                dc.config_type,
-                dc.size_bytes as config_size,
-                dc.created_at,
-                d.device_name,
-                d.vendor,
-                d.model,
-                d.site_code,
-                1 as match_count
-            FROM device_configs dc
-            INNER JOIN devices d ON dc.device_id = d.id
-            INNER JOIN latest_configs lc ON 
-                dc.device_id = lc.device_id 
-                AND dc.config_type = lc.config_type 
-                AND dc.created_at = lc.latest_time
-            WHERE {search_condition}
-        """
-
-        params = search_params.copy()
-
-        # Add device filters
-        if base_filters['device_conditions']:
-            query += " AND " + " AND ".join(base_filters['device_conditions'])
-            params.extend(base_filters['device_params'])
-
-        query += " ORDER BY d.device_name, dc.config_type LIMIT 100"
-
-        results = execute_query(query, params)
+        return search_latest_configs(conn, search_term, mode, base_filters['device_conditions'],
+                                     base_filters['device_params'], limit=100)
+    except Exception as e:
+        logging.error(f"Error searching configurations: {e}")
+        return []
+    finally:
+        conn.close()
 
-        # Count actual matches for each config
-        for result in results:
-            try:
-                result['match_count'] = count_matches_in_config(result['config_id'], search_term, search_strategy)
-            except:
-                result['match_count'] = 1
 
-        return results
+def search_subnet_addresses(search_term, base_filters):
+    """Network data rows for the addresses stored inside a subnet"""
+    network = parse_network(search_term)
+    if network is None:
+        return []
+    conn = get_db_connection()
+    try:
+        addresses = subnet_addresses(conn, network, base_filters['device_conditions'],
+                                     base_filters['device_params'], limit=100)
+    finally:
+        conn.close()
 
-    except Exception as e:
-        logging.error(f"Error searching configurations: {e}")
+    descriptions = {'device_ip': 'Device IP Assignment', 'arp': 'ARP Table Entry',
+                    'interface_ip': 'Interface IP Assignment'}
+    return [{
+        'data_type': address['source'], 'device_name': address['device_name'], 'site_code': address['site_code'],
+        'search_match': address['ip_address'], 'ip_type': address['ip_type'],
+        'interface_name': address['interface_name'], 'vlan_id': address['vlan_id'],
+        'last_seen': address['last_seen'], 'mac_address': address['mac_address'],
+        'entry_type': address['entry_type'], 'description': f"{descriptions[address['source']]} in {network}"
+    } for address in addresses]
+
+
+def search_subnet_routes(search_term, base_filters):
+    """Routing rows for the routes containing a subnet or inside it"""
+    network = parse_network(search_term)
+    if network is None:
         return []
+    conn = get_db_connection()
+    try:
+        routes = subnet_routes(conn, network, base_filters['device_conditions'],
+                               base_filters['device_params'], limit=50)
+    finally:
+        conn.close()
+    return [{'data_type': 'route', **route} for route in routes]
 
 
-def count_matches_in_config(config_id, search_term, search_strategy):
-    """Count actual matches in a configuration"""
+@search_bp.route('/api/subnet')
+def api_subnet_search():
+    """Addresses in a subnet, interface subnets and routes covering it, and each device's longest-prefix match"""
     try:
-        config_query = "SELECT config_content FROM device_configs WHERE id = ?"
-        config_result = execute_query(config_query, [config_id])
+        search_term = request.args.get('network', request.args.get('search', '')).strip()
+        network = parse_network(search_term)
+        if network is None:
+            return jsonify({'error': 'A subnet or IP address is required, e.g. 10.20.0.0/14'}), 400
 
-        if not config_result:
-            return 0
+        base_filters = build_base_filters(
+            request.args.get('device', ''),
+            request.args.get('site', ''),
+            request.args.get('vendor', ''),
+            request.args.get('status', ''),
+            request.args.get('time_range', ''),
+            request.args.get('include_inactive', 'false').lower() == 'true'
+        )
+        limit = min(request.args.get('limit', 500, type=int), 5000)
 
-        content = config_result[0]['config_content'].lower()
-        search_lower = search_term.lower()
+        conn = get_db_connection()
+        try:
+            results = search_subnet(conn, network, base_filters['device_conditions'],
+                                    base_filters['device_params'], limit)
+        finally:
+            conn.close()
 
-        if search_strategy == 'exact':
-            return content.count(search_lower)
-        else:
-            return content.count(search_lower)
+        return jsonify({
+            'network': str(network),
+            'version': network.version,
+            'num_addresses': network.num_addresses,
+            **results,
+            'longest_matches': [route for route in results['routes'] if route['longest_match']],
+            'total_results': sum(len(rows) for rows in results.values())
+        })
 
     except Exception as e:
-        logging.error(f"Error counting matches: {e}")
-        return 0
+        logging.error(f"Error in subnet search: {e}")
+        return jsonify({'error': str(e)}), 500
 
 
 def search_network_data(search_term, search_strategy, base_filters):
@@ -802,8 +799,12 @@ def search_network_data(search_term, search_strategy, base_filters):
         # Normalize search term for MAC addresses
         normalized_mac = normalize_mac_for_search(search_term)
 
+        # Subnets: device, ARP and interface addresses inside it, by range queries on ip_start
+        if search_strategy == 'subnet':
+            results.extend(search_subnet_addresses(search_term, base_filters))
+
         # Search IP addresses
-        if search_strategy in ['ip_address', 'subnet', 'contains']:
+        if search_strategy in ['ip_address', 'contains']:
             # Device IPs
             ip_query = """
                 SELECT 'device_ip' as data_type, d.device_name, d.site_code,
@@ -829,18 +830,12 @@ def search_network_data(search_term, search_strategy, base_filters):
                 arp_correlation_query = """
                     SELECT 'arp_correlation' as data_type, d.device_name, d.site_code,
                            ae.ip_address as search_match, 'ARP' as ip_type, ae.interface_name, NULL as vlan_id,
-                           ae.created_at as last_seen, ae.mac_address, ae.entry_type,
+                           ae.last_seen, ae.mac_address, ae.entry_type,
                            'ARP Entry for ' || ? as description
                     FROM arp_entries ae
                     JOIN devices d ON ae.device_id = d.id
-                    JOIN collection_runs cr ON ae.collection_run_id = cr.id
                     WHERE ae.ip_address = ?
-                    AND cr.id IN (
-                        SELECT id FROM collection_runs cr2 
-                        WHERE cr2.device_id = ae.device_id 
-                        ORDER BY cr2.collection_time DESC 
-                        LIMIT 1
-                    )
+                    AND ae.is_current = 1
                 """
 
                 arp_params = [ip_address, ip_address]
@@ -855,18 +850,12 @@ def search_network_data(search_term, search_strategy, base_filters):
             arp_ip_query = """
                 SELECT 'arp_ip' as data_type, d.device_name, d.site_code,
                        ae.ip_address as search_match, 'ARP' as ip_type, ae.interface_name, NULL as vlan_id,
-                       ae.created_at as last_seen, ae.mac_address, ae.entry_type,
+                       ae.last_seen, ae.mac_address, ae.entry_type,
                        'ARP Table Entry' as description
                 FROM arp_entries ae
                 JOIN devices d ON ae.device_id = d.id
-                JOIN collection_runs cr ON ae.collection_run_id = cr.id
                 WHERE ae.ip_address LIKE ?
-                AND cr.id IN (
-                    SELECT id FROM collection_runs cr2 
-                    WHERE cr2.device_id = ae.device_id 
-                    ORDER BY cr2.collection_time DESC 
-                    LIMIT 1
-                )
+                AND ae.is_current = 1
             """
 
             params = [f"%{search_term}%"]
@@ -882,18 +871,12 @@ def search_network_data(search_term, search_strategy, base_filters):
             mac_query = """
                 SELECT 'mac_table' as data_type, d.device_name, d.site_code,
                        mat.mac_address as search_match, 'L2 Table' as ip_type, mat.interface_name, mat.vlan_id,
-                       mat.created_at as last_seen, mat.mac_address, mat.entry_type,
+                       mat.last_seen, mat.mac_address, mat.entry_type,
                        'MAC Table Entry (VLAN ' || COALESCE(CAST(mat.vlan_id AS TEXT), 'N/A') || ')' as description
                 FROM mac_address_table mat
                 JOIN devices d ON mat.device_id = d.id
-                JOIN collection_runs cr ON mat.collection_run_id = cr.id
                 WHERE mat.mac_address LIKE ?
-                AND cr.id IN (
-                    SELECT id FROM collection_runs cr2 
-                    WHERE cr2.device_id = mat.device_id 
-                    ORDER BY cr2.collection_time DESC 
-                    LIMIT 1
-                )
+                AND mat.is_current = 1
             """
 
             mac_search_terms = [normalized_mac, search_term.upper(), search_term.lower()]
@@ -928,18 +911,12 @@ def search_network_data(search_term, search_strategy, base_filters):
                 arp_correlation_query = """
                     SELECT 'arp_for_mac' as data_type, d.device_name, d.site_code,
                            ae.ip_address as search_match, 'ARP→IP' as ip_type, ae.interface_name, NULL as vlan_id,
-                           ae.created_at as last_seen, ae.mac_address, ae.entry_type,
+                           ae.last_seen, ae.mac_address, ae.entry_type,
                            'IP Address for MAC ' || ae.mac_address as description
                     FROM arp_entries ae
                     JOIN devices d ON ae.device_id = d.id
-                    JOIN collection_runs cr ON ae.collection_run_id = cr.id
                     WHERE ae.mac_address = ?
-                    AND cr.id IN (
-                        SELECT id FROM collection_runs cr2 
-                        WHERE cr2.device_id = ae.device_id 
-                        ORDER BY cr2.collection_time DESC 
-                        LIMIT 1
-                    )
+                    AND ae.is_current = 1
                 """
 
                 arp_params = [mac_address]
@@ -960,18 +937,12 @@ def search_network_data(search_term, search_strategy, base_filters):
             arp_mac_query = """
                 SELECT 'arp_mac' as data_type, d.device_name, d.site_code,
                        ae.mac_address as search_match, 'ARP' as ip_type, ae.interface_name, NULL as vlan_id,
-                       ae.created_at as last_seen, ae.mac_address, ae.entry_type,
+                       ae.last_seen, ae.mac_address, ae.entry_type,
                        'ARP Table MAC Entry (IP: ' || ae.ip_address || ')' as description
                 FROM arp_entries ae
                 JOIN devices d ON ae.device_id = d.id
-                JOIN collection_runs cr ON ae.collection_run_id = cr.id
                 WHERE ae.mac_address LIKE ?
-                AND cr.id IN (
-                    SELECT id FROM collection_runs cr2 
-                    WHERE cr2.device_id = ae.device_id 
-                    ORDER BY cr2.collection_time DESC 
-                    LIMIT 1
-                )
+                AND ae.is_current = 1
             """
 
             for mac_term in mac_search_terms:
@@ -1092,19 +1063,13 @@ def get_mac_ip_correlation(search_term, search_strategy):
                     ae.interface_name,
                     ae.age,
                     ae.entry_type,
-                    ae.created_at as last_seen,
+                    ae.last_seen,
                     'arp' as source_table
                 FROM arp_entries ae
                 JOIN devices d ON ae.device_id = d.id
-                JOIN collection_runs cr ON ae.collection_run_id = cr.id
                 WHERE ae.mac_address = ?
-                AND cr.id IN (
-                    SELECT id FROM collection_runs cr2 
-                    WHERE cr2.device_id = ae.device_id 
-                    ORDER BY cr2.collection_time DESC 
-                    LIMIT 1
-                )
-                ORDER BY ae.created_at DESC
+                AND ae.is_current = 1
+                ORDER BY ae.last_seen DESC
             """
 
             correlations['mac_to_ip'] = execute_query(arp_query, [normalized_mac])
@@ -1120,19 +1085,13 @@ def get_mac_ip_correlation(search_term, search_strategy):
                     mat.entry_type,
                     mat.is_active,
                     mat.moves,
-                    mat.created_at as last_seen,
+                    mat.last_seen,
                     'mac_table' as source_table
                 FROM mac_address_table mat
                 JOIN devices d ON mat.device_id = d.id
-                JOIN collection_runs cr ON mat.collection_run_id = cr.id
                 WHERE mat.mac_address = ?
-                AND cr.id IN (
-                    SELECT id FROM collection_runs cr2 
-                    WHERE cr2.device_id = mat.device_id 
-                    ORDER BY cr2.collection_time DESC 
-                    LIMIT 1
-                )
-                ORDER BY mat.created_at DESC
+                AND mat.is_current = 1
+                ORDER BY mat.last_seen DESC
             """
 
             mac_table_results = execute_query(mac_table_query, [normalized_mac])
@@ -1149,19 +1108,13 @@ def get_mac_ip_correlation(search_term, search_strategy):
                     ae.interface_name,
                     ae.age,
                     ae.entry_type,
-                    ae.created_at as last_seen,
+                    ae.last_seen,
                     'arp' as source_table
                 FROM arp_entries ae
                 JOIN devices d ON ae.device_id = d.id
-                JOIN collection_runs cr ON ae.collection_run_id = cr.id
                 WHERE ae.ip_address = ?
-                AND cr.id IN (
-                    SELECT id FROM collection_runs cr2 
-                    WHERE cr2.device_id = ae.device_id 
-                    ORDER BY cr2.collection_time DESC 
-                    LIMIT 1
-                )
-                ORDER BY ae.created_at DESC
+                AND ae.is_current = 1
+                ORDER BY ae.last_seen DESC
             """
 
             correlations['ip_to_mac'] = execute_query(ip_to_mac_query, [search_term])
@@ -1180,18 +1133,12 @@ def get_mac_ip_correlation(search_term, search_strategy):
                         mat.entry_type,
                         mat.is_active,
                         mat.moves,
-                        mat.created_at as last_seen,
+                        mat.last_seen,
                         'mac_table' as source_table
                     FROM mac_address_table mat
                     JOIN devices d ON mat.device_id = d.id
-                    JOIN collection_runs cr ON mat.collection_run_id = cr.id
                     WHERE mat.mac_address = ?
-                    AND cr.id IN (
-                        SELECT id FROM collection_runs cr2 
-                        WHERE cr2.device_id = mat.device_id 
-                        ORDER BY cr2.collection_time DESC 
-                        LIMIT 1
-                    )
+                    AND mat.is_current = 1
                 """
 
                 mac_entries = execute_query(mac_l2_query, [mac_address])
@@ -1465,8 +1412,12 @@ def search_routing(search_term, search_strategy, base_filters):
     results = []
 
     try:
+        # Subnets: routes containing the subnet (longest match first) or inside it
+        if search_strategy == 'subnet':
+            results.extend(search_subnet_routes(search_term, base_filters))
+
         # Search routes
-        if search_strategy in ['ip_address', 'subnet', 'contains']:
+        elif search_strategy in ['ip_address', 'contains']:
             route_condition = """
                 (r.destination_network LIKE ? OR 
                  r.next_hop LIKE ? OR
@@ -1733,7 +1684,17 @@ def api_config_detail(config_id):
     try:
         query = """
             SELECT 
-                dc.*,
+                dc.id,
+                dc.device_id,
+                dc.collection_run_id,
+                dc.config_type,
+                config_text(dc.config_hash, dc.config_content) AS config_content,
+                dc.config_hash,
+                dc.size_bytes,
+                dc.line_count,
+                dc.created_at,
+                dc.last_seen,
+                dc.change_marker,
                 d.device_name,
                 d.site_code,
                 cr.collection_time
@@ -1802,7 +1763,7 @@ def view_config(config_id):
                 dc.device_id,
                 dc.collection_run_id,
                 dc.config_type,
-                dc.config_content,
+                config_text(dc.config_hash, dc.config_content) AS config_content,
                 dc.config_hash,
                 dc.size_bytes,
                 dc.line_count,
@@ -1843,7 +1804,7 @@ def compare_configs(old_id, new_id):
                 dc.device_id,
                 dc.collection_run_id,
                 dc.config_type,
-                dc.config_content,
+                config_text(dc.config_hash, dc.config_content) AS config_content,
                 dc.config_hash,
                 dc.size_bytes,
                 dc.line_count,
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Collector Capture Archive
+One append-only archive per collection run instead of a directory tree of per-getter
+JSON files. Each device result is one NDJSON line compressed as its own gzip member;
+concatenated members form a normal gzip stream, so the archive can be read front to
+back with gzip.open, while the offset index written beside it allows seeking straight
+to one device without decompressing the rest
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ARCHIVE_FORMAT = 'rapidcmdb-capture-ndjson-gzip'
+ARCHIVE_VERSION = 1
+ARCHIVE_SUFFIX = '.ndjson.gz'
+INDEX_SUFFIX = '.index.json'
+
+
+def index_path_for(archive_path) -> Path:
+    """Index file stored beside an archive"""
+    archive_path = Path(archive_path)
+    return archive_path.with_name(archive_path.name[:-len(ARCHIVE_SUFFIX)] + INDEX_SUFFIX)
+
+
+def find_archives(directory) -> List[Path]:
+    """Capture archives under a directory, oldest first"""
+    return sorted(Path(directory).glob(f"**/*{ARCHIVE_SUFFIX}"), key=lambda p: (p.stat().st_mtime, p.name))
+
+
+class CaptureArchiveWriter:
+    """Appends device results to a run archive and records each record's offset"""
+
+    def __init__(self, directory, run_name: str = None, compresslevel: int = 6):
+        run_name = run_name or f"collection_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.path = Path(directory) / f"{run_name}{ARCHIVE_SUFFIX}"
+        self.index_path = index_path_for(self.path)
+        self.compresslevel = compresslevel
+        self.records = []
+        self.raw_bytes = 0
+        self._file = open(self.path, 'ab')
+        self._offset = self._file.tell()
+
+    def write(self, result: Dict) -> int:
+        """Append one device result; returns the compressed record size"""
+        line = json.dumps(result, default=str, separators=(',', ':')).encode() + b'\n'
+        member = gzip.compress(line, compresslevel=self.compresslevel)
+        self._file.write(member)
+        # Flush per record so a crashed run still leaves every finished device readable
+        self._file.flush()
+
+        self.records.append({
+            'device_name': result.get('device_name'),
+            'device_ip': result.get('device_ip'),
+            'site_code': result.get('site_code'),
+            'napalm_driver': result.get('napalm_driver'),
+            'success': result.get('success', False),
+            'collection_time': result.get('collection_time'),
+            'offset': self._offset,
+            'length': len(member),
+            'raw_size': len(line)
+        })
+        self._offset += len(member)
+        self.raw_bytes += len(line)
+        return len(member)
+
+    def close(self):
+        """Close the archive and write its offset index"""
+        if self._file.closed:
+            return
+        self._file.close()
+        index = {
+            'format': ARCHIVE_FORMAT,
+            'version': ARCHIVE_VERSION,
+            'archive': self.path.name,
+            'created': datetime.now().isoformat(),
+            'record_count': len(self.records),
+            'raw_bytes': self.raw_bytes,
+            'compressed_bytes': self._offset,
+            'records': self.records
+        }
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+
+def iter_archive_lines(archive_path) -> Iterator[str]:
+    """Stream the raw NDJSON lines of an archive, leaving parsing to the caller"""
+    with gzip.open(archive_path, 'rt') as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield line
+        except EOFError:
+            # A run that died mid-write leaves a truncated final member; earlier records are intact
+            logging.warning(f"Capture archive {archive_path} ends with a truncated record")
+
+
+def iter_archive(archive_path) -> Iterator[Dict]:
+    """Stream device results from an archive one record at a time"""
+    for line in iter_archive_lines(archive_path):
+        yield json.loads(line)
+
+
+def load_index(archive_path) -> Optional[Dict]:
+    """Offset index for an archive, None when the run did not finish writing it"""
+    index_path = index_path_for(archive_path)
+    if not index_path.exists():
+        return None
+    with open(index_path) as f:
+        return json.load(f)
+
+
+def read_record(archive_path, offset: int, length: int) -> Dict:
+    """Read one record by its index offset without decompressing the rest of the archive"""
+    with open(archive_path, 'rb') as f:
+        f.seek(offset)
+        return json.loads(gzip.decompress(f.read(length)))
+
+
+def find_device(archive_path, device_name: str) -> Optional[Dict]:
+    """Latest record for a device, using the index when present"""
+    index = load_index(archive_path)
+    if index is None:
+        found = None
+        for record in iter_archive(archive_path):
+            if record.get('device_name') == device_name:
+                found = record
+        return found
+
+    entries = [entry for entry in index['records'] if entry['device_name'] == device_name]
+    if not entries:
+        return None
+    return read_record(archive_path, entries[-1]['offset'], entries[-1]['length'])
+
+
+def summarize_archive(archive_path) -> Dict:
+    """Per-run totals and per-getter counts, streamed from the archive"""
+    summary = {
+        'archive': str(archive_path),
+        'devices': 0,
+        'successful': 0,
+        'failed': 0,
+        'sites': {},
+        'methods': {}
+    }
+    for record in iter_archive(archive_path):
+        summary['devices'] += 1
+        summary['successful' if record.get('success') else 'failed'] += 1
+        site = record.get('site_code') or 'UNKNOWN'
+        summary['sites'][site] = summary['sites'].get(site, 0) + 1
+        for method in record.get('methods_collected', []):
+            name = method['method'] if isinstance(method, dict) else method
+            summary['methods'][name] = summary['methods'].get(name, 0) + 1
+    return summary
+
+
+def export_device_files(archive_path, output_dir) -> Tuple[int, Path]:
+    """Expand an archive into the legacy per-device directory layout for tools that still expect it"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    count = 0
+    for record in iter_archive(archive_path):
+        device_name = record['device_name']
+        device_dir = output_dir / device_name
+        device_dir.mkdir(exist_ok=True)
+        with open(device_dir / f"{device_name}_complete.json", 'w') as f:
+            json.dump(record, f, indent=2, default=str)
+        for data_type, data in record.get('data', {}).items():
+            if data_type == 'get_config' and isinstance(data, dict):
+                for config_type, config_content in data.items():
+                    with open(device_dir / f"{device_name}_{config_type}_config.txt", 'w') as f:
+                        f.write(config_content or '')
+            else:
+                with open(device_dir / f"{device_name}_{data_type}.json", 'w') as f:
+                    json.dump(data, f, indent=2, default=str)
+        count += 1
+    return count, output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect collector capture archives')
+    parser.add_argument('archive', help='Capture archive (.ndjson.gz)')
+    parser.add_argument('--device', help='Print the record for one device')
+    parser.add_argument('--export', metavar='DIR', help='Expand into per-device JSON files')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.device:
+        record = find_device(args.archive, args.device)
+        if record is None:
+            print(f"No record for {args.device}")
+            return 1
+        print(json.dumps(record, indent=2, default=str))
+    elif args.export:
+        count, output_dir = export_device_files(args.archive, args.export)
+        print(f"Exported {count} devices to {output_dir}")
+    else:
+        print(json.dumps(summarize_archive(args.archive), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
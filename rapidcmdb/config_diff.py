@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Config Change Detection
+When the importer stores a config whose hash differs from the device's previous config of
+the same type, a config_changes row is written with the unified diff, the number of lines
+added plus removed, and a summary naming the config sections touched. History pages then
+read stored diffs instead of diffing full configs per request. Small configs are diffed
+inline by the writer; large ones go to a process pool and their rows are written as the
+diffs complete, in submission order
+"""
+
+import argparse
+import difflib
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from config_store import load_config_text, register_config_functions
+
+POOL_THRESHOLD_LINES = 2000
+DIFF_CONTEXT = 3
+SUMMARY_SECTIONS = 5
+
+# Same definition as cmdb.sql, for databases created from the embedded schema
+CHANGES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS config_changes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        device_id INTEGER NOT NULL,
+        old_config_id INTEGER,
+        new_config_id INTEGER NOT NULL,
+        change_type TEXT NOT NULL, -- added, modified, deleted, replaced
+        change_summary TEXT, -- Brief description of changes
+        diff_content TEXT, -- Actual unified diff
+        change_size INTEGER NOT NULL, -- Number of lines changed
+        detected_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+        FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE,
+        FOREIGN KEY (old_config_id) REFERENCES device_configs(id),
+        FOREIGN KEY (new_config_id) REFERENCES device_configs(id),
+
+        CONSTRAINT check_change_type CHECK (change_type IN ('added', 'modified', 'deleted', 'replaced')),
+        CONSTRAINT check_change_size CHECK (change_size >= 0)
+    )
+"""
+
+CHANGES_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_config_changes_device_time ON config_changes(device_id, detected_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_config_changes_time ON config_changes(detected_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_config_changes_configs ON config_changes(new_config_id, old_config_id)",
+)
+
+
+def ensure_changes_table(conn: sqlite3.Connection):
+    """Create config_changes and its lookup indexes, and drop the schema trigger that only
+    recorded line-count deltas - it would duplicate every change the importer now writes"""
+    conn.execute(CHANGES_SCHEMA)
+    for statement in CHANGES_INDEXES:
+        conn.execute(statement)
+    conn.execute("DROP TRIGGER IF EXISTS detect_config_changes")
+
+
+def _format_range(start: int, stop: int) -> str:
+    """Unified diff hunk range, as difflib writes it"""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return str(beginning)
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _section_of(lines: List[str], index: int) -> Optional[str]:
+    """Top-level config line a changed line belongs to: the line itself or its nearest unindented parent"""
+    for position in range(min(index, len(lines) - 1), -1, -1):
+        line = lines[position]
+        if line and not line[0].isspace() and line.strip() not in ('!', '#', 'exit', 'end', '}'):
+            return line.strip()
+    return None
+
+
+def diff_configs(old_text: str, new_text: str, context: int = DIFF_CONTEXT) -> Dict:
+    """Unified diff of two configs with added/removed line counts and the sections they fall in"""
+    old_lines = old_text.splitlines()
+    new_lines = new_text.splitlines()
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+
+    diff_lines = []
+    added = removed = 0
+    sections = []
+
+    def note_section(lines, index):
+        section = _section_of(lines, index)
+        if section and section not in sections:
+            sections.append(section)
+
+    for group in matcher.get_grouped_opcodes(context):
+        first, last = group[0], group[-1]
+        diff_lines.append(f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                diff_lines.extend(' ' + line for line in old_lines[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                diff_lines.extend('-' + line for line in old_lines[i1:i2])
+                removed += i2 - i1
+                note_section(old_lines, i1)
+            if tag in ('replace', 'insert'):
+                diff_lines.extend('+' + line for line in new_lines[j1:j2])
+                added += j2 - j1
+                note_section(new_lines, j1)
+
+    summary = f"{added} lines added, {removed} removed"
+    if sections:
+        summary += ": " + ", ".join(sections[:SUMMARY_SECTIONS])
+        if len(sections) > SUMMARY_SECTIONS:
+            summary += f" and {len(sections) - SUMMARY_SECTIONS} more sections"
+
+    return {
+        'diff_content': "\n".join(diff_lines),
+        'change_size': added + removed,
+        'change_summary': summary,
+        'lines_added': added,
+        'lines_removed': removed
+    }
+
+
+def write_change(conn: sqlite3.Connection, change: Dict, diff: Dict):
+    """Insert the config_changes row for a change, or fill in an existing row that has no diff yet"""
+    if change.get('id'):
+        conn.execute("""
+            UPDATE config_changes SET change_summary = ?, diff_content = ?, change_size = ?
+            WHERE id = ?
+        """, (diff['change_summary'], diff['diff_content'], diff['change_size'], change['id']))
+        return
+    conn.execute("""
+        INSERT INTO config_changes (
+            device_id, old_config_id, new_config_id, change_type,
+            change_summary, diff_content, change_size, detected_at
+        ) VALUES (?, ?, ?, 'modified', ?, ?, ?, ?)
+    """, (change['device_id'], change['old_config_id'], change['new_config_id'],
+          diff['change_summary'], diff['diff_content'], diff['change_size'], change['detected_at']))
+
+
+class ConfigChangeDetector:
+    """
+    Writes config_changes rows for a single writer connection. Diffs of configs longer than
+    pool_threshold lines run on a lazily started process pool (workers=0 diffs everything
+    inline); drain() writes the completed ones, oldest first. Pooled diffs recorded since the
+    writer's last commit are held back until commit(), and rollback() drops them, so a diff is
+    never written against a config id the rollback freed for reuse
+    """
+
+    def __init__(self, workers: int = None, pool_threshold: int = POOL_THRESHOLD_LINES, max_pending: int = 64):
+        self.workers = min(4, os.cpu_count() or 1) if workers is None else workers
+        self.pool_threshold = pool_threshold
+        self.max_pending = max_pending
+        self.recorded = 0
+        self._executor = None
+        self._pending = deque()
+        self._uncommitted = 0
+
+    def record(self, conn: sqlite3.Connection, change: Dict, old_text: str, new_text: str):
+        """Diff old_text against new_text and write the change, now or once the pool finishes it"""
+        large = max(old_text.count('\n'), new_text.count('\n')) >= self.pool_threshold
+        if not (large and self.workers):
+            write_change(conn, change, diff_configs(old_text, new_text))
+            self.recorded += 1
+            return
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._pending.append((change, self._executor.submit(diff_configs, old_text, new_text)))
+        self._uncommitted += 1
+        if self.committed_pending >= self.max_pending:
+            self._write_next(conn)
+
+    def commit(self):
+        """The writer committed: pooled diffs recorded so far may now be written"""
+        self._uncommitted = 0
+
+    def rollback(self):
+        """The writer rolled back: drop pooled diffs recorded since its last commit"""
+        for _ in range(self._uncommitted):
+            self._pending.pop()[1].cancel()
+        self._uncommitted = 0
+
+    def _write_next(self, conn: sqlite3.Connection):
+        change, future = self._pending.popleft()
+        try:
+            write_change(conn, change, future.result())
+            self.recorded += 1
+        except Exception as e:
+            logging.warning(f"Failed to record config change for config {change['new_config_id']}: {e}")
+
+    def drain(self, conn: sqlite3.Connection, wait: bool = False) -> int:
+        """Write finished pooled diffs in submission order (all of them when wait); returns rows written"""
+        written = 0
+        while self.committed_pending and (wait or self._pending[0][1].done()):
+            self._write_next(conn)
+            written += 1
+        return written
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def committed_pending(self) -> int:
+        return len(self._pending) - self._uncommitted
+
+    def close(self, conn: sqlite3.Connection):
+        self.rollback()
+        self.drain(conn, wait=True)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def backfill_changes(conn: sqlite3.Connection, detector: ConfigChangeDetector, batch_size: int = 200) -> Dict:
+    """
+    Record diffs for config history stored before change detection existed: every pair of
+    consecutive configs of a device and type with different hashes gets a config_changes
+    row, and rows left without a diff by the old schema trigger are filled in. Safe to rerun
+    """
+    ensure_changes_table(conn)
+    conn.commit()
+    stats = {'pairs_checked': 0, 'changes_added': 0, 'changes_filled': 0}
+    previous = {}
+    last_id = 0
+    while True:
+        rows = conn.execute("""
+            SELECT dc.id, dc.device_id, dc.config_type, dc.config_hash, dc.config_content, dc.created_at,
+                   cc.id AS change_id, cc.diff_content IS NOT NULL AS has_diff
+            FROM device_configs dc
+            LEFT JOIN config_changes cc ON cc.new_config_id = dc.id
+            WHERE dc.id > ?
+            ORDER BY dc.id LIMIT ?
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        for config_id, device_id, config_type, config_hash, inline, created_at, change_id, has_diff in rows:
+            last_id = config_id
+            key = (device_id, config_type)
+            old = previous.get(key)
+            previous[key] = (config_id, config_hash, inline)
+            if old is None or old[1] == config_hash:
+                continue
+            stats['pairs_checked'] += 1
+            if change_id and has_diff:
+                continue
+            change = {'id': change_id, 'device_id': device_id, 'old_config_id': old[0],
+                      'new_config_id': config_id, 'detected_at': created_at}
+            detector.record(conn, change, load_config_text(conn, old[1], old[2]) or '',
+                            load_config_text(conn, config_hash, inline) or '')
+            # The configs were committed long ago, so the diff can be written whenever it is ready
+            detector.commit()
+            stats['changes_filled' if change_id else 'changes_added'] += 1
+        detector.drain(conn)
+        conn.commit()
+        logging.info(f"Checked {stats['pairs_checked']} config changes, "
+                     f"{stats['changes_added']} added, {stats['changes_filled']} filled")
+
+    detector.close(conn)
+    conn.commit()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record config diffs for existing device config history')
+    parser.add_argument('--db-path', default='napalm_cmdb.db', help='SQLite database path')
+    parser.add_argument('--workers', type=int, help='Diff processes for large configs (default: up to 4, 0 = inline)')
+    parser.add_argument('--batch-size', type=int, default=200, help='Configs read per transaction')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    conn = register_config_functions(sqlite3.connect(args.db_path))
+    try:
+        started = time.time()
+        stats = backfill_changes(conn, ConfigChangeDetector(args.workers), args.batch_size)
+        stats['seconds'] = round(time.time() - started, 2)
+        print(json.dumps(stats, indent=2))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Config Full-Text Index
+config_fts is an FTS5 index over the latest config of each device and type. It is an
+external-content table reading text through the config_fts_content view, so configs stay
+stored once in config_blobs; connections that query it need config_text() registered.
+The importer swaps a device's entry when a new config arrives, and config_fts_docs records
+which configs are indexed so entries are only ever removed with the text they were added
+with. The trigram tokenizer with detail='none' keeps only which configs hold each run of
+three characters, a small fraction of the size of a positional index. A search looks up
+the configs holding every trigram of its term and checks just those texts, in result
+order, until the limit is reached, so it finds the substring matches LIKE '%term%' found.
+Regex searches really match patterns, scanning only the latest configs
+"""
+
+import argparse
+import html
+import json
+import logging
+import re
+import sqlite3
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config_store import load_config_text, register_config_functions
+
+SNIPPET_CHARS = 200
+TRIGRAM = 3  # Shorter terms have no trigram to look up
+
+INDEX_SCHEMA = (
+    """CREATE VIEW IF NOT EXISTS config_fts_content AS
+       SELECT id, config_text(config_hash, config_content) AS config_text FROM device_configs""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS config_fts USING fts5(
+           config_text, content='config_fts_content', content_rowid='id',
+           tokenize='trigram', detail='none'
+       )""",
+    """CREATE TABLE IF NOT EXISTS config_fts_docs (
+           config_id INTEGER PRIMARY KEY -- device_configs.id currently held in config_fts
+       )""",
+)
+
+LATEST_CONFIG_IDS = "SELECT MAX(id) FROM device_configs GROUP BY device_id, config_type"
+
+
+def index_exists(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'config_fts'").fetchone() is not None
+
+
+def _is_trigram_index(conn: sqlite3.Connection) -> bool:
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'config_fts'").fetchone()[0]
+    return 'trigram' in sql and "detail='none'" in sql
+
+
+def ensure_config_index(conn: sqlite3.Connection) -> bool:
+    """
+    Create the index if missing, filling it from the latest configs; False without FTS5 or
+    the trigram tokenizer (SQLite 3.34). An index of another layout is rebuilt as trigrams
+    """
+    if index_exists(conn):
+        if _is_trigram_index(conn):
+            return True
+        logging.info("Replacing the config full-text index with a trigram index...")
+        conn.execute("DROP TABLE config_fts")
+        conn.execute("DROP TABLE IF EXISTS config_fts_docs")
+    try:
+        for statement in INDEX_SCHEMA:
+            conn.execute(statement)
+    except sqlite3.OperationalError as e:
+        logging.warning(f"Config full-text index unavailable, searches will scan configs: {e}")
+        return False
+    if conn.execute("SELECT 1 FROM device_configs LIMIT 1").fetchone():
+        logging.info("Building config full-text index from the latest configs...")
+        rebuild_config_index(conn)
+    return True
+
+
+def index_config(conn: sqlite3.Connection, config_id: int, config_text: str):
+    conn.execute("INSERT INTO config_fts (rowid, config_text) VALUES (?, ?)", (config_id, config_text))
+    conn.execute("INSERT OR IGNORE INTO config_fts_docs (config_id) VALUES (?)", (config_id,))
+
+
+def unindex_config(conn: sqlite3.Connection, config_id: int, config_text: str):
+    """Remove an indexed config, given the text it was indexed with; configs not indexed are ignored"""
+    if conn.execute("DELETE FROM config_fts_docs WHERE config_id = ?", (config_id,)).rowcount:
+        conn.execute("INSERT INTO config_fts (config_fts, rowid, config_text) VALUES ('delete', ?, ?)",
+                     (config_id, config_text))
+
+
+def replace_indexed_config(conn: sqlite3.Connection, old_id: Optional[int], old_text: Optional[str],
+                           new_id: int, new_text: str):
+    """Swap a device's indexed config for the one that just superseded it"""
+    if old_id is not None:
+        unindex_config(conn, old_id, old_text or '')
+    index_config(conn, new_id, new_text)
+
+
+def unindex_device(conn: sqlite3.Connection, device_id: int) -> int:
+    """Drop a device's configs from the index before the device is deleted"""
+    if not index_exists(conn):
+        return 0
+    rows = conn.execute("""
+        SELECT dc.id, dc.config_hash, dc.config_content FROM device_configs dc
+        JOIN config_fts_docs fd ON fd.config_id = dc.id
+        WHERE dc.device_id = ?
+    """, (device_id,)).fetchall()
+    for config_id, config_hash, inline in rows:
+        unindex_config(conn, config_id, load_config_text(conn, config_hash, inline) or '')
+    return len(rows)
+
+
+def rebuild_config_index(conn: sqlite3.Connection) -> int:
+    """Reindex the latest config of every device and type from scratch"""
+    conn.execute("INSERT INTO config_fts (config_fts) VALUES ('delete-all')")
+    conn.execute("DELETE FROM config_fts_docs")
+    conn.execute(f"""
+        INSERT INTO config_fts (rowid, config_text)
+        SELECT id, config_text(config_hash, config_content) FROM device_configs WHERE id IN ({LATEST_CONFIG_IDS})
+    """)
+    conn.execute(f"INSERT INTO config_fts_docs (config_id) {LATEST_CONFIG_IDS}")
+    conn.execute("INSERT INTO config_fts (config_fts) VALUES ('optimize')")
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM config_fts_docs").fetchone()[0]
+
+
+def fts_query(search_term: str) -> Optional[str]:
+    """
+    FTS5 query for the configs holding every trigram of a term: a superset of the configs
+    containing it, case-insensitively. None for terms shorter than a trigram
+    """
+    trigrams = dict.fromkeys(search_term[i:i + TRIGRAM] for i in range(len(search_term) - TRIGRAM + 1))
+    return ' AND '.join('"' + trigram.replace('"', '""') + '"' for trigram in trigrams) or None
+
+
+def term_pattern(search_term: str, exact: bool = False) -> re.Pattern:
+    """
+    Regex for a term as literal text, case-insensitive. In exact mode an end of the term that
+    is a letter or digit may not continue into a longer word, so 'vlan 10' misses 'vlan 100'
+    """
+    pattern = re.escape(search_term)
+    if exact and search_term[:1].isalnum():
+        pattern = r'(?<![^\W_])' + pattern
+    if exact and search_term[-1:].isalnum():
+        pattern += r'(?![^\W_])'
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def snippet_html(config_text: str, spans: List[Tuple[int, int]]) -> Optional[str]:
+    """The config line holding the first match, HTML-escaped with its matches in <mark> tags"""
+    if not spans:
+        return None
+    start = config_text.rfind('\n', 0, spans[0][0]) + 1
+    end = config_text.find('\n', spans[0][1])
+    end = min(end if end != -1 else len(config_text), start + SNIPPET_CHARS)
+    parts = []
+    position = start
+    for span_start, span_end in spans:
+        if span_start >= end:
+            break
+        span_end = min(span_end, end)
+        parts += [html.escape(config_text[position:span_start]), '<mark>',
+                  html.escape(config_text[span_start:span_end]), '</mark>']
+        position = span_end
+    parts.append(html.escape(config_text[position:end]))
+    return ''.join(parts).strip()
+
+
+def _regexp(pattern: str, value: str) -> bool:
+    return value is not None and re.search(pattern, value, re.IGNORECASE | re.MULTILINE) is not None
+
+
+def search_latest_configs(conn: sqlite3.Connection, search_term: str, mode: str = 'contains',
+                          conditions: Sequence[str] = (), params: Sequence = (), limit: int = 100) -> List[Dict]:
+    """
+    Search the latest config of each device and type. mode is 'contains' (the term anywhere,
+    as LIKE '%term%' finds it), 'exact' (the term not running into a longer word) or 'regex';
+    conditions filter on devices d and device_configs dc. Rows carry match_count and a
+    snippet of the first matching line. Contains and exact searches take their candidates
+    from config_fts; regex mode and terms shorter than a trigram scan the latest configs
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    columns = """
+        dc.id as config_id, dc.config_type, dc.size_bytes as config_size, dc.created_at,
+        d.device_name, d.vendor, d.model, d.site_code, dc.config_hash, dc.config_content
+    """
+    filters = ''.join(f" AND {condition}" for condition in conditions)
+    query_limit = limit
+
+    if mode == 'regex':
+        try:
+            pattern = re.compile(search_term, re.IGNORECASE | re.MULTILINE)
+        except re.error as e:
+            logging.warning(f"Invalid config search regex {search_term!r}: {e}")
+            return []
+        conn.create_function('regexp', 2, _regexp, deterministic=True)
+        tables = "device_configs dc JOIN devices d ON dc.device_id = d.id"
+        condition = f"dc.id IN ({LATEST_CONFIG_IDS}) AND config_text(dc.config_hash, dc.config_content) REGEXP ?"
+        term_param = search_term
+    else:
+        pattern = term_pattern(search_term, exact=(mode == 'exact'))
+        query = fts_query(search_term)
+        if query and index_exists(conn):
+            # Candidates hold the term's trigrams but maybe not the term; the match check
+            # below drops the others, so the query cannot stop at the limit
+            tables = ("config_fts JOIN device_configs dc ON dc.id = config_fts.rowid "
+                      "JOIN devices d ON dc.device_id = d.id")
+            condition, term_param = "config_fts MATCH ?", query
+            query_limit = -1
+        else:
+            tables = "device_configs dc JOIN devices d ON dc.device_id = d.id"
+            condition = (f"dc.id IN ({LATEST_CONFIG_IDS}) "
+                         f"AND config_text(dc.config_hash, dc.config_content) LIKE ? ESCAPE '\\'")
+            term_param = '%' + re.sub(r'([\\%_])', r'\\\1', search_term) + '%'
+            if mode == 'exact':
+                query_limit = -1
+
+    # Texts are loaded only for the rows kept, not carried through the sort
+    rows = cursor.execute(f"""
+        SELECT {columns}
+        FROM {tables}
+        WHERE {condition}{filters}
+        ORDER BY d.device_name, dc.config_type
+        LIMIT ?
+    """, [term_param, *params, query_limit])
+
+    results = []
+    for row in rows:
+        if len(results) == limit:
+            break
+        config_text = load_config_text(conn, row['config_hash'], row['config_content']) or ''
+        spans = [match.span() for match in pattern.finditer(config_text)]
+        if not spans:
+            continue
+        result = {key: row[key] for key in row.keys() if key not in ('config_hash', 'config_content')}
+        result['match_count'] = len(spans)
+        result['snippet'] = snippet_html(config_text, spans)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build, rebuild or query the config full-text index')
+    parser.add_argument('--db-path', default='napalm_cmdb.db', help='SQLite database path')
+    parser.add_argument('--rebuild', action='store_true', help='Reindex the latest configs from scratch')
+    parser.add_argument('--search', help='Run a search and print the matches')
+    parser.add_argument('--mode', choices=['contains', 'exact', 'regex'], default='contains', help='Search mode')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    conn = register_config_functions(sqlite3.connect(args.db_path))
+    try:
+        ensure_config_index(conn)
+        conn.commit()
+        if args.rebuild:
+            started = time.time()
+            indexed = rebuild_config_index(conn)
+            logging.info(f"Indexed {indexed} configs in {time.time() - started:.1f}s")
+        if args.search:
+            started = time.perf_counter()
+            results = search_latest_configs(conn, args.search, args.mode)
+            elapsed = (time.perf_counter() - started) * 1000
+            for result in results:
+                print(f"{result['device_name']:<30} {result['config_type']:<8} {result['match_count']:>5} matches")
+            print(f"{len(results)} configs in {elapsed:.1f} ms")
+        else:
+            print(json.dumps({'indexed_configs': conn.execute("SELECT COUNT(*) FROM config_fts_docs").fetchone()[0]},
+                             indent=2))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Config Blob Store
+Each distinct device config is stored once in config_blobs, keyed by the SHA-256 that
+device_configs.config_hash already holds, and zlib-compressed. device_configs rows point at
+their blob through config_hash and keep an empty config_content; rows written before the
+store existed keep their inline text until migrated. Readers register config_text() on
+their connection and select config_text(dc.config_hash, dc.config_content) wherever they
+used dc.config_content, which resolves either form through a shared decompression cache
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional
+
+COMPRESSION = 'zlib'
+COMPRESS_LEVEL = 6
+
+BLOB_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS config_blobs (
+        config_hash TEXT PRIMARY KEY, -- SHA256 of the uncompressed config text
+        compression TEXT NOT NULL DEFAULT 'zlib',
+        content BLOB NOT NULL,
+        size_bytes INTEGER NOT NULL, -- uncompressed size
+        stored_bytes INTEGER NOT NULL, -- compressed size
+        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def compress_config(config_content: str) -> bytes:
+    return zlib.compress(config_content.encode(), COMPRESS_LEVEL)
+
+
+def decompress_config(content: bytes, compression: str) -> str:
+    if compression == 'zlib':
+        return zlib.decompress(content).decode()
+    if compression == 'none':
+        return bytes(content).decode()
+    raise ValueError(f"Unknown config compression: {compression}")
+
+
+class ConfigTextCache:
+    """Thread-safe LRU of decompressed configs by hash, bounded by total text size"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, config_hash: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(config_hash)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(config_hash)
+            self.hits += 1
+            return text
+
+    def put(self, config_hash: str, text: str):
+        if len(text) > self.max_bytes:
+            return
+        with self._lock:
+            if config_hash in self._entries:
+                return
+            self._entries[config_hash] = text
+            self.current_bytes += len(text)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+config_cache = ConfigTextCache()
+
+
+def ensure_blob_table(conn: sqlite3.Connection):
+    conn.execute(BLOB_SCHEMA)
+
+
+def store_config_blob(conn: sqlite3.Connection, config_hash: str, config_content: str) -> bool:
+    """Store a config's text under its hash unless already present; True when a blob was added"""
+    if conn.execute("SELECT 1 FROM config_blobs WHERE config_hash = ?", (config_hash,)).fetchone():
+        return False
+    content = compress_config(config_content)
+    conn.execute("""
+        INSERT INTO config_blobs (config_hash, compression, content, size_bytes, stored_bytes)
+        VALUES (?, ?, ?, ?, ?)
+    """, (config_hash, COMPRESSION, content, len(config_content.encode()), len(content)))
+    return True
+
+
+def load_config_text(conn: sqlite3.Connection, config_hash: str, inline: str = None) -> Optional[str]:
+    """Config text for a device_configs row: inline text when present, otherwise its blob"""
+    if inline:
+        return inline
+    if not config_hash:
+        return inline
+    text = config_cache.get(config_hash)
+    if text is not None:
+        return text
+    try:
+        row = conn.execute("SELECT content, compression FROM config_blobs WHERE config_hash = ?",
+                           (config_hash,)).fetchone()
+    except sqlite3.OperationalError:
+        # Database from before the blob store - every row still holds its text inline
+        return inline
+    if row is None:
+        return inline
+    text = decompress_config(row[0], row[1])
+    config_cache.put(config_hash, text)
+    return text
+
+
+def register_config_functions(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Make config_text(config_hash, config_content) available to queries on this connection"""
+    conn.create_function('config_text', 2, lambda config_hash, inline: load_config_text(conn, config_hash, inline),
+                         deterministic=True)
+    return conn
+
+
+def delete_orphan_blobs(conn: sqlite3.Connection) -> int:
+    """Remove blobs no device_configs row references any more, e.g. after retention cleanup"""
+    ensure_blob_table(conn)
+    cursor = conn.execute("""
+        DELETE FROM config_blobs
+        WHERE config_hash NOT IN (SELECT config_hash FROM device_configs)
+    """)
+    return cursor.rowcount
+
+
+def migrate_inline_configs(conn: sqlite3.Connection, batch_size: int = 200) -> Dict:
+    """
+    Move inline config_content into the blob store, a batch of rows per transaction so a
+    large database can be migrated while the web app keeps reading it. Safe to rerun
+    """
+    ensure_blob_table(conn)
+    conn.commit()
+    stats = {'rows_migrated': 0, 'blobs_added': 0, 'inline_bytes': 0, 'stored_bytes': 0}
+    last_id = 0
+    while True:
+        rows = conn.execute("""
+            SELECT id, config_hash, config_content FROM device_configs
+            WHERE id > ? AND config_content != ''
+            ORDER BY id LIMIT ?
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        for row_id, config_hash, config_content in rows:
+            stats['inline_bytes'] += len(config_content.encode())
+            if store_config_blob(conn, config_hash, config_content):
+                stats['blobs_added'] += 1
+            conn.execute("UPDATE device_configs SET config_content = '' WHERE id = ?", (row_id,))
+            stats['rows_migrated'] += 1
+            last_id = row_id
+        conn.commit()
+        logging.info(f"Migrated {stats['rows_migrated']} configs into {stats['blobs_added']} blobs")
+
+    stats['stored_bytes'] = conn.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM config_blobs").fetchone()[0]
+    return stats
+
+
+def store_summary(conn: sqlite3.Connection) -> Dict:
+    """Config rows, distinct blobs and bytes held inline vs compressed"""
+    ensure_blob_table(conn)
+    rows, inline_rows, inline_bytes, referenced_bytes = conn.execute("""
+        SELECT COUNT(*), COUNT(CASE WHEN config_content != '' THEN 1 END),
+               COALESCE(SUM(LENGTH(CAST(config_content AS BLOB))), 0), COALESCE(SUM(size_bytes), 0)
+        FROM device_configs
+    """).fetchone()
+    blobs, blob_bytes, stored_bytes = conn.execute("""
+        SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), COALESCE(SUM(stored_bytes), 0) FROM config_blobs
+    """).fetchone()
+    return {
+        'config_rows': rows,
+        'inline_rows': inline_rows,
+        'inline_bytes': inline_bytes,
+        'config_bytes_referenced': referenced_bytes,
+        'blobs': blobs,
+        'blob_bytes': blob_bytes,
+        'blob_stored_bytes': stored_bytes,
+        'compression_ratio': round(blob_bytes / stored_bytes, 2) if stored_bytes else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or migrate the device config blob store')
+    parser.add_argument('--db-path', default='napalm_cmdb.db', help='SQLite database path')
+    parser.add_argument('--migrate', action='store_true', help='Move inline config_content into config_blobs')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM after migrating to release the freed pages')
+    parser.add_argument('--batch-size', type=int, default=200, help='Rows migrated per transaction')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    conn = sqlite3.connect(args.db_path)
+    try:
+        if args.migrate:
+            started = time.time()
+            stats = migrate_inline_configs(conn, args.batch_size)
+            logging.info(f"Migration finished in {time.time() - started:.1f}s: {stats}")
+            if args.vacuum:
+                logging.info("Running VACUUM...")
+                conn.execute("VACUUM")
+        print(json.dumps(store_summary(conn), indent=2))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
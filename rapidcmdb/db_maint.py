@@ -13,6 +13,10 @@ from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 import argparse
 
+from config_search import index_exists
+from config_store import delete_orphan_blobs
+from interval_store import ensure_interval_columns
+
 
 class DatabaseMaintenance:
     def __init__(self, db_path: str):
@@ -225,6 +229,7 @@ class DatabaseMaintenance:
     def clean_old_data(self, dry_run: bool = True) -> Dict[str, int]:
         """Clean old data based on retention policies"""
         cursor = self.conn.cursor()
+        ensure_interval_columns(self.conn)
 
         # Get retention policies
         cursor.execute("SELECT * FROM retention_policies WHERE enabled = 1")
@@ -243,7 +248,18 @@ class DatabaseMaintenance:
             if table_name == 'collection_runs':
                 date_column = 'collection_time'
                 partition_column = 'device_id'
-            elif table_name in ['interfaces', 'arp_entries', 'mac_address_table', 'environment_data']:
+            elif table_name in ['arp_entries', 'mac_address_table']:
+                # Interval rows: only intervals closed before the cutoff expire, whatever their age
+                query = f"SELECT COUNT(*) FROM {table_name} WHERE is_current = 0 AND last_seen < ?"
+                cursor.execute(query, (cutoff_date.isoformat(),))
+                count = cursor.fetchone()[0]
+                cleanup_stats[table_name] = count
+                if count > 0 and not dry_run:
+                    cursor.execute(f"DELETE FROM {table_name} WHERE is_current = 0 AND last_seen < ?",
+                                   (cutoff_date.isoformat(),))
+                    self.logger.info(f"Cleaned {count} closed intervals from {table_name}")
+                continue
+            elif table_name in ['interfaces', 'environment_data']:
                 date_column = 'created_at'
                 partition_column = 'device_id'
             elif table_name == 'device_configs':
@@ -252,6 +268,11 @@ class DatabaseMaintenance:
             else:
                 continue  # Skip unknown tables
 
+            # Configs in the search index are each device's latest and are never expired
+            keep_indexed = table_name == 'device_configs' and index_exists(self.conn)
+            # An unchanged config stays on the run that first stored it, however old that run is
+            keep_referenced = table_name == 'collection_runs'
+
             # Count records that would be deleted
             if keep_latest_count:
                 # Keep latest N records per device, regardless of age
@@ -266,7 +287,11 @@ class DatabaseMaintenance:
                     AND t1.{date_column} < ?
                 """
             else:
-                query = f"SELECT COUNT(*) FROM {table_name} WHERE {date_column} < ?"
+                query = f"SELECT COUNT(*) FROM {table_name} t1 WHERE t1.{date_column} < ?"
+            if keep_indexed:
+                query += " AND t1.id NOT IN (SELECT config_id FROM config_fts_docs)"
+            if keep_referenced:
+                query += " AND t1.id NOT IN (SELECT collection_run_id FROM device_configs)"
 
             cursor.execute(query, (cutoff_date.isoformat(),))
             count = cursor.fetchone()[0]
@@ -287,9 +312,21 @@ class DatabaseMaintenance:
                     """
                 else:
                     delete_query = f"DELETE FROM {table_name} WHERE {date_column} < ?"
+                if keep_indexed:
+                    delete_query += " AND id NOT IN (SELECT config_id FROM config_fts_docs)"
+                if keep_referenced:
+                    delete_query += " AND id NOT IN (SELECT collection_run_id FROM device_configs)"
 
                 cursor.execute(delete_query, (cutoff_date.isoformat(),))
                 self.logger.info(f"Cleaned {count} old records from {table_name}")
+                if table_name == 'device_configs':
+                    orphans = delete_orphan_blobs(self.conn)
+                    self.logger.info(f"Removed {orphans} config blobs no longer referenced")
+                if table_name == 'interfaces' and cursor.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'interface_ips'").fetchone():
+                    # This connection does not enforce foreign keys, so the cascade is done here
+                    cursor.execute("DELETE FROM interface_ips WHERE interface_id NOT IN (SELECT id FROM interfaces)")
+                    self.logger.info(f"Removed {cursor.rowcount} addresses of expired interfaces")
 
         if not dry_run:
             self.conn.commit()
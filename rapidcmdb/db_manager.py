@@ -9,25 +9,413 @@ import sqlite3
 import json
 import hashlib
 import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
-import re
+from contextlib import contextmanager
+
+from config_diff import ConfigChangeDetector, ensure_changes_table
+from config_search import ensure_config_index, replace_indexed_config
+from config_store import ensure_blob_table, load_config_text, register_config_functions, store_config_blob
+from interval_store import INTERVAL_KEYS, ensure_interval_columns, store_interval_rows
+from ip_ranges import address_range, ensure_range_columns
+
+
+# Column lists for the per-run tables. Rows are built by the build_*_rows functions below as
+# tuples in this column order, then written with executemany after device_id and collection_run_id
+# (or, for the INTERVAL_KEYS tables, merged into the device's current intervals)
+TABLE_COLUMNS = {
+    'interfaces': ('interface_name', 'interface_type', 'admin_status', 'oper_status', 'description',
+                   'mac_address', 'speed', 'mtu', 'last_flapped', 'duplex', 'vlan_id'),
+    'lldp_neighbors': ('local_interface', 'remote_hostname', 'remote_port', 'remote_system_description',
+                       'remote_chassis_id', 'remote_port_id'),
+    'arp_entries': ('interface_name', 'ip_address', 'mac_address', 'age', 'entry_type', 'ip_start', 'ip_end'),
+    'mac_address_table': ('mac_address', 'interface_name', 'vlan_id', 'entry_type', 'is_active', 'moves',
+                          'last_move'),
+    'environment_data': ('cpu_usage', 'memory_used', 'memory_available', 'memory_total', 'temperature_sensors',
+                         'power_supplies', 'fans'),
+    'device_users': ('username', 'privilege_level', 'password_hash', 'ssh_keys', 'user_type'),
+    'vlans': ('vlan_id', 'vlan_name', 'status', 'interfaces'),
+    'routes': ('destination_network', 'prefix_length', 'next_hop', 'interface_name', 'protocol', 'metric',
+               'administrative_distance', 'is_active', 'ip_start', 'ip_end'),
+    'hardware_inventory': ('component_type', 'slot_position', 'part_number', 'serial_number', 'description',
+                           'status', 'vendor', 'model', 'additional_data'),
+}
+
+
+_MAC_SEPARATORS = str.maketrans('', '', ':-.')
+
+
+def normalize_mac_address(mac_address: str) -> Optional[str]:
+    """Normalize MAC address to XX:XX:XX:XX:XX:XX format"""
+    if not mac_address:
+        return None
+
+    # Remove common separators and convert to uppercase
+    mac = mac_address.upper().translate(_MAC_SEPARATORS)
+
+    # Validate length
+    if len(mac) != 12:
+        return None
+
+    # Format as XX:XX:XX:XX:XX:XX
+    return f"{mac[0:2]}:{mac[2:4]}:{mac[4:6]}:{mac[6:8]}:{mac[8:10]}:{mac[10:12]}"
+
+
+def determine_interface_type(interface_name: str) -> str:
+    """Determine interface type from name"""
+    name_lower = interface_name.lower()
+
+    type_mapping = {
+        'vlan': 'VLAN',
+        'loopback': 'Loopback',
+        'tengigabit': 'Physical',
+        'gigabit': 'Physical',
+        'fastethernet': 'Physical',
+        'ethernet': 'Physical',
+        'tunnel': 'Tunnel',
+        'port-channel': 'PortChannel',
+        'po': 'PortChannel',
+        'mgmt': 'Management',
+        'management': 'Management'
+    }
+
+    for keyword, interface_type in type_mapping.items():
+        if keyword in name_lower:
+            return interface_type
+
+    return 'Physical'  # Default
+
+
+def build_interface_rows(interfaces_data: Dict) -> List[Tuple]:
+    """Interface rows with typed, validated speed/MTU/flap values"""
+    rows = []
+    for interface_name, interface_info in interfaces_data.items():
+        # Validate interface name
+        if not interface_name or not interface_name.strip():
+            continue
+
+        # Convert boolean values to proper format
+        admin_status = 'enabled' if interface_info.get('is_enabled') else 'disabled'
+        oper_status = 'up' if interface_info.get('is_up') else 'down'
+
+        # Validate and clean numeric values
+        speed = interface_info.get('speed')
+        if speed is not None:
+            try:
+                speed = float(speed)
+                if speed <= 0:
+                    speed = None
+            except (ValueError, TypeError):
+                speed = None
+
+        mtu = interface_info.get('mtu')
+        if mtu is not None:
+            try:
+                mtu = int(mtu)
+                if mtu < 64 or mtu > 65535:
+                    mtu = None
+            except (ValueError, TypeError):
+                mtu = None
+
+        last_flapped = interface_info.get('last_flapped')
+        if last_flapped is not None:
+            try:
+                last_flapped = float(last_flapped)
+                if last_flapped < 0:
+                    last_flapped = None
+            except (ValueError, TypeError):
+                last_flapped = None
+
+        # Validate duplex
+        duplex = interface_info.get('duplex')
+        if duplex and duplex not in ['full', 'half', 'auto']:
+            duplex = None
+
+        rows.append((
+            interface_name, determine_interface_type(interface_name),
+            admin_status, oper_status, interface_info.get('description'),
+            normalize_mac_address(interface_info.get('mac_address')),
+            speed, mtu, last_flapped, duplex, None  # VLAN ID extraction could be added here
+        ))
+    return rows
+
+
+def build_interface_ip_rows(interfaces_ip_data: Dict) -> List[Tuple]:
+    """
+    (interface_name, ip_address, prefix_length, ip_version, ip_start, ip_end) for each
+    get_interfaces_ip address; the range covers the interface's subnet
+    """
+    rows = []
+    for interface_name, ip_data in interfaces_ip_data.items():
+        for addresses in ip_data.values():
+            for ip_addr, details in addresses.items():
+                prefix_length = details.get('prefix_length')
+                if prefix_length in (None, ''):
+                    continue
+                ip_start, ip_end = address_range(ip_addr, prefix_length)
+                if ip_start is None:
+                    continue
+                rows.append((interface_name, ip_addr, int(prefix_length), 4 if isinstance(ip_start, int) else 6,
+                             ip_start, ip_end))
+    return rows
+
+
+def build_lldp_rows(lldp_data: Dict) -> List[Tuple]:
+    """LLDP neighbor rows"""
+    return [
+        (local_interface, neighbor.get('hostname'), neighbor.get('port'), neighbor.get('system_description'),
+         neighbor.get('chassis_id'), neighbor.get('port_id'))
+        for local_interface, neighbors in lldp_data.items()
+        for neighbor in neighbors
+    ]
+
+
+def build_arp_rows(arp_data: List) -> List[Tuple]:
+    """ARP rows, skipping entries without a usable IP or MAC"""
+    rows = []
+    for entry in arp_data:
+        # Validate and clean age value
+        age = entry.get('age')
+        if age is not None:
+            try:
+                age = float(age)
+                if age < 0:
+                    age = None  # Ignore negative ages
+            except (ValueError, TypeError):
+                age = None
+
+        # Skip entries with invalid IP or MAC
+        ip_addr = entry.get('ip')
+        mac_addr = normalize_mac_address(entry.get('mac'))
+
+        if not ip_addr or not mac_addr:
+            continue
+
+        rows.append((entry.get('interface'), ip_addr, mac_addr, age,
+                     'dynamic') + address_range(ip_addr))  # Default to dynamic if not specified
+    return rows
+
+
+def build_mac_rows(mac_data: List) -> List[Tuple]:
+    """MAC address table rows with validated VLAN, move count and last move"""
+    rows = []
+    for entry in mac_data:
+        # Validate and clean VLAN ID
+        vlan_id = entry.get('vlan')
+        if vlan_id is not None:
+            try:
+                vlan_id = int(vlan_id)
+                # Skip invalid VLAN IDs (must be 1-4094)
+                if vlan_id < 1 or vlan_id > 4094:
+                    vlan_id = None
+            except (ValueError, TypeError):
+                vlan_id = None
+
+        # Skip entries with invalid MAC addresses
+        mac_addr = normalize_mac_address(entry.get('mac'))
+        if not mac_addr:
+            continue
+
+        entry_type = 'static' if entry.get('static') else 'dynamic'
+
+        # Validate moves count
+        moves = entry.get('moves', 0)
+        try:
+            moves = int(moves)
+            if moves < 0:
+                moves = 0
+        except (ValueError, TypeError):
+            moves = 0
+
+        # Validate last_move timestamp
+        last_move = entry.get('last_move')
+        if last_move is not None:
+            try:
+                last_move = float(last_move)
+                if last_move < 0:
+                    last_move = None
+            except (ValueError, TypeError):
+                last_move = None
+
+        rows.append((mac_addr, entry.get('interface'), vlan_id, entry_type, entry.get('active', True),
+                     moves, last_move))
+    return rows
+
+
+def build_environment_rows(env_data: Dict) -> List[Tuple]:
+    """Single environment row: first CPU, memory totals and the raw sensor groups as JSON"""
+    cpu_usage = None
+    memory_used = None
+    memory_available = None
+    memory_total = None
+
+    # Extract CPU usage (take first CPU if multiple)
+    cpu_data = env_data.get('cpu', {})
+    if cpu_data:
+        cpu_usage = list(cpu_data.values())[0].get('%usage')
+
+    # Extract memory information
+    memory_data = env_data.get('memory', {})
+    if memory_data:
+        memory_used = memory_data.get('used_ram')
+        memory_available = memory_data.get('available_ram')
+        if memory_used and memory_available:
+            memory_total = memory_used + memory_available
+
+    return [(cpu_usage, memory_used, memory_available, memory_total,
+             json.dumps(env_data.get('temperature', {})),
+             json.dumps(env_data.get('power', {})),
+             json.dumps(env_data.get('fans', {})))]
+
+
+def build_user_rows(users_data: Dict) -> List[Tuple]:
+    """Local user account rows"""
+    return [
+        (username, user_info.get('level'), user_info.get('password'),
+         json.dumps(user_info.get('sshkeys', [])), 'local')  # Default to local if not specified
+        for username, user_info in users_data.items()
+    ]
+
+
+def build_vlan_rows(vlan_data: Dict) -> List[Tuple]:
+    """VLAN rows, skipping IDs outside 1-4094"""
+    rows = []
+    for vlan_id, vlan_info in vlan_data.items():
+        # Extract numeric VLAN ID and validate
+        try:
+            vlan_num = int(vlan_id)
+            if vlan_num < 1 or vlan_num > 4094:
+                logging.debug(f"Skipping invalid VLAN ID: {vlan_id}")
+                continue  # Skip invalid VLAN IDs
+        except (ValueError, TypeError):
+            logging.debug(f"Skipping non-numeric VLAN ID: {vlan_id}")
+            continue
+
+        # Validate status
+        status = vlan_info.get('status', 'active')
+        if status not in ['active', 'suspended', 'shutdown']:
+            status = 'active'
+
+        rows.append((vlan_num, vlan_info.get('name'), status, json.dumps(vlan_info.get('interfaces', []))))
+    return rows
+
+
+def build_route_rows(route_data: List) -> List[Tuple]:
+    """Route rows with the destination split into network and prefix length"""
+    rows = []
+    for route in route_data:
+        # Parse destination network and prefix
+        destination = route.get('destination', '')
+        if '/' in destination:
+            network, prefix = destination.split('/')
+            prefix_length = int(prefix)
+        else:
+            network = destination
+            prefix_length = 32 if '.' in destination else 128  # Default for IPv4/IPv6
+
+        rows.append((network, prefix_length, route.get('next_hop'), route.get('outgoing_interface'),
+                     route.get('protocol', 'unknown'), route.get('metric'), route.get('preference'), True)
+                    + address_range(network, prefix_length))
+    return rows
+
+
+def build_hardware_rows(hardware_data: Dict) -> List[Tuple]:
+    """Hardware inventory rows for optics, power supplies and fans"""
+    rows = []
+
+    # Process optical transceivers from get_optics data
+    for interface_name, optics_info in hardware_data.get('optics', {}).items():
+        # Extract optical metrics from the nested structure
+        physical_channels = optics_info.get('physical_channels', {})
+        channels = physical_channels.get('channel', [])
+        if not channels:
+            continue
+
+        state = channels[0].get('state', {})  # Most interfaces have single channel
+
+        # Extract power and current measurements
+        input_power = state.get('input_power', {})
+        output_power = state.get('output_power', {})
+        laser_bias = state.get('laser_bias_current', {})
+
+        optics_metrics = {
+            'input_power_dbm': input_power.get('instant'),
+            'output_power_dbm': output_power.get('instant'),
+            'laser_bias_current_ma': laser_bias.get('instant'),
+            'interface_name': interface_name
+        }
+
+        # Determine transceiver status based on power levels
+        status = 'operational'
+        if input_power.get('instant', 0) < -30:  # Very low input power
+            status = 'failed'
+        elif input_power.get('instant', 0) < -20:  # Low input power
+            status = 'unknown'
+
+        rows.append(('transceiver', interface_name, None, None, f"Optical transceiver for {interface_name}",
+                     status, None, None, json.dumps(optics_metrics)))
+
+    # Process power supplies from environment data
+    for psu_name, psu_info in hardware_data.get('power_supplies', {}).items():
+        rows.append(('psu', psu_name, psu_info.get('part_number'), psu_info.get('serial_number'),
+                     psu_info.get('description'), 'operational' if psu_info.get('status') == 'ok' else 'failed',
+                     psu_info.get('vendor'), psu_info.get('model'), json.dumps(psu_info)))
+
+    # Process fans from environment data
+    for fan_name, fan_info in hardware_data.get('fans', {}).items():
+        rows.append(('fan', fan_name, None, None, fan_info.get('description'),
+                     'operational' if fan_info.get('status') == 'ok' else 'failed', None, None,
+                     json.dumps(fan_info)))
+
+    return rows
+
+
+def build_config_rows(config_data: Dict) -> List[Tuple]:
+    """(config_type, content, sha256, size_bytes, line_count) for each non-empty config"""
+    rows = []
+    for config_type, config_content in config_data.items():
+        if config_content:
+            encoded = config_content.encode()
+            rows.append((config_type, config_content, hashlib.sha256(encoded).hexdigest(), len(encoded),
+                         config_content.count('\n') + 1))
+    return rows
+
+
+# Getter -> (table, row builder, label used in import logging), in import order
+ROW_BUILDERS = (
+    ('get_interfaces', 'interfaces', build_interface_rows, 'interfaces'),
+    ('get_lldp_neighbors', 'lldp_neighbors', build_lldp_rows, 'lldp_neighbors'),
+    ('get_arp_table', 'arp_entries', build_arp_rows, 'arp_table'),
+    ('get_mac_address_table', 'mac_address_table', build_mac_rows, 'mac_address_table'),
+    ('get_environment', 'environment_data', build_environment_rows, 'environment'),
+    ('get_users', 'device_users', build_user_rows, 'users'),
+    ('get_vlans', 'vlans', build_vlan_rows, 'vlans'),
+    ('get_route_to', 'routes', build_route_rows, 'routes'),
+)
 
 
 class NapalmCMDB:
     """Database manager for NAPALM network device data"""
 
-    def __init__(self, db_path: str = "napalm_cmdb.db", schema_path: str = "cmdb.sql"):
+    def __init__(self, db_path: str = "napalm_cmdb.db", schema_path: str = "cmdb.sql", diff_workers: int = None):
         self.db_path = db_path
         self.schema_path = schema_path
         self.connection = None
+        self._defer_commits = False
+        self.change_detector = ConfigChangeDetector(diff_workers)
+        self.config_index = False
         self.setup_database()
 
     def setup_database(self):
         """Initialize database connection and create tables if needed"""
         self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
         self.connection.row_factory = sqlite3.Row  # Enable column access by name
+        register_config_functions(self.connection)
 
         # Enable foreign key constraints
         self.connection.execute("PRAGMA foreign_keys = ON")
@@ -38,6 +426,27 @@ class NapalmCMDB:
         if not cursor.fetchone():
             self.create_schema()
 
+        self.migrate_schema()
+
+    def migrate_schema(self):
+        """Add columns and tables introduced after a database was created"""
+        cursor = self.connection.cursor()
+        ensure_blob_table(self.connection)
+        config_columns = {row[1] for row in cursor.execute("PRAGMA table_info(device_configs)")}
+        if not config_columns:
+            return
+
+        for column, definition in (('last_seen', 'DATETIME'), ('change_marker', 'TEXT')):
+            if column not in config_columns:
+                cursor.execute(f"ALTER TABLE device_configs ADD COLUMN {column} {definition}")
+                logging.info(f"Added device_configs.{column} column")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_config_device_type ON device_configs(device_id, config_type)")
+        ensure_changes_table(self.connection)
+        ensure_interval_columns(self.connection)
+        ensure_range_columns(self.connection)
+        self.config_index = ensure_config_index(self.connection)
+        self.connection.commit()
+
     def create_schema(self):
         """Create database schema from SQL file"""
         logging.info("Creating database schema...")
@@ -106,6 +515,8 @@ class NapalmCMDB:
                 subnet_mask TEXT,
                 vlan_id INTEGER,
                 is_primary BOOLEAN NOT NULL DEFAULT 0,
+                ip_start INTEGER,
+                ip_end INTEGER,
                 created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
                 updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
 
@@ -187,6 +598,12 @@ class NapalmCMDB:
                 mac_address TEXT NOT NULL,
                 age REAL,
                 entry_type TEXT,
+                first_seen DATETIME,
+                last_seen DATETIME,
+                run_count INTEGER NOT NULL DEFAULT 1,
+                is_current BOOLEAN NOT NULL DEFAULT 1,
+                ip_start INTEGER,
+                ip_end INTEGER,
                 created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
 
                 FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE,
@@ -207,6 +624,10 @@ class NapalmCMDB:
                 is_active BOOLEAN NOT NULL DEFAULT 1,
                 moves INTEGER DEFAULT 0,
                 last_move REAL,
+                first_seen DATETIME,
+                last_seen DATETIME,
+                run_count INTEGER NOT NULL DEFAULT 1,
+                is_current BOOLEAN NOT NULL DEFAULT 1,
                 created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
 
                 FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE,
@@ -247,6 +668,8 @@ class NapalmCMDB:
                 size_bytes INTEGER NOT NULL,
                 line_count INTEGER NOT NULL,
                 created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                last_seen DATETIME,
+                change_marker TEXT,
 
                 FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE,
                 FOREIGN KEY (collection_run_id) REFERENCES collection_runs(id) ON DELETE CASCADE,
@@ -307,6 +730,8 @@ class NapalmCMDB:
                 metric INTEGER,
                 administrative_distance INTEGER,
                 is_active BOOLEAN NOT NULL DEFAULT 1,
+                ip_start INTEGER,
+                ip_end INTEGER,
                 created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
 
                 FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE,
@@ -324,6 +749,7 @@ class NapalmCMDB:
             "CREATE INDEX idx_device_ips_device ON device_ips(device_id)",
             "CREATE INDEX idx_device_ips_address ON device_ips(ip_address)",
             "CREATE INDEX idx_collection_device_time ON collection_runs(device_id, collection_time DESC)",
+            "CREATE INDEX idx_config_device_type ON device_configs(device_id, config_type)",
 
             # Create trigger for single primary IP
             """CREATE TRIGGER enforce_single_primary_ip
@@ -362,14 +788,53 @@ class NapalmCMDB:
     def close(self):
         """Close database connection"""
         if self.connection:
+            self.change_detector.close(self.connection)
+            self.connection.commit()
             self.connection.close()
 
-    def generate_device_key(self, vendor: str, serial_number: str, model: str) -> str:
+    def flush_config_changes(self):
+        """Write config changes whose pooled diffs have finished, in their own commit"""
+        if self.change_detector.drain(self.connection):
+            self.connection.commit()
+
+    def _commit(self):
+        """Commit unless writes are being grouped by device_transaction()"""
+        if not self._defer_commits:
+            self.connection.commit()
+            self.change_detector.commit()
+
+    def _rollback(self):
+        """Roll back, dropping config diffs queued for the rows being discarded"""
+        self.connection.rollback()
+        self.change_detector.rollback()
+
+    @contextmanager
+    def device_transaction(self):
+        """Group every insert for one device into a single commit, rolling back on failure"""
+        self._defer_commits = True
+        try:
+            yield
+        except Exception:
+            self._defer_commits = False
+            self._rollback()
+            raise
+        self._defer_commits = False
+        self._commit()
+        self.flush_config_changes()
+
+    def import_device_result(self, napalm_data: Dict):
+        """Import one collector result as a single transaction"""
+        with self.device_transaction():
+            self.import_napalm_data(napalm_data)
+
+    @staticmethod
+    def generate_device_key(vendor: str, serial_number: str, model: str) -> str:
         """Generate a stable device key from vendor, serial, and model"""
         key_string = f"{vendor}|{serial_number}|{model}".upper()
         return hashlib.sha256(key_string.encode()).hexdigest()[:16]
 
-    def extract_site_code(self, device_name: str) -> str:
+    @staticmethod
+    def extract_site_code(device_name: str) -> str:
         """Extract site code from device name"""
         # Example: frc-c03h2-swl-01 -> FRC
         parts = device_name.split('-')
@@ -380,7 +845,8 @@ class NapalmCMDB:
                 return site
         return 'UNK'  # Default for unknown
 
-    def determine_device_role(self, device_name: str, interfaces: Dict) -> str:
+    @staticmethod
+    def determine_device_role(device_name: str, interfaces: Dict) -> str:
         """Determine device role based on naming convention and interfaces"""
         name_lower = device_name.lower()
 
@@ -410,27 +876,26 @@ class NapalmCMDB:
 
         return 'unknown'
 
-    def insert_or_update_device(self, napalm_data: Dict) -> int:
-        """Insert or update device record and return device ID"""
-        facts = napalm_data['data'].get('get_facts', {})
-        interfaces = napalm_data['data'].get('get_interfaces', {})
-
-        device_name = napalm_data['device_name']
-        collection_ip = napalm_data['device_ip']  # The IP used for collection
-
-        # Extract device information
-        vendor = facts.get('vendor', 'Unknown')
-        serial_number = facts.get('serial_number', 'Unknown')
-        model = facts.get('model', 'Unknown')
-
-        # Generate stable device key
-        device_key = self.generate_device_key(vendor, serial_number, model)
-
-        site_code = self.extract_site_code(device_name)
-        device_role = self.determine_device_role(device_name, interfaces)
+    def insert_or_update_device(self, prepared: Dict) -> int:
+        """Insert or update device record from a prepare_device() result and return device ID"""
+        device = prepared['device']
+        device_name = prepared['device_name']
+        collection_ip = prepared['device_ip']  # The IP used for collection
+        device_key = device['device_key']
 
         cursor = self.connection.cursor()
 
+        if not prepared['has_facts']:
+            # Scheduled runs may skip get_facts - keep the stored identity rather than overwrite it with 'Unknown'
+            cursor.execute("SELECT id FROM devices WHERE device_name = ?", (device_name,))
+            existing = cursor.fetchone()
+            if existing:
+                device_id = existing[0]
+                cursor.execute("UPDATE devices SET last_updated = ? WHERE id = ?", (datetime.now(), device_id))
+                self._update_device_ips(device_id, collection_ip, prepared['interface_ips'])
+                self._commit()
+                return device_id
+
         try:
             # Check if device exists by device_key (most reliable) or device_name
             cursor.execute("""
@@ -449,9 +914,9 @@ class NapalmCMDB:
                         uptime = ?, last_updated = ?, site_code = ?, device_role = ?
                     WHERE id = ?
                 """, (
-                    device_key, device_name, facts.get('hostname'), facts.get('fqdn'),
-                    vendor, model, serial_number, facts.get('os_version'),
-                    facts.get('uptime'), datetime.now(), site_code, device_role, device_id
+                    device_key, device_name, device['hostname'], device['fqdn'],
+                    device['vendor'], device['model'], device['serial_number'], device['os_version'],
+                    device['uptime'], datetime.now(), device['site_code'], device['device_role'], device_id
                 ))
                 logging.info(f"Updated existing device: {device_name} (ID: {device_id})")
             else:
@@ -462,17 +927,17 @@ class NapalmCMDB:
                         serial_number, os_version, uptime, site_code, device_role
                     ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
-                    device_key, device_name, facts.get('hostname'), facts.get('fqdn'),
-                    vendor, model, serial_number, facts.get('os_version'),
-                    facts.get('uptime'), site_code, device_role
+                    device_key, device_name, device['hostname'], device['fqdn'],
+                    device['vendor'], device['model'], device['serial_number'], device['os_version'],
+                    device['uptime'], device['site_code'], device['device_role']
                 ))
                 device_id = cursor.lastrowid
                 logging.info(f"Inserted new device: {device_name} (ID: {device_id})")
 
             # Handle device IP addresses
-            self._update_device_ips(device_id, collection_ip, napalm_data)
+            self._update_device_ips(device_id, collection_ip, prepared['interface_ips'])
 
-            self.connection.commit()
+            self._commit()
             return device_id
 
         except sqlite3.IntegrityError as e:
@@ -484,52 +949,43 @@ class NapalmCMDB:
                 raise
         except Exception as e:
             logging.error(f"Error inserting/updating device {device_name}: {e}")
-            self.connection.rollback()
+            self._rollback()
             raise
 
-    def _update_device_ips(self, device_id: int, collection_ip: str, napalm_data: Dict):
+    def _update_device_ips(self, device_id: int, collection_ip: str, interface_ips: List[Tuple]):
         """Update device IP addresses"""
         cursor = self.connection.cursor()
+        now = datetime.now()
 
         # Always ensure the collection IP is recorded
         try:
             cursor.execute("""
                 INSERT OR REPLACE INTO device_ips (
-                    device_id, ip_address, ip_type, is_primary, updated_at
-                ) VALUES (?, ?, 'management', 1, ?)
-            """, (device_id, collection_ip, datetime.now()))
+                    device_id, ip_address, ip_type, is_primary, updated_at, ip_start, ip_end
+                ) VALUES (?, ?, 'management', 1, ?, ?, ?)
+            """, (device_id, collection_ip, now) + address_range(collection_ip))
         except sqlite3.IntegrityError:
             # IP might be used by another device - this is a data issue to investigate
             logging.warning(f"IP address {collection_ip} already exists for another device")
 
-        # Add interface IPs from interface data
-        interfaces_ip = napalm_data['data'].get('get_interfaces_ip', {})
-        for interface_name, ip_data in interfaces_ip.items():
-            for protocol, addresses in ip_data.items():
-                for ip_addr, details in addresses.items():
-                    if ip_addr != collection_ip:  # Don't duplicate the management IP
-                        try:
-                            cursor.execute("""
-                                INSERT OR IGNORE INTO device_ips (
-                                    device_id, ip_address, ip_type, interface_name, 
-                                    subnet_mask, is_primary, updated_at
-                                ) VALUES (?, ?, 'vlan', ?, ?, 0, ?)
-                            """, (
-                                device_id, ip_addr, interface_name,
-                                str(details.get('prefix_length', '')), datetime.now()
-                            ))
-                        except sqlite3.IntegrityError:
-                            # IP already exists, skip
-                            continue
-
-    def insert_collection_run(self, device_id: int, napalm_data: Dict) -> int:
+        # Add interface IPs from interface data; OR IGNORE skips addresses already recorded
+        cursor.executemany("""
+            INSERT OR IGNORE INTO device_ips (
+                device_id, ip_address, ip_type, interface_name, 
+                subnet_mask, is_primary, updated_at, ip_start, ip_end
+            ) VALUES (?, ?, 'vlan', ?, ?, 0, ?, ?, ?)
+        """, [(device_id, ip_addr, interface_name, prefix, now) + address_range(ip_addr)
+              for ip_addr, interface_name, prefix in interface_ips])
+
+    def insert_collection_run(self, device_id: int, prepared: Dict) -> int:
         """Insert collection run record and return run ID"""
         cursor = self.connection.cursor()
 
-        collection_time = datetime.fromisoformat(napalm_data['collection_time'])
-        methods_collected = list(napalm_data['data'].keys())
-        errors = napalm_data.get('errors', [])
-        collection_ip = napalm_data['device_ip']
+        collection_time = datetime.fromisoformat(prepared['collection_time'])
+        methods_collected = list(prepared['methods'])
+        if prepared['config_check'].get('unchanged'):
+            # The pre-check confirmed the stored config is current, which counts as collecting it
+            methods_collected.append('get_config')
 
         cursor.execute("""
             INSERT INTO collection_runs (
@@ -537,381 +993,157 @@ class NapalmCMDB:
                 errors, methods_collected, napalm_driver, collector_version
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
-            device_id, collection_ip, collection_time, napalm_data['success'],
-            napalm_data.get('credential_used'), json.dumps(errors),
-            json.dumps(methods_collected), napalm_data.get('napalm_driver'),
-            napalm_data.get('collector_version', '1.0')
+            device_id, prepared['device_ip'], collection_time, prepared['success'],
+            prepared['credential_used'], json.dumps(prepared['errors']),
+            json.dumps(methods_collected), prepared['napalm_driver'],
+            prepared['collector_version']
         ))
 
         run_id = cursor.lastrowid
-        self.connection.commit()
+        self._commit()
         return run_id
 
-    def insert_interfaces(self, device_id: int, run_id: int, interfaces_data: Dict, interfaces_ip_data: Dict):
-        """Insert interface data"""
-        cursor = self.connection.cursor()
-
-        for interface_name, interface_info in interfaces_data.items():
-            # Validate interface name
-            if not interface_name or not interface_name.strip():
-                continue
-
-            # Determine interface type
-            interface_type = self._determine_interface_type(interface_name)
-
-            # Convert boolean values to proper format
-            admin_status = 'enabled' if interface_info.get('is_enabled') else 'disabled'
-            oper_status = 'up' if interface_info.get('is_up') else 'down'
-
-            # Validate and clean numeric values
-            speed = interface_info.get('speed')
-            if speed is not None:
-                try:
-                    speed = float(speed)
-                    if speed <= 0:
-                        speed = None
-                except (ValueError, TypeError):
-                    speed = None
-
-            mtu = interface_info.get('mtu')
-            if mtu is not None:
-                try:
-                    mtu = int(mtu)
-                    if mtu < 64 or mtu > 65535:
-                        mtu = None
-                except (ValueError, TypeError):
-                    mtu = None
-
-            last_flapped = interface_info.get('last_flapped')
-            if last_flapped is not None:
-                try:
-                    last_flapped = float(last_flapped)
-                    if last_flapped < 0:
-                        last_flapped = None
-                except (ValueError, TypeError):
-                    last_flapped = None
-
-            # Validate duplex
-            duplex = interface_info.get('duplex')
-            if duplex and duplex not in ['full', 'half', 'auto']:
-                duplex = None
-
-            cursor.execute("""
-                INSERT INTO interfaces (
-                    device_id, collection_run_id, interface_name, interface_type,
-                    admin_status, oper_status, description, mac_address, speed, mtu,
-                    last_flapped, duplex, vlan_id
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                device_id, run_id, interface_name, interface_type,
-                admin_status, oper_status, interface_info.get('description'),
-                self._normalize_mac_address(interface_info.get('mac_address')),
-                speed, mtu, last_flapped, duplex, None  # VLAN ID extraction could be added here
-            ))
-
-        self.connection.commit()
-
-    def _normalize_mac_address(self, mac_address: str) -> Optional[str]:
-        """Normalize MAC address to XX:XX:XX:XX:XX:XX format"""
-        if not mac_address:
-            return None
-
-        # Remove common separators and convert to uppercase
-        mac = re.sub(r'[:\-\.]', '', mac_address.upper())
-
-        # Validate length
-        if len(mac) != 12:
-            return None
-
-        # Format as XX:XX:XX:XX:XX:XX
-        return ':'.join([mac[i:i + 2] for i in range(0, 12, 2)])
-
-    def _determine_interface_type(self, interface_name: str) -> str:
-        """Determine interface type from name"""
-        name_lower = interface_name.lower()
-
-        type_mapping = {
-            'vlan': 'VLAN',
-            'loopback': 'Loopback',
-            'tengigabit': 'Physical',
-            'gigabit': 'Physical',
-            'fastethernet': 'Physical',
-            'ethernet': 'Physical',
-            'tunnel': 'Tunnel',
-            'port-channel': 'PortChannel',
-            'po': 'PortChannel',
-            'mgmt': 'Management',
-            'management': 'Management'
-        }
-
-        for keyword, interface_type in type_mapping.items():
-            if keyword in name_lower:
-                return interface_type
+    def insert_rows(self, table: str, device_id: int, run_id: int, rows: List[Tuple]):
+        """Write a pre-built row batch for one of the TABLE_COLUMNS tables in a single executemany"""
+        if table in INTERVAL_KEYS:
+            # ARP and MAC entries extend the rows of tuples already seen rather than copying them
+            seen_at = self.connection.execute("SELECT collection_time FROM collection_runs WHERE id = ?",
+                                              (run_id,)).fetchone()
+            store_interval_rows(self.connection, table, TABLE_COLUMNS[table], device_id, run_id, rows,
+                                seen_at[0] if seen_at else None)
+            self._commit()
+            return
+
+        columns = ('device_id', 'collection_run_id') + TABLE_COLUMNS[table]
+        if rows:
+            self.connection.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [(device_id, run_id) + row for row in rows]
+            )
+        self._commit()
 
-        return 'Physical'  # Default
+    def insert_interfaces(self, device_id: int, run_id: int, interfaces_data: Dict, interfaces_ip_data: Dict = None):
+        """Insert interface data"""
+        self.insert_rows('interfaces', device_id, run_id, build_interface_rows(interfaces_data))
+        if interfaces_ip_data:
+            self.insert_interface_ips(run_id, build_interface_ip_rows(interfaces_ip_data))
+
+    def insert_interface_ips(self, run_id: int, rows: List[Tuple]):
+        """Attach build_interface_ip_rows() rows to the interfaces stored for the same run"""
+        interface_ids = {row[0]: row[1] for row in self.connection.execute(
+            "SELECT interface_name, id FROM interfaces WHERE collection_run_id = ?", (run_id,))}
+        self.connection.executemany("""
+            INSERT INTO interface_ips (interface_id, ip_address, prefix_length, ip_version, ip_start, ip_end)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(interface_ids[row[0]],) + row[1:] for row in rows if row[0] in interface_ids])
+        self._commit()
 
     def insert_lldp_neighbors(self, device_id: int, run_id: int, lldp_data: Dict):
         """Insert LLDP neighbor data"""
-        cursor = self.connection.cursor()
-
-        for local_interface, neighbors in lldp_data.items():
-            for neighbor in neighbors:
-                cursor.execute("""
-                    INSERT INTO lldp_neighbors (
-                        device_id, collection_run_id, local_interface,
-                        remote_hostname, remote_port, remote_system_description,
-                        remote_chassis_id, remote_port_id
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    device_id, run_id, local_interface,
-                    neighbor.get('hostname'),
-                    neighbor.get('port'),
-                    neighbor.get('system_description'),
-                    neighbor.get('chassis_id'),
-                    neighbor.get('port_id')
-                ))
-
-        self.connection.commit()
+        self.insert_rows('lldp_neighbors', device_id, run_id, build_lldp_rows(lldp_data))
 
     def insert_arp_table(self, device_id: int, run_id: int, arp_data: List):
         """Insert ARP table data"""
-        cursor = self.connection.cursor()
-
-        for entry in arp_data:
-            # Validate and clean age value
-            age = entry.get('age')
-            if age is not None:
-                try:
-                    age = float(age)
-                    if age < 0:
-                        age = None  # Ignore negative ages
-                except (ValueError, TypeError):
-                    age = None
-
-            # Skip entries with invalid IP or MAC
-            ip_addr = entry.get('ip')
-            mac_addr = self._normalize_mac_address(entry.get('mac'))
-
-            if not ip_addr or not mac_addr:
-                continue
-
-            cursor.execute("""
-                INSERT INTO arp_entries (
-                    device_id, collection_run_id, interface_name,
-                    ip_address, mac_address, age, entry_type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                device_id, run_id,
-                entry.get('interface'),
-                ip_addr,
-                mac_addr,
-                age,
-                'dynamic'  # Default to dynamic if not specified
-            ))
-
-        self.connection.commit()
+        self.insert_rows('arp_entries', device_id, run_id, build_arp_rows(arp_data))
 
     def insert_mac_address_table(self, device_id: int, run_id: int, mac_data: List):
         """Insert MAC address table data"""
-        cursor = self.connection.cursor()
+        self.insert_rows('mac_address_table', device_id, run_id, build_mac_rows(mac_data))
 
-        for entry in mac_data:
-            # Validate and clean VLAN ID
-            vlan_id = entry.get('vlan')
-            if vlan_id is not None:
-                try:
-                    vlan_id = int(vlan_id)
-                    # Skip invalid VLAN IDs (must be 1-4094)
-                    if vlan_id < 1 or vlan_id > 4094:
-                        vlan_id = None
-                except (ValueError, TypeError):
-                    vlan_id = None
-
-            # Skip entries with invalid MAC addresses
-            mac_addr = self._normalize_mac_address(entry.get('mac'))
-            if not mac_addr:
-                continue
+    def insert_environment_data(self, device_id: int, run_id: int, env_data: Dict):
+        """Insert environment monitoring data"""
+        self.insert_rows('environment_data', device_id, run_id, build_environment_rows(env_data))
 
-            entry_type = 'static' if entry.get('static') else 'dynamic'
+    def insert_device_config(self, device_id: int, run_id: int, config_data: Dict, change_marker: str = None):
+        """Insert device configuration data"""
+        self.store_config_rows(device_id, run_id, build_config_rows(config_data), change_marker)
 
-            # Validate moves count
-            moves = entry.get('moves', 0)
-            try:
-                moves = int(moves)
-                if moves < 0:
-                    moves = 0
-            except (ValueError, TypeError):
-                moves = 0
+    def store_config_rows(self, device_id: int, run_id: int, config_rows: List[Tuple], change_marker: str = None):
+        """
+        Store pre-hashed configs from build_config_rows. A config whose hash matches the device's
+        latest config of the same type is not stored again; only that row's last_seen is updated,
+        so unchanged configs cost one UPDATE instead of a full copy. The row keeps the
+        collection_run_id of the run that first stored the content, so that run's history still
+        shows it. New content goes to the config_blobs store, compressed once per distinct hash,
+        and a change from the previous config is recorded in config_changes with its diff. The
+        new config replaces the previous one in the config_fts search index
+        """
+        cursor = self.connection.cursor()
+        now = datetime.now()
 
-            # Validate last_move timestamp
-            last_move = entry.get('last_move')
-            if last_move is not None:
-                try:
-                    last_move = float(last_move)
-                    if last_move < 0:
-                        last_move = None
-                except (ValueError, TypeError):
-                    last_move = None
+        for config_type, config_content, config_hash, size_bytes, line_count in config_rows:
+            latest = self._latest_config(device_id, config_type)
+            if latest and latest['config_hash'] == config_hash:
+                cursor.execute("""
+                    UPDATE device_configs
+                    SET last_seen = ?, change_marker = COALESCE(?, change_marker)
+                    WHERE id = ?
+                """, (now, change_marker if config_type == 'running' else None, latest['id']))
+                continue
 
+            store_config_blob(self.connection, config_hash, config_content)
             cursor.execute("""
-                INSERT INTO mac_address_table (
-                    device_id, collection_run_id, mac_address, interface_name,
-                    vlan_id, entry_type, is_active, moves, last_move
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO device_configs (
+                    device_id, collection_run_id, config_type,
+                    config_content, config_hash, size_bytes, line_count,
+                    last_seen, change_marker
+                ) VALUES (?, ?, ?, '', ?, ?, ?, ?, ?)
             """, (
-                device_id, run_id,
-                mac_addr,
-                entry.get('interface'),
-                vlan_id,
-                entry_type,
-                entry.get('active', True),
-                moves,
-                last_move
+                device_id, run_id, config_type,
+                config_hash, size_bytes, line_count,
+                now, change_marker if config_type == 'running' else None
             ))
 
-        self.connection.commit()
-
-    def insert_environment_data(self, device_id: int, run_id: int, env_data: Dict):
-        """Insert environment monitoring data"""
+            config_id = cursor.lastrowid
+            old_content = None
+            if latest:
+                old_content = load_config_text(self.connection, latest['config_hash'], latest['config_content'])
+                self.change_detector.record(self.connection, {
+                    'device_id': device_id,
+                    'old_config_id': latest['id'],
+                    'new_config_id': config_id,
+                    'detected_at': now
+                }, old_content or '', config_content)
+            if self.config_index:
+                replace_indexed_config(self.connection, latest['id'] if latest else None, old_content,
+                                       config_id, config_content)
+
+        self._commit()
+        if not self._defer_commits:
+            self.flush_config_changes()
+
+    def _latest_config(self, device_id: int, config_type: str) -> Optional[sqlite3.Row]:
+        """Most recent stored config of a type for a device"""
         cursor = self.connection.cursor()
-
-        cpu_usage = None
-        memory_used = None
-        memory_available = None
-        memory_total = None
-
-        # Extract CPU usage (take first CPU if multiple)
-        cpu_data = env_data.get('cpu', {})
-        if cpu_data:
-            cpu_usage = list(cpu_data.values())[0].get('%usage')
-
-        # Extract memory information
-        memory_data = env_data.get('memory', {})
-        if memory_data:
-            memory_used = memory_data.get('used_ram')
-            memory_available = memory_data.get('available_ram')
-            if memory_used and memory_available:
-                memory_total = memory_used + memory_available
-
         cursor.execute("""
-            INSERT INTO environment_data (
-                device_id, collection_run_id, cpu_usage, memory_used,
-                memory_available, memory_total, temperature_sensors, power_supplies, fans
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            device_id, run_id, cpu_usage, memory_used, memory_available, memory_total,
-            json.dumps(env_data.get('temperature', {})),
-            json.dumps(env_data.get('power', {})),
-            json.dumps(env_data.get('fans', {}))
-        ))
-
-        self.connection.commit()
-
-    def insert_device_config(self, device_id: int, run_id: int, config_data: Dict):
-        """Insert device configuration data"""
+            SELECT id, config_hash, config_content FROM device_configs
+            WHERE device_id = ? AND config_type = ?
+            ORDER BY id DESC LIMIT 1
+        """, (device_id, config_type))
+        return cursor.fetchone()
+
+    def touch_device_configs(self, device_id: int):
+        """Mark the device's latest configs as still current after a pre-check found no change"""
         cursor = self.connection.cursor()
-
-        for config_type, config_content in config_data.items():
-            if config_content:
-                # Calculate hash for change detection
-                config_hash = hashlib.sha256(config_content.encode()).hexdigest()
-                line_count = config_content.count('\n') + 1
-                size_bytes = len(config_content.encode())
-
-                cursor.execute("""
-                    INSERT INTO device_configs (
-                        device_id, collection_run_id, config_type,
-                        config_content, config_hash, size_bytes, line_count
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    device_id, run_id, config_type, config_content,
-                    config_hash, size_bytes, line_count
-                ))
-
-        self.connection.commit()
+        cursor.execute("""
+            UPDATE device_configs SET last_seen = ?
+            WHERE id IN (
+                SELECT MAX(id) FROM device_configs WHERE device_id = ? GROUP BY config_type
+            )
+        """, (datetime.now(), device_id))
+        self._commit()
 
     def insert_device_users(self, device_id: int, run_id: int, users_data: Dict):
         """Insert device user account data"""
-        cursor = self.connection.cursor()
-
-        for username, user_info in users_data.items():
-            cursor.execute("""
-                INSERT INTO device_users (
-                    device_id, collection_run_id, username,
-                    privilege_level, password_hash, ssh_keys, user_type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                device_id, run_id, username,
-                user_info.get('level'),
-                user_info.get('password'),
-                json.dumps(user_info.get('sshkeys', [])),
-                'local'  # Default to local if not specified
-            ))
-
-        self.connection.commit()
+        self.insert_rows('device_users', device_id, run_id, build_user_rows(users_data))
 
     def insert_vlans(self, device_id: int, run_id: int, vlan_data: Dict):
         """Insert VLAN data"""
-        cursor = self.connection.cursor()
-
-        for vlan_id, vlan_info in vlan_data.items():
-            # Extract numeric VLAN ID and validate
-            try:
-                vlan_num = int(vlan_id)
-                if vlan_num < 1 or vlan_num > 4094:
-                    logging.debug(f"Skipping invalid VLAN ID: {vlan_id}")
-                    continue  # Skip invalid VLAN IDs
-            except (ValueError, TypeError):
-                logging.debug(f"Skipping non-numeric VLAN ID: {vlan_id}")
-                continue
-
-            # Validate status
-            status = vlan_info.get('status', 'active')
-            if status not in ['active', 'suspended', 'shutdown']:
-                status = 'active'
-
-            cursor.execute("""
-                INSERT INTO vlans (
-                    device_id, collection_run_id, vlan_id, vlan_name, status,
-                    interfaces
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                device_id, run_id, vlan_num,
-                vlan_info.get('name'),
-                status,
-                json.dumps(vlan_info.get('interfaces', []))
-            ))
-
-        self.connection.commit()
+        self.insert_rows('vlans', device_id, run_id, build_vlan_rows(vlan_data))
 
     def insert_routes(self, device_id: int, run_id: int, route_data: List):
         """Insert routing table data"""
-        cursor = self.connection.cursor()
-
-        for route in route_data:
-            # Parse destination network and prefix
-            destination = route.get('destination', '')
-            if '/' in destination:
-                network, prefix = destination.split('/')
-                prefix_length = int(prefix)
-            else:
-                network = destination
-                prefix_length = 32 if '.' in destination else 128  # Default for IPv4/IPv6
-
-            cursor.execute("""
-                INSERT INTO routes (
-                    device_id, collection_run_id, destination_network,
-                    prefix_length, next_hop, interface_name, protocol,
-                    metric, administrative_distance, is_active
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                device_id, run_id, network, prefix_length,
-                route.get('next_hop'), route.get('outgoing_interface'),
-                route.get('protocol', 'unknown'), route.get('metric'),
-                route.get('preference'), True
-            ))
-
-        self.connection.commit()
+        self.insert_rows('routes', device_id, run_id, build_route_rows(route_data))
 
     def get_hardware_inventory(self, device_name: str = None) -> List[Dict]:
         """Get complete hardware inventory including optics"""
@@ -964,109 +1196,56 @@ class NapalmCMDB:
 
     def import_napalm_data(self, napalm_data: Dict):
         """Import complete NAPALM collection data"""
-        device_name = napalm_data.get('device_name', 'Unknown')
+        self.apply_prepared_device(prepare_device(napalm_data))
+
+    def import_prepared_device(self, prepared: Dict):
+        """Apply a prepare_device() result built by an import worker as a single transaction"""
+        with self.device_transaction():
+            self.apply_prepared_device(prepared)
+
+    def apply_prepared_device(self, prepared: Dict):
+        """Write a prepared device: identity, collection run, then each table's row batch"""
+        device_name = prepared.get('device_name', 'Unknown')
 
         try:
             # Insert/update device
-            device_id = self.insert_or_update_device(napalm_data)
+            device_id = self.insert_or_update_device(prepared)
             logging.info(f"Device {device_name} - ID: {device_id}")
 
             # Insert collection run
-            run_id = self.insert_collection_run(device_id, napalm_data)
+            run_id = self.insert_collection_run(device_id, prepared)
             logging.info(f"Collection run created - ID: {run_id}")
 
-            data = napalm_data['data']
             imported_data_types = []
+            for label, error in prepared['build_failures'].items():
+                logging.warning(f"Failed to import {label} for {device_name}: {error}")
 
             # Insert data based on what was collected
-            try:
-                if 'get_interfaces' in data:
-                    interfaces_ip = data.get('get_interfaces_ip', {})
-                    self.insert_interfaces(device_id, run_id, data['get_interfaces'], interfaces_ip)
-                    imported_data_types.append("interfaces")
-            except Exception as e:
-                logging.warning(f"Failed to import interfaces for {device_name}: {e}")
-
-            try:
-                if 'get_lldp_neighbors' in data:
-                    self.insert_lldp_neighbors(device_id, run_id, data['get_lldp_neighbors'])
-                    imported_data_types.append("lldp_neighbors")
-            except Exception as e:
-                logging.warning(f"Failed to import LLDP neighbors for {device_name}: {e}")
-
-            try:
-                if 'get_arp_table' in data:
-                    self.insert_arp_table(device_id, run_id, data['get_arp_table'])
-                    imported_data_types.append("arp_table")
-            except Exception as e:
-                logging.warning(f"Failed to import ARP table for {device_name}: {e}")
-
-            try:
-                if 'get_mac_address_table' in data:
-                    self.insert_mac_address_table(device_id, run_id, data['get_mac_address_table'])
-                    imported_data_types.append("mac_address_table")
-            except Exception as e:
-                logging.warning(f"Failed to import MAC address table for {device_name}: {e}")
+            for table, label, rows in prepared['tables']:
+                try:
+                    self.insert_rows(table, device_id, run_id, rows)
+                    imported_data_types.append(label)
+                except Exception as e:
+                    logging.warning(f"Failed to import {label} for {device_name}: {e}")
 
-            try:
-                if 'get_environment' in data:
-                    self.insert_environment_data(device_id, run_id, data['get_environment'])
-                    imported_data_types.append("environment")
-            except Exception as e:
-                logging.warning(f"Failed to import environment data for {device_name}: {e}")
+            if prepared['interface_ip_rows'] and 'interfaces' in imported_data_types:
+                try:
+                    self.insert_interface_ips(run_id, prepared['interface_ip_rows'])
+                    imported_data_types.append("interface_ips")
+                except Exception as e:
+                    logging.warning(f"Failed to import interface_ips for {device_name}: {e}")
 
             try:
-                if 'get_config' in data:
-                    self.insert_device_config(device_id, run_id, data['get_config'])
+                config_check = prepared['config_check']
+                if prepared['configs'] is not None:
+                    self.store_config_rows(device_id, run_id, prepared['configs'], config_check.get('marker'))
                     imported_data_types.append("config")
+                elif config_check.get('unchanged'):
+                    self.touch_device_configs(device_id)
+                    imported_data_types.append("config (unchanged)")
             except Exception as e:
                 logging.warning(f"Failed to import configuration for {device_name}: {e}")
 
-            try:
-                if 'get_users' in data:
-                    self.insert_device_users(device_id, run_id, data['get_users'])
-                    imported_data_types.append("users")
-            except Exception as e:
-                logging.warning(f"Failed to import users for {device_name}: {e}")
-
-            try:
-                if 'get_vlans' in data:
-                    self.insert_vlans(device_id, run_id, data['get_vlans'])
-                    imported_data_types.append("vlans")
-            except Exception as e:
-                logging.warning(f"Failed to import VLANs for {device_name}: {e}")
-
-            try:
-                if 'get_route_to' in data:
-                    self.insert_routes(device_id, run_id, data['get_route_to'])
-                    imported_data_types.append("routes")
-            except Exception as e:
-                logging.warning(f"Failed to import routes for {device_name}: {e}")
-
-            # NEW: Hardware inventory including optics
-            try:
-                # Collect hardware data from multiple sources
-                hardware_data = {}
-
-                # Add optics data
-                if 'get_optics' in data:
-                    hardware_data['optics'] = data['get_optics']
-
-                # Add environment hardware data
-                if 'get_environment' in data:
-                    env_data = data['get_environment']
-                    if 'power' in env_data:
-                        hardware_data['power_supplies'] = env_data['power']
-                    if 'fans' in env_data:
-                        hardware_data['fans'] = env_data['fans']
-
-                # Import hardware inventory if we have any data
-                if hardware_data:
-                    self.insert_hardware_inventory(device_id, run_id, hardware_data)
-                    imported_data_types.append("hardware_inventory")
-            except Exception as e:
-                logging.warning(f"Failed to import hardware inventory for {device_name}: {e}")
-
             if imported_data_types:
                 logging.info(f"Successfully imported {device_name}: {', '.join(imported_data_types)}")
             else:
@@ -1074,93 +1253,13 @@ class NapalmCMDB:
 
         except Exception as e:
             logging.error(f"Error importing data for {device_name}: {str(e)}")
-            self.connection.rollback()
+            self._rollback()
             raise
 
     def insert_hardware_inventory(self, device_id: int, run_id: int, hardware_data: Dict):
         """Insert hardware inventory data including optics"""
-        cursor = self.connection.cursor()
+        self.insert_rows('hardware_inventory', device_id, run_id, build_hardware_rows(hardware_data))
 
-        # Process optical transceivers from get_optics data
-        if 'optics' in hardware_data:
-            for interface_name, optics_info in hardware_data['optics'].items():
-                # Extract optical metrics from the nested structure
-                physical_channels = optics_info.get('physical_channels', {})
-                channels = physical_channels.get('channel', [])
-
-                if channels:
-                    channel_data = channels[0]  # Most interfaces have single channel
-                    state = channel_data.get('state', {})
-
-                    # Extract power and current measurements
-                    input_power = state.get('input_power', {})
-                    output_power = state.get('output_power', {})
-                    laser_bias = state.get('laser_bias_current', {})
-
-                    # Create comprehensive optics data
-                    optics_metrics = {
-                        'input_power_dbm': input_power.get('instant'),
-                        'output_power_dbm': output_power.get('instant'),
-                        'laser_bias_current_ma': laser_bias.get('instant'),
-                        'interface_name': interface_name
-                    }
-
-                    # Determine transceiver status based on power levels
-                    status = 'operational'
-                    if input_power.get('instant', 0) < -30:  # Very low input power
-                        status = 'failed'
-                    elif input_power.get('instant', 0) < -20:  # Low input power
-                        status = 'unknown'
-
-                    # Insert as transceiver component
-                    cursor.execute("""
-                        INSERT INTO hardware_inventory (
-                            device_id, collection_run_id, component_type, slot_position,
-                            description, status, additional_data
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        device_id, run_id, 'transceiver', interface_name,
-                        f"Optical transceiver for {interface_name}",
-                        status,
-                        json.dumps(optics_metrics)
-                    ))
-
-        # Process power supplies from environment data
-        if 'power_supplies' in hardware_data:
-            for psu_name, psu_info in hardware_data['power_supplies'].items():
-                cursor.execute("""
-                    INSERT INTO hardware_inventory (
-                        device_id, collection_run_id, component_type, slot_position,
-                        part_number, serial_number, description, status,
-                        vendor, model, additional_data
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    device_id, run_id, 'psu', psu_name,
-                    psu_info.get('part_number'),
-                    psu_info.get('serial_number'),
-                    psu_info.get('description'),
-                    'operational' if psu_info.get('status') == 'ok' else 'failed',
-                    psu_info.get('vendor'),
-                    psu_info.get('model'),
-                    json.dumps(psu_info)
-                ))
-
-        # Process fans from environment data
-        if 'fans' in hardware_data:
-            for fan_name, fan_info in hardware_data['fans'].items():
-                cursor.execute("""
-                    INSERT INTO hardware_inventory (
-                        device_id, collection_run_id, component_type, slot_position,
-                        description, status, additional_data
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    device_id, run_id, 'fan', fan_name,
-                    fan_info.get('description'),
-                    'operational' if fan_info.get('status') == 'ok' else 'failed',
-                    json.dumps(fan_info)
-                ))
-
-        self.connection.commit()
     def get_device_summary(self) -> List[Dict]:
         """Get summary of all devices"""
         cursor = self.connection.cursor()
@@ -1225,7 +1324,7 @@ class NapalmCMDB:
     def search_mac_address(self, mac_address: str) -> List[Dict]:
         """Search for MAC address across all devices"""
         # Normalize the search MAC address
-        normalized_mac = self._normalize_mac_address(mac_address)
+        normalized_mac = normalize_mac_address(mac_address)
         if not normalized_mac:
             return []
 
@@ -1303,7 +1402,10 @@ class NapalmCMDB:
 
         if config_type:
             cursor.execute("""
-                SELECT dc.*, cr.collection_time
+                SELECT dc.id, dc.device_id, dc.collection_run_id, dc.config_type,
+                       config_text(dc.config_hash, dc.config_content) AS config_content, dc.config_hash,
+                       dc.size_bytes, dc.line_count, dc.created_at, dc.last_seen, dc.change_marker,
+                       cr.collection_time
                 FROM device_configs dc
                 JOIN devices d ON dc.device_id = d.id
                 JOIN collection_runs cr ON dc.collection_run_id = cr.id
@@ -1312,7 +1414,10 @@ class NapalmCMDB:
             """, (device_name, config_type))
         else:
             cursor.execute("""
-                SELECT dc.*, cr.collection_time
+                SELECT dc.id, dc.device_id, dc.collection_run_id, dc.config_type,
+                       config_text(dc.config_hash, dc.config_content) AS config_content, dc.config_hash,
+                       dc.size_bytes, dc.line_count, dc.created_at, dc.last_seen, dc.change_marker,
+                       cr.collection_time
                 FROM device_configs dc
                 JOIN devices d ON dc.device_id = d.id
                 JOIN collection_runs cr ON dc.collection_run_id = cr.id
@@ -1356,25 +1461,224 @@ class NapalmCMDB:
         return [dict(row) for row in cursor.fetchall()]
 
 
-def import_napalm_files(db_path: str, files_directory: str, schema_path: str = "cmdb.sql"):
-    """Import all NAPALM JSON files from a directory"""
-    cmdb = NapalmCMDB(db_path, schema_path)
-    files_path = Path(files_directory)
+def prepare_device(napalm_data: Dict) -> Dict:
+    """
+    Parse side of an import: everything that needs no database - device identity, IP rows,
+    validated row batches per table and config hashes. Runs in import worker processes, so
+    the result holds only plain data and the single writer only has to apply it
+    """
+    data = napalm_data.get('data', {})
+    facts = data.get('get_facts', {})
+    device_name = napalm_data['device_name']
+    collection_ip = napalm_data['device_ip']
+
+    vendor = facts.get('vendor', 'Unknown')
+    serial_number = facts.get('serial_number', 'Unknown')
+    model = facts.get('model', 'Unknown')
+
+    interface_ips = []
+    for interface_name, ip_data in data.get('get_interfaces_ip', {}).items():
+        for protocol, addresses in ip_data.items():
+            for ip_addr, details in addresses.items():
+                if ip_addr != collection_ip:  # Don't duplicate the management IP
+                    interface_ips.append((ip_addr, interface_name, str(details.get('prefix_length', ''))))
+
+    prepared = {
+        'device_name': device_name,
+        'device_ip': collection_ip,
+        'collection_time': napalm_data['collection_time'],
+        'success': napalm_data['success'],
+        'credential_used': napalm_data.get('credential_used'),
+        'errors': napalm_data.get('errors', []),
+        'napalm_driver': napalm_data.get('napalm_driver'),
+        'collector_version': napalm_data.get('collector_version', '1.0'),
+        'config_check': napalm_data.get('config_check') or {},
+        'methods': list(data.keys()),
+        'has_facts': bool(facts),
+        'device': {
+            'device_key': NapalmCMDB.generate_device_key(vendor, serial_number, model),
+            'hostname': facts.get('hostname'),
+            'fqdn': facts.get('fqdn'),
+            'vendor': vendor,
+            'model': model,
+            'serial_number': serial_number,
+            'os_version': facts.get('os_version'),
+            'uptime': facts.get('uptime'),
+            'site_code': NapalmCMDB.extract_site_code(device_name),
+            'device_role': NapalmCMDB.determine_device_role(device_name, data.get('get_interfaces', {})),
+        },
+        'interface_ips': interface_ips,
+        'interface_ip_rows': [],
+        'tables': [],
+        'configs': None,
+        'build_failures': {}
+    }
+
+    for getter, table, builder, label in ROW_BUILDERS:
+        if getter in data:
+            try:
+                prepared['tables'].append((table, label, builder(data[getter])))
+            except Exception as e:
+                prepared['build_failures'][label] = str(e)
 
-    json_files = list(files_path.glob("**/*_complete.json"))
+    if 'get_interfaces_ip' in data:
+        try:
+            prepared['interface_ip_rows'] = build_interface_ip_rows(data['get_interfaces_ip'])
+        except Exception as e:
+            prepared['build_failures']['interface_ips'] = str(e)
 
-    logging.info(f"Found {len(json_files)} NAPALM collection files")
+    if 'get_config' in data:
+        try:
+            prepared['configs'] = build_config_rows(data['get_config'])
+        except Exception as e:
+            prepared['build_failures']['config'] = str(e)
+
+    # Hardware inventory including optics, gathered from several getters
+    hardware_data = {}
+    if 'get_optics' in data:
+        hardware_data['optics'] = data['get_optics']
+    env_data = data.get('get_environment', {})
+    if 'power' in env_data:
+        hardware_data['power_supplies'] = env_data['power']
+    if 'fans' in env_data:
+        hardware_data['fans'] = env_data['fans']
+    if hardware_data:
+        try:
+            prepared['tables'].append(('hardware_inventory', 'hardware_inventory', build_hardware_rows(hardware_data)))
+        except Exception as e:
+            prepared['build_failures']['hardware_inventory'] = str(e)
+
+    return prepared
 
-    for json_file in json_files:
+
+def _prepare_sources(sources: List[Tuple[str, Any, str]]) -> List[Tuple[str, Optional[Dict], Optional[str]]]:
+    """
+    Import worker: load and prepare a batch of capture records. Each source is
+    ('file', path, label), ('record', (archive, offset, length), label) or ('line', ndjson, label);
+    returns (label, prepared, error) per source, prepared None for unsuccessful archive records
+    """
+    from capture_archive import read_record
+
+    results = []
+    for kind, payload, label in sources:
         try:
-            with open(json_file, 'r') as f:
-                napalm_data = json.load(f)
+            if kind == 'file':
+                with open(payload, 'r') as f:
+                    napalm_data = json.load(f)
+            elif kind == 'record':
+                napalm_data = read_record(*payload)
+            else:
+                napalm_data = json.loads(payload)
+                label = f"{napalm_data.get('device_name')} from {label}"
+                if not napalm_data.get('success'):
+                    results.append((label, None, None))
+                    continue
+            results.append((label, prepare_device(napalm_data), None))
+        except Exception as e:
+            results.append((label, None, str(e)))
+    return results
+
+
+def _prepared_in_order(batches, workers: int, window: int):
+    """Prepare source batches on a process pool, yielding results in submission order with a bounded backlog"""
+    if workers <= 1:
+        for batch in batches:
+            yield from _prepare_sources(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(_prepare_sources, batch))
+            # Keep the parsers only a few batches ahead of the writer so memory stays flat
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def import_napalm_files(db_path: str, files_directory: str, schema_path: str = "cmdb.sql",
+                        all_archives: bool = False, workers: int = None, batch_size: int = 16) -> Dict:
+    """
+    Import NAPALM collection results from a capture archive, or from a directory holding
+    archives and/or legacy *_complete.json files. For a directory only the newest archive is
+    imported unless all_archives is set, since every run leaves its own archive behind.
+
+    Parsing and normalisation run on a pool of worker processes (workers, default one per
+    CPU; 1 keeps everything in this process) while this process is the single writer,
+    applying each device's pre-built rows in one transaction. Devices are written in capture
+    order, so a device seen in several archives ends with its newest data
+    """
+    from capture_archive import ARCHIVE_SUFFIX, find_archives, iter_archive_lines, load_index
 
-            cmdb.import_napalm_data(napalm_data)
-            logging.info(f"Imported: {json_file.name}")
+    cmdb = NapalmCMDB(db_path, schema_path)
+    files_path = Path(files_directory)
+    workers = workers or os.cpu_count() or 1
 
+    if files_path.is_file():
+        json_files = []
+        archives = [files_path] if files_path.name.endswith(ARCHIVE_SUFFIX) else []
+        if not archives:
+            json_files = [files_path]
+    else:
+        json_files = sorted(files_path.glob("**/*_complete.json"))
+        archives = find_archives(files_path)
+        if archives and not all_archives:
+            archives = archives[-1:]
+
+    logging.info(f"Found {len(json_files)} NAPALM collection files and {len(archives)} capture archives to import "
+                 f"({workers} parser processes)")
+
+    def sources():
+        for json_file in json_files:
+            yield 'file', str(json_file), json_file.name
+        for archive in archives:
+            index = load_index(archive)
+            if index is not None:
+                # Workers seek straight to their records, so decompression is spread across the pool too
+                for entry in index['records']:
+                    if entry.get('success'):
+                        yield ('record', (str(archive), entry['offset'], entry['length']),
+                               f"{entry['device_name']} from {archive.name}")
+            else:
+                for line in iter_archive_lines(archive):
+                    yield 'line', line, archive.name
+
+    def batches():
+        batch = []
+        for source in sources():
+            batch.append(source)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    counters = {'imported': 0, 'failed': 0, 'skipped': 0, 'write_seconds': 0.0}
+    started = time.time()
+    for label, prepared, error in _prepared_in_order(batches(), workers, window=workers * 4):
+        if error:
+            counters['failed'] += 1
+            logging.error(f"Failed to import {label}: {error}")
+            continue
+        if prepared is None:
+            counters['skipped'] += 1
+            continue
+        write_started = time.time()
+        try:
+            cmdb.import_prepared_device(prepared)
+            counters['imported'] += 1
+            logging.info(f"Imported: {label}")
         except Exception as e:
-            logging.error(f"Failed to import {json_file}: {str(e)}")
+            counters['failed'] += 1
+            logging.error(f"Failed to import {label}: {str(e)}")
+        counters['write_seconds'] += time.time() - write_started
+
+    elapsed = time.time() - started
+    counters['seconds'] = round(elapsed, 2)
+    counters['write_seconds'] = round(counters['write_seconds'], 2)
+    logging.info(f"Imported {counters['imported']} devices ({counters['failed']} failed) in {elapsed:.1f}s - "
+                 f"{counters['imported'] / elapsed if elapsed else 0:.0f} devices/s, writer busy {counters['write_seconds']:.1f}s")
 
     # Check for any duplicates after import
     duplicates = cmdb.check_duplicate_device_names()
@@ -1385,13 +1689,17 @@ def import_napalm_files(db_path: str, files_directory: str, schema_path: str = "
 
     cmdb.close()
     logging.info("Import complete")
+    return counters
 
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description='NAPALM CMDB Database Manager')
-    parser.add_argument('--import-dir', help='Directory containing NAPALM JSON files')
+    parser.add_argument('--import-dir', help='Capture archive, or directory containing archives or NAPALM JSON files')
+    parser.add_argument('--all-archives', action='store_true',
+                        help='Import every capture archive in --import-dir, oldest first, not just the newest')
+    parser.add_argument('--workers', type=int, help='Parser processes for --import-dir (default: one per CPU)')
     parser.add_argument('--db-path', default='napalm_cmdb.db', help='SQLite database path')
     parser.add_argument('--schema-path', default='cmdb.sql', help='SQL schema file path')
     parser.add_argument('--summary', action='store_true', help='Show device summary')
@@ -1409,7 +1717,7 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
     if args.import_dir:
-        import_napalm_files(args.db_path, args.import_dir, args.schema_path)
+        import_napalm_files(args.db_path, args.import_dir, args.schema_path, args.all_archives, args.workers)
     elif args.summary:
         cmdb = NapalmCMDB(args.db_path, args.schema_path)
         devices = cmdb.get_device_summary()
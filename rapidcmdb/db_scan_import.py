@@ -20,6 +20,8 @@ import re
 from pathlib import Path
 import time
 
+from ip_ranges import address_range, ensure_range_columns
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -116,6 +118,9 @@ class ScanImporter:
                 logger.error(f"Database schema not found. Please create using cmdb.sql first.")
                 sys.exit(1)
 
+            # Databases created before the IP range columns get them before any device_ips insert
+            ensure_range_columns(conn)
+            conn.commit()
             conn.close()
             logger.info(f"Database connection verified: {self.db_path}")
 
@@ -630,8 +635,9 @@ class ScanImporter:
                     if ip and ip.strip():  # Skip empty IPs
                         cursor.execute("""
                             INSERT INTO device_ips (
-                                device_id, ip_address, ip_type, is_primary, created_at, updated_at
-                            ) VALUES (?, ?, ?, ?, ?, ?)
+                                device_id, ip_address, ip_type, is_primary, created_at, updated_at,
+                                ip_start, ip_end
+                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                         """, (
                             device_id,
                             ip,
@@ -639,7 +645,7 @@ class ScanImporter:
                             1 if i == 0 else 0,  # First IP is primary
                             now,
                             now
-                        ))
+                        ) + address_range(ip))
 
                 # Commit the transaction
                 cursor.execute("COMMIT")
@@ -753,8 +759,9 @@ class ScanImporter:
                     if ip:
                         cursor.execute("""
                             INSERT INTO device_ips (
-                                device_id, ip_address, ip_type, is_primary, created_at, updated_at
-                            ) VALUES (?, ?, ?, ?, ?, ?)
+                                device_id, ip_address, ip_type, is_primary, created_at, updated_at,
+                                ip_start, ip_end
+                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                         """, (
                             existing_id,
                             ip,
@@ -762,7 +769,7 @@ class ScanImporter:
                             1 if i == 0 else 0,
                             now,
                             now
-                        ))
+                        ) + address_range(ip))
 
                 # Commit the transaction
                 cursor.execute("COMMIT")
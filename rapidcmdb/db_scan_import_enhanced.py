@@ -21,6 +21,8 @@ from pathlib import Path
 import time
 import yaml
 
+from ip_ranges import address_range, ensure_range_columns
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -475,6 +477,9 @@ class ScanImporter:
                 logger.error(f"Database schema not found. Please create using cmdb.sql first.")
                 sys.exit(1)
 
+            # Databases created before the IP range columns get them before any device_ips insert
+            ensure_range_columns(conn)
+            conn.commit()
             conn.close()
             logger.info(f"Database connection verified: {self.db_path}")
 
@@ -493,6 +498,15 @@ class ScanImporter:
         conn.execute("PRAGMA busy_timeout=30000")
         return conn
 
+    def _get_read_connection(self) -> Optional[sqlite3.Connection]:
+        """Read-only connection for dry runs, or None when there is no device table to read yet"""
+        try:
+            conn = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True)
+            conn.execute("SELECT 1 FROM devices LIMIT 1")
+            return conn
+        except sqlite3.Error:
+            return None
+
     def normalize_scan_data(self, scan_data: Dict) -> Dict:
         """Normalize different scan data formats to expected format"""
 
@@ -1003,138 +1017,31 @@ class ScanImporter:
         # Fallback: Unknown site
         return 'UNK'
     def import_device(self, device: ImportedDevice) -> bool:
-        """Import single device into database with immediate commit"""
-        try:
-            # Check if device already exists
-            exists, existing_id = self.device_exists(device)
-
-            if exists:
-                logger.info(f"Device already exists: {device.device_name} (ID: {existing_id})")
-                self.stats['duplicates_found'] += 1
-                return self.update_device(device, existing_id)
-
-            if self.dry_run:
-                logger.info(f"[DRY RUN] Would import device: {device.device_name} ({device.vendor} {device.model})")
-                self.stats['devices_imported'] += 1
-                return True
-
-            # Validate required fields
-            if not device.serial_number or not device.serial_number.strip():
-                logger.error(f"Cannot import device {device.device_name}: empty serial number")
-                self.stats['errors'] += 1
-                return False
-
-            if not device.vendor or not device.vendor.strip():
-                logger.error(f"Cannot import device {device.device_name}: empty vendor")
-                self.stats['errors'] += 1
-                return False
-
-            if not device.device_name or not device.device_name.strip():
-                logger.error(f"Cannot import device: empty device name")
-                self.stats['errors'] += 1
-                return False
-
-            # Database transaction
-            conn = None
-            try:
-                conn = self._get_db_connection()
-                cursor = conn.cursor()
-
-                cursor.execute("BEGIN IMMEDIATE")
-
-                insert_query = """
-                    INSERT INTO devices (
-                        device_key, device_name, hostname, fqdn, vendor, model, 
-                        serial_number, os_version, site_code, device_role, notes,
-                        first_discovered, last_updated, is_active
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """
-
-                now = datetime.now().isoformat()
-
-                cursor.execute(insert_query, (
-                    device.device_key,
-                    device.device_name,
-                    device.hostname,
-                    device.fqdn,
-                    device.vendor,
-                    device.model,
-                    device.serial_number,
-                    device.os_version,
-                    device.site_code,
-                    device.device_role,
-                    device.notes,
-                    now,
-                    now,
-                    1
-                ))
-
-                device_id = cursor.lastrowid
-
-                # Insert IP addresses
-                for i, ip in enumerate(device.all_ips):
-                    if ip and ip.strip():
-                        cursor.execute("""
-                            INSERT INTO device_ips (
-                                device_id, ip_address, ip_type, is_primary, created_at, updated_at
-                            ) VALUES (?, ?, ?, ?, ?, ?)
-                        """, (
-                            device_id,
-                            ip,
-                            'management' if i == 0 else 'secondary',
-                            1 if i == 0 else 0,
-                            now,
-                            now
-                        ))
-
-                cursor.execute("COMMIT")
-
-                logger.info(f"Successfully imported device: {device.device_name} (ID: {device_id})")
-                self.stats['devices_imported'] += 1
-                return True
-
-            except sqlite3.DatabaseError as e:
-                if conn:
-                    try:
-                        conn.execute("ROLLBACK")
-                    except:
-                        pass
-                raise e
-
-            finally:
-                if conn:
-                    conn.close()
+        """Import or update a single device in its own transaction"""
+        if self.dry_run:
+            return self.upsert_devices(None, [device]) == 1
 
+        conn = None
+        try:
+            conn = self._get_db_connection()
+            return self.upsert_devices(conn, [device]) == 1
         except Exception as e:
             logger.error(f"Error importing device {device.device_name}: {e}")
             self.stats['errors'] += 1
             return False
+        finally:
+            if conn:
+                conn.close()
 
     def device_exists(self, device: ImportedDevice) -> Tuple[bool, Optional[int]]:
         """Check if device already exists in database"""
-        if self.dry_run:
-            return False, None
-
         conn = None
         try:
-            conn = self._get_db_connection()
-            cursor = conn.cursor()
-
-            # Check by device key first
-            cursor.execute("SELECT id FROM devices WHERE device_key = ?", (device.device_key,))
-            result = cursor.fetchone()
-
-            if result:
-                return True, result[0]
-
-            # Check by serial number and vendor
-            cursor.execute("""
-                SELECT id FROM devices 
-                WHERE serial_number = ? AND vendor = ?
-            """, (device.serial_number, device.vendor))
-            result = cursor.fetchone()
-
-            return bool(result), result[0] if result else None
+            conn = self._get_read_connection() if self.dry_run else self._get_db_connection()
+            if conn is None:
+                return False, None
+            device_id = self._find_device_id(conn.cursor(), device)
+            return device_id is not None, device_id
 
         except Exception as e:
             logger.error(f"Error checking if device exists: {e}")
@@ -1143,85 +1050,148 @@ class ScanImporter:
             if conn:
                 conn.close()
 
-    def update_device(self, device: ImportedDevice, existing_id: int) -> bool:
-        """Update existing device with new information"""
+    @staticmethod
+    def _find_device_id(cursor: sqlite3.Cursor, device: ImportedDevice) -> Optional[int]:
+        """Existing row for a device: by device key first, then by serial number and vendor"""
+        cursor.execute("SELECT id FROM devices WHERE device_key = ?", (device.device_key,))
+        row = cursor.fetchone()
+        if not row:
+            cursor.execute("SELECT id FROM devices WHERE serial_number = ? AND vendor = ?",
+                           (device.serial_number, device.vendor))
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _validation_error(device: ImportedDevice) -> Optional[str]:
+        if not device.serial_number or not device.serial_number.strip():
+            return f"Cannot import device {device.device_name}: empty serial number"
+        if not device.vendor or not device.vendor.strip():
+            return f"Cannot import device {device.device_name}: empty vendor"
+        if not device.device_name or not device.device_name.strip():
+            return "Cannot import device: empty device name"
+        return None
+
+    def _write_device(self, cursor: sqlite3.Cursor, device: ImportedDevice, now: str) -> Tuple[int, bool]:
+        """Insert or update one device and replace its IP addresses; returns (device_id, updated)"""
+        device_id = self._find_device_id(cursor, device)
+        updated = device_id is not None
+        if updated:
+            cursor.execute("""
+                UPDATE devices SET
+                    device_name = ?, hostname = ?, fqdn = ?, os_version = ?,
+                    device_role = ?, vendor = ?, model = ?, notes = ?,
+                    last_updated = ?
+                WHERE id = ?
+            """, (device.device_name, device.hostname, device.fqdn, device.os_version,
+                  device.device_role, device.vendor, device.model, device.notes,
+                  now, device_id))
+            cursor.execute("DELETE FROM device_ips WHERE device_id = ?", (device_id,))
+        else:
+            cursor.execute("""
+                INSERT INTO devices (
+                    device_key, device_name, hostname, fqdn, vendor, model,
+                    serial_number, os_version, site_code, device_role, notes,
+                    first_discovered, last_updated, is_active
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (device.device_key, device.device_name, device.hostname, device.fqdn,
+                  device.vendor, device.model, device.serial_number, device.os_version,
+                  device.site_code, device.device_role, device.notes, now, now, 1))
+            device_id = cursor.lastrowid
+
+        cursor.executemany("""
+            INSERT INTO device_ips (
+                device_id, ip_address, ip_type, is_primary, created_at, updated_at, ip_start, ip_end
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(device_id, ip, 'management' if i == 0 else 'secondary', 1 if i == 0 else 0, now, now)
+              + address_range(ip)
+              for i, ip in enumerate(device.all_ips) if ip and ip.strip()])
+        return device_id, updated
+
+    def upsert_devices(self, conn: Optional[sqlite3.Connection], devices: List[ImportedDevice]) -> int:
+        """
+        Insert or update a batch of devices in one transaction on a caller-owned connection
+        Each device runs under its own savepoint, so one constraint violation doesn't
+        lose the rest of the batch. Returns the number of devices written.
+        """
+        if not devices:
+            return 0
+
+        if self.dry_run:
+            return self._preview_devices(devices)
+
+        inserted = updated = 0
+        now = datetime.now().isoformat()
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
         try:
-            if self.dry_run:
-                logger.info(f"[DRY RUN] Would update device: {device.device_name} (ID: {existing_id})")
-                self.stats['devices_updated'] += 1
-                return True
+            for device in devices:
+                error = self._validation_error(device)
+                if error:
+                    logger.error(error)
+                    self.stats['errors'] += 1
+                    continue
+
+                cursor.execute("SAVEPOINT device_upsert")
+                try:
+                    device_id, was_update = self._write_device(cursor, device, now)
+                    cursor.execute("RELEASE SAVEPOINT device_upsert")
+                except sqlite3.DatabaseError as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT device_upsert")
+                    cursor.execute("RELEASE SAVEPOINT device_upsert")
+                    logger.error(f"Error upserting device {device.device_name}: {e}")
+                    self.stats['errors'] += 1
+                    continue
+
+                if was_update:
+                    updated += 1
+                    logger.info(f"Successfully updated device: {device.device_name} (ID: {device_id}) - "
+                                f"Role: {device.device_role}")
+                else:
+                    inserted += 1
+                    logger.info(f"Successfully imported device: {device.device_name} (ID: {device_id})")
 
-            conn = None
+            cursor.execute("COMMIT")
+        except Exception:
             try:
-                conn = self._get_db_connection()
-                cursor = conn.cursor()
-
-                cursor.execute("BEGIN IMMEDIATE")
-
-                update_query = """
-                    UPDATE devices SET
-                        device_name = ?, hostname = ?, fqdn = ?, os_version = ?,
-                        device_role = ?, vendor = ?, model = ?, notes = ?,
-                        last_updated = ?
-                    WHERE id = ?
-                """
-
-                now = datetime.now().isoformat()
-
-                cursor.execute(update_query, (
-                    device.device_name,
-                    device.hostname,
-                    device.fqdn,
-                    device.os_version,
-                    device.device_role,  # Add device_role update
-                    device.vendor,  # Add vendor update
-                    device.model,  # Add model update
-                    device.notes,
-                    now,
-                    existing_id
-                ))
-
-                # Update IP addresses
-                cursor.execute("DELETE FROM device_ips WHERE device_id = ?", (existing_id,))
-
-                for i, ip in enumerate(device.all_ips):
-                    if ip:
-                        cursor.execute("""
-                            INSERT INTO device_ips (
-                                device_id, ip_address, ip_type, is_primary, created_at, updated_at
-                            ) VALUES (?, ?, ?, ?, ?, ?)
-                        """, (
-                            existing_id,
-                            ip,
-                            'management' if i == 0 else 'secondary',
-                            1 if i == 0 else 0,
-                            now,
-                            now
-                        ))
-
-                cursor.execute("COMMIT")
-
-                logger.info(
-                    f"Successfully updated device: {device.device_name} (ID: {existing_id}) - Role: {device.device_role}")
-                self.stats['devices_updated'] += 1
-                return True
-
-            except sqlite3.DatabaseError as e:
-                if conn:
-                    try:
-                        conn.execute("ROLLBACK")
-                    except:
-                        pass
-                raise e
-
-            finally:
-                if conn:
-                    conn.close()
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            raise
+
+        # Counted only once the batch is durable
+        self.stats['devices_imported'] += inserted
+        self.stats['devices_updated'] += updated
+        self.stats['duplicates_found'] += updated
+        return inserted + updated
+
+    def _preview_devices(self, devices: List[ImportedDevice]) -> int:
+        """Dry run of upsert_devices: counts what it would insert and update without writing"""
+        inserted = updated = 0
+        conn = self._get_read_connection()
+        try:
+            for device in devices:
+                error = self._validation_error(device)
+                if error:
+                    logger.error(error)
+                    self.stats['errors'] += 1
+                    continue
 
-        except Exception as e:
-            logger.error(f"Error updating device {device.device_name}: {e}")
-            self.stats['errors'] += 1
-            return False
+                device_id = self._find_device_id(conn.cursor(), device) if conn else None
+                if device_id is not None:
+                    updated += 1
+                    logger.info(f"[DRY RUN] Would update device: {device.device_name} (ID: {device_id})")
+                else:
+                    inserted += 1
+                    logger.info(f"[DRY RUN] Would import device: {device.device_name} "
+                                f"({device.vendor} {device.model})")
+        finally:
+            if conn:
+                conn.close()
+
+        self.stats['devices_imported'] += inserted
+        self.stats['devices_updated'] += updated
+        self.stats['duplicates_found'] += updated
+        return inserted + updated
 
     def import_scan_file(self, scan_file: str, filters: Dict = None) -> bool:
         """Import devices from a single scan file"""
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Interval Storage for ARP and MAC Tables
+arp_entries and mac_address_table keep one row per observed tuple - (ip, mac, interface)
+for ARP, (mac, vlan, interface) for MAC - for as long as collection keeps seeing it. A run
+that sees the tuple again extends its row (last_seen, run_count, collection_run_id) instead
+of copying it; a new row is written only when a tuple appears. Tuples missing from a run
+that collected the table get is_current = 0, closing their interval, and a tuple that comes
+back later starts a new row. Current state is the indexed predicate is_current = 1
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+# Identity of an entry within a device; the table's other columns are refreshed in place
+INTERVAL_KEYS = {
+    'arp_entries': ('ip_address', 'mac_address', 'interface_name'),
+    'mac_address_table': ('mac_address', 'vlan_id', 'interface_name'),
+}
+
+# Columns that change on every poll without the entry changing (ARP age counts up); they keep
+# the value seen when the interval opened rather than costing a row rewrite per run
+VOLATILE_COLUMNS = ('age',)
+
+INTERVAL_COLUMNS = (
+    ('first_seen', 'DATETIME'),
+    ('last_seen', 'DATETIME'),
+    ('run_count', 'INTEGER NOT NULL DEFAULT 1'),
+    ('is_current', 'BOOLEAN NOT NULL DEFAULT 1'),
+)
+
+INTERVAL_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_arp_current_device "
+    "ON arp_entries(device_id, ip_address, mac_address, interface_name) WHERE is_current = 1",
+    "CREATE INDEX IF NOT EXISTS idx_arp_current_ip ON arp_entries(ip_address) WHERE is_current = 1",
+    "CREATE INDEX IF NOT EXISTS idx_arp_current_mac ON arp_entries(mac_address) WHERE is_current = 1",
+    "CREATE INDEX IF NOT EXISTS idx_mac_current_device "
+    "ON mac_address_table(device_id, mac_address, vlan_id, interface_name) WHERE is_current = 1",
+    "CREATE INDEX IF NOT EXISTS idx_mac_current_mac ON mac_address_table(mac_address) WHERE is_current = 1",
+)
+
+
+def ensure_interval_columns(conn: sqlite3.Connection):
+    """
+    Add the interval columns to a database created before them. Existing rows become
+    one-run intervals, current when they belong to the latest run that collected the table
+    """
+    for table in INTERVAL_KEYS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if not columns:
+            continue
+        added = [column for column, _ in INTERVAL_COLUMNS if column not in columns]
+        for column, definition in INTERVAL_COLUMNS:
+            if column in added:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        if added:
+            conn.execute(f"UPDATE {table} SET first_seen = created_at, last_seen = created_at")
+            conn.execute(f"""
+                UPDATE {table} SET is_current = 0
+                WHERE collection_run_id != (
+                    SELECT MAX(t2.collection_run_id) FROM {table} t2 WHERE t2.device_id = {table}.device_id
+                )
+            """)
+            logging.info(f"Added interval columns to {table}")
+    for statement in INTERVAL_INDEXES:
+        conn.execute(statement)
+
+
+def store_interval_rows(conn: sqlite3.Connection, table: str, columns: Tuple[str, ...], device_id: int,
+                        run_id: int, rows: List[Tuple], seen_at=None) -> Dict[str, int]:
+    """
+    Merge one run's rows for a device into its current intervals. rows are tuples in
+    columns order, as the build_*_rows functions produce them. Every interval seen again is
+    extended by one UPDATE for the device; only rows whose other columns changed are
+    rewritten. Returns counts of rows inserted, extended, refreshed and closed
+    """
+    seen_at = seen_at or datetime.now()
+    key_columns = INTERVAL_KEYS[table]
+    key_positions = [columns.index(column) for column in key_columns]
+    value_columns = [column for column in columns if column not in key_columns and column not in VOLATILE_COLUMNS]
+    value_positions = [columns.index(column) for column in value_columns]
+
+    current = {}
+    for row in conn.execute(f"""
+        SELECT id, {', '.join(key_columns + tuple(value_columns))} FROM {table}
+        WHERE device_id = ? AND is_current = 1
+    """, (device_id,)):
+        current[tuple(row[1:len(key_columns) + 1])] = (row[0], tuple(row[len(key_columns) + 1:]))
+
+    inserts = []
+    refreshes = []
+    extended = 0
+    seen = set()
+    for row in rows:
+        key = tuple(row[position] for position in key_positions)
+        if key in seen:
+            continue  # Same tuple twice in one table dump
+        seen.add(key)
+        existing = current.pop(key, None)
+        if existing is None:
+            inserts.append((device_id, run_id) + tuple(row) + (seen_at, seen_at))
+            continue
+        extended += 1
+        values = tuple(row[position] for position in value_positions)
+        if values != existing[1]:
+            refreshes.append(values + (existing[0],))
+
+    if current:
+        conn.executemany(f"UPDATE {table} SET is_current = 0 WHERE id = ?",
+                         [(row_id,) for row_id, _ in current.values()])
+    if extended:
+        conn.execute(f"""
+            UPDATE {table} SET collection_run_id = ?, last_seen = ?, run_count = run_count + 1
+            WHERE device_id = ? AND is_current = 1
+        """, (run_id, seen_at, device_id))
+    if refreshes:
+        conn.executemany(f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in value_columns)} WHERE id = ?",
+                         refreshes)
+    if inserts:
+        conn.executemany(f"""
+            INSERT INTO {table} (device_id, collection_run_id, {', '.join(columns)}, first_seen, last_seen)
+            VALUES ({', '.join('?' * (len(columns) + 4))})
+        """, inserts)
+
+    return {'inserted': len(inserts), 'extended': extended, 'refreshed': len(refreshes), 'closed': len(current)}
+
+
+def compact_history(conn: sqlite3.Connection, table: str) -> Dict[str, int]:
+    """
+    Fold full-copy history written before interval storage into intervals: rows of a tuple
+    from consecutive runs that collected the table become one row spanning them. Run once
+    per table after upgrading; a device is compacted in one transaction
+    """
+    key_columns = INTERVAL_KEYS[table]
+    stats = {'devices': 0, 'rows_before': 0, 'rows_after': 0}
+    device_ids = [row[0] for row in conn.execute(f"SELECT DISTINCT device_id FROM {table}")]
+
+    for device_id in device_ids:
+        runs = [row[0] for row in conn.execute(f"""
+            SELECT DISTINCT collection_run_id FROM {table} WHERE device_id = ? ORDER BY collection_run_id
+        """, (device_id,))]
+        run_position = {run_id: position for position, run_id in enumerate(runs)}
+
+        rows = conn.execute(f"""
+            SELECT id, collection_run_id, first_seen, last_seen, run_count, is_current, {', '.join(key_columns)}
+            FROM {table} WHERE device_id = ?
+            ORDER BY collection_run_id, id
+        """, (device_id,)).fetchall()
+        stats['rows_before'] += len(rows)
+
+        # key -> [row id, run position of the interval's last run, last_seen, run_count, is_current, run id]
+        open_intervals = {}
+        merged = defaultdict(list)
+        kept = {}
+        for row_id, run_id, first_seen, last_seen, run_count, is_current, *key in rows:
+            key = tuple(key)
+            position = run_position[run_id]
+            interval = open_intervals.get(key)
+            if interval and interval[1] == position - 1:
+                merged[interval[0]].append(row_id)
+                interval[1:] = [position, last_seen, interval[3] + run_count, is_current, run_id]
+            elif interval and interval[1] == position:
+                merged[interval[0]].append(row_id)  # Duplicate tuple within one run
+            else:
+                interval = [row_id, position, last_seen, run_count, is_current, run_id]
+                open_intervals[key] = interval
+                kept[row_id] = interval
+
+        for row_id, absorbed in merged.items():
+            _, _, last_seen, run_count, is_current, run_id = kept[row_id]
+            conn.execute(f"""
+                UPDATE {table} SET last_seen = ?, run_count = ?, is_current = ?, collection_run_id = ?
+                WHERE id = ?
+            """, (last_seen, run_count, is_current, run_id, row_id))
+            conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(absorbed_id,) for absorbed_id in absorbed])
+        conn.commit()
+
+        stats['devices'] += 1
+        stats['rows_after'] += len(kept)
+
+    logging.info(f"Compacted {table}: {stats['rows_before']} rows into {stats['rows_after']} intervals "
+                 f"across {stats['devices']} devices")
+    return stats
+
+
+def interval_summary(conn: sqlite3.Connection) -> Dict:
+    """Rows, current rows and the runs they stand for, per interval table"""
+    summary = {}
+    for table in INTERVAL_KEYS:
+        rows, current, observations = conn.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(is_current), 0), COALESCE(SUM(run_count), 0) FROM {table}
+        """).fetchone()
+        summary[table] = {'rows': rows, 'current_rows': current, 'observations': observations}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or compact interval-stored ARP and MAC tables')
+    parser.add_argument('--db-path', default='napalm_cmdb.db', help='SQLite database path')
+    parser.add_argument('--compact', action='store_true',
+                        help='Fold full-copy history from before interval storage into intervals')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM after compacting to release the freed pages')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    conn = sqlite3.connect(args.db_path)
+    try:
+        ensure_interval_columns(conn)
+        conn.commit()
+        if args.compact:
+            started = time.time()
+            for table in INTERVAL_KEYS:
+                compact_history(conn, table)
+            logging.info(f"Compaction finished in {time.time() - started:.1f}s")
+            if args.vacuum:
+                logging.info("Running VACUUM...")
+                conn.execute("VACUUM")
+        print(json.dumps(interval_summary(conn), indent=2))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+IP Range Columns
+device_ips, arp_entries, interface_ips and routes carry ip_start and ip_end next to their
+text addresses: the first and last address a row covers - the address itself for device
+and ARP addresses, the whole network for interface subnets and routes. IPv4 is stored as an
+INTEGER and IPv6 as a 16-byte big-endian BLOB. SQLite sorts every INTEGER before every BLOB
+and compares BLOBs bytewise, so one (ip_start, ip_end) index keeps both families in numeric
+order and a bound of one family never matches the other. Addresses in a subnet are then a
+range scan on ip_start, and the networks containing a subnet are found by probing the one
+start each shorter prefix length allows, which is also how longest-prefix matches are found
+"""
+
+import argparse
+import ipaddress
+import json
+import logging
+import sqlite3
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from interval_store import ensure_interval_columns
+
+RangeValue = Union[int, bytes]
+
+RANGE_COLUMNS = (
+    ('ip_start', 'INTEGER'),
+    ('ip_end', 'INTEGER'),
+)
+
+# Address column and prefix length column each table's range is computed from; rows without
+# a prefix length column cover a single address
+RANGE_SOURCES = {
+    'device_ips': ('ip_address', None),
+    'arp_entries': ('ip_address', None),
+    'interface_ips': ('ip_address', 'prefix_length'),
+    'routes': ('destination_network', 'prefix_length'),
+}
+
+RANGE_INDEXES = {
+    'device_ips': ("CREATE INDEX IF NOT EXISTS idx_device_ips_range ON device_ips(ip_start, ip_end)",),
+    'arp_entries': ("CREATE INDEX IF NOT EXISTS idx_arp_current_range "
+                    "ON arp_entries(ip_start, ip_end) WHERE is_current = 1",),
+    'interface_ips': ("CREATE INDEX IF NOT EXISTS idx_interface_ips_range ON interface_ips(ip_start, ip_end)",),
+    'routes': ("CREATE INDEX IF NOT EXISTS idx_routes_range ON routes(ip_start, ip_end)",
+               "CREATE INDEX IF NOT EXISTS idx_routes_device_run ON routes(device_id, collection_run_id)"),
+}
+
+# Same definition as cmdb.sql, for databases created from the embedded schema
+INTERFACE_IPS_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS interface_ips (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        interface_id INTEGER NOT NULL,
+        ip_address TEXT NOT NULL,
+        prefix_length INTEGER NOT NULL,
+        ip_version INTEGER NOT NULL, -- 4 or 6
+        is_secondary BOOLEAN NOT NULL DEFAULT 0,
+        ip_start INTEGER, -- first address of the interface subnet, integer (IPv4) or BLOB (IPv6)
+        ip_end INTEGER, -- last address of the interface subnet
+        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+        FOREIGN KEY (interface_id) REFERENCES interfaces(id) ON DELETE CASCADE,
+
+        CONSTRAINT check_prefix_length_v4 CHECK (
+            (ip_version = 4 AND prefix_length >= 0 AND prefix_length <= 32) OR
+            (ip_version = 6 AND prefix_length >= 0 AND prefix_length <= 128)
+        ),
+        CONSTRAINT check_ip_version CHECK (ip_version IN (4, 6))
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_interface_ips_interface ON interface_ips(interface_id)",
+    "CREATE INDEX IF NOT EXISTS idx_interface_ips_address ON interface_ips(ip_address)",
+)
+
+# Routes and interface addresses are copied per run; only the device's latest copy counts
+LATEST_ROUTES = ("r.collection_run_id = "
+                 "(SELECT MAX(r2.collection_run_id) FROM routes r2 WHERE r2.device_id = r.device_id)")
+LATEST_INTERFACES = ("i.collection_run_id = "
+                     "(SELECT MAX(i2.collection_run_id) FROM interfaces i2 WHERE i2.device_id = i.device_id)")
+
+
+def encode_address(address: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> RangeValue:
+    return int(address) if address.version == 4 else address.packed
+
+
+def address_range(address: str, prefix_length=None) -> Tuple[Optional[RangeValue], Optional[RangeValue]]:
+    """
+    ip_start and ip_end for an address, or for the network it is in when prefix_length
+    is given; (None, None) when the address does not parse
+    """
+    try:
+        address = str(address).split('/')[0].split('%')[0].strip()  # Drop any prefix and IPv6 zone
+        if prefix_length in (None, ''):
+            value = encode_address(ipaddress.ip_address(address))
+            return value, value
+        network = ipaddress.ip_network(f"{address}/{int(prefix_length)}", strict=False)
+    except (ValueError, TypeError):
+        return None, None
+    return encode_address(network.network_address), encode_address(network.broadcast_address)
+
+
+def parse_network(term: str) -> Optional[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    """A subnet or single address typed into a search, host bits ignored; None if it is neither"""
+    try:
+        return ipaddress.ip_network(term.strip(), strict=False)
+    except (ValueError, AttributeError):
+        return None
+
+
+def network_bounds(network) -> Tuple[RangeValue, RangeValue]:
+    return encode_address(network.network_address), encode_address(network.broadcast_address)
+
+
+def containing_starts(network) -> List[RangeValue]:
+    """ip_start of every network, /0 up to the network itself, that could contain it"""
+    return [encode_address(network.supernet(new_prefix=prefix).network_address)
+            for prefix in range(network.prefixlen + 1)]
+
+
+def ensure_range_columns(conn: sqlite3.Connection):
+    """Add the range columns and indexes to a database created before them, filling existing rows"""
+    ensure_interval_columns(conn)  # The ARP range index covers current rows only
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'interfaces'").fetchone():
+        for statement in INTERFACE_IPS_SCHEMA:
+            conn.execute(statement)
+    for table in RANGE_SOURCES:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if not columns:
+            continue
+        added = [column for column, _ in RANGE_COLUMNS if column not in columns]
+        for column, definition in RANGE_COLUMNS:
+            if column in added:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        if added:
+            filled = fill_ranges(conn, table)
+            logging.info(f"Added IP range columns to {table}, filled {filled} rows")
+        for statement in RANGE_INDEXES[table]:
+            conn.execute(statement)
+
+
+def fill_ranges(conn: sqlite3.Connection, table: str, batch_size: int = 5000) -> int:
+    """Compute ip_start/ip_end for rows that have none; rows whose address does not parse stay NULL"""
+    address_column, prefix_column = RANGE_SOURCES[table]
+    filled = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(f"""
+            SELECT id, {address_column}, {prefix_column or 'NULL'} FROM {table}
+            WHERE id > ? AND ip_start IS NULL ORDER BY id LIMIT ?
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            return filled
+        last_id = rows[-1][0]
+        updates = [address_range(address, prefix) + (row_id,) for row_id, address, prefix in rows]
+        updates = [update for update in updates if update[0] is not None]
+        conn.executemany(f"UPDATE {table} SET ip_start = ?, ip_end = ? WHERE id = ?", updates)
+        filled += len(updates)
+
+
+def _containing_condition(alias: str, network) -> Tuple[str, List]:
+    """Rows of an aligned-range table whose range covers the whole network, as one index probe per prefix length"""
+    _, end = network_bounds(network)
+    starts = containing_starts(network)
+    return (f"{alias}.ip_start IN ({', '.join('?' * len(starts))}) AND {alias}.ip_end >= ?",
+            [*starts, end])
+
+
+def _within_condition(alias: str, network) -> Tuple[str, List]:
+    """Rows of an aligned-range table strictly inside the network, as one index range scan"""
+    start, end = network_bounds(network)
+    return (f"{alias}.ip_start BETWEEN ? AND ? AND {alias}.ip_end <= ? "
+            f"AND ({alias}.ip_start > ? OR {alias}.ip_end < ?)", [start, end, end, start, end])
+
+
+def _relation(row: Dict, network) -> str:
+    """'contains' when the row's range covers the whole network, else 'within'"""
+    start, end = network_bounds(network)
+    row_start, row_end = row.pop('ip_start'), row.pop('ip_end')
+    return 'contains' if row_start <= start and row_end >= end else 'within'
+
+
+def subnet_addresses(conn: sqlite3.Connection, network, conditions: Sequence[str] = (), params: Sequence = (),
+                     limit: int = 500) -> List[Dict]:
+    """Device addresses, interface addresses included, and current ARP entries inside the network"""
+    start, end = network_bounds(network)
+    filters = ''.join(f" AND {condition}" for condition in conditions)
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    rows = cursor.execute(f"""
+        SELECT * FROM (
+            SELECT 'device_ip' AS source, d.device_name, d.site_code, di.ip_address, di.ip_type,
+                   di.interface_name, di.vlan_id, NULL AS mac_address, NULL AS entry_type,
+                   di.updated_at AS last_seen, di.ip_start
+            FROM device_ips di
+            JOIN devices d ON di.device_id = d.id
+            WHERE di.ip_start BETWEEN ? AND ?{filters}
+            UNION ALL
+            SELECT 'arp' AS source, d.device_name, d.site_code, ae.ip_address, 'ARP' AS ip_type,
+                   ae.interface_name, NULL AS vlan_id, ae.mac_address, ae.entry_type,
+                   ae.last_seen, ae.ip_start
+            FROM arp_entries ae
+            JOIN devices d ON ae.device_id = d.id
+            WHERE ae.ip_start BETWEEN ? AND ? AND ae.is_current = 1{filters}
+        )
+        ORDER BY ip_start, device_name, source
+        LIMIT ?
+    """, [start, end, *params, start, end, *params, limit]).fetchall()
+    return [{key: row[key] for key in row.keys() if key != 'ip_start'} for row in rows]
+
+
+def subnet_interfaces(conn: sqlite3.Connection, network, conditions: Sequence[str] = (), params: Sequence = (),
+                      limit: int = 500) -> List[Dict]:
+    """
+    Latest interface subnets containing the network, most specific first, then those within
+    it, each with its relation to it. The two groups are limited separately
+    """
+    filters = ''.join(f" AND {condition}" for condition in conditions)
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    results = []
+    for condition, condition_params in (_containing_condition('iip', network), _within_condition('iip', network)):
+        for row in cursor.execute(f"""
+            SELECT d.device_name, d.site_code, i.interface_name, i.vlan_id, iip.ip_address, iip.prefix_length,
+                   iip.ip_version, i.created_at AS last_seen, iip.ip_start, iip.ip_end
+            FROM interface_ips iip
+            JOIN interfaces i ON iip.interface_id = i.id
+            JOIN devices d ON i.device_id = d.id
+            WHERE {condition} AND {LATEST_INTERFACES}{filters}
+            ORDER BY iip.prefix_length DESC, d.device_name
+            LIMIT ?
+        """, [*condition_params, *params, limit]):
+            result = dict(row)
+            result['relation'] = _relation(result, network)
+            results.append(result)
+    return results
+
+
+def subnet_routes(conn: sqlite3.Connection, network, conditions: Sequence[str] = (), params: Sequence = (),
+                  limit: int = 500) -> List[Dict]:
+    """
+    Routes in each device's latest routing table that contain the network or lie within it.
+    Containing routes come first, most specific first, and the first of each device is its
+    longest-prefix match (longest_match); for a single address that is the route it would use.
+    The two groups are limited separately, so routes inside the network never crowd out the
+    containing ones
+    """
+    filters = ''.join(f" AND {condition}" for condition in conditions)
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    results = []
+    matched_devices = set()
+    for condition, condition_params in (_containing_condition('r', network), _within_condition('r', network)):
+        for row in cursor.execute(f"""
+            SELECT d.device_name, d.site_code, r.destination_network, r.prefix_length, r.next_hop,
+                   r.interface_name, r.protocol, r.metric, r.administrative_distance,
+                   cr.collection_time AS last_seen, r.ip_start, r.ip_end
+            FROM routes r
+            JOIN devices d ON r.device_id = d.id
+            JOIN collection_runs cr ON r.collection_run_id = cr.id
+            WHERE {condition} AND {LATEST_ROUTES}{filters}
+            ORDER BY r.prefix_length DESC, d.device_name, r.administrative_distance, r.metric
+            LIMIT ?
+        """, [*condition_params, *params, limit]):
+            result = dict(row)
+            result['relation'] = _relation(result, network)
+            result['longest_match'] = result['relation'] == 'contains' and result['device_name'] not in matched_devices
+            if result['longest_match']:
+                matched_devices.add(result['device_name'])
+            results.append(result)
+    return results
+
+
+def search_subnet(conn: sqlite3.Connection, network, conditions: Sequence[str] = (), params: Sequence = (),
+                  limit: int = 500) -> Dict[str, List[Dict]]:
+    """Everything stored about a subnet or address: addresses in it, interface subnets and routes"""
+    return {
+        'addresses': subnet_addresses(conn, network, conditions, params, limit),
+        'subnets': subnet_interfaces(conn, network, conditions, params, limit),
+        'routes': subnet_routes(conn, network, conditions, params, limit),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill IP range columns or run a subnet search')
+    parser.add_argument('--db-path', default='napalm_cmdb.db', help='SQLite database path')
+    parser.add_argument('--fill', action='store_true', help='Compute ranges for rows that have none')
+    parser.add_argument('--search', help='Subnet or address to look up, e.g. 10.20.0.0/14')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    conn = sqlite3.connect(args.db_path)
+    try:
+        ensure_range_columns(conn)
+        conn.commit()
+        summary = {}
+        if args.fill:
+            started = time.time()
+            summary['filled'] = {table: fill_ranges(conn, table) for table in RANGE_SOURCES
+                                 if conn.execute(f"PRAGMA table_info({table})").fetchone()}
+            conn.commit()
+            summary['seconds'] = round(time.time() - started, 2)
+        if args.search:
+            network = parse_network(args.search)
+            if network is None:
+                parser.error(f"not a subnet or address: {args.search}")
+            started = time.perf_counter()
+            results = search_subnet(conn, network)
+            summary['search'] = {section: len(rows) for section, rows in results.items()}
+            summary['search']['ms'] = round((time.perf_counter() - started) * 1000, 2)
+            summary['longest_matches'] = [f"{route['device_name']}: {route['destination_network']}/"
+                                          f"{route['prefix_length']} via {route['next_hop']}"
+                                          for route in results['routes'] if route['longest_match']][:20]
+        print(json.dumps(summary, indent=2, default=str))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,21 +6,28 @@ using the napalm_cmdb.db database as source instead of JSON scan files
 """
 
 import json
+import hashlib
 import yaml
 import os
 import logging
 import argparse
 import time
 import re
+import heapq
+import random
 import sqlite3
 import threading
+import queue
 from datetime import datetime, timedelta
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from typing import Dict, List, Optional, Any, Tuple
 import napalm
 from napalm.base.exceptions import ConnectionException, CommandErrorException
 
+from capture_archive import CaptureArchiveWriter
+
 
 class CredentialManager:
     """Manages credentials from both config files and environment variables"""
@@ -182,15 +189,198 @@ class CredentialManager:
         return validated
 
 
+class LatencyHistogram:
+    """Rolling window of latency samples for percentiles, plus lifetime power-of-two millisecond buckets"""
+
+    BUCKETS_MS = [2 ** i for i in range(18)]  # 1 ms .. 131 s
+
+    def __init__(self, window: int = 1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bucket_counts = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def record(self, seconds: float, success: bool = True):
+        sample = seconds * 1000
+        self.samples.append(sample)
+        self.count += 1
+        self.total_ms += sample
+        self.max_ms = max(self.max_ms, sample)
+        if not success:
+            self.failures += 1
+        for index, edge in enumerate(self.BUCKETS_MS):
+            if sample <= edge:
+                self.bucket_counts[index] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Fold another histogram in, e.g. to combine one getter across drivers"""
+        self.samples.extend(other.samples)
+        self.count += other.count
+        self.failures += other.failures
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.bucket_counts = [a + b for a, b in zip(self.bucket_counts, other.bucket_counts)]
+
+    @staticmethod
+    def _percentile(ordered: List[float], pct: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def summary(self, buckets: bool = False) -> Dict:
+        """Lifetime count and mean with percentiles over the rolling window"""
+        ordered = sorted(self.samples)
+        summary = {
+            'count': self.count,
+            'failures': self.failures,
+            'mean_ms': round(self.total_ms / self.count, 1) if self.count else 0.0,
+            'p50_ms': round(self._percentile(ordered, 50), 1),
+            'p90_ms': round(self._percentile(ordered, 90), 1),
+            'p99_ms': round(self._percentile(ordered, 99), 1),
+            'max_ms': round(self.max_ms, 1),
+            'total_seconds': round(self.total_ms / 1000, 2)
+        }
+        if buckets:
+            summary['buckets_ms'] = {(f"<={edge}" if index < len(self.BUCKETS_MS) else f">{self.BUCKETS_MS[-1]}"): count
+                                     for index, (edge, count) in
+                                     enumerate(zip(self.BUCKETS_MS + [None], self.bucket_counts)) if count}
+        return summary
+
+
+class CollectionMetrics:
+    """
+    Latency histograms keyed by driver and stage. Stages are 'connect' (session open including
+    login), 'auth_failed' and 'connect_failed' for rejected or unreachable attempts, each getter
+    by name, 'config_check' and 'close'. Safe to record from worker threads
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, driver: str, stage: str, seconds: float, success: bool = True):
+        key = (driver or 'unknown', stage)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram(self.window)
+            histogram.record(seconds, success)
+
+    def by_driver(self, buckets: bool = False) -> Dict:
+        """{driver: {stage: summary}}"""
+        report = {}
+        with self._lock:
+            for (driver, stage), histogram in sorted(self.histograms.items()):
+                report.setdefault(driver, {})[stage] = histogram.summary(buckets)
+        return report
+
+    def by_stage(self) -> Dict:
+        """{stage: summary} combined across drivers, slowest total time first"""
+        combined = {}
+        with self._lock:
+            for (driver, stage), histogram in self.histograms.items():
+                combined.setdefault(stage, LatencyHistogram(self.window * len(self.histograms))).merge(histogram)
+        summaries = {stage: histogram.summary() for stage, histogram in combined.items()}
+        return dict(sorted(summaries.items(), key=lambda kv: -kv[1]['total_seconds']))
+
+
+class MetricsReporter:
+    """
+    Writes periodic CollectionStats snapshots as JSON lines, and logs each one with a
+    COLLECTION_METRICS prefix so the pipeline can forward it from the collector's output
+    """
+
+    LOG_PREFIX = 'COLLECTION_METRICS '
+
+    def __init__(self, stats: 'CollectionStats', path: Optional[Path], interval: float = 15):
+        self.stats = stats
+        self.path = path
+        self.interval = max(1.0, interval)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="collection-metrics", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop the reporter and emit the final snapshot"""
+        self._stop.set()
+        self._thread.join()
+        self.emit(final=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.emit()
+
+    def emit(self, final: bool = False):
+        snapshot = self.stats.snapshot(final)
+        line = json.dumps(snapshot, separators=(',', ':'))
+        if self.path:
+            try:
+                with open(self.path, 'a') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                logging.warning(f"Could not write metrics snapshot to {self.path}: {str(e)}")
+        logging.info(self.LOG_PREFIX + line)
+
+
 class CollectionStats:
     """Track collection statistics and timing"""
 
-    def __init__(self):
+    def __init__(self, metrics_window: int = 1000):
         self.start_time = None
         self.end_time = None
         self.device_times = {}
         self.collection_results = []
         self.error_summary = {}
+        self.counters = {
+            'total': 0,
+            'successful': 0,
+            'failed': 0,
+            'methods_collected': 0,
+            'methods_failed': 0,
+            'first_attempt_logins': 0,
+            'credential_attempts': 0,
+            'retries': 0
+        }
+        self.site_stats = {}
+        self.site_devices = {}
+        self.metrics = CollectionMetrics(metrics_window)
+
+    def record_timing(self, driver: str, stage: str, seconds: float, success: bool = True):
+        """Add a connect, getter or close latency to the driver's histograms"""
+        self.metrics.record(driver, stage, seconds, success)
+
+    def snapshot(self, final: bool = False) -> Dict:
+        """Point-in-time progress and latency percentiles for live monitoring"""
+        now = datetime.now()
+        elapsed = (now - self.start_time).total_seconds() if self.start_time else 0
+        return {
+            'type': 'collection_metrics',
+            'time': now.isoformat(),
+            'final': final,
+            'elapsed_seconds': round(elapsed, 1),
+            'devices': {
+                'completed': self.counters['total'],
+                'successful': self.counters['successful'],
+                'failed': self.counters['failed'],
+                'per_minute': round(self.counters['total'] / elapsed * 60, 2) if elapsed > 0 else 0
+            },
+            'timings': self.metrics.by_driver()
+        }
+
+    def get_performance_breakdown(self) -> Dict:
+        """Per-getter latency combined across drivers, and per driver with histogram buckets"""
+        return {
+            'by_stage': self.metrics.by_stage(),
+            'by_driver': self.metrics.by_driver(buckets=True)
+        }
 
     def start_collection(self):
         """Mark collection start time"""
@@ -214,8 +404,115 @@ class CollectionStats:
             ).total_seconds()
 
     def add_result(self, result: Dict):
-        """Add a collection result"""
-        self.collection_results.append(result)
+        """
+        Count a collection result and keep its record without the collected data. Retry results
+        adjust the first pass counts so successful/failed reflect each device's final outcome
+        """
+        reason = result.get('retry_reason')
+        if not reason:
+            self.counters['total'] += 1
+            if result.get('success'):
+                self.counters['successful'] += 1
+            else:
+                self.counters['failed'] += 1
+            self.counters['methods_failed'] += len(result.get('methods_failed', []))
+        else:
+            self.counters['retries'] += 1
+            if reason == 'connection':
+                if result.get('success'):
+                    self.counters['successful'] += 1
+                    self.counters['failed'] -= 1
+                self.counters['methods_failed'] += len(result.get('methods_failed', []))
+            else:
+                # Getters that failed before and succeeded now are no longer failures
+                self.counters['methods_failed'] -= len(result.get('methods_collected', []))
+        self.counters['methods_collected'] += len(result.get('methods_collected', []))
+        self.counters['credential_attempts'] += result.get('credential_attempts', 0)
+        if result.get('credential_used') and result.get('credential_attempts') == 1:
+            self.counters['first_attempt_logins'] += 1
+        self.collection_results.append({k: v for k, v in result.items() if k != 'data'})
+
+    def _site(self, site: str) -> Dict:
+        if site not in self.site_stats:
+            self.site_stats[site] = {
+                'devices': 0, 'queued': 0, 'max_queue_depth': 0, 'active': 0, 'max_active': 0,
+                'completed': 0, 'successful': 0, 'failed': 0, 'retries': 0, 'device_seconds': 0.0,
+                'sessions': 0, 'queue_wait_seconds': 0.0, 'first_start': None, 'last_end': None
+            }
+        return self.site_stats[site]
+
+    def site_enqueued(self, site: str, device_ip: str):
+        """
+        Record a device waiting for a session at a site. A device queued again by a retry pass
+        counts as a retry, not as another device
+        """
+        stats = self._site(site)
+        device = self.site_devices.get(device_ip)
+        if device is None:
+            device = self.site_devices[device_ip] = {'success': None}
+            stats['devices'] += 1
+        else:
+            stats['retries'] += 1
+        device['enqueued'] = datetime.now()
+        stats['queued'] += 1
+        stats['max_queue_depth'] = max(stats['max_queue_depth'], stats['queued'])
+
+    def site_started(self, site: str, device_ip: str):
+        """Record a device at a site leaving the queue for a session, and how long it waited"""
+        stats = self._site(site)
+        now = datetime.now()
+        stats['queued'] -= 1
+        stats['active'] += 1
+        stats['sessions'] += 1
+        stats['max_active'] = max(stats['max_active'], stats['active'])
+        enqueued = self.site_devices.get(device_ip, {}).pop('enqueued', None)
+        if enqueued:
+            stats['queue_wait_seconds'] += (now - enqueued).total_seconds()
+        if stats['first_start'] is None:
+            stats['first_start'] = now
+
+    def site_finished(self, site: str, device_ip: str, result: Dict):
+        """
+        Record a finished device session at a site. Each device is completed once; a retry that
+        succeeds after a failed first pass moves the device from failed to successful
+        """
+        stats = self._site(site)
+        stats['active'] -= 1
+        stats['device_seconds'] += result.get('collection_duration') or 0
+        stats['last_end'] = datetime.now()
+        device = self.site_devices.setdefault(device_ip, {'success': None})
+        success = bool(result.get('success'))
+        if device['success'] is None:
+            stats['completed'] += 1
+            stats['successful' if success else 'failed'] += 1
+            device['success'] = success
+        elif success and not device['success']:
+            stats['failed'] -= 1
+            stats['successful'] += 1
+            device['success'] = True
+
+    def get_site_statistics(self) -> Dict:
+        """Per-site throughput, queue depth and session concurrency for the run summary"""
+        report = {}
+        for site, stats in sorted(self.site_stats.items()):
+            elapsed = 0
+            if stats['first_start'] and stats['last_end']:
+                elapsed = (stats['last_end'] - stats['first_start']).total_seconds()
+            completed = stats['completed']
+            report[site] = {
+                'devices': stats['devices'],
+                'completed': completed,
+                'successful': stats['successful'],
+                'failed': stats['failed'],
+                'retries': stats['retries'],
+                'max_queue_depth': stats['max_queue_depth'],
+                'max_concurrent_sessions': stats['max_active'],
+                'elapsed_seconds': round(elapsed, 2),
+                'devices_per_minute': round(completed / elapsed * 60, 2) if elapsed > 0 else None,
+                'average_device_time': round(stats['device_seconds'] / stats['sessions'], 2) if stats['sessions'] else 0,
+                'average_queue_wait': round(stats['queue_wait_seconds'] / stats['sessions'], 2) if stats['sessions'] else 0
+            }
+        return report
 
     def get_total_runtime(self) -> float:
         """Get total collection runtime in seconds"""
@@ -229,6 +526,384 @@ class CollectionStats:
         return sum(times) / len(times) if times else 0
 
 
+class CollectionWriter:
+    """
+    Single writer stage between collection threads and storage.
+    Worker threads put finished results on a bounded queue; one thread commits each
+    device into the CMDB in its own transaction and/or appends it to the run's capture
+    archive, so results are persisted as they arrive instead of being held until the run ends.
+    capture_format 'files' keeps the legacy per-device directory tree instead of an archive
+    """
+
+    def __init__(self, collector: 'DatabaseDeviceCollector', write_db: bool = False,
+                 capture_files: bool = True, queue_size: int = 20):
+        self.collector = collector
+        self.write_db = write_db
+        self.capture_files = capture_files
+        self.capture_format = collector.config.get('capture_format', 'archive')
+        self.archive = None
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.max_queue_depth = 0
+        self.counters = {
+            'database_writes': 0,
+            'database_errors': 0,
+            'captured': 0,
+            'capture_errors': 0,
+            'capture_bytes': 0,
+            'skipped_failed': 0
+        }
+        self._thread = threading.Thread(target=self._run, name="collection-writer", daemon=True)
+
+    def start(self):
+        """Start the writer thread"""
+        self._thread.start()
+
+    def put(self, result: Dict):
+        """Queue a device result, blocking while the writer is behind"""
+        self.queue.put(result)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    def close(self):
+        """Drain the queue and stop the writer thread"""
+        self.queue.put(None)
+        self._thread.join()
+
+    def summary(self) -> Dict:
+        """Writer counters for the collection summary"""
+        return {
+            'database_enabled': self.write_db,
+            'capture_enabled': self.capture_files,
+            'queue_size': self.queue.maxsize,
+            'max_queue_depth': self.max_queue_depth,
+            'capture_format': self.capture_format if self.capture_files else None,
+            'capture_archive': str(self.archive.path) if self.archive else None,
+            **self.counters
+        }
+
+    def _open_database(self):
+        """Open the writer's own CMDB connection"""
+        from db_manager import NapalmCMDB
+        return NapalmCMDB(self.collector.db_path)
+
+    def _run(self):
+        cmdb = None
+        if self.write_db:
+            try:
+                cmdb = self._open_database()
+            except Exception as e:
+                logging.error(f"Could not open CMDB {self.collector.db_path} for writing: {str(e)}")
+
+        if self.capture_files and self.capture_format == 'archive':
+            try:
+                self.archive = CaptureArchiveWriter(self.collector.capture_dir)
+                logging.info(f"Capturing results to {self.archive.path}")
+            except OSError as e:
+                logging.error(f"Could not open capture archive in {self.collector.capture_dir}: {str(e)}")
+
+        try:
+            while True:
+                result = self.queue.get()
+                if result is None:
+                    break
+                self._write(cmdb, result)
+        finally:
+            if cmdb:
+                cmdb.close()
+            if self.archive:
+                self.archive.close()
+
+    def _write(self, cmdb, result: Dict):
+        device_name = result['device_name']
+        if not result['success']:
+            self.counters['skipped_failed'] += 1
+            logging.warning(f"No data to save for {device_name} - collection failed")
+            return
+
+        if self.write_db:
+            if cmdb is None:
+                self.counters['database_errors'] += 1
+            else:
+                try:
+                    cmdb.import_device_result(result)
+                    self.counters['database_writes'] += 1
+                    logging.info(f"Committed {device_name} to CMDB - {len(result['methods_collected'])} methods")
+                except Exception as e:
+                    self.counters['database_errors'] += 1
+                    logging.error(f"Error writing {device_name} to CMDB: {str(e)}")
+
+        if self.capture_files:
+            try:
+                if self.capture_format == 'archive':
+                    if self.archive is None:
+                        raise OSError("capture archive is not open")
+                    self.counters['capture_bytes'] += self.archive.write(result)
+                else:
+                    self.collector.save_device_data(result)
+                self.counters['captured'] += 1
+            except Exception as e:
+                self.counters['capture_errors'] += 1
+                logging.error(f"Error saving capture files for {device_name}: {str(e)}")
+
+
+class CollectionScheduler:
+    """
+    Per-getter collection cadence.
+    Each getter has an interval in minutes; it is due for a device once the device's last
+    successful collection_runs entry containing that getter is older than the interval, less
+    an early tolerance so a getter collected slightly early is not pushed back a whole run.
+    Getters without an interval, or never collected, are always due
+    """
+
+    def __init__(self, config: Dict):
+        schedule = config.get('collection_schedule') or {}
+        self.enabled = schedule.get('enabled', False)
+        self.default_interval = schedule.get('default_interval_minutes', 0) or 0
+        self.intervals = schedule.get('intervals') or {}
+        self.tolerance = (schedule.get('early_tolerance_percent', 10) or 0) / 100.0
+        self.last_success = {}
+
+    def interval_for(self, method: str) -> float:
+        """Interval in minutes for a getter, 0 meaning every run"""
+        return self.intervals.get(method, self.default_interval) or 0
+
+    def load_last_success(self, conn: sqlite3.Connection, methods: List[str]):
+        """Load the last successful collection time per device and getter from collection_runs"""
+        longest = max((self.interval_for(m) for m in methods), default=0)
+        if not longest:
+            return
+
+        # Nothing older than the longest interval can make a getter not due
+        cutoff = datetime.now() - timedelta(minutes=longest)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT device_id, collection_time, methods_collected
+            FROM collection_runs
+            WHERE success = 1 AND collection_time >= ?
+        """, (cutoff,))
+
+        for device_id, collection_time, methods_collected in cursor.fetchall():
+            try:
+                collected_at = datetime.fromisoformat(str(collection_time))
+                collected = json.loads(methods_collected or '[]')
+            except (ValueError, TypeError):
+                continue
+
+            device_last = self.last_success.setdefault(device_id, {})
+            for method in collected:
+                if method not in device_last or collected_at > device_last[method]:
+                    device_last[method] = collected_at
+
+        logging.info(f"Collection schedule: loaded last successful getters for {len(self.last_success)} devices")
+
+    def due_methods(self, device: Dict, methods: List[str], now: datetime = None) -> List[str]:
+        """Getters from methods that are due for this device"""
+        if not self.enabled:
+            return methods
+
+        now = now or datetime.now()
+        last = self.last_success.get(device.get('id'), {})
+        due = []
+        for method in methods:
+            interval = self.interval_for(method)
+            collected_at = last.get(method)
+            if not interval or collected_at is None:
+                due.append(method)
+            elif now - collected_at >= timedelta(minutes=interval * (1 - self.tolerance)):
+                due.append(method)
+        return due
+
+
+class SiteBudget:
+    """
+    Site-aware dispatch order and concurrency limits.
+    Devices queue per site_code and are started round-robin across sites, so one small site
+    behind a slow WAN link or TACACS server cannot occupy every worker while other sites wait.
+    Each site has a session limit under the global cap, and optionally a minimum gap between
+    session starts so bursts of logins do not land on one site's AAA server
+    """
+
+    def __init__(self, config: Dict, global_limit: int, default_site_limit: int = None):
+        budgets = config.get('site_concurrency') or {}
+        self.enabled = budgets.get('enabled', True)
+        self.global_limit = max(1, global_limit)
+        if default_site_limit is None:
+            default_site_limit = budgets.get('per_site_limit')
+        self.default_site_limit = default_site_limit or self.global_limit
+        self.site_limits = budgets.get('site_limits') or {}
+        self.connect_interval = budgets.get('min_connect_interval_seconds', 0) or 0
+        self._last_start = {}
+
+    @staticmethod
+    def site_of(device: Dict) -> str:
+        return device.get('site_code') or 'UNKNOWN'
+
+    def limit_for(self, site: str) -> int:
+        """Concurrent sessions allowed at a site"""
+        if not self.enabled:
+            return self.global_limit
+        return max(1, min(self.site_limits.get(site, self.default_site_limit), self.global_limit))
+
+    def queues(self, plan: List[Tuple[Dict, List[str]]]) -> 'OrderedDict[str, deque]':
+        """Per-site work queues, the largest sites first so their long tails start early"""
+        by_site = {}
+        for item in plan:
+            by_site.setdefault(self.site_of(item[0]), deque()).append(item)
+        return OrderedDict(sorted(by_site.items(), key=lambda kv: -len(kv[1])))
+
+    def interleave(self, plan: List[Tuple[Dict, List[str]]]) -> List[Tuple[Dict, List[str]]]:
+        """Plan reordered round-robin across sites"""
+        if not self.enabled:
+            return list(plan)
+        queues = self.queues(plan)
+        ordered = []
+        while queues:
+            for site in list(queues):
+                ordered.append(queues[site].popleft())
+                if not queues[site]:
+                    del queues[site]
+        return ordered
+
+    def pacing_delay(self, site: str, now: float = None) -> float:
+        """Seconds until a new session may start at a site"""
+        if not self.enabled or not self.connect_interval or site not in self._last_start:
+            return 0
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._last_start[site] + self.connect_interval - now)
+
+    def mark_started(self, site: str):
+        self._last_start[site] = time.monotonic()
+
+
+class RetryQueue:
+    """
+    Deferred retries for failed connections and failed getters, drained after the first pass.
+    Each retry waits base_delay * 2^(attempt-1) seconds, capped at max_delay and spread by
+    +/- jitter, so a burst of timeouts at one site is not retried in lockstep
+    """
+
+    def __init__(self, config: Dict):
+        retry = config.get('retry') or {}
+        self.enabled = retry.get('enabled', True)
+        self.max_attempts = retry.get('max_attempts', 2)
+        self.base_delay = retry.get('base_delay_seconds', 10)
+        self.max_delay = retry.get('max_delay_seconds', 120)
+        self.jitter = retry.get('jitter', 0.5)
+        self.retry_getters = retry.get('retry_getters', True)
+        self.attempts = {}  # device ip -> (attempt, reason) of the retry currently queued or running
+        self._heap = []
+        self._sequence = 0
+        self.counters = {'connection_retries': 0, 'getter_retries': 0, 'exhausted': 0}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def delay_for(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return max(0.0, delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def push(self, device: Dict, methods: List[str], attempt: int, reason: str) -> bool:
+        """Queue a retry; False when the device has used up its attempts"""
+        if not self.enabled or attempt > self.max_attempts:
+            self.counters['exhausted'] += 1
+            return False
+        delay = self.delay_for(attempt)
+        self._sequence += 1
+        heapq.heappush(self._heap, (time.monotonic() + delay, self._sequence, device, methods))
+        self.attempts[device['primary_ip']] = (attempt, reason)
+        self.counters['connection_retries' if reason == 'connection' else 'getter_retries'] += 1
+        logging.info(f"[{device['device_name']}] Retry {attempt}/{self.max_attempts} for "
+                     f"{'connection' if reason == 'connection' else ', '.join(methods)} in {delay:.0f}s")
+        return True
+
+    def seconds_until_due(self) -> float:
+        return max(0.0, self._heap[0][0] - time.monotonic()) if self._heap else 0.0
+
+    def pop_due(self) -> List[Tuple[Dict, List[str]]]:
+        """
+        Every queued retry whose backoff has elapsed, plus those falling due within the jitter
+        window so one pass picks up a whole burst rather than a device at a time
+        """
+        now = time.monotonic() + self.base_delay * self.jitter
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, device, methods = heapq.heappop(self._heap)
+            due.append((device, methods))
+        return due
+
+
+class ReachabilityTracker:
+    """
+    Devices that stayed unreachable after their retries. After unreachable_after_runs
+    consecutive unreachable runs a device is skipped until skip_until, starting at
+    unreachable_skip_hours and doubling on each further failure up to max_skip_hours;
+    one successful connection clears it
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS device_reachability (
+            device_id INTEGER PRIMARY KEY,
+            consecutive_failures INTEGER NOT NULL DEFAULT 0,
+            last_failure DATETIME,
+            last_error TEXT,
+            skip_until DATETIME,
+            FOREIGN KEY (device_id) REFERENCES devices(id) ON DELETE CASCADE
+        )
+    """
+
+    def __init__(self, config: Dict):
+        retry = config.get('retry') or {}
+        self.threshold = retry.get('unreachable_after_runs', 3)
+        self.skip_hours = retry.get('unreachable_skip_hours', 6)
+        self.max_skip_hours = retry.get('max_skip_hours', 168)
+
+    def load_skipped(self, conn: sqlite3.Connection, now: datetime = None) -> Dict[int, Dict]:
+        """Devices currently inside their skip window"""
+        if not self.threshold:
+            return {}
+        conn.execute(self.SCHEMA)
+        cursor = conn.execute("""
+            SELECT device_id, consecutive_failures, skip_until, last_error FROM device_reachability
+            WHERE skip_until IS NOT NULL AND skip_until > ?
+        """, (now or datetime.now(),))
+        return {row[0]: {'consecutive_failures': row[1], 'skip_until': row[2], 'last_error': row[3]}
+                for row in cursor.fetchall()}
+
+    def record_outcomes(self, conn: sqlite3.Connection, outcomes: Dict[int, Dict]) -> int:
+        """Update failure streaks from each device's final result; returns devices newly skipped"""
+        if not self.threshold:
+            return 0
+        conn.execute(self.SCHEMA)
+        now = datetime.now()
+        newly_skipped = 0
+        for device_id, result in outcomes.items():
+            if result.get('failure_type') != 'unreachable':
+                if result.get('credential_used'):
+                    conn.execute("DELETE FROM device_reachability WHERE device_id = ?", (device_id,))
+                continue
+
+            row = conn.execute("SELECT consecutive_failures FROM device_reachability WHERE device_id = ?",
+                               (device_id,)).fetchone()
+            failures = (row[0] if row else 0) + 1
+            skip_until = None
+            if failures >= self.threshold:
+                hours = min(self.max_skip_hours, self.skip_hours * 2 ** (failures - self.threshold))
+                skip_until = now + timedelta(hours=hours)
+                newly_skipped += 1
+                logging.warning(f"[{result.get('device_name')}] Unreachable on {failures} consecutive runs - "
+                                f"skipping until {skip_until:%Y-%m-%d %H:%M}")
+            conn.execute("""
+                INSERT INTO device_reachability (device_id, consecutive_failures, last_failure, last_error, skip_until)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(device_id) DO UPDATE SET
+                    consecutive_failures = excluded.consecutive_failures,
+                    last_failure = excluded.last_failure,
+                    last_error = excluded.last_error,
+                    skip_until = excluded.skip_until
+            """, (device_id, failures, now, (result.get('errors') or [None])[-1], skip_until))
+        conn.commit()
+        return newly_skipped
+
+
 class DatabaseDeviceCollector:
     """Database-driven collector class for NAPALM-based device data collection with credential caching"""
 
@@ -245,13 +920,17 @@ class DatabaseDeviceCollector:
         self.credential_manager = CredentialManager(self.config)
 
         # Initialize statistics tracking
-        self.stats = CollectionStats()
+        self.stats = CollectionStats(self.config.get('metrics', {}).get('window', 1000))
 
         # Create capture directory if it doesn't exist
         self.capture_dir.mkdir(exist_ok=True)
 
         # Credential caching - maps device characteristics to working credentials
         self.credential_cache = {}
+        self.device_credentials = {}  # device id -> credential name that last worked
+        self.config_markers = {}  # device id -> change marker stored with its latest running config
+        self.retry_queue = RetryQueue(self.config)
+        self.final_outcomes = {}  # device id -> last result this run, for reachability tracking
         self.cache_lock = threading.Lock()  # Thread-safe access to cache
 
         # NAPALM driver mapping for vendors in your database
@@ -303,6 +982,81 @@ class DatabaseDeviceCollector:
             'detailed_timing': True,
             'performance_metrics': True,
             'database_path': 'napalm_cmdb.db',
+            'capture_files': True,
+            'capture_format': 'archive',
+            'stream_to_database': False,
+            'writer_queue_size': 20,
+            'async_collection': {
+                'enabled': False,
+                'max_sessions': 200,
+                'per_site_limit': 20,
+                'connect_timeout': 15,
+                'command_timeout': 60,
+                'port': 22,
+                '_info': 'asyncssh + ntc-templates engine for ios/eos getters; other drivers use NAPALM threads'
+            },
+            'collection_schedule': {
+                'enabled': False,
+                'default_interval_minutes': 0,
+                'early_tolerance_percent': 10,
+                'intervals': {
+                    'get_arp_table': 15,
+                    'get_mac_address_table': 15,
+                    'get_interfaces': 60,
+                    'get_interfaces_ip': 60,
+                    'get_lldp_neighbors': 60,
+                    'get_config': 60,
+                    'get_environment': 60,
+                    'get_facts': 1440,
+                    'get_inventory': 1440,
+                    'get_optics': 1440,
+                    'get_users': 1440,
+                    'get_network_instances': 1440
+                },
+                '_info': 'Minutes between successful collections per getter; 0 or missing means every run'
+            },
+            'retry': {
+                'enabled': True,
+                'max_attempts': 2,
+                'base_delay_seconds': 10,
+                'max_delay_seconds': 120,
+                'jitter': 0.5,
+                'retry_getters': True,
+                'unreachable_after_runs': 3,
+                'unreachable_skip_hours': 6,
+                'max_skip_hours': 168,
+                '_info': 'Timed-out connections and failed getters are retried after the first pass with '
+                         'exponential backoff; devices unreachable on consecutive runs are skipped for a while'
+            },
+            'metrics': {
+                'enabled': True,
+                'window': 1000,
+                'snapshot_interval_seconds': 15,
+                'snapshot_file': 'collection_metrics.jsonl',
+                '_info': 'Per driver and getter latency percentiles over the last <window> samples; snapshots '
+                         'are appended to snapshot_file in capture_directory and logged as COLLECTION_METRICS'
+            },
+            'site_concurrency': {
+                'enabled': True,
+                'per_site_limit': 0,
+                'site_limits': {},
+                'min_connect_interval_seconds': 0,
+                '_info': 'Devices are dispatched round-robin across site_code. per_site_limit caps concurrent '
+                         'sessions per site under --workers (0 = no cap); site_limits overrides it per site, '
+                         'e.g. {BR1: 2}'
+            },
+            'config_change_check': {
+                'enabled': False,
+                'commands': {
+                    'ios': [
+                        'show running-config | include ^! Last configuration change',
+                        'verify /md5 system:running-config'
+                    ],
+                    'junos': ['show system commit']
+                },
+                '_info': 'Per-driver commands tried in order before get_config; the first with output is the '
+                         'change marker. An unchanged marker skips the full config fetch'
+            },
             'credential_caching': {
                 'enabled': True,
                 'cache_by': ['site_code', 'vendor', 'device_role'],
@@ -626,10 +1380,176 @@ echo "NAPALM database collector environment variables loaded"
             self.credential_cache[cache_key] = credential.copy()
             logging.info(f"Cached working credential '{credential['name']}' for cache key: {cache_key}")
 
-    def collect_single_device_sequential(self, device: Dict, credentials: List[Dict]) -> Dict:
+    def load_credential_affinity(self, devices: List[Dict], credentials: List[Dict]):
+        """
+        Seed credential affinity from the CMDB: each device's credential from its last successful
+        collection_runs entry, and for every cache bucket the credential most of its devices used
+        """
+        if not self.config.get('credential_caching', {}).get('enabled', True):
+            return
+
+        names = {cred['name']: cred for cred in credentials}
+        conn = self.get_database_connection()
+        try:
+            cursor = conn.cursor()
+            # SQLite returns the bare column from the row holding MAX()
+            cursor.execute("""
+                SELECT device_id, credential_used, MAX(collection_time)
+                FROM collection_runs
+                WHERE success = 1 AND credential_used IS NOT NULL
+                GROUP BY device_id
+            """)
+            last_used = {row[0]: row[1] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+        bucket_votes = {}
+        with self.cache_lock:
+            for device in devices:
+                name = last_used.get(device.get('id'))
+                if name not in names:
+                    continue
+                self.device_credentials[device['id']] = name
+                votes = bucket_votes.setdefault(self.get_credential_cache_key(device), {})
+                votes[name] = votes.get(name, 0) + 1
+
+            for cache_key, votes in bucket_votes.items():
+                if cache_key not in self.credential_cache:
+                    self.credential_cache[cache_key] = names[max(votes, key=votes.get)].copy()
+
+        logging.info(f"Credential affinity: {len(self.device_credentials)} devices and "
+                     f"{len(bucket_votes)} cache buckets seeded from previous runs")
+
+    def order_credentials(self, device: Dict, credentials: List[Dict]) -> List[Tuple[Dict, str]]:
+        """Credentials to try with their source: device affinity, cached bucket, then by priority"""
+        by_priority = sorted(credentials, key=lambda x: x.get('priority', 999))
+        if not self.config.get('credential_caching', {}).get('enabled', True):
+            return [(cred, 'tested') for cred in by_priority]
+
+        # Look credentials up by name so the current password is used, not a cached copy
+        names = {cred['name']: cred for cred in credentials}
+        ordered = []
+
+        with self.cache_lock:
+            affinity = self.device_credentials.get(device.get('id'))
+        if affinity in names:
+            ordered.append((names[affinity], 'device_affinity'))
+
+        cached = self.get_cached_credential(device)
+        if cached and cached['name'] in names and cached['name'] != affinity:
+            ordered.append((names[cached['name']], 'cached'))
+
+        tried = {cred['name'] for cred, _ in ordered}
+        ordered.extend((cred, 'tested') for cred in by_priority if cred['name'] not in tried)
+        return ordered
+
+    def remember_credential(self, device: Dict, credential: Dict):
+        """Record a working credential for the device and its cache bucket"""
+        if not self.config.get('credential_caching', {}).get('enabled', True):
+            return
+
+        with self.cache_lock:
+            self.device_credentials[device.get('id')] = credential['name']
+            cached = self.credential_cache.get(self.get_credential_cache_key(device))
+        if not cached or cached['name'] != credential['name']:
+            self.cache_working_credential(device, credential)
+
+    def forget_credential(self, device: Dict, credential: Dict):
+        """Drop a credential that failed authentication from the device and bucket caches"""
+        cache_key = self.get_credential_cache_key(device)
+        with self.cache_lock:
+            if self.device_credentials.get(device.get('id')) == credential['name']:
+                del self.device_credentials[device.get('id')]
+            cached = self.credential_cache.get(cache_key)
+            if cached and cached['name'] == credential['name']:
+                del self.credential_cache[cache_key]
+        logging.info(f"[{device.get('device_name')}] Invalidated cached credential '{credential['name']}' "
+                     f"after authentication failure")
+
+    def _is_auth_failure(self, error: Exception) -> bool:
+        """Whether a connection error was an authentication rejection rather than a timeout or transport error"""
+        if 'authentication' in type(error).__name__.lower():
+            return True
+        message = str(error).lower()
+        return any(marker in message for marker in (
+            'authentication', 'auth fail', 'permission denied', 'login failed', 'access denied',
+            'invalid credentials', 'bad password'
+        ))
+
+    def get_enabled_methods(self) -> List[str]:
+        """Collection methods enabled in configuration, get_facts first"""
+        collection_methods = self.config.get('collection_methods', {})
+        return self._order_methods([name for name, enabled in collection_methods.items() if enabled])
+
+    def _order_methods(self, methods: List[str]) -> List[str]:
+        """Unique method list with get_facts first and the rest in alphabetical order for consistency"""
+        remaining = set(methods)
+        ordered = []
+        if 'get_facts' in remaining:
+            ordered.append('get_facts')
+            remaining.remove('get_facts')
+        ordered.extend(sorted(remaining))
+        return ordered
+
+    def config_check_commands(self, napalm_driver: str) -> List[str]:
+        """Change marker commands for a driver, empty when the pre-check is disabled"""
+        check = self.config.get('config_change_check') or {}
+        if not check.get('enabled', False):
+            return []
+        return (check.get('commands') or {}).get(napalm_driver, [])
+
+    def load_config_markers(self, devices: List[Dict]):
+        """Change markers stored with each device's latest running config"""
+        if not self.config.get('config_change_check', {}).get('enabled', False):
+            return
+
+        wanted = {device.get('id') for device in devices}
+        conn = self.get_database_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT device_id, change_marker FROM device_configs
+                WHERE id IN (SELECT MAX(id) FROM device_configs WHERE config_type = 'running' GROUP BY device_id)
+                AND change_marker IS NOT NULL
+            """)
+            self.config_markers = {row[0]: row[1] for row in cursor.fetchall() if row[0] in wanted}
+        except sqlite3.OperationalError as e:
+            # Databases created before change markers existed have no column until the importer migrates them
+            logging.warning(f"Config change markers unavailable: {e}")
+            self.config_markers = {}
+        finally:
+            conn.close()
+
+        logging.info(f"Config change check: stored markers for {len(self.config_markers)} devices")
+
+    def evaluate_config_marker(self, device: Dict, command: str, output: str) -> Dict:
+        """Build the config_check record for a marker command's output"""
+        marker = hashlib.sha256(f"{command}\n{output.strip()}".encode()).hexdigest()
+        return {
+            'command': command,
+            'marker': marker,
+            'unchanged': self.config_markers.get(device.get('id')) == marker
+        }
+
+    def check_config_change(self, device_conn, device: Dict, napalm_driver: str) -> Optional[Dict]:
+        """Run the driver's marker commands over an open NAPALM session; None when no command answered"""
+        device_name = device.get('device_name', device.get('primary_ip'))
+        for command in self.config_check_commands(napalm_driver):
+            try:
+                output = device_conn.cli([command]).get(command, '')
+            except Exception as e:
+                logging.debug(f"[{device_name}] Config marker command '{command}' failed: {str(e)}")
+                continue
+            if output.strip() and not re.search(r"^\s*% ?(Invalid|Incomplete|Ambiguous)|syntax error", output, re.M):
+                return self.evaluate_config_marker(device, command, output)
+        return None
+
+    def collect_single_device_sequential(self, device: Dict, credentials: List[Dict],
+                                         methods: List[str] = None) -> Dict:
         """
         Collect all data from a single device sequentially in one thread.
         CORRECTED: Now produces identical JSON format to npcollector1.py
+        methods limits collection to the getters the scheduler found due; None collects every enabled method
         """
         device_ip = device['primary_ip']
         device_name = device.get('device_name', device_ip)
@@ -641,11 +1561,15 @@ echo "NAPALM database collector environment variables loaded"
         result = {
             'device_ip': device_ip,
             'device_name': device_name,
+            'site_code': device.get('site_code'),
+            'napalm_driver': self.get_napalm_driver(device),
             'success': False,
             'data': {},
             'errors': [],
             'credential_used': None,
             'credential_source': None,
+            'credential_attempts': 0,
+            'failure_type': None,
             'collection_time': datetime.now().isoformat(),
             'collection_duration': 0,
             'methods_collected': [],
@@ -653,20 +1577,17 @@ echo "NAPALM database collector environment variables loaded"
         }
 
         # Determine NAPALM driver
-        napalm_driver = self.get_napalm_driver(device)
+        napalm_driver = result['napalm_driver']
         if not napalm_driver:
             result['errors'].append(f"No NAPALM driver found for vendor: {device.get('vendor', 'unknown')}")
+            result['failure_type'] = 'no_driver'
             self.stats.end_device_collection(device_ip)
             return result
 
         logging.info(f"[{device_name}] Starting sequential collection using driver: {napalm_driver}")
 
-        # Prepare credentials to try - SIMPLIFIED to match JSON collector
-        credentials_to_try = []
-
-        # Sort credentials by priority (same as JSON collector)
-        for cred in sorted(credentials, key=lambda x: x.get('priority', 999)):
-            credentials_to_try.append((cred, 'tested'))
+        # Credentials that worked for this device or its bucket go first, then the rest by priority
+        credentials_to_try = self.order_credentials(device, credentials)
 
         # Try to establish connection with working credentials
         device_conn = None
@@ -674,6 +1595,8 @@ echo "NAPALM database collector environment variables loaded"
         credential_source = None
 
         for cred, source in credentials_to_try:
+            result['credential_attempts'] += 1
+            open_started = time.time()
             try:
                 logging.info(f"[{device_name}] Attempting connection with {source} credentials: {cred['name']}")
 
@@ -701,15 +1624,22 @@ echo "NAPALM database collector environment variables loaded"
 
                 # Test connection
                 device_conn.open()
+                self.stats.record_timing(napalm_driver, 'connect', time.time() - open_started)
                 logging.info(f"[{device_name}] Successfully connected with {source} credentials: {cred['name']}")
 
                 working_credential = cred
                 credential_source = source
+                self.remember_credential(device, cred)
                 break
 
             except (ConnectionException, CommandErrorException) as e:
                 logging.warning(f"[{device_name}] Failed to connect with {source} credentials {cred['name']}: {str(e)}")
                 result['errors'].append(f"Credential {cred['name']} ({source}): {str(e)}")
+                auth_failure = self._is_auth_failure(e)
+                self.stats.record_timing(napalm_driver, 'auth_failed' if auth_failure else 'connect_failed',
+                                         time.time() - open_started, success=False)
+                if source != 'tested' and auth_failure:
+                    self.forget_credential(device, cred)
 
                 if device_conn:
                     try:
@@ -717,11 +1647,21 @@ echo "NAPALM database collector environment variables loaded"
                     except:
                         pass
                     device_conn = None
+                if not auth_failure:
+                    # Timeouts and refused connections are not credential specific - the next
+                    # credential would only wait out the same timeout; the retry queue tries again later
+                    result['failure_type'] = 'unreachable'
+                    break
                 continue
 
             except Exception as e:
                 logging.error(f"[{device_name}] Unexpected error with credentials {cred['name']}: {str(e)}")
                 result['errors'].append(f"Unexpected error: {str(e)}")
+                auth_failure = self._is_auth_failure(e)
+                self.stats.record_timing(napalm_driver, 'auth_failed' if auth_failure else 'connect_failed',
+                                         time.time() - open_started, success=False)
+                if source != 'tested' and auth_failure:
+                    self.forget_credential(device, cred)
                 if device_conn:
                     try:
                         device_conn.close()
@@ -732,28 +1672,15 @@ echo "NAPALM database collector environment variables loaded"
 
         # If no connection established, return failure
         if not device_conn or not working_credential:
+            result['failure_type'] = result['failure_type'] or 'auth'
             logging.error(f"[{device_name}] Could not establish connection with any credentials")
             self.stats.end_device_collection(device_ip)
             return result
 
         # Now collect data sequentially using the established connection
         try:
-            # Get collection methods from configuration and build unique list
-            collection_methods = self.config.get('collection_methods', {})
-            enabled_methods = set()
-
-            for method_name, enabled in collection_methods.items():
-                if enabled:
-                    enabled_methods.add(method_name)
-
-            # Convert to ordered list, prioritizing get_facts first
-            methods_to_collect = []
-            if 'get_facts' in enabled_methods:
-                methods_to_collect.append('get_facts')
-                enabled_methods.remove('get_facts')
-
-            # Add remaining methods in alphabetical order for consistency
-            methods_to_collect.extend(sorted(enabled_methods))
+            # Use the scheduled getters when given, otherwise every enabled method
+            methods_to_collect = self._order_methods(methods if methods is not None else self.get_enabled_methods())
 
             logging.info(
                 f"[{device_name}] Will collect {len(methods_to_collect)} methods sequentially: {', '.join(methods_to_collect)}")
@@ -764,6 +1691,26 @@ echo "NAPALM database collector environment variables loaded"
                 try:
                     logging.info(f"[{device_name}] Collecting {method_name}")
 
+                    # A matching change marker means the stored config is current - skip the full fetch
+                    if method_name == 'get_config' and self.config_check_commands(napalm_driver):
+                        config_check = self.check_config_change(device_conn, device, napalm_driver)
+                        self.stats.record_timing(napalm_driver, 'config_check', time.time() - method_start_time,
+                                                 success=config_check is not None)
+                        if config_check:
+                            result['config_check'] = config_check
+                            if config_check['unchanged']:
+                                method_duration = time.time() - method_start_time
+                                result['methods_collected'].append({
+                                    'method': method_name,
+                                    'duration': method_duration,
+                                    'success': True,
+                                    'unchanged': True
+                                })
+                                logging.info(f"[{device_name}] Config unchanged per '{config_check['command']}' "
+                                             f"- skipped get_config in {method_duration:.2f}s")
+                                continue
+                        method_start_time = time.time()
+
                     # Get the method from the device connection
                     method_func = getattr(device_conn, method_name, None)
                     if not method_func:
@@ -772,9 +1719,8 @@ echo "NAPALM database collector environment variables loaded"
                     # Execute the method and get RAW NAPALM data
                     method_data = method_func()
 
-                    # Calculate timing and data size
                     method_duration = time.time() - method_start_time
-                    data_size = len(json.dumps(method_data, default=str)) if method_data else 0
+                    self.stats.record_timing(napalm_driver, method_name, method_duration)
 
                     # Store the RAW NAPALM result without modification
                     result['data'][method_name] = method_data
@@ -783,7 +1729,6 @@ echo "NAPALM database collector environment variables loaded"
                     result['methods_collected'].append({
                         'method': method_name,
                         'duration': method_duration,
-                        'data_size': data_size,
                         'success': True
                     })
 
@@ -798,10 +1743,11 @@ echo "NAPALM database collector environment variables loaded"
                                 f"[{device_name}] Updated device name from facts: {device_ip} -> {clean_hostname}")
 
                     logging.info(
-                        f"[{device_name}] Successfully collected {method_name} in {method_duration:.2f}s ({data_size} bytes)")
+                        f"[{device_name}] Successfully collected {method_name} in {method_duration:.2f}s")
 
                 except Exception as method_error:
                     method_duration = time.time() - method_start_time
+                    self.stats.record_timing(napalm_driver, method_name, method_duration, success=False)
                     result['methods_failed'].append({
                         'method': method_name,
                         'duration': method_duration,
@@ -829,8 +1775,10 @@ echo "NAPALM database collector environment variables loaded"
         finally:
             # Always close the connection
             if device_conn:
+                close_started = time.time()
                 try:
                     device_conn.close()
+                    self.stats.record_timing(napalm_driver, 'close', time.time() - close_started)
                     logging.debug(f"[{device_name}] Connection closed")
                 except Exception as e:
                     logging.warning(f"[{device_name}] Error closing connection: {str(e)}")
@@ -972,7 +1920,9 @@ echo "NAPALM database collector environment variables loaded"
 
         return filtered_devices
 
-    def generate_json_compatible_summary(self, results: List[Dict], devices: List[Dict]) -> Dict:
+    def generate_json_compatible_summary(self, results: List[Dict], devices: List[Dict],
+                                         writer_summary: Dict = None, schedule_summary: Dict = None,
+                                         engine_summary: Dict = None) -> Dict:
         """Generate a summary compatible with JSON scan file format"""
 
         # Create devices dict in the format expected by the loader
@@ -993,10 +1943,11 @@ echo "NAPALM database collector environment variables loaded"
             }
             devices_dict[device['primary_ip']] = device_dict
 
-        # Calculate summary statistics
-        total_devices = len(results)
-        successful = sum(1 for r in results if r['success'])
-        failed = total_devices - successful
+        # Summary statistics come from the counters streamed in during collection
+        counters = self.stats.counters
+        total_devices = counters['total']
+        successful = counters['successful']
+        failed = counters['failed']
 
         # Create JSON-compatible summary
         summary = {
@@ -1014,11 +1965,24 @@ echo "NAPALM database collector environment variables loaded"
                 'failed_collections': failed,
                 'success_rate': (successful / total_devices * 100) if total_devices > 0 else 0,
                 'average_device_time': self.stats.get_average_device_time(),
-                'max_workers': self.max_workers
+                'max_workers': self.max_workers,
+                'methods_collected': counters['methods_collected'],
+                'methods_failed': counters['methods_failed'],
+                'first_attempt_logins': counters['first_attempt_logins'],
+                'credential_attempts': counters['credential_attempts']
             },
+            'site_statistics': self.stats.get_site_statistics(),
+            'performance': self.stats.get_performance_breakdown(),
             'collection_results': results
         }
 
+        if writer_summary:
+            summary['writer_summary'] = writer_summary
+        if schedule_summary:
+            summary['schedule_summary'] = schedule_summary
+        if engine_summary:
+            summary['engine_summary'] = engine_summary
+
         return summary
 
     def print_credential_cache_stats(self):
@@ -1031,8 +1995,118 @@ echo "NAPALM database collector environment variables loaded"
             else:
                 logging.info("Credential cache is empty")
 
-    def run_collection(self, filter_args: Dict = None):
-        """Main collection runner - one thread per device, sequential collection within each thread"""
+    def record_result(self, device: Dict, methods: List[str], result: Dict):
+        """
+        Count a finished device and queue a deferred retry when its connection timed out
+        or some getters failed, instead of retrying inline on the worker
+        """
+        attempt, reason = self.retry_queue.attempts.pop(device['primary_ip'], (0, None))
+        if reason:
+            result['retry_attempt'] = attempt
+            result['retry_reason'] = reason
+        self.stats.add_result(result)
+        if reason != 'getters' or result.get('credential_used'):
+            # A device that answered earlier in the run is not unreachable because a getter retry timed out
+            self.final_outcomes[device.get('id')] = result
+
+        if result.get('failure_type') == 'unreachable':
+            if reason == 'getters':
+                # The device answered before, so retry only what is still missing
+                self.retry_queue.push(device, methods, attempt + 1, 'getters')
+            else:
+                self.retry_queue.push(device, methods, attempt + 1, 'connection')
+        elif result.get('success') and result.get('methods_failed') and self.retry_queue.retry_getters:
+            failed = [m['method'] for m in result['methods_failed']]
+            self.retry_queue.push(device, failed, attempt + 1, 'getters')
+
+    def site_budget(self, global_limit: int, default_site_limit: int = None) -> SiteBudget:
+        """Site concurrency budget from site_concurrency config under a global session cap"""
+        return SiteBudget(self.config, global_limit, default_site_limit)
+
+    def _collect_and_enqueue(self, writer: CollectionWriter, device: Dict, credentials: List[Dict],
+                             methods: List[str] = None) -> Dict:
+        """Collect one device on a worker thread and hand the full result to the writer stage"""
+        result = self.collect_single_device_sequential(device, credentials, methods)
+        writer.put(result)
+        return {k: v for k, v in result.items() if k != 'data'}
+
+    def plan_collection(self, devices: List[Dict], ignore_schedule: bool = False,
+                        include_unreachable: bool = False) -> Tuple[List[Tuple[Dict, List[str]]], Dict]:
+        """
+        Pair each device with the getters due for it, dropping devices with nothing due and
+        devices inside an unreachable skip window
+        """
+        methods = self.get_enabled_methods()
+
+        unreachable = {}
+        if not include_unreachable:
+            conn = self.get_database_connection()
+            try:
+                unreachable = ReachabilityTracker(self.config).load_skipped(conn)
+            except sqlite3.Error as e:
+                logging.warning(f"Could not load device reachability: {str(e)}")
+            finally:
+                conn.close()
+        skipped_unreachable = [device for device in devices if device.get('id') in unreachable]
+        if skipped_unreachable:
+            devices = [device for device in devices if device.get('id') not in unreachable]
+            logging.info(f"Skipping {len(skipped_unreachable)} devices marked unreachable "
+                         f"(use --include-unreachable to try them)")
+            for device in skipped_unreachable:
+                logging.debug(f"Skipping {device['device_name']} - unreachable until "
+                              f"{unreachable[device['id']]['skip_until']}")
+
+        scheduler = CollectionScheduler(self.config)
+        if ignore_schedule:
+            scheduler.enabled = False
+
+        if scheduler.enabled:
+            conn = self.get_database_connection()
+            try:
+                scheduler.load_last_success(conn, methods)
+            finally:
+                conn.close()
+
+        now = datetime.now()
+        plan = []
+        methods_scheduled = {method: 0 for method in methods}
+        for device in devices:
+            due = scheduler.due_methods(device, methods, now)
+            if not due:
+                logging.debug(f"Skipping {device['device_name']} - no getters due")
+                continue
+            plan.append((device, due))
+            for method in due:
+                methods_scheduled[method] += 1
+
+        schedule_summary = {
+            'enabled': scheduler.enabled,
+            'devices_due': len(plan),
+            'devices_skipped': len(devices) - len(plan),
+            'devices_unreachable': len(skipped_unreachable),
+            'methods_scheduled': methods_scheduled
+        }
+        if scheduler.enabled:
+            logging.info(f"Collection schedule: {len(plan)} devices have getters due, "
+                         f"{schedule_summary['devices_skipped']} skipped")
+            for method, count in methods_scheduled.items():
+                interval = scheduler.interval_for(method)
+                cadence = f"every {interval} min" if interval else "every run"
+                logging.info(f"  {method}: due on {count} devices ({cadence})")
+
+        return plan, schedule_summary
+
+    def run_collection(self, filter_args: Dict = None, write_db: bool = None, capture_files: bool = None,
+                       ignore_schedule: bool = False, use_async: bool = None, include_unreachable: bool = False):
+        """
+        Main collection runner - one thread per device, sequential collection within each thread.
+        Results stream through a single writer thread; write_db and capture_files override the
+        stream_to_database and capture_files config settings when given. Only getters due under
+        collection_schedule are collected unless ignore_schedule is set. use_async overrides
+        async_collection.enabled to run the asyncio SSH engine instead of the thread pool.
+        Timed-out devices and failed getters are retried with backoff after the first pass;
+        devices marked unreachable by earlier runs are skipped unless include_unreachable is set
+        """
 
         # Start collection timing
         self.stats.start_collection()
@@ -1057,73 +2131,69 @@ echo "NAPALM database collector environment variables loaded"
             logging.error("No credentials configured")
             return
 
-        logging.info(f"Starting collection from {len(devices)} devices using {self.max_workers} threads")
-        logging.info("Each device will be processed sequentially within its own thread")
-
-        # Collect data with one thread per device
-        results = []
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit one task per device - each will do sequential collection
-            # Use device IP as key to ensure no duplicates
-            submitted_devices = set()
-            future_to_device = {}
-
-            for device in devices:
-                device_ip = device['primary_ip']
-                device_name = device['device_name']
+        plan, schedule_summary = self.plan_collection(devices, ignore_schedule, include_unreachable)
+        self.load_credential_affinity([device for device, _ in plan], credentials)
+        self.load_config_markers([device for device, _ in plan])
+        if not plan:
+            logging.info("No getters due on any device - nothing to collect")
 
-                # Check for duplicate devices by IP
-                if device_ip in submitted_devices:
-                    logging.warning(
-                        f"Skipping duplicate device {device_name} ({device_ip}) - already submitted for collection")
-                    continue
-
-                # Submit the task
-                future = executor.submit(self.collect_single_device_sequential, device, credentials)
-                future_to_device[future] = device
-                submitted_devices.add(device_ip)
-                logging.info(f"Submitted collection task for {device_name} ({device_ip})")
-
-            logging.info(f"Submitted {len(future_to_device)} unique collection tasks")
+        logging.info(f"Starting collection from {len(plan)} devices using {self.max_workers} threads")
+        logging.info("Each device will be processed sequentially within its own thread")
 
-            # Process completed tasks
-            for future in as_completed(future_to_device):
-                device = future_to_device[future]
-                try:
-                    result = future.result()
-                    results.append(result)
-                    self.stats.add_result(result)
-
-                    # Save the collected data
-                    if result['success']:
-                        self.save_device_data(result)
-                        logging.info(
-                            f"Saved data for {result['device_name']} - {len(result['methods_collected'])} methods")
-                    else:
-                        logging.warning(f"No data to save for {result['device_name']} - collection failed")
+        if write_db is None:
+            write_db = self.config.get('stream_to_database', False)
+        if capture_files is None:
+            capture_files = self.config.get('capture_files', True)
+        if not write_db and not capture_files:
+            logging.warning("Database streaming and file capture are both disabled - collected data will be discarded")
+
+        writer = CollectionWriter(self, write_db=write_db, capture_files=capture_files,
+                                  queue_size=self.config.get('writer_queue_size') or self.max_workers * 2)
+        writer.start()
+
+        reporter = None
+        metrics_config = self.config.get('metrics', {})
+        if metrics_config.get('enabled', True):
+            snapshot_file = metrics_config.get('snapshot_file', 'collection_metrics.jsonl')
+            reporter = MetricsReporter(self.stats, self.capture_dir / snapshot_file if snapshot_file else None,
+                                       metrics_config.get('snapshot_interval_seconds', 15))
+            reporter.start()
+
+        self.retry_queue = RetryQueue(self.config)
+        self.final_outcomes = {}
+        if use_async is None:
+            use_async = self.config.get('async_collection', {}).get('enabled', False)
+
+        engine_summary = None
+        try:
+            engine_summary = self._dispatch_pass(plan, credentials, writer, use_async)
+
+            # Deferred retries run once the first pass has moved through every device
+            while self.retry_queue:
+                wait_seconds = self.retry_queue.seconds_until_due()
+                if wait_seconds >= 1:
+                    logging.info(f"{len(self.retry_queue)} retries queued - next in {wait_seconds:.0f}s")
+                time.sleep(wait_seconds)
+                retry_plan = self.retry_queue.pop_due()
+                logging.info(f"Retry pass: {len(retry_plan)} devices")
+                retry_summary = self._dispatch_pass(retry_plan, credentials, writer, use_async)
+                if retry_summary:
+                    engine_summary = {k: (engine_summary or {}).get(k, 0) + v for k, v in retry_summary.items()}
+        finally:
+            # Wait for the writer to commit everything still queued
+            writer.close()
 
-                except Exception as e:
-                    logging.error(f"Error processing device {device['device_name']}: {str(e)}")
-                    # Create failed result entry
-                    failed_result = {
-                        'device_ip': device['primary_ip'],
-                        'device_name': device['device_name'],
-                        'database_id': device['id'],
-                        'success': False,
-                        'errors': [f"Thread execution error: {str(e)}"],
-                        'collection_time': datetime.now().isoformat(),
-                        'methods_collected': [],
-                        'methods_failed': []
-                    }
-                    results.append(failed_result)
-                    self.stats.add_result(failed_result)
+        schedule_summary['retries'] = dict(self.retry_queue.counters)
+        schedule_summary['newly_unreachable'] = self.update_reachability()
 
         # End collection timing
         self.stats.end_collection()
+        if reporter:
+            reporter.stop()
 
         # Generate JSON-compatible summary
-        summary = self.generate_json_compatible_summary(results, devices)
+        summary = self.generate_json_compatible_summary(self.stats.collection_results, devices, writer.summary(),
+                                                        schedule_summary, engine_summary)
 
         # Log final summary with credential cache stats
         self.print_credential_cache_stats()
@@ -1131,9 +2201,147 @@ echo "NAPALM database collector environment variables loaded"
         logging.info(f"Success: {summary['collection_summary']['successful_collections']}, "
                      f"Failed: {summary['collection_summary']['failed_collections']}")
         logging.info(f"Average time per device: {summary['collection_summary']['average_device_time']:.2f}s")
+        logging.info(f"Logged in on first credential: {summary['collection_summary']['first_attempt_logins']}, "
+                     f"total login attempts: {summary['collection_summary']['credential_attempts']}")
+        slowest_sites = sorted(summary['site_statistics'].items(), key=lambda kv: -kv[1]['elapsed_seconds'])[:5]
+        for site, site_stats in slowest_sites:
+            logging.info(f"Site {site}: {site_stats['completed']}/{site_stats['devices']} devices "
+                         f"({site_stats['retries']} retries) in "
+                         f"{site_stats['elapsed_seconds']:.1f}s, {site_stats['max_concurrent_sessions']} concurrent "
+                         f"max, average wait {site_stats['average_queue_wait']:.1f}s")
+        retries = schedule_summary['retries']
+        if retries['connection_retries'] or retries['getter_retries'] or schedule_summary['newly_unreachable']:
+            logging.info(f"Retries: {retries['connection_retries']} connection, {retries['getter_retries']} getter, "
+                         f"{retries['exhausted']} gave up; {schedule_summary['newly_unreachable']} devices now "
+                         f"skipped as unreachable")
+        if write_db:
+            logging.info(f"CMDB writes: {writer.counters['database_writes']}, "
+                         f"errors: {writer.counters['database_errors']}, "
+                         f"max queue depth: {writer.max_queue_depth}/{writer.queue.maxsize}")
 
         return summary
 
+    def _dispatch_pass(self, plan: List[Tuple[Dict, List[str]]], credentials: List[Dict],
+                       writer: CollectionWriter, use_async: bool) -> Optional[Dict]:
+        if use_async:
+            return self._dispatch_async_collection(plan, credentials, writer)
+        self._dispatch_collection(plan, credentials, writer)
+        return None
+
+    def update_reachability(self) -> int:
+        """Record this run's final outcomes so persistently unreachable devices are skipped next time"""
+        conn = self.get_database_connection()
+        try:
+            return ReachabilityTracker(self.config).record_outcomes(conn, self.final_outcomes)
+        except sqlite3.Error as e:
+            logging.warning(f"Could not update device reachability: {str(e)}")
+            return 0
+        finally:
+            conn.close()
+
+    def _dispatch_async_collection(self, plan: List[Tuple[Dict, List[str]]], credentials: List[Dict],
+                                   writer: CollectionWriter) -> Optional[Dict]:
+        """Run the asyncio SSH engine, falling back to the thread pool when its dependencies are missing"""
+        from async_collector import AsyncCollectionEngine, ASYNC_ENGINE_AVAILABLE
+
+        if not ASYNC_ENGINE_AVAILABLE:
+            logging.warning("Async engine needs asyncssh and ntc_templates (pip install asyncssh ntc_templates) "
+                            "- using the NAPALM thread pool")
+            self._dispatch_collection(plan, credentials, writer)
+            return None
+
+        engine = AsyncCollectionEngine(self, credentials, self.config.get('async_collection', {}))
+        return engine.run(plan, writer)
+
+    def _dispatch_collection(self, plan: List[Tuple[Dict, List[str]]], credentials: List[Dict],
+                             writer: CollectionWriter):
+        """
+        Run one collection task per unique device under the site budget: sites are served
+        round-robin and a device only starts while its site is under its session limit
+        """
+        budget = self.site_budget(self.max_workers)
+
+        # Use device IP as key to ensure no duplicates
+        submitted_devices = set()
+        unique_plan = []
+        for device, methods in plan:
+            if device['primary_ip'] in submitted_devices:
+                logging.warning(f"Skipping duplicate device {device['device_name']} ({device['primary_ip']}) "
+                                f"- already submitted for collection")
+                continue
+            submitted_devices.add(device['primary_ip'])
+            unique_plan.append((device, methods))
+
+        queues = budget.queues(unique_plan) if budget.enabled else OrderedDict([('ALL', deque(unique_plan))])
+        for site, site_queue in queues.items():
+            for device, _ in site_queue:
+                self.stats.site_enqueued(budget.site_of(device), device['primary_ip'])
+        active = {site: 0 for site in queues}
+        logging.info(f"Dispatching {len(unique_plan)} devices across {len(queues)} sites, "
+                     f"{budget.global_limit} sessions max, {budget.default_site_limit} per site by default")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_device = {}
+
+            while queues or future_to_device:
+                # Start as many devices as the global and per-site limits allow, one site at a time
+                next_ready = None
+                started = True
+                while started and queues and len(future_to_device) < budget.global_limit:
+                    started = False
+                    for site in list(queues):
+                        if len(future_to_device) >= budget.global_limit:
+                            break
+                        if active[site] >= budget.limit_for(site):
+                            continue
+                        delay = budget.pacing_delay(site)
+                        if delay:
+                            next_ready = delay if next_ready is None else min(next_ready, delay)
+                            continue
+
+                        device, methods = queues[site].popleft()
+                        if not queues[site]:
+                            del queues[site]
+                        else:
+                            # Served sites go to the back so the next pass starts with another site
+                            queues.move_to_end(site)
+                        active[site] += 1
+                        budget.mark_started(site)
+                        self.stats.site_started(budget.site_of(device), device['primary_ip'])
+
+                        future = executor.submit(self._collect_and_enqueue, writer, device, credentials, methods)
+                        future_to_device[future] = (site, device, methods)
+                        logging.info(f"Submitted collection task for {device['device_name']} ({device['primary_ip']})")
+                        started = True
+
+                if not future_to_device:
+                    # Everything queued is waiting out connection pacing
+                    time.sleep(next_ready or 0.05)
+                    continue
+
+                done, _ = wait(future_to_device, timeout=next_ready, return_when=FIRST_COMPLETED)
+                for future in done:
+                    site, device, methods = future_to_device.pop(future)
+                    active[site] -= 1
+                    try:
+                        result = future.result()
+
+                    except Exception as e:
+                        logging.error(f"Error processing device {device['device_name']}: {str(e)}")
+                        # Create failed result entry
+                        result = {
+                            'device_ip': device['primary_ip'],
+                            'device_name': device['device_name'],
+                            'database_id': device['id'],
+                            'success': False,
+                            'errors': [f"Thread execution error: {str(e)}"],
+                            'collection_time': datetime.now().isoformat(),
+                            'methods_collected': [],
+                            'methods_failed': []
+                        }
+                    self.stats.site_finished(budget.site_of(device), device['primary_ip'], result)
+                    self.record_result(device, methods, result)
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -1171,6 +2379,16 @@ Filter Examples:
   # Complex multi-filter example
   python db_collector.py --site FRC USC --vendor cisco --role core --model catalyst
 
+Streaming Writes:
+  # Commit each device into the database as it finishes, skipping capture files
+  python db_collector.py --site FRC --write-db --no-capture
+
+  # Collect every enabled getter even if collection_schedule says it is not due
+  python db_collector.py --site FRC --ignore-schedule
+
+  # Hundreds of concurrent SSH sessions in one event loop, NAPALM threads for other drivers
+  python db_collector.py --async-engine --workers 20
+
 Filter Types:
   --name      : Filter by device name (supports multiple values)
   --site      : Filter by site code (supports multiple values) 
@@ -1184,6 +2402,15 @@ Filter Types:
     parser.add_argument('--config', default='db_collector_config.yaml', help='Configuration file')
     parser.add_argument('--database', default='napalm_cmdb.db', help='Database path')
     parser.add_argument('--workers', type=int, default=10, help='Maximum concurrent workers')
+    parser.add_argument('--write-db', action='store_true',
+                        help='Commit each device into the database as it is collected (no separate import step)')
+    parser.add_argument('--no-capture', action='store_true', help='Do not write the capture archive or files')
+    parser.add_argument('--ignore-schedule', action='store_true',
+                        help='Collect every enabled getter regardless of collection_schedule intervals')
+    parser.add_argument('--async-engine', action='store_true',
+                        help='Collect over asyncio SSH sessions (ios/eos), NAPALM threads for other drivers')
+    parser.add_argument('--include-unreachable', action='store_true',
+                        help='Also try devices skipped after repeated unreachable runs')
 
     # New specific filter options
     parser.add_argument('--name', nargs='+', help='Filter by device name (supports multiple values)')
@@ -1306,7 +2533,12 @@ echo "NAPALM database collector environment variables template created"
         # Remove None values
         filter_args = {k: v for k, v in filter_args.items() if v is not None}
 
-        collector.run_collection(filter_args if filter_args else None)
+        collector.run_collection(filter_args if filter_args else None,
+                                 write_db=True if args.write_db else None,
+                                 capture_files=False if args.no_capture else None,
+                                 ignore_schedule=args.ignore_schedule,
+                                 include_unreachable=args.include_unreachable,
+                                 use_async=True if args.async_engine else None)
 
     except Exception as e:
         print(f"Error: {str(e)}")
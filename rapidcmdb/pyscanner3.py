@@ -13,10 +13,22 @@ import sys
 import time
 import socket
 import os
+import re
+import logging
+import sqlite3
+import hashlib
+import base64
+import zlib
+import multiprocessing
+import queue as queue_module
+import contextvars
+import dataclasses
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any, Tuple, Set
 from dataclasses import dataclass, asdict
 from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 # Modern SNMP library
 try:
@@ -41,6 +53,7 @@ class SNMPCredentials:
     timeout: int = 3  # Reduced from 5 to 3 seconds
     retries: int = 1  # Reduced from 2 to 1
     try_v2c_fallback: bool = True  # Try v2c if v3 fails
+    port: int = 161  # Agent UDP port (non-standard ports are mostly for lab/simulator use)
 
     def __post_init__(self):
         if self.communities is None:
@@ -57,6 +70,17 @@ class ScanConfig:
     tcp_check_timeout: int = 2  # TCP port check timeout
     tcp_check_ports: List[int] = None  # Will default to [20,21,22,25,53,80,161,443,993,995]
     skip_tcp_check: bool = False  # Option to disable TCP pre-filtering
+    stream_queue_size: int = 0  # Streaming mode work queue bound (0 = 2x concurrent_scans)
+    max_varbinds: int = 24  # Max OIDs per SNMP GET PDU for fingerprint collection
+    credential_cache: str = ""  # Per-subnet SNMP credential memory file ("" = disabled)
+    credential_prefix_len: int = 24  # Subnet size the credential memory is keyed by
+    checkpoint_interval: int = 15  # Seconds between streaming-mode checkpoint saves
+    adaptive_timeouts: bool = False  # Derive TCP/SNMP timeouts from measured RTT
+    max_pps: float = 0  # Global egress packets/sec for TCP SYNs + SNMP requests (0 = unlimited)
+    subnet_pps: float = 0  # Per-/24 egress packets/sec (0 = unlimited)
+    rate_max_wait: float = 0  # Drop probes that would wait longer than this (0 = never drop)
+    cmdb_path: str = ""  # Stream devices straight into this CMDB database ("" = disabled)
+    cmdb_batch_size: int = 200  # Devices per CMDB upsert transaction
 
     def __post_init__(self):
         if self.tcp_check_ports is None:
@@ -64,11 +88,167 @@ class ScanConfig:
             self.tcp_check_ports = [20, 21, 22, 25, 53, 80, 161, 443, 515, 631, 993, 995, 9100]
 
 
+class RTTEstimator:
+    """
+    Smoothed round-trip estimates per host and per subnet (RFC 6298 style EWMA + variance)
+    Fed by TCP connect latencies from the pre-filter; used to shrink TCP and SNMP timeouts
+    on fast segments while slow WAN sites keep the configured budget
+    """
+
+    ALPHA = 0.125  # SRTT gain
+    BETA = 0.25  # RTTVAR gain
+    K = 4  # RTO = SRTT + K * RTTVAR
+    MAX_HOSTS = 4096  # Host estimates are only needed while a host is in flight
+
+    def __init__(self, min_timeout: float = 0.5, snmp_allowance: float = 0.5,
+                 min_snmp_timeout: float = 1.0, prefix_len: int = 24):
+        self.min_timeout = min_timeout
+        self.snmp_allowance = snmp_allowance  # Agent processing time on top of network RTT
+        self.min_snmp_timeout = min_snmp_timeout
+        self.prefix_len = prefix_len
+        self.hosts: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.subnets: Dict[str, List[float]] = {}
+        self.samples = 0
+
+    def _subnet_key(self, ip_address: str) -> str:
+        prefix_len = self.prefix_len if ':' not in ip_address else 64
+        return str(ipaddress.ip_network(f"{ip_address}/{prefix_len}", strict=False))
+
+    def _update(self, estimate: Optional[List[float]], rtt: float) -> List[float]:
+        if estimate is None:
+            return [rtt, rtt / 2]
+        srtt, rttvar = estimate
+        rttvar = (1 - self.BETA) * rttvar + self.BETA * abs(srtt - rtt)
+        srtt = (1 - self.ALPHA) * srtt + self.ALPHA * rtt
+        return [srtt, rttvar]
+
+    def add_sample(self, ip_address: str, rtt: float):
+        """Record one measured round trip (seconds) for a host"""
+        self.samples += 1
+        self.hosts[ip_address] = self._update(self.hosts.get(ip_address), rtt)
+        self.hosts.move_to_end(ip_address)
+        if len(self.hosts) > self.MAX_HOSTS:
+            self.hosts.popitem(last=False)
+        subnet = self._subnet_key(ip_address)
+        self.subnets[subnet] = self._update(self.subnets.get(subnet), rtt)
+
+    def rto(self, ip_address: str) -> Optional[float]:
+        """Retransmission timeout from the host estimate, else its subnet's, else None"""
+        estimate = self.hosts.get(ip_address)
+        if estimate is None:
+            estimate = self.subnets.get(self._subnet_key(ip_address))
+        if estimate is None:
+            return None
+        srtt, rttvar = estimate
+        return srtt + self.K * rttvar
+
+    def tcp_timeout(self, ip_address: str, configured: float) -> float:
+        """TCP pre-filter timeout - the subnet estimate, never above the configured value"""
+        rto = self.rto(ip_address)
+        if rto is None:
+            return configured
+        return min(configured, max(self.min_timeout, rto))
+
+    def snmp_params(self, ip_address: str, timeout: float, retries: int) -> Tuple[float, int]:
+        """
+        SNMP (timeout, retries) for a host
+        A shortened timeout buys one extra retry, so loss on a fast link is still covered
+        """
+        rto = self.rto(ip_address)
+        if rto is None:
+            return timeout, retries
+        adaptive = min(timeout, max(self.min_snmp_timeout, rto + self.snmp_allowance))
+        if adaptive * 2 <= timeout:
+            retries += 1
+        return round(adaptive, 3), retries
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations - the caller sleeps off any debt"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Take one token; returns seconds to wait before it may be used"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        self.tokens += 1
+
+
+class EgressRateLimiter:
+    """
+    Packet-rate limits for scanner egress: one global bucket plus one bucket per subnet
+    Shared by the TCP pre-filter (one token per SYN) and the SNMP collector (one per request)
+    so probe bursts stay under CoPP policers and firewall flood protection
+    """
+
+    def __init__(self, global_pps: float = 0, subnet_pps: float = 0, prefix_len: int = 24,
+                 max_wait: float = 0):
+        self.global_bucket = TokenBucket(global_pps, global_pps / 10) if global_pps > 0 else None
+        self.subnet_pps = subnet_pps
+        self.prefix_len = prefix_len
+        self.max_wait = max_wait  # 0 = always wait; otherwise probes needing longer are dropped
+        self.subnet_buckets: Dict[str, TokenBucket] = {}
+        self.sent = 0
+        self.throttled = 0
+        self.dropped = 0
+        self.wait_time = 0.0
+
+    def _subnet_bucket(self, ip_address: str) -> Optional[TokenBucket]:
+        if self.subnet_pps <= 0:
+            return None
+        prefix_len = self.prefix_len if ':' not in ip_address else 64
+        subnet = str(ipaddress.ip_network(f"{ip_address}/{prefix_len}", strict=False))
+        bucket = self.subnet_buckets.get(subnet)
+        if bucket is None:
+            bucket = self.subnet_buckets[subnet] = TokenBucket(self.subnet_pps, self.subnet_pps / 10)
+        return bucket
+
+    async def acquire(self, ip_address: str) -> bool:
+        """Wait for permission to send one packet to ip_address; False if it was dropped"""
+        buckets = [b for b in (self.global_bucket, self._subnet_bucket(ip_address)) if b]
+        if not buckets:
+            return True
+
+        now = time.monotonic()
+        wait = max(bucket.reserve(now) for bucket in buckets)
+        if self.max_wait and wait > self.max_wait:
+            for bucket in buckets:
+                bucket.refund()
+            self.dropped += 1
+            return False
+
+        if wait > 0:
+            self.throttled += 1
+            self.wait_time += wait
+            await asyncio.sleep(wait)
+        self.sent += 1
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "sent": self.sent,
+            "throttled": self.throttled,
+            "dropped": self.dropped,
+            "wait_time": round(self.wait_time, 2)
+        }
+
+
 class TCPPortChecker:
     """Fast TCP port connectivity checker"""
 
     @staticmethod
-    async def check_host_responsive(ip_address: str, ports: List[int], timeout: int = 2) -> bool:
+    async def check_host_responsive(ip_address: str, ports: List[int], timeout: float = 2,
+                                    rtt_estimator: Optional[RTTEstimator] = None,
+                                    rate_limiter: Optional[EgressRateLimiter] = None) -> bool:
         """
         Check if host is responsive on any of the specified ports
         Returns True if any port is open, False otherwise
@@ -79,7 +259,7 @@ class TCPPortChecker:
         # Create tasks for all port checks
         tasks = []
         for port in ports:
-            task = TCPPortChecker._check_single_port(ip_address, port, timeout)
+            task = TCPPortChecker._check_single_port(ip_address, port, timeout, rtt_estimator, rate_limiter)
             tasks.append(task)
 
         try:
@@ -97,12 +277,20 @@ class TCPPortChecker:
             return False
 
     @staticmethod
-    async def _check_single_port(ip_address: str, port: int, timeout: int) -> bool:
+    async def _check_single_port(ip_address: str, port: int, timeout: float,
+                                 rtt_estimator: Optional[RTTEstimator] = None,
+                                 rate_limiter: Optional[EgressRateLimiter] = None) -> bool:
         """Check if a single port is open"""
+        if rate_limiter and not await rate_limiter.acquire(ip_address):
+            return False
+
+        start = time.monotonic()
         try:
             # Create connection with timeout
             future = asyncio.open_connection(ip_address, port)
             reader, writer = await asyncio.wait_for(future, timeout=timeout)
+            if rtt_estimator:
+                rtt_estimator.add_sample(ip_address, time.monotonic() - start)
 
             # Close connection immediately
             writer.close()
@@ -113,7 +301,12 @@ class TCPPortChecker:
 
             return True
 
-        except (asyncio.TimeoutError, ConnectionRefusedError, OSError):
+        except ConnectionRefusedError:
+            # A RST is still a measured round trip
+            if rtt_estimator:
+                rtt_estimator.add_sample(ip_address, time.monotonic() - start)
+            return False
+        except (asyncio.TimeoutError, OSError):
             return False
         except Exception:
             return False
@@ -157,6 +350,62 @@ class StandardOIDs:
         return cls.ENTITY_MIB
 
 
+class PatternMatcher:
+    """
+    Single-pass multi-substring matcher for the lowercase fingerprint patterns
+    All patterns are compiled into one trie-shaped regex and the text is scanned once,
+    taking the longest pattern starting at each matching position. Shorter patterns
+    contained in a hit are implied by it, which gives the same answer as testing every
+    pattern with `in` without walking the pattern list per device.
+    """
+
+    def __init__(self, patterns):
+        unique = sorted({p for p in patterns if p})
+        self.has_empty = "" in patterns
+        self._regex = None
+        if unique:
+            self._regex = re.compile(self._trie_regex(unique))
+        # Every pattern that is a substring of another is implied whenever the longer one hits
+        self._implied = {p: frozenset(q for q in unique if q in p) for p in unique}
+
+    @staticmethod
+    def _trie_regex(patterns: List[str]) -> str:
+        """Build a prefix-factored regex; greedy optional tails make it match longest-first"""
+        trie = {}
+        for pattern in patterns:
+            node = trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        def build(node: Dict) -> str:
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != ""]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+            return f"(?:{body})?" if "" in node else body
+
+        return build(trie)
+
+    def find_all(self, text: str) -> Set[str]:
+        """Return the set of patterns that occur anywhere in text"""
+        found = {""} if self.has_empty else set()
+        if self._regex is None:
+            return found
+
+        # Restart one character past each hit so overlapping patterns are still seen
+        search = self._regex.search
+        hits = set()
+        match = search(text)
+        while match:
+            hits.add(match.group())
+            match = search(text, match.start() + 1)
+
+        for hit in hits:
+            found |= self._implied[hit]
+        return found
+
+
 class FingerprintEngine:
     """Enhanced fingerprinting engine with pattern hierarchy"""
 
@@ -165,6 +414,16 @@ class FingerprintEngine:
         self.vendor_priority = self.rules.get('detection_rules', {}).get('priority_order', [])
         # Extract all fingerprint OIDs from YAML for collection
         self.fingerprint_oids = self._extract_fingerprint_oids()
+        # Compile vendor rules once - patterns into one matcher, extraction regexes precompiled
+        self._compiled_vendors, self.pattern_matcher = self._compile_rules()
+        # Reverse indexes so a device only visits vendors it can possibly match
+        self._definitive_oid_index = {}
+        self._definitive_pattern_index = {}
+        for vendor_name, vendor in self._compiled_vendors.items():
+            for oid, _, _ in vendor["definitive_oids"]:
+                self._definitive_oid_index.setdefault(oid, set()).add(vendor_name)
+            for _, lowered in vendor["definitive"]:
+                self._definitive_pattern_index.setdefault(lowered, set()).add(vendor_name)
 
     def fingerprint_device(self, snmp_data: Dict[str, str]) -> Dict[str, Any]:
         """
@@ -237,63 +496,131 @@ class FingerprintEngine:
 
         return fingerprint_oids
 
+    def _compile_rules(self) -> Tuple[Dict[str, Dict[str, Any]], PatternMatcher]:
+        """Pre-process YAML vendor rules into lowercase pattern lists and compiled regexes"""
+        compiled = {}
+        all_patterns = set()
+
+        for vendor_name, vendor_rule in self.rules.get('vendors', {}).items():
+            vendor_rule = vendor_rule or {}
+
+            exclusions = [str(p).lower() for p in vendor_rule.get('exclusion_patterns', []) or []]
+
+            definitive_patterns = vendor_rule.get('definitive_patterns', []) or []
+            if not definitive_patterns:
+                # Fallback to old-style detection patterns
+                definitive_patterns = vendor_rule.get('detection_patterns', []) or []
+            definitive = []
+            for pattern in definitive_patterns:
+                pattern_str = str(pattern.get('pattern', pattern) if isinstance(pattern, dict) else pattern)
+                definitive.append((pattern_str, pattern_str.lower()))
+
+            device_types = []
+            for device_type, type_rule in (vendor_rule.get('device_type_rules', {}) or {}).items():
+                device_types.append({
+                    "name": device_type,
+                    "definitive": [str(p).lower() for p in type_rule.get('definitive_patterns', []) or []],
+                    "mandatory": [str(p).lower() for p in type_rule.get('mandatory_patterns', []) or []],
+                    "optional": [str(p).lower() for p in type_rule.get('optional_patterns', []) or []],
+                    "priority_score": (100 - type_rule.get('priority', 99)) * 5
+                })
+                for key in ("definitive", "mandatory", "optional"):
+                    all_patterns.update(device_types[-1][key])
+
+            extraction = {}
+            for field_type in ('model_extraction', 'serial_extraction', 'firmware_extraction'):
+                rules = []
+                for rule in vendor_rule.get(field_type, []) or []:
+                    pattern = rule.get('regex', '')
+                    if not pattern:
+                        continue
+                    try:
+                        regex = re.compile(pattern, re.IGNORECASE)
+                    except re.error:
+                        continue
+                    rules.append((regex, rule.get('capture_group', 1), rule.get('device_types', [])))
+                extraction[field_type] = rules
+
+            definitive_oids = []
+            oid_name_map = {}
+            for oid_config in vendor_rule.get('fingerprint_oids', []) or []:
+                oid = oid_config.get('oid', '')
+                name = oid_config.get('name', '').lower()
+                if oid and name:
+                    oid_name_map[oid] = name
+                if oid_config.get('definitive', False):
+                    expected = [v.lower() for v in oid_config.get('expected_values', []) or []]
+                    definitive_oids.append((oid, name, set(expected)))
+
+            all_patterns.update(exclusions)
+            all_patterns.update(lowered for _, lowered in definitive)
+
+            compiled[vendor_name] = {
+                "exclusions": exclusions,
+                "definitive": definitive,
+                "device_types": device_types,
+                "extraction": extraction,
+                "definitive_oids": definitive_oids,
+                "oid_name_map": oid_name_map
+            }
+
+        return compiled, PatternMatcher(all_patterns)
+
     def _check_definitive_oids(self, snmp_data: Dict[str, str]) -> Dict[str, Any]:
         """Check for definitive vendor OIDs from YAML configuration"""
+        candidates = set()
+        for oid in snmp_data:
+            vendors = self._definitive_oid_index.get(oid)
+            if vendors:
+                candidates |= vendors
+        if not candidates:
+            return {"confidence_score": 0, "vendor": "", "device_type": ""}
 
         # FIXED: Check vendors in priority order, not YAML file order
         for vendor_name in self.vendor_priority:
-            if vendor_name not in self.rules.get('vendors', {}):
+            if vendor_name not in candidates:
                 continue
-
-            vendor_config = self.rules['vendors'][vendor_name]
-            fingerprint_oids = vendor_config.get('fingerprint_oids', [])
+            vendor = self._compiled_vendors[vendor_name]
 
             # Look for definitive OIDs (marked as definitive=true)
             definitive_matches = {}
-            for oid_config in fingerprint_oids:
-                if not oid_config.get('definitive', False):
+            for oid, name, expected_values in vendor["definitive_oids"]:
+                value = snmp_data.get(oid)
+                if not value:
                     continue
 
-                oid = oid_config.get('oid', '')
-                if oid in snmp_data and snmp_data[oid]:
-                    name = oid_config.get('name', '').lower()
-                    value = snmp_data[oid]
-
-                    # Check expected values if specified
-                    expected_values = oid_config.get('expected_values', [])
-                    if expected_values and value.lower() not in [v.lower() for v in expected_values]:
-                        continue
+                # Check expected values if specified
+                if expected_values and value.lower() not in expected_values:
+                    continue
 
-                    definitive_matches[name] = value
+                definitive_matches[name] = value
 
             # If we found definitive OIDs for this vendor, process the result
             if definitive_matches:
-                return self._process_definitive_match(vendor_name, vendor_config, definitive_matches, snmp_data)
+                return self._process_definitive_match(vendor_name, vendor, definitive_matches, snmp_data)
 
         # No definitive OIDs found
         return {"confidence_score": 0, "vendor": "", "device_type": ""}
 
-    def _process_definitive_match(self, vendor_name: str, vendor_config: Dict,
+    def _process_definitive_match(self, vendor_name: str, vendor: Dict,
                                   definitive_matches: Dict[str, str], snmp_data: Dict[str, str]) -> Dict[str, Any]:
         """Process a definitive OID match and extract device info"""
 
         # Smart field extraction from ALL collected data
-        model, serial, firmware = self._smart_field_extraction(snmp_data, vendor_config)
+        model, serial, firmware = self._smart_field_extraction(snmp_data, vendor)
 
         # Determine device type using existing rules
-        device_type = self._determine_device_type(vendor_config,
-                                                  " ".join(definitive_matches.values()).lower())
+        matched_text = " ".join(definitive_matches.values()).lower()
+        device_type = self._determine_device_type(vendor, self.pattern_matcher.find_all(matched_text))
 
         # Apply any model/serial/firmware extraction rules if smart extraction didn't find them
+        all_values = " ".join(snmp_data.values())
         if not model:
-            model = self._extract_field(vendor_config, 'model_extraction',
-                                        " ".join(snmp_data.values()), device_type)
+            model = self._extract_field(vendor, 'model_extraction', all_values, device_type)
         if not serial:
-            serial = self._extract_field(vendor_config, 'serial_extraction',
-                                         " ".join(snmp_data.values()), device_type)
+            serial = self._extract_field(vendor, 'serial_extraction', all_values, device_type)
         if not firmware:
-            firmware = self._extract_field(vendor_config, 'firmware_extraction',
-                                           " ".join(snmp_data.values()), device_type)
+            firmware = self._extract_field(vendor, 'firmware_extraction', all_values, device_type)
 
         return {
             "vendor": vendor_name,
@@ -306,7 +633,7 @@ class FingerprintEngine:
             "matched_oids": list(definitive_matches.keys())
         }
 
-    def _smart_field_extraction(self, snmp_data: Dict[str, str], vendor_config: Dict) -> Tuple[str, str, str]:
+    def _smart_field_extraction(self, snmp_data: Dict[str, str], vendor: Dict) -> Tuple[str, str, str]:
         """
         Smart extraction of model, serial, and firmware from ALL OID data
         Analyzes OID names from YAML configuration to identify relevant fields
@@ -315,16 +642,8 @@ class FingerprintEngine:
         serial = ""
         firmware = ""
 
-        # Get all fingerprint OIDs for this vendor to analyze their names
-        vendor_fingerprint_oids = vendor_config.get('fingerprint_oids', [])
-
-        # Create mapping of OID -> name for smart analysis
-        oid_name_map = {}
-        for oid_config in vendor_fingerprint_oids:
-            oid = oid_config.get('oid', '')
-            name = oid_config.get('name', '').lower()
-            if oid and name:
-                oid_name_map[oid] = name
+        # Mapping of OID -> lowercase name, prepared at rule load
+        oid_name_map = vendor["oid_name_map"]
 
         # Analyze collected SNMP data using OID names from YAML
         for oid, value in snmp_data.items():
@@ -332,7 +651,7 @@ class FingerprintEngine:
                 continue
 
             # Get the descriptive name for this OID from YAML
-            oid_name = oid_name_map.get(oid, "").lower()
+            oid_name = oid_name_map.get(oid, "")
 
             # Smart detection based on OID name keywords
             if not model and any(keyword in oid_name for keyword in ["model", "product", "type"]):
@@ -374,18 +693,29 @@ class FingerprintEngine:
         sys_name = snmp_data.get("1.3.6.1.2.1.1.5.0", "").lower()
 
         # Combine all SNMP text for pattern matching
-        all_text = f"{sys_descr} {sys_name}"
+        text_parts = [sys_descr, sys_name]
         for oid, value in snmp_data.items():
             if value and value not in ["<nil>", ""]:
-                all_text += f" {str(value).lower()}"
+                text_parts.append(str(value).lower())
+        all_text = " ".join(text_parts)
+
+        # One pass over the text finds every rule pattern present
+        found = self.pattern_matcher.find_all(all_text)
+
+        # A vendor can only match if one of its definitive patterns is present
+        candidates = set()
+        for pattern in found:
+            vendors = self._definitive_pattern_index.get(pattern)
+            if vendors:
+                candidates |= vendors
 
         # Test vendors in priority order
         for vendor_name in self.vendor_priority:
-            if vendor_name not in self.rules.get('vendors', {}):
+            if vendor_name not in candidates:
                 continue
+            vendor = self._compiled_vendors[vendor_name]
 
-            vendor_rule = self.rules['vendors'][vendor_name]
-            result = self._test_vendor(vendor_name, vendor_rule, all_text, snmp_data)
+            result = self._test_vendor(vendor_name, vendor, all_text, found)
 
             if result['confidence_score'] > 0:
                 return result
@@ -401,13 +731,12 @@ class FingerprintEngine:
             "detection_method": "no_vendor_detected"
         }
 
-    def _test_vendor(self, vendor_name: str, vendor_rule: Dict, all_text: str, snmp_data: Dict) -> Dict:
-        """Test if device matches a specific vendor"""
+    def _test_vendor(self, vendor_name: str, vendor: Dict, all_text: str, found: Set[str]) -> Dict:
+        """Test if device matches a specific vendor, given the patterns found in all_text"""
 
         # Step 1: Check exclusion patterns (immediate disqualification)
-        exclusions = vendor_rule.get('exclusion_patterns', [])
-        for exclusion in exclusions:
-            if exclusion.lower() in all_text:
+        for exclusion in vendor["exclusions"]:
+            if exclusion in found:
                 return {"confidence_score": 0, "vendor": "", "device_type": ""}
 
         confidence = 0
@@ -415,15 +744,11 @@ class FingerprintEngine:
         detection_method = "pattern_match"
 
         # Step 2: Check definitive patterns (high confidence)
-        definitive_patterns = vendor_rule.get('definitive_patterns', [])
-        if not definitive_patterns:
-            # Fallback to old-style detection patterns
-            definitive_patterns = vendor_rule.get('detection_patterns', [])
+        definitive_patterns = vendor["definitive"]
 
         definitive_matches = 0
-        for pattern in definitive_patterns:
-            pattern_str = pattern.get('pattern', pattern) if isinstance(pattern, dict) else pattern
-            if pattern_str.lower() in all_text:
+        for pattern_str, lowered in definitive_patterns:
+            if lowered in found:
                 definitive_matches += 1
                 matched_patterns.append(pattern_str)
                 confidence += 90
@@ -437,12 +762,12 @@ class FingerprintEngine:
             return {"confidence_score": 0, "vendor": "", "device_type": ""}
 
         # Step 3: Determine device type
-        device_type = self._determine_device_type(vendor_rule, all_text)
+        device_type = self._determine_device_type(vendor, found)
 
         # Step 4: Extract fields
-        model = self._extract_field(vendor_rule, 'model_extraction', all_text, device_type)
-        serial = self._extract_field(vendor_rule, 'serial_extraction', all_text, device_type)
-        version = self._extract_field(vendor_rule, 'firmware_extraction', all_text, device_type)
+        model = self._extract_field(vendor, 'model_extraction', all_text, device_type)
+        serial = self._extract_field(vendor, 'serial_extraction', all_text, device_type)
+        version = self._extract_field(vendor, 'firmware_extraction', all_text, device_type)
 
         # Apply confidence cap
         confidence = min(confidence, 100)
@@ -458,27 +783,24 @@ class FingerprintEngine:
             "matched_patterns": matched_patterns
         }
 
-    def _determine_device_type(self, vendor_rule: Dict, all_text: str) -> str:
-        """Determine device type based on patterns"""
-        device_type_rules = vendor_rule.get('device_type_rules', {})
-
+    def _determine_device_type(self, vendor: Dict, found: Set[str]) -> str:
+        """Determine device type based on the patterns found in the device text"""
         best_type = ""
         best_score = 0
 
-        for device_type, type_rule in device_type_rules.items():
+        for type_rule in vendor["device_types"]:
             score = 0
 
             # Check definitive patterns for device type
-            definitive_patterns = type_rule.get('definitive_patterns', [])
-            for pattern in definitive_patterns:
-                if pattern.lower() in all_text:
+            for pattern in type_rule["definitive"]:
+                if pattern in found:
                     score += 100
 
             # Check mandatory patterns
-            mandatory_patterns = type_rule.get('mandatory_patterns', [])
+            mandatory_patterns = type_rule["mandatory"]
             mandatory_matches = 0
             for pattern in mandatory_patterns:
-                if pattern.lower() in all_text:
+                if pattern in found:
                     mandatory_matches += 1
                     score += 50
 
@@ -487,41 +809,29 @@ class FingerprintEngine:
                 continue
 
             # Check optional patterns
-            optional_patterns = type_rule.get('optional_patterns', [])
-            for pattern in optional_patterns:
-                if pattern.lower() in all_text:
+            for pattern in type_rule["optional"]:
+                if pattern in found:
                     score += 20
 
             # Consider priority (lower number = higher priority)
-            priority = type_rule.get('priority', 99)
-            score += (100 - priority) * 5
+            score += type_rule["priority_score"]
 
             if score > best_score:
                 best_score = score
-                best_type = device_type
+                best_type = type_rule["name"]
 
         return best_type if best_type else "unknown"
 
-    def _extract_field(self, vendor_rule: Dict, field_type: str, all_text: str, device_type: str) -> str:
-        """Extract specific field using regex patterns"""
-        import re
-
-        extraction_rules = vendor_rule.get(field_type, [])
-
-        for rule in extraction_rules:
+    def _extract_field(self, vendor: Dict, field_type: str, all_text: str, device_type: str) -> str:
+        """Extract specific field using precompiled regex patterns"""
+        for regex, capture_group, device_types in vendor["extraction"].get(field_type, []):
             # Check if rule applies to this device type
-            device_types = rule.get('device_types', [])
             if device_types and device_type not in device_types:
                 continue
 
             try:
-                pattern = rule.get('regex', '')
-                if not pattern:
-                    continue
-
-                match = re.search(pattern, all_text, re.IGNORECASE)
+                match = regex.search(all_text)
                 if match:
-                    capture_group = rule.get('capture_group', 1)
                     if len(match.groups()) >= capture_group:
                         extracted = match.group(capture_group).strip()
                         if extracted:
@@ -532,13 +842,149 @@ class FingerprintEngine:
         return ""
 
 
+class SNMPCredentialMemory:
+    """
+    Learned per-subnet SNMP version/credential preferences
+    Records which version (and v2c community) answered in each subnet, so later hosts in
+    the subnet try the winner first instead of paying a full timeout on a doomed SNMPv3
+    attempt. Persisted as a small JSON cache that the next scan run reads. Communities are
+    stored as hashes only.
+    """
+
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_file: Optional[str] = None, prefix_len: int = 24):
+        self.cache_file = cache_file
+        self.prefix_len = prefix_len
+        self.subnets: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.hints_used = 0
+        if cache_file:
+            self.load()
+
+    @staticmethod
+    def community_key(community: str) -> str:
+        return "v2c:" + hashlib.sha256(community.encode('utf-8')).hexdigest()[:16]
+
+    def subnet_key(self, ip_address: str) -> str:
+        address = ipaddress.ip_address(ip_address)
+        prefix_len = self.prefix_len if address.version == 4 else 64
+        return str(ipaddress.ip_network(f"{ip_address}/{prefix_len}", strict=False))
+
+    def best_key(self, ip_address: str) -> Optional[str]:
+        """Winning credential key for this host's subnet, if one has been learned"""
+        entries = self.subnets.get(self.subnet_key(ip_address))
+        if not entries:
+            return None
+        key, entry = max(entries.items(), key=lambda item: (item[1]["successes"], item[1]["last_success"]))
+        return key if entry["successes"] > 0 else None
+
+    def order_attempts(self, ip_address: str, attempts: List[Tuple[str, Optional[List[str]]]]):
+        """
+        Reorder (version, communities) attempts so the subnet's winning combination runs first
+        Returns (attempts, hint_key)
+        """
+        best = self.best_key(ip_address)
+        if not best:
+            return attempts, None
+
+        if best == "v3":
+            preferred = [a for a in attempts if a[0] == "v3"]
+            if not preferred:
+                return attempts, None
+            self.hints_used += 1
+            return preferred + [a for a in attempts if a[0] != "v3"], best
+
+        for index, (version, communities) in enumerate(attempts):
+            if version != "v2c":
+                continue
+            winner = [c for c in communities if self.community_key(c) == best]
+            if not winner:
+                break
+            others = [c for c in communities if c != winner[0]]
+            reordered = [("v2c", winner[:1])] + attempts[:index] + attempts[index + 1:]
+            if others:
+                reordered.append(("v2c", others))
+            self.hints_used += 1
+            return reordered, best
+
+        return attempts, None
+
+    def record_success(self, ip_address: str, credential_key: str):
+        entry = self.subnets.setdefault(self.subnet_key(ip_address), {}).setdefault(
+            credential_key, {"successes": 0, "failures": 0, "last_success": ""})
+        entry["successes"] += 1
+        entry["last_success"] = datetime.now(timezone.utc).isoformat()
+
+    def record_failure(self, ip_address: str, credential_key: str):
+        """A learned winner that stops answering loses standing, so stale hints age out"""
+        entry = self.subnets.get(self.subnet_key(ip_address), {}).get(credential_key)
+        if entry:
+            entry["failures"] += 1
+            entry["successes"] = max(0, entry["successes"] - 1)
+
+    def merge(self, subnets: Dict[str, Dict[str, Dict[str, Any]]]):
+        """Fold in what another scanner process learned (sharded scans)"""
+        for subnet, entries in subnets.items():
+            local_entries = self.subnets.setdefault(subnet, {})
+            for key, entry in entries.items():
+                local = local_entries.get(key)
+                if local is None:
+                    local_entries[key] = entry
+                    continue
+                local["successes"] = max(local["successes"], entry["successes"])
+                local["failures"] = max(local["failures"], entry["failures"])
+                local["last_success"] = max(local["last_success"], entry["last_success"])
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == self.CACHE_VERSION and data.get("prefix_len") == self.prefix_len:
+                self.subnets = data.get("subnets", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Warning: Could not read SNMP credential cache {self.cache_file}: {e}")
+
+    def save(self):
+        if not self.cache_file:
+            return
+        try:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({
+                    "version": self.CACHE_VERSION,
+                    "prefix_len": self.prefix_len,
+                    "updated": datetime.now(timezone.utc).isoformat(),
+                    "subnets": self.subnets
+                }, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            print(f"Warning: Could not write SNMP credential cache {self.cache_file}: {e}")
+
+
 class SNMPCollector:
     """Optimized async SNMP data collector with v3/v2c fallback"""
 
-    def __init__(self, credentials: SNMPCredentials, fingerprint_engine=None):
+    # Error-status codes that mean "PDU too large/complex" - worth retrying as smaller PDUs
+    SPLITTABLE_ERRORS = (1, 5)  # tooBig, genErr
+    # SNMPv1 answers a GET with one missing OID by failing the whole PDU with noSuchName
+    NO_SUCH_NAME = 2
+
+    # Target host of the collection running in the current task
+    _current_ip: contextvars.ContextVar = contextvars.ContextVar("snmp_target_ip", default="")
+
+    def __init__(self, credentials: SNMPCredentials, fingerprint_engine=None, max_varbinds: int = 24,
+                 credential_memory: Optional[SNMPCredentialMemory] = None,
+                 rtt_estimator: Optional[RTTEstimator] = None,
+                 rate_limiter: Optional[EgressRateLimiter] = None):
         self.credentials = credentials
         self.engine = SnmpEngine()
         self.fingerprint_engine = fingerprint_engine
+        self.max_varbinds = max_varbinds
+        self.credential_memory = credential_memory
+        self.rtt_estimator = rtt_estimator
+        self.rate_limiter = rate_limiter
 
     async def collect_device_data(self, ip_address: str) -> Tuple[Dict[str, str], Dict[str, Any]]:
         """
@@ -558,34 +1004,52 @@ class SNMPCollector:
             "collection_method": "optimized_with_fallback"
         }
 
+        # Remember which host this task is talking to, for egress pacing in _get_cmd
+        self._current_ip.set(ip_address)
+
         # Strategy: Try v3 first if configured, then fallback to v2c communities
-        versions_to_try = []
+        attempts = []
 
         if self.credentials.version == "v3" and self.credentials.username:
-            versions_to_try.append("v3")
+            attempts.append(("v3", None))
 
         # Always try v2c if fallback is enabled or if v3 is not properly configured
         if (self.credentials.try_v2c_fallback or
                 self.credentials.version == "v2c" or
                 not self.credentials.username):
-            versions_to_try.append("v2c")
+            attempts.append(("v2c", self._v2c_communities()))
+
+        # Put whatever already worked in this subnet first
+        hint_key = None
+        if self.credential_memory:
+            attempts, hint_key = self.credential_memory.order_attempts(ip_address, attempts)
+            if hint_key:
+                metadata["credential_hint"] = hint_key.split(':')[0]
+
+        # Per-host timeout/retries from measured RTT, else the configured values
+        timeout, retries = self.credentials.timeout, self.credentials.retries
+        if self.rtt_estimator:
+            timeout, retries = self.rtt_estimator.snmp_params(ip_address, timeout, retries)
+            metadata["snmp_timeout"] = timeout
+            metadata["snmp_retries"] = retries
 
         # Try each version until we get a successful response
-        for version in versions_to_try:
-            metadata["snmp_version_attempted"].append(version)
+        for version, communities in attempts:
+            if version not in metadata["snmp_version_attempted"]:
+                metadata["snmp_version_attempted"].append(version)
 
             try:
                 # Create transport target
                 target = await UdpTransportTarget.create(
-                    (ip_address, 161),
-                    timeout=self.credentials.timeout,
-                    retries=self.credentials.retries
+                    (ip_address, self.credentials.port),
+                    timeout=timeout,
+                    retries=retries
                 )
 
                 if version == "v3":
                     success = await self._try_snmpv3(target, snmp_data, metadata)
                 else:  # v2c
-                    success = await self._try_snmpv2c(target, snmp_data, metadata)
+                    success = await self._try_snmpv2c(target, snmp_data, metadata, communities)
 
                 if success:
                     metadata["snmp_version_successful"] = version
@@ -595,12 +1059,21 @@ class SNMPCollector:
                 metadata[f"{version}_error"] = str(e)
                 continue
 
+        if self.credential_memory:
+            self._update_credential_memory(ip_address, hint_key, metadata)
+
         # Calculate response time
         metadata["response_time_ms"] = int((time.time() - start_time) * 1000)
         metadata["oids_collected"] = len(snmp_data)
 
         return snmp_data, metadata
 
+    async def _get_cmd(self, auth_data, target, *object_types):
+        """get_cmd behind the egress rate limiter; a dropped request looks like a timeout"""
+        if self.rate_limiter and not await self.rate_limiter.acquire(self._current_ip.get()):
+            return "rateLimiterDrop", 0, 0, []
+        return await get_cmd(self.engine, auth_data, target, ContextData(), *object_types)
+
     async def _try_snmpv3(self, target, snmp_data: Dict[str, str], metadata: Dict) -> bool:
         """Try SNMPv3 authentication"""
         try:
@@ -612,8 +1085,8 @@ class SNMPCollector:
                 ObjectType(ObjectIdentity("1.3.6.1.2.1.1.5.0"))  # sysName
             ]
 
-            error_indication, error_status, error_index, var_binds = await get_cmd(
-                self.engine, auth_data, target, ContextData(), *critical_oids
+            error_indication, error_status, error_index, var_binds = await self._get_cmd(
+                auth_data, target, *critical_oids
             )
 
             if error_indication:
@@ -645,14 +1118,38 @@ class SNMPCollector:
             metadata["v3_exception"] = str(e)
             return False
 
-    async def _try_snmpv2c(self, target, snmp_data: Dict[str, str], metadata: Dict) -> bool:
-        """Try SNMPv2c with multiple community strings"""
+    def _v2c_communities(self) -> List[str]:
+        """Configured v2c communities in the order they are tried"""
         communities_to_try = self.credentials.communities.copy()
 
         # If a specific community was set, try it first
         if self.credentials.community and self.credentials.community not in communities_to_try:
             communities_to_try.insert(0, self.credentials.community)
 
+        return communities_to_try
+
+    def _update_credential_memory(self, ip_address: str, hint_key: Optional[str], metadata: Dict):
+        """Feed the outcome of this host back into the per-subnet credential memory"""
+        version = metadata.get("snmp_version_successful")
+        if version == "v3":
+            winner = "v3"
+        elif version == "v2c":
+            winner = SNMPCredentialMemory.community_key(metadata.get("successful_community", ""))
+        else:
+            winner = None
+
+        # A host that answers nothing (no agent, dead address) says nothing about the hint;
+        # only another credential winning does
+        if winner and hint_key and hint_key != winner:
+            self.credential_memory.record_failure(ip_address, hint_key)
+        if winner:
+            self.credential_memory.record_success(ip_address, winner)
+
+    async def _try_snmpv2c(self, target, snmp_data: Dict[str, str], metadata: Dict,
+                           communities: Optional[List[str]] = None) -> bool:
+        """Try SNMPv2c with multiple community strings"""
+        communities_to_try = communities if communities is not None else self._v2c_communities()
+
         for community in communities_to_try:
             try:
                 auth_data = CommunityData(community)
@@ -663,8 +1160,8 @@ class SNMPCollector:
                     ObjectType(ObjectIdentity("1.3.6.1.2.1.1.5.0"))  # sysName
                 ]
 
-                error_indication, error_status, error_index, var_binds = await get_cmd(
-                    self.engine, auth_data, target, ContextData(), *critical_oids
+                error_indication, error_status, error_index, var_binds = await self._get_cmd(
+                    auth_data, target, *critical_oids
                 )
 
                 if error_indication or error_status:
@@ -759,8 +1256,8 @@ class SNMPCollector:
             return
 
         try:
-            error_indication, error_status, error_index, var_binds = await get_cmd(
-                self.engine, auth_data, target, ContextData(), *object_types
+            error_indication, error_status, error_index, var_binds = await self._get_cmd(
+                auth_data, target, *object_types
             )
 
             if not error_indication and not error_status and var_binds:
@@ -788,48 +1285,70 @@ class SNMPCollector:
             "entPhysicalSerialNum": "1.3.6.1.2.1.47.1.1.1.1.11.1"
         }
 
-        for name, oid in key_extended.items():
-            try:
-                error_indication, error_status, error_index, var_binds = await get_cmd(
-                    self.engine, auth_data, target, ContextData(), ObjectType(ObjectIdentity(oid))
-                )
-
-                if not error_indication and not error_status and var_binds:
-                    var_bind_list = list(var_binds) if hasattr(var_binds, '__iter__') else [var_binds]
-
-                    for oid_obj, value in var_bind_list:
-                        if not isinstance(value, (NoSuchObject, NoSuchInstance, EndOfMibView)):
-                            snmp_data[str(oid_obj)] = str(value)
-                            metadata["oids_successful"].append(str(oid_obj))
-                            break  # Only get first value for table OIDs
-
-            except Exception:
-                # Silently skip extended OIDs that fail
-                continue
+        # Failed extended OIDs are silently skipped
+        values = await self._batched_get(auth_data, target, list(key_extended.values()), metadata)
+        for oid_str, value in values.items():
+            snmp_data[oid_str] = value
+            metadata["oids_successful"].append(oid_str)
 
     async def _collect_fingerprint_oids(self, auth_data, target, oids: Dict[str, str],
                                         snmp_data: Dict[str, str], metadata: Dict):
         """Collect vendor fingerprint OIDs from YAML configuration"""
-        for oid, oid_name in oids.items():
-            try:
-                error_indication, error_status, error_index, var_binds = await get_cmd(
-                    self.engine, auth_data, target, ContextData(), ObjectType(ObjectIdentity(oid))
-                )
+        # Failed fingerprint OIDs are silently skipped
+        values = await self._batched_get(auth_data, target, list(oids.keys()), metadata)
+        for oid_str, value in values.items():
+            snmp_data[oid_str] = value
+            metadata["oids_successful"].append(oid_str)
+            # Store with descriptive name for easier debugging
+            oid_name = oids.get(oid_str, oid_str)
+            metadata[f"fingerprint_oid_{oid_name.replace(' ', '_').lower()}"] = value
+
+    async def _batched_get(self, auth_data, target, oids: List[str], metadata: Dict) -> Dict[str, str]:
+        """
+        GET many OIDs using multi-varbind PDUs of up to max_varbinds each
+        Returns {oid: value} for every OID the agent answered with a real value
+        """
+        values = {}
+        batch_size = max(1, self.max_varbinds)
+        for start in range(0, len(oids), batch_size):
+            await self._get_batch(auth_data, target, oids[start:start + batch_size], values, metadata)
+        return values
 
-                if not error_indication and not error_status and var_binds:
-                    var_bind_list = list(var_binds) if hasattr(var_binds, '__iter__') else [var_binds]
+    async def _get_batch(self, auth_data, target, batch: List[str], values: Dict[str, str], metadata: Dict):
+        """
+        Send one GET PDU; split and retry the halves on tooBig/genErr, and on noSuchName
+        drop the OID named by error_index and resend the rest
+        """
+        try:
+            metadata["get_pdus_sent"] = metadata.get("get_pdus_sent", 0) + 1
+            error_indication, error_status, error_index, var_binds = await self._get_cmd(
+                auth_data, target,
+                *[ObjectType(ObjectIdentity(oid)) for oid in batch]
+            )
+        except Exception:
+            return
 
-                    for oid_obj, value in var_bind_list:
-                        if not isinstance(value, (NoSuchObject, NoSuchInstance, EndOfMibView)):
-                            snmp_data[str(oid_obj)] = str(value)
-                            metadata["oids_successful"].append(str(oid_obj))
-                            # Store with descriptive name for easier debugging
-                            metadata[f"fingerprint_oid_{oid_name.replace(' ', '_').lower()}"] = str(value)
-                            break  # Only get first value for table OIDs
+        if error_indication:
+            return
 
-            except Exception:
-                # Silently skip fingerprint OIDs that fail
-                continue
+        if error_status:
+            if int(error_status) in self.SPLITTABLE_ERRORS and len(batch) > 1:
+                metadata["get_pdu_splits"] = metadata.get("get_pdu_splits", 0) + 1
+                middle = len(batch) // 2
+                await self._get_batch(auth_data, target, batch[:middle], values, metadata)
+                await self._get_batch(auth_data, target, batch[middle:], values, metadata)
+            elif int(error_status) == self.NO_SUCH_NAME and 0 < int(error_index) <= len(batch):
+                remaining = batch[:int(error_index) - 1] + batch[int(error_index):]
+                if remaining:
+                    metadata["get_pdu_resends"] = metadata.get("get_pdu_resends", 0) + 1
+                    await self._get_batch(auth_data, target, remaining, values, metadata)
+            return
+
+        if var_binds:
+            var_bind_list = list(var_binds) if hasattr(var_binds, '__iter__') else [var_binds]
+            for oid_obj, value in var_bind_list:
+                if not isinstance(value, (NoSuchObject, NoSuchInstance, EndOfMibView)):
+                    values[str(oid_obj)] = str(value)
 
     async def _individual_collection(self, auth_data, target, oids: Dict[str, str],
                                      snmp_data: Dict[str, str], metadata: Dict):
@@ -839,8 +1358,8 @@ class SNMPCollector:
                 continue
 
             try:
-                error_indication, error_status, error_index, var_binds = await get_cmd(
-                    self.engine, auth_data, target, ContextData(), ObjectType(ObjectIdentity(oid))
+                error_indication, error_status, error_index, var_binds = await self._get_cmd(
+                    auth_data, target, ObjectType(ObjectIdentity(oid))
                 )
 
                 if not error_indication and not error_status and var_binds:
@@ -999,7 +1518,6 @@ class DeviceRecord:
             # Clean system name for use as ID
             clean_name = self.sys_name.lower().replace('-', '_').replace(' ', '_')
             # Remove any non-alphanumeric characters except underscores
-            import re
             clean_name = re.sub(r'[^a-z0-9_]', '', clean_name)
             return f"host_{clean_name}"
         elif vendor and device_type:
@@ -1011,47 +1529,492 @@ class DeviceRecord:
             return f"ip_{self.ip_address.replace('.', '_')}"
 
 
+def host_range(network) -> Tuple[int, int]:
+    """First and last address (as ints) that network.hosts() yields, without expanding it"""
+    first = int(network.network_address)
+    last = int(network.broadcast_address)
+    if network.prefixlen >= network.max_prefixlen - 1:
+        return first, last
+    if network.version == 4:
+        return first + 1, last - 1  # network and broadcast excluded
+    return first + 1, last  # Subnet-Router anycast excluded
+
+
+def count_network_hosts(network) -> int:
+    """Number of addresses network.hosts() yields, without expanding it"""
+    first, last = host_range(network)
+    return last - first + 1
+
+
+def shard_host_ranges(cidrs: List[str], shards: int, min_slice: int = 256,
+                      align_prefix: int = 24) -> List[Tuple[str, int, int]]:
+    """
+    Split CIDRs into (cidr, first, last) host-address slices for parallel workers
+    Roughly four slices per worker so fast slices don't leave processes idle at the end.
+    Slices end on /align_prefix boundaries (/64 for IPv6), so each subnet the credential
+    memory and the per-subnet rate limit track is scanned by a single process
+    """
+    networks = []
+    for cidr in cidrs:
+        try:
+            networks.append(ipaddress.ip_network(cidr.strip(), strict=False))
+        except Exception as e:
+            raise ValueError(f"Invalid CIDR {cidr}: {e}")
+
+    total_hosts = sum(count_network_hosts(network) for network in networks)
+    slice_size = max(min_slice, -(-total_hosts // max(1, shards * 4)))
+
+    slices = []
+    for network in networks:
+        block = 1 << (network.max_prefixlen - (align_prefix if network.version == 4 else 64))
+        network_slice = -(-slice_size // block) * block
+        first, last = host_range(network)
+        start = first
+        while start <= last:
+            end = min(start - start % block + network_slice - 1, last)
+            slices.append((str(network), start, end))
+            start = end + 1
+    return slices
+
+
+def load_shard_layout(path: str) -> Optional[Dict[str, Any]]:
+    """The CIDRs and slices a sharded scan was started with, or None if not recorded"""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: Could not read shard layout {path}: {e}")
+        return None
+    if data.get("version") != 1:
+        return None
+    return {"cidrs": data.get("cidrs", []), "slices": [tuple(item) for item in data.get("slices", [])]}
+
+
+def save_shard_layout(path: str, cidrs: List[str], slices: List[Tuple[str, int, int]]):
+    """Record the slices so a resume reuses them, whatever --shards it is given"""
+    data = {"version": 1, "cidrs": cidrs, "slices": [list(item) for item in slices]}
+    try:
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_file, path)
+    except Exception as e:
+        print(f"Warning: Could not write shard layout {path}: {e}")
+
+
+class NDJSONResultSink:
+    """
+    Append-only NDJSON result log - one line per discovered device
+    Every line is flushed as it is written, so a crash keeps everything scanned so far
+    """
+
+    def __init__(self, path: str, append: bool = False, fsync_every: int = 100):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.records_written = 0
+        self._handle = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, device_data: Dict[str, Any], session_data: Optional[Dict[str, Any]]):
+        """Append one device (Go schema) and its session record"""
+        line = json.dumps({"device": device_data, "session": session_data}, separators=(',', ':'))
+        self._handle.write(line + "\n")
+        self._handle.flush()
+        self.records_written += 1
+        if self.fsync_every and self.records_written % self.fsync_every == 0:
+            os.fsync(self._handle.fileno())
+
+    def close(self):
+        if self._handle and not self._handle.closed:
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+            self._handle.close()
+
+
+class CMDBResultSink:
+    """
+    Streams discovered devices straight into the CMDB instead of via the JSON document
+    Devices are normalised with the scan importer's own parser, so device keys and
+    vendor/role mappings match a file import, and written through one writer connection
+    in batched upsert transactions.
+    """
+
+    def __init__(self, db_path: str, fingerprint_file: str, batch_size: int = 200):
+        from db_scan_import_enhanced import ScanImporter
+
+        # The importer logs every parsed device at INFO; keep the scan progress readable
+        logging.getLogger('db_scan_import_enhanced').setLevel(logging.WARNING)
+
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.importer = ScanImporter(db_path, fingerprint_file=fingerprint_file)
+        self._conn = self.importer._get_db_connection()
+        self._pending = []
+
+    def write(self, device_data: Dict[str, Any], session_data: Optional[Dict[str, Any]] = None):
+        """Queue one device (Go schema); the batch is committed once it is full"""
+        self.importer.stats['devices_processed'] += 1
+        device = self.importer.parse_device_from_scan(device_data.get("id", ""), device_data)
+        if not device:
+            self.importer.stats['devices_skipped'] += 1
+            return
+        self._pending.append(device)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        try:
+            self.importer.upsert_devices(self._conn, pending)
+        except sqlite3.Error as e:
+            print(f"CMDB write failed for {len(pending)} devices: {e}")
+            self.importer.stats['errors'] += len(pending)
+
+    def close(self):
+        if self._conn:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+    def summary(self) -> str:
+        stats = self.importer.stats
+        return (f"CMDB import ({self.db_path}): {stats['devices_imported']} new, "
+                f"{stats['devices_updated']} updated, {stats['devices_skipped']} skipped, "
+                f"{stats['errors']} errors")
+
+
+def load_ndjson_results(path: str):
+    """
+    Yield (device_data, session_data) tuples from an NDJSON result log
+    A truncated final line (process killed mid-write) is skipped
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            device_data = record.get("device")
+            if device_data:
+                yield device_data, record.get("session")
+
+
+class ScanCheckpoint:
+    """
+    Resumable scan state: a bitmap of finished addresses over the CIDR, or over the
+    first..last slice of it a shard scans, plus running counters
+    Saved atomically next to the NDJSON result log, which holds the devices themselves
+    """
+
+    MAX_ADDRESSES = 1 << 26  # 8 MB bitmap; larger ranges should be split into several scans
+
+    def __init__(self, path: str, network, scan_id: str, first: Optional[int] = None, last: Optional[int] = None):
+        self.base = int(network.network_address) if first is None else first
+        last = int(network.broadcast_address) if last is None else last
+        self.size = last - self.base + 1
+        if self.size > self.MAX_ADDRESSES:
+            raise ValueError(f"{network} is too large to checkpoint - split it into smaller CIDRs or more shards")
+        self.path = path
+        self.network = network
+        self.scan_id = scan_id
+        self.bitmap = bytearray((self.size + 7) // 8)
+        self.completed = 0
+        self.stats: Dict[str, int] = {}
+        self.last_saved = time.time()
+
+    def _offset(self, ip) -> Optional[int]:
+        try:
+            offset = int(ipaddress.ip_address(str(ip))) - self.base
+        except ValueError:
+            return None
+        return offset if 0 <= offset < self.size else None
+
+    def is_done(self, ip) -> bool:
+        offset = self._offset(ip)
+        return offset is not None and bool(self.bitmap[offset >> 3] & (1 << (offset & 7)))
+
+    def mark_done(self, ip):
+        offset = self._offset(ip)
+        if offset is None:
+            return
+        mask = 1 << (offset & 7)
+        if not self.bitmap[offset >> 3] & mask:
+            self.bitmap[offset >> 3] |= mask
+            self.completed += 1
+
+    def save(self, stats: Dict[str, int]):
+        self.stats = stats
+        data = {
+            "version": 1,
+            "cidr": str(self.network),
+            "first": self.base,
+            "size": self.size,
+            "scan_id": self.scan_id,
+            "completed": self.completed,
+            "stats": stats,
+            "saved_at": datetime.now(timezone.utc).isoformat(),
+            "bitmap": base64.b64encode(zlib.compress(bytes(self.bitmap))).decode('ascii')
+        }
+        try:
+            tmp_file = f"{self.path}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.path)
+        except Exception as e:
+            print(f"Warning: Could not write checkpoint {self.path}: {e}")
+        self.last_saved = time.time()
+
+    @classmethod
+    def load(cls, path: str, network, first: Optional[int] = None,
+             last: Optional[int] = None) -> Optional['ScanCheckpoint']:
+        """Load a checkpoint for this CIDR and slice, or None if missing or for a different range"""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Could not read checkpoint {path}: {e}")
+            return None
+
+        if data.get("version") != 1 or data.get("cidr") != str(network):
+            print(f"Warning: Checkpoint {path} is for {data.get('cidr')}, not {network}")
+            return None
+
+        checkpoint = cls(path, network, data.get("scan_id", ""), first, last)
+        # Checkpoints saved before slices were recorded always covered the whole CIDR
+        if (data.get("first", int(network.network_address)) != checkpoint.base
+                or data.get("size", network.num_addresses) != checkpoint.size):
+            print(f"Warning: Checkpoint {path} covers a different slice of {network}")
+            return None
+        bitmap = zlib.decompress(base64.b64decode(data["bitmap"]))
+        if len(bitmap) != len(checkpoint.bitmap):
+            return None
+        checkpoint.bitmap = bytearray(bitmap)
+        checkpoint.completed = data.get("completed", 0)
+        checkpoint.stats = data.get("stats", {})
+        return checkpoint
+
+
+class ScanProgress:
+    """Running scan counters and the console progress lines parsed by the pipeline UI"""
+
+    def __init__(self, total_hosts: int, rate_limiter: Optional[EgressRateLimiter] = None):
+        self.total_hosts = total_hosts
+        self.rate_limiter = rate_limiter
+        self.shard_limiter_stats: Dict[Any, Dict[str, float]] = {}
+        self.start_time = time.time()
+        self.completed = 0
+        self.tcp_responsive = 0
+        self.snmp_successful = 0
+        self.tcp_failed = 0
+        self.snmp_failed = 0
+        self.v3_success = 0
+        self.v2c_success = 0
+        self.resumed_from = 0
+
+    COUNTER_FIELDS = ("tcp_responsive", "snmp_successful", "tcp_failed", "snmp_failed", "v3_success", "v2c_success")
+
+    def counters(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.COUNTER_FIELDS}
+
+    def restore(self, counters: Dict[str, int], completed: int):
+        """Continue counting from a checkpoint of a previous run"""
+        for name in self.COUNTER_FIELDS:
+            setattr(self, name, getattr(self, name) + int(counters.get(name, 0)))
+        self.completed += completed
+        self.resumed_from += completed
+
+    @staticmethod
+    def classify(result: Optional[Tuple]) -> Tuple[str, str, str, str]:
+        """Reduce a scan result to (status, snmp_version, vendor, device_type)"""
+        if result is None:
+            return "timeout", "", "", ""
+
+        device_record, session_data, tcp_status = result
+        if tcp_status != "responsive":
+            return "no_tcp", "", "", ""
+        if not device_record:
+            return "snmp_fail", "", "", ""
+
+        return ("found",
+                device_record.metadata.get('snmp_version_successful', 'unk'),
+                device_record.fingerprint_result.get('vendor', 'unknown'),
+                device_record.fingerprint_result.get('device_type', 'unknown'))
+
+    def _count(self, status: str, snmp_version: str):
+        self.completed += 1
+        if status in ("found", "snmp_fail"):
+            self.tcp_responsive += 1
+        else:
+            self.tcp_failed += 1
+
+        if status == "found":
+            self.snmp_successful += 1
+            # Track version success
+            if snmp_version == 'v3':
+                self.v3_success += 1
+            elif snmp_version == 'v2c':
+                self.v2c_success += 1
+        elif status == "snmp_fail":
+            self.snmp_failed += 1
+
+    def record(self, ip: str, result: Optional[Tuple]):
+        """Update counters for one finished host and print its status line"""
+        self.record_status(ip, *self.classify(result))
+
+    def record_status(self, ip: str, status: str, snmp_version: str = "", vendor: str = "", device_type: str = ""):
+        """Update counters for one classified host and print its status line"""
+        self._count(status, snmp_version)
+        completed = self.completed
+        total_hosts = self.total_hosts
+
+        if status == "found":
+            print(
+                f"✓ {ip:<15} | {'OK':<4} | {snmp_version:<5} | {vendor:<12} | {device_type:<15} | ({completed}/{total_hosts})")
+        elif status == "snmp_fail":
+            print(
+                f"~ {ip:<15} | {'OK':<4} | {'FAIL':<5} | {'snmp_fail':<12} | {'no_response':<15} | ({completed}/{total_hosts})")
+        elif status == "no_tcp":
+            print(
+                f"✗ {ip:<15} | {'NO':<4} | {'N/A':<5} | {'no_tcp':<12} | {'not_scanned':<15} | ({completed}/{total_hosts})")
+        else:
+            print(
+                f"✗ {ip:<15} | {'TO':<4} | {'N/A':<5} | {'timeout':<12} | {'not_scanned':<15} | ({completed}/{total_hosts})")
+
+        # Show progress update every 50 devices or at key milestones
+        if completed % 50 == 0 or completed in [1, 5, 10, 25] or completed == total_hosts:
+            self.print_progress()
+
+    def limiter_stats(self) -> Optional[Dict[str, float]]:
+        """Rate limiter totals for this process plus any reported by shard workers"""
+        all_stats = list(self.shard_limiter_stats.values())
+        if self.rate_limiter:
+            all_stats.append(self.rate_limiter.stats())
+        if not all_stats:
+            return None
+        return {key: sum(stats[key] for stats in all_stats) for key in all_stats[0]}
+
+    def print_progress(self):
+        """Print the periodic 'Progress:' summary line"""
+        elapsed = time.time() - self.start_time
+        if self.completed > 0 and elapsed > 0:
+            rate = (self.completed - self.resumed_from) / elapsed
+            eta_seconds = (self.total_hosts - self.completed) / rate if rate > 0 else 0
+            eta_str = f"{int(eta_seconds // 60)}m {int(eta_seconds % 60)}s" if eta_seconds > 0 else "complete"
+
+            progress_pct = (self.completed / max(self.total_hosts, 1)) * 100
+            limiter = self.limiter_stats()
+            rate_str = ""
+            if limiter:
+                rate_str = f" | Rate wait: {limiter['wait_time']:.1f}s | Throttled: {int(limiter['throttled'])} | Dropped: {int(limiter['dropped'])}"
+            print("-" * 90)
+            print(
+                f"Progress: {progress_pct:.1f}% | TCP OK: {self.tcp_responsive} | SNMP: {self.snmp_successful} (v3: {self.v3_success}, v2c: {self.v2c_success}) | TCP Failed: {self.tcp_failed} | ETA: {eta_str}{rate_str}")
+            if self.completed < self.total_hosts:
+                print("-" * 90)
+
+    def print_summary(self, total_devices: int):
+        """Print the final scan summary block"""
+        total_hosts = max(self.total_hosts, 1)
+        total_time = time.time() - self.start_time
+        print(f"SCAN_COMPLETE: {total_devices} devices found in {int(total_time // 60)}m {int(total_time % 60)}s")
+
+        print(f"Hosts scanned: {self.total_hosts}")
+        print(f"TCP responsive: {self.tcp_responsive}")
+        print(f"SNMP devices found: {total_devices}")
+        print(f"  - SNMPv3 successful: {self.v3_success}")
+        print(f"  - SNMPv2c successful: {self.v2c_success}")
+        print(f"TCP non-responsive: {self.tcp_failed}")
+        print(f"SNMP timeouts: {self.snmp_failed}")
+        print(f"Success rate: {(self.snmp_successful / total_hosts) * 100:.1f}%")
+        print(f"TCP filter efficiency: {((self.tcp_failed) / total_hosts) * 100:.1f}% hosts skipped")
+
+        limiter = self.limiter_stats()
+        if limiter:
+            print(f"Rate limiter: {int(limiter['sent'])} packets sent, {int(limiter['throttled'])} throttled "
+                  f"({limiter['wait_time']:.1f}s waiting), {int(limiter['dropped'])} dropped")
+
+
 class OptimizedSNMPScanner:
     """Optimized scanner with TCP pre-filtering and v3/v2c fallback"""
 
     def __init__(self, config: ScanConfig):
         self.config = config
         self.fingerprint_engine = FingerprintEngine(config.fingerprint_rules)
+        self.credential_memory = None
+        if config.credential_cache:
+            self.credential_memory = SNMPCredentialMemory(config.credential_cache, config.credential_prefix_len)
+        self.rtt_estimator = RTTEstimator() if config.adaptive_timeouts else None
+        self.rate_limiter = None
+        if config.max_pps > 0 or config.subnet_pps > 0:
+            self.rate_limiter = EgressRateLimiter(config.max_pps, config.subnet_pps, max_wait=config.rate_max_wait)
         # Pass fingerprint engine to collector for OID collection
-        self.collector = SNMPCollector(config.credentials, self.fingerprint_engine)
+        self.collector = SNMPCollector(config.credentials, self.fingerprint_engine, config.max_varbinds,
+                                       self.credential_memory, self.rtt_estimator, self.rate_limiter)
         self.tcp_checker = TCPPortChecker()
 
-    async def scan_network(self, cidr: str) -> Dict[str, Any]:
-        """Scan network CIDR with TCP pre-filtering and SNMP version fallback"""
-
-        # Parse CIDR
-        try:
-            network = ipaddress.ip_network(cidr, strict=False)
-            ip_list = [str(ip) for ip in network.hosts()]
-        except Exception as e:
-            raise ValueError(f"Invalid CIDR: {e}")
+    def save_credential_memory(self):
+        """Persist learned per-subnet credentials for the next scan run"""
+        if self.credential_memory:
+            self.credential_memory.save()
 
-        total_hosts = len(ip_list)
+    def _print_scan_header(self, cidr: str, total_hosts: int):
         print(f"Scanning {total_hosts} hosts in {cidr}")
         print(f"TCP pre-filter ports: {self.config.tcp_check_ports}")
         print(f"TCP timeout: {self.config.tcp_check_timeout}s")
         print(f"SNMP timeout: {self.config.credentials.timeout}s")
+        if self.rtt_estimator:
+            print(f"Adaptive timeouts: on (RTT-derived, capped at the values above)")
+        if self.rate_limiter:
+            print(f"Egress rate limit: {self.config.max_pps or 'unlimited'} pps global, "
+                  f"{self.config.subnet_pps or 'unlimited'} pps per /24")
         print(
             f"SNMP strategy: v3 first, then v2c fallback" if self.config.credentials.try_v2c_fallback else f"SNMP version: {self.config.credentials.version}")
         print(f"Concurrent scans: {self.config.concurrent_scans}")
+        if self.credential_memory:
+            print(f"Credential cache: {self.config.credential_cache} "
+                  f"({len(self.credential_memory.subnets)} subnets learned)")
         print("-" * 90)
         print(f"{'IP Address':<15} | {'TCP':<4} | {'SNMP':<5} | {'Vendor':<12} | {'Device Type':<15} | Progress")
         print("-" * 90)
 
+    def _open_cmdb_sink(self) -> Optional[CMDBResultSink]:
+        if not self.config.cmdb_path:
+            return None
+        return CMDBResultSink(self.config.cmdb_path, self.config.fingerprint_rules, self.config.cmdb_batch_size)
+
+    @staticmethod
+    def _close_cmdb_sink(sink: Optional[CMDBResultSink]):
+        if sink:
+            sink.close()
+            print(sink.summary())
+
+    @staticmethod
+    def _make_scan_id(cidr: str) -> str:
+        return f"scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{hash(cidr) & 0xffffffff:08x}"
+
+    async def scan_network(self, cidr: str) -> Dict[str, Any]:
+        """Scan network CIDR with TCP pre-filtering and SNMP version fallback"""
+
+        # Parse CIDR
+        try:
+            network = ipaddress.ip_network(cidr, strict=False)
+            ip_list = [str(ip) for ip in network.hosts()]
+        except Exception as e:
+            raise ValueError(f"Invalid CIDR: {e}")
+
+        total_hosts = len(ip_list)
+        self._print_scan_header(cidr, total_hosts)
+
         # Progress tracking
-        start_time = time.time()
-        completed = 0
-        tcp_responsive = 0
-        snmp_successful = 0
-        tcp_failed = 0
-        snmp_failed = 0
-        v3_success = 0
-        v2c_success = 0
+        progress = ScanProgress(total_hosts, self.rate_limiter)
         results = []
 
         # Create semaphore for concurrent scanning
@@ -1059,61 +2022,11 @@ class OptimizedSNMPScanner:
 
         # Progress-aware scan function
         async def scan_with_progress(ip):
-            nonlocal completed, tcp_responsive, snmp_successful, tcp_failed, snmp_failed, v3_success, v2c_success
-
             result = await self._scan_single_device_optimized(semaphore, ip)
+            progress.record(ip, result)
 
-            # Update progress
-            completed += 1
-
-            if result is not None:
-                device_record, session_data, tcp_status = result
-
-                if tcp_status == "responsive":
-                    tcp_responsive += 1
-
-                    if device_record:
-                        snmp_successful += 1
-                        vendor = device_record.fingerprint_result.get('vendor', 'unknown')
-                        device_type = device_record.fingerprint_result.get('device_type', 'unknown')
-                        snmp_version = device_record.metadata.get('snmp_version_successful', 'unk')
-
-                        # Track version success
-                        if snmp_version == 'v3':
-                            v3_success += 1
-                        elif snmp_version == 'v2c':
-                            v2c_success += 1
-
-                        print(
-                            f"✓ {ip:<15} | {'OK':<4} | {snmp_version:<5} | {vendor:<12} | {device_type:<15} | ({completed}/{total_hosts})")
-                        results.append((device_record, session_data))
-                    else:
-                        snmp_failed += 1
-                        print(
-                            f"~ {ip:<15} | {'OK':<4} | {'FAIL':<5} | {'snmp_fail':<12} | {'no_response':<15} | ({completed}/{total_hosts})")
-                else:
-                    tcp_failed += 1
-                    print(
-                        f"✗ {ip:<15} | {'NO':<4} | {'N/A':<5} | {'no_tcp':<12} | {'not_scanned':<15} | ({completed}/{total_hosts})")
-            else:
-                tcp_failed += 1
-                print(
-                    f"✗ {ip:<15} | {'TO':<4} | {'N/A':<5} | {'timeout':<12} | {'not_scanned':<15} | ({completed}/{total_hosts})")
-
-            # Show progress update every 50 devices or at key milestones
-            if completed % 50 == 0 or completed in [1, 5, 10, 25] or completed == total_hosts:
-                elapsed = time.time() - start_time
-                if completed > 0:
-                    rate = completed / elapsed
-                    eta_seconds = (total_hosts - completed) / rate if rate > 0 else 0
-                    eta_str = f"{int(eta_seconds // 60)}m {int(eta_seconds % 60)}s" if eta_seconds > 0 else "complete"
-
-                    progress_pct = (completed / total_hosts) * 100
-                    print("-" * 90)
-                    print(
-                        f"Progress: {progress_pct:.1f}% | TCP OK: {tcp_responsive} | SNMP: {snmp_successful} (v3: {v3_success}, v2c: {v2c_success}) | TCP Failed: {tcp_failed} | ETA: {eta_str}")
-                    if completed < total_hosts:
-                        print("-" * 90)
+            if result is not None and result[0]:
+                results.append((result[0], result[1]))
 
             return result
 
@@ -1125,34 +2038,245 @@ class OptimizedSNMPScanner:
         devices = {}
         sessions = []
         total_devices = 0
-        scan_id = f"scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{hash(cidr) & 0xffffffff:08x}"
+        scan_id = self._make_scan_id(cidr)
 
         print("\n" + "=" * 90)
         print("Processing results...")
 
-        for device_record, session_data in results:
-            if device_record:
-                device_data = device_record.to_go_schema(scan_id)
-                devices[device_data["id"]] = device_data
-                total_devices += 1
+        cmdb_sink = self._open_cmdb_sink()
+        try:
+            for device_record, session_data in results:
+                if device_record:
+                    device_data = device_record.to_go_schema(scan_id)
+                    devices[device_data["id"]] = device_data
+                    total_devices += 1
+                    if cmdb_sink:
+                        cmdb_sink.write(device_data, session_data)
+
+                    if session_data:
+                        sessions.append(session_data)
+        finally:
+            self._close_cmdb_sink(cmdb_sink)
+
+        return self._finalize_results(progress, devices, sessions, total_devices)
+
+    async def scan_network_streaming(self, cidr: str, ndjson_path: str,
+                                     checkpoint_path: Optional[str] = None,
+                                     resume: bool = False) -> Dict[str, Any]:
+        """
+        Streaming scan for large CIDRs
+        Addresses are fed lazily into a bounded queue drained by a fixed worker pool,
+        and each device is appended to the NDJSON log as soon as it completes.
+        With a checkpoint path, finished addresses are recorded in a bitmap saved every
+        checkpoint_interval seconds; resume=True skips them and appends to the same log.
+        The Go-schema document is assembled from the log at the end.
+        """
+        try:
+            network = ipaddress.ip_network(cidr, strict=False)
+        except Exception as e:
+            raise ValueError(f"Invalid CIDR: {e}")
 
-                if session_data:
-                    sessions.append(session_data)
+        first, last = host_range(network)
+        total_hosts = last - first + 1
+        progress = ScanProgress(total_hosts, self.rate_limiter)
+        checkpoint, scan_id, resume = self._open_checkpoint(
+            network, ndjson_path, checkpoint_path, resume, self._make_scan_id(cidr), progress)
 
-        # Final summary
-        total_time = time.time() - start_time
-        # print(f"\nScan Complete!")
-        print(f"SCAN_COMPLETE: {total_devices} devices found in {int(total_time // 60)}m {int(total_time % 60)}s")
+        self._print_scan_header(cidr, total_hosts)
+        print(f"Streaming results to: {ndjson_path}")
+        if checkpoint_path:
+            print(f"Checkpoint: {checkpoint_path} (every {self.config.checkpoint_interval}s)")
+        if resume:
+            print(f"Resuming: {checkpoint.completed} of {total_hosts} hosts already scanned")
+            print("-" * 90)
 
-        print(f"Hosts scanned: {total_hosts}")
-        print(f"TCP responsive: {tcp_responsive}")
-        print(f"SNMP devices found: {total_devices}")
-        print(f"  - SNMPv3 successful: {v3_success}")
-        print(f"  - SNMPv2c successful: {v2c_success}")
-        print(f"TCP non-responsive: {tcp_failed}")
-        print(f"SNMP timeouts: {snmp_failed}")
-        print(f"Success rate: {(snmp_successful / total_hosts) * 100:.1f}%")
-        print(f"TCP filter efficiency: {((tcp_failed) / total_hosts) * 100:.1f}% hosts skipped")
+        await self._stream_host_range(network, first, last, ndjson_path, scan_id, progress, checkpoint, resume)
+
+        print("\n" + "=" * 90)
+        print("Processing results...")
+        return self._assemble_from_ndjson(progress, [ndjson_path])
+
+    def _open_checkpoint(self, network, ndjson_path: str, checkpoint_path: Optional[str], resume: bool,
+                         scan_id: str, progress: ScanProgress, first: Optional[int] = None,
+                         last: Optional[int] = None):
+        """
+        Load (resume) or create the checkpoint for the network, or for its first..last slice;
+        returns (checkpoint, scan_id, resume)
+        """
+        if not checkpoint_path:
+            return None, scan_id, False
+
+        checkpoint = None
+        if resume:
+            checkpoint = ScanCheckpoint.load(checkpoint_path, network, first, last)
+            if checkpoint:
+                # Devices logged after the last checkpoint save are done too
+                for device_data, _ in load_ndjson_results(ndjson_path):
+                    checkpoint.mark_done(device_data.get("primary_ip", ""))
+                scan_id = checkpoint.scan_id
+                progress.restore(checkpoint.stats, checkpoint.completed)
+            else:
+                print(f"No usable checkpoint at {checkpoint_path} - starting a fresh scan")
+
+        if checkpoint is None:
+            return ScanCheckpoint(checkpoint_path, network, scan_id, first, last), scan_id, False
+        return checkpoint, scan_id, True
+
+    async def _stream_host_range(self, network, first: int, last: int, ndjson_path: str, scan_id: str,
+                                 progress: ScanProgress, checkpoint: Optional[ScanCheckpoint] = None,
+                                 append: bool = False):
+        """Scan addresses first..last of network through a bounded queue and fixed worker pool"""
+        address_class = type(network.network_address)
+        remaining = (last - first + 1) - (checkpoint.completed if checkpoint else 0)
+        worker_count = max(1, min(self.config.concurrent_scans, remaining))
+        queue_size = self.config.stream_queue_size or worker_count * 2
+        queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        sink = NDJSONResultSink(ndjson_path, append=append)
+        cmdb_sink = self._open_cmdb_sink()
+
+        async def producer():
+            for value in range(first, last + 1):
+                ip = str(address_class(value))
+                if checkpoint and checkpoint.is_done(ip):
+                    continue
+                await queue.put(ip)
+            for _ in range(worker_count):
+                await queue.put(None)
+
+        async def worker():
+            while True:
+                ip = await queue.get()
+                if ip is None:
+                    break
+                try:
+                    result = await self._scan_single_device(ip)
+                except Exception:
+                    result = None
+                progress.record(ip, result)
+
+                if result is not None and result[0]:
+                    device_record, session_data, _ = result
+                    device_data = device_record.to_go_schema(scan_id)
+                    sink.write(device_data, session_data)
+                    if cmdb_sink:
+                        cmdb_sink.write(device_data, session_data)
+
+                # Only mark done once the result (if any) is in the log
+                if checkpoint:
+                    checkpoint.mark_done(ip)
+                    if time.time() - checkpoint.last_saved >= self.config.checkpoint_interval:
+                        checkpoint.save(progress.counters())
+
+        try:
+            await asyncio.gather(producer(), *[worker() for _ in range(worker_count)])
+        finally:
+            sink.close()
+            self._close_cmdb_sink(cmdb_sink)
+            if checkpoint:
+                checkpoint.save(progress.counters())
+
+    def _assemble_from_ndjson(self, progress: ScanProgress, ndjson_paths: List[str],
+                              cmdb_sink: Optional[CMDBResultSink] = None) -> Dict[str, Any]:
+        """Build the final Go-schema document from one or more NDJSON result logs"""
+        devices = {}
+        sessions = []
+        total_devices = 0
+        try:
+            for ndjson_path in ndjson_paths:
+                for device_data, session_data in load_ndjson_results(ndjson_path):
+                    devices[device_data["id"]] = device_data
+                    total_devices += 1
+                    if cmdb_sink:
+                        cmdb_sink.write(device_data, session_data)
+                    if session_data:
+                        sessions.append(session_data)
+        finally:
+            self._close_cmdb_sink(cmdb_sink)
+
+        return self._finalize_results(progress, devices, sessions, total_devices)
+
+    async def scan_sharded(self, cidrs: List[str], output_base: str, shards: int,
+                           resume: bool = False) -> Dict[str, Any]:
+        """
+        Fan CIDR slices out to worker processes, each with its own event loop and SnmpEngine
+        Workers stream devices into per-slice NDJSON logs (with checkpoints) and report
+        per-host status back here, where one combined progress feed is printed and the
+        logs are merged into a single Go-schema document
+        """
+        # Slice on the subnets the credential memory and the per-/24 rate limit are keyed by
+        align_prefix = min(self.config.credential_prefix_len, 24)
+        slices = shard_host_ranges(cidrs, shards, align_prefix=align_prefix)
+        # Checkpoints are per slice, so a resume must keep the interrupted scan's slices
+        layout_path = f"{output_base}.shards.json"
+        layout = load_shard_layout(layout_path) if resume else None
+        if layout:
+            if layout["cidrs"] != cidrs:
+                raise ValueError(f"Checkpoints in {layout_path} are for {', '.join(layout['cidrs'])}, "
+                                 f"not {', '.join(cidrs)}")
+            if layout["slices"] != slices:
+                print(f"Resuming with the {len(layout['slices'])} slices the interrupted scan was started with")
+            slices = layout["slices"]
+        save_shard_layout(layout_path, cidrs, slices)
+        total_hosts = sum(last - first + 1 for _, first, last in slices)
+        scan_id = self._make_scan_id(",".join(cidrs))
+        workers = max(1, min(shards, len(slices)))
+
+        self._print_scan_header(", ".join(cidrs), total_hosts)
+        print(f"Sharded scan: {len(slices)} slices across {workers} worker processes")
+        print("-" * 90)
+
+        progress = ScanProgress(total_hosts)
+        ndjson_paths = []
+        # The global packet budget is shared between worker processes; the CMDB keeps a
+        # single writer, fed here from the merged shard logs
+        shard_config = dataclasses.replace(self.config, max_pps=self.config.max_pps / workers, cmdb_path="")
+        shard_config.verbose = getattr(self.config, 'verbose', False)
+        manager = multiprocessing.Manager()
+        status_queue = manager.Queue()
+
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = []
+                for index, (cidr, first, last) in enumerate(slices):
+                    ndjson_path = f"{output_base}.shard{index:04d}.ndjson"
+                    checkpoint_path = f"{output_base}.shard{index:04d}.checkpoint"
+                    ndjson_paths.append(ndjson_path)
+                    futures.append(pool.submit(run_scan_shard, shard_config, cidr, first, last, ndjson_path,
+                                               checkpoint_path, scan_id, resume, status_queue))
+
+                pending = set(futures)
+                while pending or not status_queue.empty():
+                    try:
+                        self._apply_shard_messages(progress, status_queue.get_nowait())
+                    except queue_module.Empty:
+                        pending = {future for future in pending if not future.done()}
+                        await asyncio.sleep(0.1)
+
+                for future in futures:
+                    shard_result = future.result()
+                    if self.credential_memory:
+                        self.credential_memory.merge(shard_result.get("credential_subnets", {}))
+        finally:
+            manager.shutdown()
+
+        print("\n" + "=" * 90)
+        print("Processing results...")
+        return self._assemble_from_ndjson(progress, ndjson_paths, self._open_cmdb_sink())
+
+    @staticmethod
+    def _apply_shard_messages(progress: ScanProgress, messages: List[Tuple]):
+        for message in messages:
+            if message[0] == "host":
+                progress.record_status(*message[1:])
+            elif message[0] == "restore":
+                progress.restore(message[1], message[2])
+            elif message[0] == "limiter":
+                progress.shard_limiter_stats[message[1]] = message[2]
+
+    def _finalize_results(self, progress: ScanProgress, devices: Dict, sessions: List,
+                          total_devices: int) -> Dict[str, Any]:
+        """Print the final summary and build the Go-schema result document"""
+        progress.print_summary(total_devices)
 
         # Show vendor breakdown
         vendor_counts = {}
@@ -1179,7 +2303,7 @@ class OptimizedSNMPScanner:
             "total_devices": total_devices,
             "devices": devices,
             "sessions": sessions,
-            "statistics": self._generate_statistics(devices, v3_success, v2c_success),
+            "statistics": self._generate_statistics(devices, progress.v3_success, progress.v2c_success),
             "config": {
                 "max_sessions": 100,
                 "max_devices": 10000,
@@ -1194,71 +2318,81 @@ class OptimizedSNMPScanner:
     async def _scan_single_device_optimized(self, semaphore: asyncio.Semaphore, ip_address: str) -> Optional[Tuple]:
         """Optimized single device scan with TCP pre-filtering and SNMP fallback"""
         async with semaphore:
-            try:
-                # Step 1: TCP connectivity check (unless disabled)
-                if not self.config.skip_tcp_check:
-                    tcp_responsive = await self.tcp_checker.check_host_responsive(
-                        ip_address,
-                        self.config.tcp_check_ports,
-                        self.config.tcp_check_timeout
-                    )
-
-                    if not tcp_responsive:
-                        # Host not responsive on any TCP ports - skip SNMP
-                        return None, None, "not_responsive"
-                else:
-                    tcp_responsive = True
-
-                # Step 2: SNMP data collection with version fallback
-                snmp_data, metadata = await self.collector.collect_device_data(ip_address)
-
-                # Skip if no SNMP response or critical data missing
-                if not snmp_data or "1.3.6.1.2.1.1.1.0" not in snmp_data:
-                    return None, None, "responsive"
-
-                # Step 3: Fingerprint device
-                fingerprint_result = self.fingerprint_engine.fingerprint_device(snmp_data)
-
-                # Step 4: Create device record
-                device_record = DeviceRecord(ip_address, snmp_data, fingerprint_result, metadata)
-
-                # Step 5: Create session data
-                session_data = {
-                    "id": f"scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{hash(ip_address) & 0xffffffff:08x}",
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "target_ip": ip_address,
-                    "scan_type": "single_device",
-                    "devices_found": 1,
-                    "new_devices": 0,
-                    "updated_devices": 0,
-                    "snmp_version_used": metadata.get('snmp_version_successful', 'unknown'),
-                    "results": [{
-                        "ip_address": ip_address,
-                        "vendor": fingerprint_result.get('vendor', ''),
-                        "device_type": fingerprint_result.get('device_type', ''),
-                        "model": fingerprint_result.get('model', ''),
-                        "serial_number": fingerprint_result.get('serial_number', ''),
-                        "os_version": fingerprint_result.get('os_version', ''),
-                        "sys_descr": snmp_data.get("1.3.6.1.2.1.1.1.0", ""),
-                        "sys_name": snmp_data.get("1.3.6.1.2.1.1.5.0", ""),
-                        "snmp_data": dict(snmp_data),
-                        "confidence_score": fingerprint_result.get('confidence_score', 0),
-                        "detection_method": fingerprint_result.get('detection_method', ''),
-                        "scan_timestamp": datetime.now(timezone.utc).isoformat(),
-                        "snmp_version": metadata.get('snmp_version_successful', 'unknown')
-                    }],
-                    "duration": "1s"
-                }
-
-                return device_record, session_data, "responsive"
-
-            except asyncio.TimeoutError:
-                return None, None, "responsive"
-            except Exception as e:
-                if hasattr(self.config, 'verbose') and self.config.verbose:
-                    print(f"Error scanning {ip_address}: {e}")
+            return await self._scan_single_device(ip_address)
+
+    async def _scan_single_device(self, ip_address: str) -> Optional[Tuple]:
+        """Scan one host - concurrency is bounded by the caller"""
+        try:
+            # Step 1: TCP connectivity check (unless disabled)
+            if not self.config.skip_tcp_check:
+                tcp_timeout = self.config.tcp_check_timeout
+                if self.rtt_estimator:
+                    tcp_timeout = self.rtt_estimator.tcp_timeout(ip_address, tcp_timeout)
+
+                tcp_responsive = await self.tcp_checker.check_host_responsive(
+                    ip_address,
+                    self.config.tcp_check_ports,
+                    tcp_timeout,
+                    self.rtt_estimator,
+                    self.rate_limiter
+                )
+
+                if not tcp_responsive:
+                    # Host not responsive on any TCP ports - skip SNMP
+                    return None, None, "not_responsive"
+            else:
+                tcp_responsive = True
+
+            # Step 2: SNMP data collection with version fallback
+            snmp_data, metadata = await self.collector.collect_device_data(ip_address)
+
+            # Skip if no SNMP response or critical data missing
+            if not snmp_data or "1.3.6.1.2.1.1.1.0" not in snmp_data:
                 return None, None, "responsive"
 
+            # Step 3: Fingerprint device
+            fingerprint_result = self.fingerprint_engine.fingerprint_device(snmp_data)
+
+            # Step 4: Create device record
+            device_record = DeviceRecord(ip_address, snmp_data, fingerprint_result, metadata)
+
+            # Step 5: Create session data
+            session_data = {
+                "id": f"scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{hash(ip_address) & 0xffffffff:08x}",
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "target_ip": ip_address,
+                "scan_type": "single_device",
+                "devices_found": 1,
+                "new_devices": 0,
+                "updated_devices": 0,
+                "snmp_version_used": metadata.get('snmp_version_successful', 'unknown'),
+                "results": [{
+                    "ip_address": ip_address,
+                    "vendor": fingerprint_result.get('vendor', ''),
+                    "device_type": fingerprint_result.get('device_type', ''),
+                    "model": fingerprint_result.get('model', ''),
+                    "serial_number": fingerprint_result.get('serial_number', ''),
+                    "os_version": fingerprint_result.get('os_version', ''),
+                    "sys_descr": snmp_data.get("1.3.6.1.2.1.1.1.0", ""),
+                    "sys_name": snmp_data.get("1.3.6.1.2.1.1.5.0", ""),
+                    "snmp_data": dict(snmp_data),
+                    "confidence_score": fingerprint_result.get('confidence_score', 0),
+                    "detection_method": fingerprint_result.get('detection_method', ''),
+                    "scan_timestamp": datetime.now(timezone.utc).isoformat(),
+                    "snmp_version": metadata.get('snmp_version_successful', 'unknown')
+                }],
+                "duration": "1s"
+            }
+
+            return device_record, session_data, "responsive"
+
+        except asyncio.TimeoutError:
+            return None, None, "responsive"
+        except Exception as e:
+            if hasattr(self.config, 'verbose') and self.config.verbose:
+                print(f"Error scanning {ip_address}: {e}")
+            return None, None, "responsive"
+
     def _generate_statistics(self, devices: Dict, v3_success: int, v2c_success: int) -> Dict[str, Any]:
         """Generate statistics section matching Go format with version info"""
         vendor_breakdown = {}
@@ -1291,6 +2425,62 @@ class OptimizedSNMPScanner:
         }
 
 
+class ShardProgress(ScanProgress):
+    """Progress for a worker process - forwards host statuses to the parent in small batches"""
+
+    def __init__(self, total_hosts: int, status_queue, rate_limiter: Optional[EgressRateLimiter] = None,
+                 flush_interval: float = 0.5, batch_size: int = 200):
+        super().__init__(total_hosts, rate_limiter)
+        self.status_queue = status_queue
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = []
+        self._last_flush = time.time()
+
+    def restore(self, counters: Dict[str, int], completed: int):
+        super().restore(counters, completed)
+        self.status_queue.put([("restore", counters, completed)])
+
+    def record_status(self, ip: str, status: str, snmp_version: str = "", vendor: str = "", device_type: str = ""):
+        self._count(status, snmp_version)
+        self._pending.append(("host", ip, status, snmp_version, vendor, device_type))
+        if len(self._pending) >= self.batch_size or time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.rate_limiter and self._pending:
+            self._pending.append(("limiter", os.getpid(), self.rate_limiter.stats()))
+        if self._pending:
+            self.status_queue.put(self._pending)
+            self._pending = []
+        self._last_flush = time.time()
+
+
+def run_scan_shard(config: ScanConfig, cidr: str, first: int, last: int, ndjson_path: str,
+                   checkpoint_path: str, scan_id: str, resume: bool, status_queue) -> Dict[str, Any]:
+    """Worker-process entry point for sharded scans - one slice, its own loop and SnmpEngine"""
+    scanner = OptimizedSNMPScanner(config)
+    network = ipaddress.ip_network(cidr, strict=False)
+    progress = ShardProgress(last - first + 1, status_queue, scanner.rate_limiter)
+
+    async def run():
+        checkpoint, shard_scan_id, resumed = scanner._open_checkpoint(
+            network, ndjson_path, checkpoint_path, resume, scan_id, progress, first, last)
+        await scanner._stream_host_range(network, first, last, ndjson_path, shard_scan_id,
+                                         progress, checkpoint, resumed)
+
+    try:
+        asyncio.run(run())
+    finally:
+        progress.flush()
+
+    return {
+        "cidr": cidr,
+        "ndjson_path": ndjson_path,
+        "credential_subnets": scanner.credential_memory.subnets if scanner.credential_memory else {}
+    }
+
+
 def ensure_output_directory(output_path: str) -> str:
     """
     Ensure the output directory exists, creating it if necessary.
@@ -1320,7 +2510,8 @@ def ensure_output_directory(output_path: str) -> str:
 async def main():
     """Main CLI function"""
     parser = argparse.ArgumentParser(description="Optimized Python SNMP Scanner with v3/v2c Fallback")
-    parser.add_argument("--cidr", required=True, help="Network CIDR to scan (e.g., 192.168.1.0/24)")
+    parser.add_argument("--cidr", required=True, nargs='+',
+                        help="Network CIDR(s) to scan (e.g., 192.168.1.0/24); several CIDRs run as a sharded scan")
     parser.add_argument("--config", default="scanner_config.yaml", help="Configuration file")
     parser.add_argument("--rules", default="vendor_fingerprints.yaml", help="Fingerprint rules file")
     parser.add_argument("--output", default="scan_results.json", help="Output file")
@@ -1331,6 +2522,20 @@ async def main():
                         default=[20, 21, 22, 25, 53, 80, 161, 443, 993, 995],
                         help="TCP ports to check for responsiveness")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
+    parser.add_argument("--stream", action="store_true",
+                        help="Streaming mode for large CIDRs: bounded worker pool, results appended to an NDJSON log")
+    parser.add_argument("--stream-file", default="",
+                        help="NDJSON result log for --stream (default: <output>.ndjson)")
+    parser.add_argument("--queue-size", type=int, default=0,
+                        help="Streaming work queue size (default: 2x --concurrent)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Worker processes for a sharded scan (each with its own event loop and SNMP engine)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume an interrupted --stream scan from its checkpoint (implies --stream)")
+    parser.add_argument("--checkpoint-file", default="",
+                        help="Streaming checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--checkpoint-interval", type=int, default=15,
+                        help="Seconds between checkpoint saves in streaming mode")
 
     # SNMP credentials - NOTE: version parameter now controls preferred method
     parser.add_argument("--snmp-version", default="v3", choices=["v2c", "v3"],
@@ -1345,7 +2550,27 @@ async def main():
     parser.add_argument("--priv-key", default="", help="SNMP v3 privacy key")
     parser.add_argument("--snmp-timeout", type=int, default=3, help="SNMP timeout in seconds")
     parser.add_argument("--retries", type=int, default=1, help="SNMP retries")
+    parser.add_argument("--snmp-port", type=int, default=161, help="SNMP agent UDP port")
     parser.add_argument("--no-fallback", action="store_true", help="Disable automatic version fallback")
+    parser.add_argument("--max-pps", type=float, default=0,
+                        help="Global egress rate limit in packets/sec for TCP SYNs and SNMP requests (0 = unlimited)")
+    parser.add_argument("--subnet-pps", type=float, default=0,
+                        help="Per-/24 egress rate limit in packets/sec (0 = unlimited)")
+    parser.add_argument("--rate-max-wait", type=float, default=0,
+                        help="Drop probes that would wait longer than this many seconds for the limiter (0 = never)")
+    parser.add_argument("--adaptive-timeouts", action="store_true",
+                        help="Shrink TCP/SNMP timeouts per host/subnet from measured TCP connect RTT")
+    parser.add_argument("--credential-cache", default="",
+                        help="Per-subnet SNMP credential memory file, read and updated each run "
+                             "(default: snmp_credential_cache.json next to --output)")
+    parser.add_argument("--no-credential-cache", action="store_true",
+                        help="Disable per-subnet SNMP credential memory")
+    parser.add_argument("--max-varbinds", type=int, default=24,
+                        help="Max OIDs per SNMP GET PDU (oversized PDUs are split on tooBig/genErr)")
+    parser.add_argument("--cmdb-db", default="",
+                        help="Also write discovered devices straight into this CMDB database (no separate import step)")
+    parser.add_argument("--cmdb-batch-size", type=int, default=200,
+                        help="Devices per CMDB upsert transaction with --cmdb-db")
 
     args = parser.parse_args()
 
@@ -1361,7 +2586,8 @@ async def main():
         priv_key=args.priv_key,
         timeout=args.snmp_timeout,
         retries=args.retries,
-        try_v2c_fallback=not args.no_fallback
+        try_v2c_fallback=not args.no_fallback,
+        port=args.snmp_port
     )
 
     config = ScanConfig(
@@ -1370,7 +2596,16 @@ async def main():
         concurrent_scans=args.concurrent,
         tcp_check_timeout=args.tcp_timeout,
         tcp_check_ports=args.tcp_ports,
-        skip_tcp_check=args.skip_tcp_check
+        skip_tcp_check=args.skip_tcp_check,
+        stream_queue_size=args.queue_size,
+        checkpoint_interval=args.checkpoint_interval,
+        adaptive_timeouts=args.adaptive_timeouts,
+        max_pps=args.max_pps,
+        subnet_pps=args.subnet_pps,
+        rate_max_wait=args.rate_max_wait,
+        max_varbinds=args.max_varbinds,
+        cmdb_path=args.cmdb_db,
+        cmdb_batch_size=args.cmdb_batch_size
     )
     config.verbose = args.verbose
 
@@ -1378,15 +2613,21 @@ async def main():
     if not Path(args.rules).exists():
         print(f"Error: Fingerprint rules file not found: {args.rules}")
         sys.exit(1)
+    if args.cmdb_db and not Path(args.cmdb_db).exists():
+        print(f"Error: CMDB database not found: {args.cmdb_db}")
+        sys.exit(1)
 
     # Ensure output directory exists and get absolute path
     output_file = ensure_output_directory(args.output)
+    if not args.no_credential_cache:
+        config.credential_cache = (args.credential_cache or
+                                   str(Path(output_file).parent / "snmp_credential_cache.json"))
 
     # Create scanner and run scan
     scanner = OptimizedSNMPScanner(config)
 
     print(f"Optimized Python SNMP Scanner v2.2 - with v3/v2c Fallback")
-    print(f"CIDR: {args.cidr}")
+    print(f"CIDR: {', '.join(args.cidr)}")
     print(f"SNMP Strategy: {args.snmp_version} preferred" + (
         ", with fallback" if not args.no_fallback else ", no fallback"))
     if args.snmp_version == "v3" and args.username:
@@ -1394,9 +2635,21 @@ async def main():
     print(f"SNMPv2c Communities: {args.communities}")
     print(f"Rules: {args.rules}")
     print(f"Output: {output_file}")
+    if args.cmdb_db:
+        print(f"CMDB: {args.cmdb_db}")
 
     try:
-        results = await scanner.scan_network(args.cidr)
+        if args.shards > 1 or len(args.cidr) > 1:
+            results = await scanner.scan_sharded(args.cidr, str(Path(output_file).with_suffix('')),
+                                                 args.shards, resume=args.resume)
+        elif args.stream or args.resume:
+            stream_file = args.stream_file or str(Path(output_file).with_suffix('.ndjson'))
+            checkpoint_file = args.checkpoint_file or str(Path(output_file).with_suffix('.checkpoint'))
+            results = await scanner.scan_network_streaming(args.cidr[0], stream_file,
+                                                           checkpoint_path=checkpoint_file,
+                                                           resume=args.resume)
+        else:
+            results = await scanner.scan_network(args.cidr[0])
 
         # Output results with proper error handling
         try:
@@ -1453,6 +2706,9 @@ async def main():
             traceback.print_exc()
         sys.exit(1)
 
+    finally:
+        scanner.save_credential_memory()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -7,6 +7,7 @@ Maintains CLI compatibility while using secure credential storage
 import sys
 import argparse
 import logging
+import threading
 from pathlib import Path
 from typing import Dict, Optional
 
@@ -76,6 +77,11 @@ class SecureDatabaseDeviceCollector(DatabaseDeviceCollector):
         # Create capture directory
         self.capture_dir.mkdir(exist_ok=True)
 
+        # Credential affinity caches used on the collection hot path
+        self.credential_cache = {}
+        self.device_credentials = {}
+        self.cache_lock = threading.Lock()
+
         # NAPALM driver mapping for vendors in database
         self.driver_mapping = {
             'cisco': 'ios',
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+SNMP Agent Simulator
+Answers SNMP GET/GETNEXT for many simulated devices, one per loopback address, so the
+scanner and collector can be exercised and benchmarked without a live network.
+Responses are replayed from device profiles (built-in, a profile YAML/JSON file, or a
+previous pyscanner3 result file/NDJSON log) with configurable latency, loss, v2c
+communities and an SNMPv3 user.
+
+Linux routes all of 127.0.0.0/8 to the loopback interface, so addresses like
+127.16.0.1 can be bound without any interface configuration.
+"""
+
+import argparse
+import asyncio
+import bisect
+import ipaddress
+import json
+import random
+import re
+import socket
+import sys
+import time
+from typing import Dict, List, Optional, Tuple, Any
+
+import yaml
+
+try:
+    from pysnmp.entity import engine, config
+    from pysnmp.entity.rfc3413 import cmdrsp, context
+    from pysnmp.carrier.asyncio.dgram import udp
+    from pysnmp.proto import rfc1902, rfc1905
+    from pysnmp.proto.api import v2c
+except ImportError:
+    print("Error: pysnmp library not found. Install with: pip install pysnmp")
+    sys.exit(1)
+
+SYS_DESCR = "1.3.6.1.2.1.1.1.0"
+SYS_OBJECT_ID = "1.3.6.1.2.1.1.2.0"
+SYS_UPTIME = "1.3.6.1.2.1.1.3.0"
+SYS_NAME = "1.3.6.1.2.1.1.5.0"
+SYS_SERVICES = "1.3.6.1.2.1.1.7.0"
+ENT_SERIAL = "1.3.6.1.2.1.47.1.1.1.1.11.1"
+
+# Go-schema field names pyscanner3 writes in place of entity-MIB OIDs
+ENTITY_FIELD_OIDS = {
+    "Entity Model Name": "1.3.6.1.2.1.47.1.1.1.1.13.1",
+    "Entity Serial Number": ENT_SERIAL,
+    "Entity Hardware Revision": "1.3.6.1.2.1.47.1.1.1.1.8.1",
+}
+
+OID_PATTERN = re.compile(r'^\d+(\.\d+)+$')
+
+AUTH_PROTOCOLS = {
+    "MD5": config.USM_AUTH_HMAC96_MD5,
+    "SHA": config.USM_AUTH_HMAC96_SHA,
+    "SHA224": config.USM_AUTH_HMAC128_SHA224,
+    "SHA256": config.USM_AUTH_HMAC192_SHA256,
+    "SHA384": config.USM_AUTH_HMAC256_SHA384,
+    "SHA512": config.USM_AUTH_HMAC384_SHA512,
+}
+
+PRIV_PROTOCOLS = {
+    "DES": config.USM_PRIV_CBC56_DES,
+    "AES": config.USM_PRIV_CFB128_AES,
+    "AES192": config.USM_PRIV_CFB192_AES,
+    "AES256": config.USM_PRIV_CFB256_AES,
+}
+
+DEFAULT_PROFILES = [
+    {"name": "cisco_switch", "oids": {
+        SYS_DESCR: "Cisco IOS Software, C2960X Software (C2960X-UNIVERSALK9-M), Version 15.2(7)E4, "
+                   "RELEASE SOFTWARE (fc2)",
+        SYS_OBJECT_ID: "1.3.6.1.4.1.9.1.1208",
+        "1.3.6.1.2.1.47.1.1.1.1.13.1": "WS-C2960X-48FPD-L",
+        ENT_SERIAL: "FOC2134X0AB",
+        "1.3.6.1.2.1.47.1.1.1.1.10.1": "15.2(7)E4",
+    }},
+    {"name": "arista_switch", "oids": {
+        SYS_DESCR: "Arista Networks EOS version 4.28.3M running on an Arista Networks DCS-7050SX3-48YC8",
+        SYS_OBJECT_ID: "1.3.6.1.4.1.30065.1.3011.7050.3741.48",
+        "1.3.6.1.2.1.47.1.1.1.1.13.1": "DCS-7050SX3-48YC8",
+        ENT_SERIAL: "JPE19200001",
+    }},
+    {"name": "juniper_switch", "oids": {
+        SYS_DESCR: "Juniper Networks, Inc. ex4300-48p Ethernet Switch, kernel JUNOS 21.4R3-S1.6",
+        SYS_OBJECT_ID: "1.3.6.1.4.1.2636.1.1.1.2.132",
+        ENT_SERIAL: "PE3714100001",
+    }},
+    {"name": "apc_ups", "oids": {
+        SYS_DESCR: "APC Web/SNMP Management Card (MB:v4.1.0 PF:v6.8.2 PN:apc_hw05_aos_682.bin AF1:v6.8.2 "
+                   "AN1:apc_hw05_sumx_682.bin MN:SMT1500RM2U HR:05 SN: 3S1234567890 MD:01/15/2019)",
+        SYS_OBJECT_ID: "1.3.6.1.4.1.318.1.3.27",
+        "1.3.6.1.4.1.318.1.1.1.1.1.1.0": "Smart-UPS 1500",
+        "1.3.6.1.4.1.318.1.1.1.1.2.3.0": "3S1234567890",
+    }},
+    {"name": "hp_printer", "oids": {
+        SYS_DESCR: "HP ETHERNET MULTI-ENVIRONMENT,ROM none,JETDIRECT,JD153,EEPROM JSI24090012,CIDATE 06/10/2021",
+        SYS_OBJECT_ID: "1.3.6.1.4.1.11.2.3.9.1",
+    }},
+    {"name": "aruba_ap", "oids": {
+        SYS_DESCR: "ArubaOS (MODEL: 515), Version 8.10.0.6",
+        SYS_OBJECT_ID: "1.3.6.1.4.1.14823.1.2.111",
+    }},
+    {"name": "linux_server", "oids": {
+        SYS_DESCR: "Linux web01 5.15.0-91-generic #101-Ubuntu SMP x86_64",
+        SYS_OBJECT_ID: "1.3.6.1.4.1.8072.3.2.10",
+    }},
+]
+
+
+def _profile_from_snmp_data(name: str, snmp_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Keep the OID-keyed values of a recorded device, mapping Go-schema entity names back to OIDs"""
+    oids = {}
+    for key, value in (snmp_data or {}).items():
+        if value in (None, "", "<nil>"):
+            continue
+        oid = ENTITY_FIELD_OIDS.get(key, key)
+        if OID_PATTERN.match(oid):
+            oids[oid] = str(value)
+    if SYS_DESCR not in oids:
+        return None
+    return {"name": name, "oids": oids}
+
+
+def load_profiles(path: str) -> List[Dict[str, Any]]:
+    """
+    Load device profiles from:
+      - a profile file: {"profiles": [{"name": ..., "oids": {oid: value}}]} (YAML or JSON)
+      - a pyscanner3 result document: {"devices": {id: {"snmp_data_by_ip": ...}}}
+      - a pyscanner3 NDJSON result log
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.ndjson'):
+            # NDJSON result log, one {"device": ..., "session": ...} per line
+            devices = {}
+            for line in f:
+                try:
+                    device = json.loads(line).get("device")
+                except (json.JSONDecodeError, AttributeError):
+                    continue
+                if device:
+                    devices[device.get("id", str(len(devices)))] = device
+            data = {"devices": devices}
+        elif path.endswith('.json'):
+            data = json.load(f)
+        else:
+            data = yaml.safe_load(f) or {}
+
+    profiles = []
+    if "profiles" in data:
+        for entry in data["profiles"]:
+            profile = _profile_from_snmp_data(entry.get("name", f"profile_{len(profiles)}"), entry.get("oids", {}))
+            if profile:
+                profiles.append(profile)
+    for device_id, device in (data.get("devices") or {}).items():
+        for snmp_data in (device.get("snmp_data_by_ip") or {}).values():
+            profile = _profile_from_snmp_data(device_id, snmp_data)
+            if profile:
+                profiles.append(profile)
+                break
+
+    if not profiles:
+        raise ValueError(f"No usable device profiles (need at least sysDescr) in {path}")
+    return profiles
+
+
+class SimulatedDevice:
+    """One simulated agent: a bind address and the OID values it answers with"""
+
+    def __init__(self, address: str, profile_name: str, oids: Dict[str, str]):
+        self.address = address
+        self.profile_name = profile_name
+        self.values = {oid: self._typed_value(oid, value) for oid, value in oids.items()}
+        self.sorted_oids = sorted(self.values, key=lambda oid: tuple(int(part) for part in oid.split('.')))
+        self.sorted_keys = [tuple(int(part) for part in oid.split('.')) for oid in self.sorted_oids]
+        self.requests = 0
+
+    @staticmethod
+    def _typed_value(oid: str, value: str):
+        if oid == SYS_OBJECT_ID and OID_PATTERN.match(value):
+            return rfc1902.ObjectIdentifier(value)
+        if oid == SYS_UPTIME and value.isdigit():
+            return rfc1902.TimeTicks(int(value))
+        if oid == SYS_SERVICES and value.isdigit():
+            return rfc1902.Integer(int(value))
+        return rfc1902.OctetString(value)
+
+    def get(self, oid: str):
+        return self.values.get(oid, rfc1905.noSuchObject)
+
+    def get_next(self, oid: str):
+        index = bisect.bisect_right(self.sorted_keys, tuple(int(part) for part in oid.split('.')))
+        if index < len(self.sorted_oids):
+            next_oid = self.sorted_oids[index]
+            return rfc1902.ObjectName(next_oid), self.values[next_oid]
+        return rfc1902.ObjectName(oid), rfc1905.endOfMibView
+
+
+def build_devices(cidr: str, count: int, profiles: List[Dict[str, Any]], seed: int = 1) -> List[SimulatedDevice]:
+    """Spread profiles over the first count host addresses of cidr with per-device sysName/serial"""
+    rng = random.Random(seed)
+    network = ipaddress.ip_network(cidr, strict=False)
+    devices = []
+    for index, address in enumerate(network.hosts()):
+        if index >= count:
+            break
+        profile = profiles[index % len(profiles)]
+        oids = dict(profile["oids"])
+        oids[SYS_NAME] = f"sim-{profile['name']}-{index:05d}".replace('_', '-')
+        oids.setdefault(SYS_UPTIME, str(rng.randint(10 ** 5, 10 ** 9)))
+        if ENT_SERIAL in oids:
+            oids[ENT_SERIAL] = f"{oids[ENT_SERIAL][:6]}{index:06d}"
+        devices.append(SimulatedDevice(str(address), profile["name"], oids))
+
+    if len(devices) < count:
+        raise ValueError(f"{cidr} only has room for {len(devices)} simulated devices")
+    return devices
+
+
+class SimulatorResponder(cmdrsp.CommandResponderBase):
+    """
+    GET/GETNEXT responder that serves each request from the device bound to the
+    transport it arrived on, with optional response delay, loss and tooBig limit
+    """
+
+    SUPPORTED_PDU_TYPES = (rfc1905.GetRequestPDU.tagSet, rfc1905.GetNextRequestPDU.tagSet)
+
+    def __init__(self, snmp_engine, snmp_context, simulator: 'SNMPAgentSimulator'):
+        super().__init__(snmp_engine, snmp_context)
+        self.simulator = simulator
+        self._deferred = set()
+
+    def handle_management_operation(self, snmpEngine, stateReference, contextName, PDU, *args):
+        sim = self.simulator
+        request = snmpEngine.observer.get_execution_context('rfc3412.receiveMessage:request')
+        device = sim.devices_by_domain.get(tuple(request['transportDomain']))
+        if device is None:
+            return
+
+        device.requests += 1
+        sim.stats["requests"] += 1
+        if sim.loss and sim.rng.random() < sim.loss:
+            sim.stats["dropped"] += 1
+            return
+
+        var_binds = v2c.apiPDU.get_varbinds(PDU)
+        if sim.max_varbinds and len(var_binds) > sim.max_varbinds:
+            sim.stats["too_big"] += 1
+            response = ("tooBig", 0, [])
+        elif PDU.tagSet == rfc1905.GetNextRequestPDU.tagSet:
+            response = (0, 0, [device.get_next(str(name)) for name, _ in var_binds])
+        else:
+            response = (0, 0, [(name, device.get(str(name))) for name, _ in var_binds])
+
+        delay = sim.response_delay()
+        if delay > 0:
+            # process_pdu releases request state when we return; keep it until the reply is sent
+            self._deferred.add(stateReference)
+            asyncio.get_running_loop().call_later(delay, self._send_deferred, snmpEngine, stateReference, response)
+        else:
+            self.send_varbinds(snmpEngine, stateReference, *response)
+        sim.stats["responses"] += 1
+
+    def _send_deferred(self, snmp_engine, state_reference, response):
+        self._deferred.discard(state_reference)
+        try:
+            self.send_varbinds(snmp_engine, state_reference, *response)
+        finally:
+            super().release_state_information(state_reference)
+
+    def release_state_information(self, stateReference):
+        if stateReference not in self._deferred:
+            super().release_state_information(stateReference)
+
+
+class SNMPAgentSimulator:
+    """Many simulated SNMP agents served by one SNMP engine inside the running event loop"""
+
+    def __init__(self, devices: List[SimulatedDevice], port: int = 161,
+                 communities: Optional[List[str]] = None,
+                 v3_user: str = "", auth_key: str = "", priv_key: str = "",
+                 auth_protocol: str = "SHA", priv_protocol: str = "AES",
+                 latency: Tuple[float, float] = (0.0, 0.0), loss: float = 0.0,
+                 max_varbinds: int = 0, tcp_port: int = 0, seed: int = 1):
+        self.devices = devices
+        self.port = port
+        self.communities = communities if communities is not None else ["public"]
+        self.v3_user = v3_user
+        self.auth_key = auth_key
+        self.priv_key = priv_key
+        self.auth_protocol = auth_protocol
+        self.priv_protocol = priv_protocol
+        self.latency = latency
+        self.loss = loss
+        self.max_varbinds = max_varbinds
+        self.tcp_port = tcp_port
+        self.rng = random.Random(seed)
+        self.devices_by_domain = {}
+        self.stats = {"requests": 0, "responses": 0, "dropped": 0, "too_big": 0}
+        self._engine = None
+        self._tcp_servers = []
+
+    def response_delay(self) -> float:
+        low, high = self.latency
+        return low if high <= low else self.rng.uniform(low, high)
+
+    async def start(self):
+        raise_open_file_limit(len(self.devices) * (2 if self.tcp_port else 1) + 64)
+        self._engine = engine.SnmpEngine()
+
+        for index, community in enumerate(self.communities):
+            config.add_v1_system(self._engine, f"sim-area-{index}", community)
+        if self.v3_user:
+            config.add_v3_user(
+                self._engine, self.v3_user,
+                AUTH_PROTOCOLS.get(self.auth_protocol, config.USM_AUTH_HMAC96_SHA) if self.auth_key
+                else config.USM_AUTH_NONE, self.auth_key or None,
+                PRIV_PROTOCOLS.get(self.priv_protocol, config.USM_PRIV_CFB128_AES) if self.priv_key
+                else config.USM_PRIV_NONE, self.priv_key or None)
+
+        for index, device in enumerate(self.devices):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind((device.address, self.port))
+            domain = udp.DOMAIN_NAME + (index + 1,)
+            config.add_transport(self._engine, domain, udp.UdpAsyncioTransport().open_server_mode(sock=sock))
+            self.devices_by_domain[domain] = device
+
+            if self.tcp_port:
+                self._tcp_servers.append(
+                    await asyncio.start_server(self._close_connection, device.address, self.tcp_port))
+
+        SimulatorResponder(self._engine, context.SnmpContext(self._engine), self)
+
+    @staticmethod
+    async def _close_connection(reader, writer):
+        writer.close()
+
+    def stop(self):
+        for server in self._tcp_servers:
+            server.close()
+        self._tcp_servers = []
+        if self._engine:
+            self._engine.close_dispatcher()
+            self._engine = None
+
+
+def raise_open_file_limit(needed: int):
+    """Every simulated device holds a socket; lift the soft fd limit as far as allowed"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def parse_latency(value: str) -> Tuple[float, float]:
+    """'5' or '2-10' milliseconds -> (low, high) seconds"""
+    low, _, high = str(value).partition('-')
+    low = float(low or 0) / 1000
+    return low, (float(high) / 1000 if high else low)
+
+
+def add_simulator_arguments(parser: argparse.ArgumentParser):
+    """Simulator options shared with bench_scanner.py"""
+    parser.add_argument("--cidr", default="127.16.0.0/22", help="Loopback range the simulated devices occupy")
+    parser.add_argument("--devices", type=int, default=200, help="Number of simulated devices")
+    parser.add_argument("--port", type=int, default=16161, help="UDP port every simulated agent listens on")
+    parser.add_argument("--profiles", default="",
+                        help="Profile YAML/JSON, pyscanner3 result JSON or NDJSON log to replay (default: built-in)")
+    parser.add_argument("--latency-ms", default="0", help="Response delay in ms, fixed ('5') or a range ('2-10')")
+    parser.add_argument("--loss", type=float, default=0.0, help="Fraction of requests silently dropped (0-1)")
+    parser.add_argument("--agent-communities", nargs='+', default=["public"], help="v2c communities agents accept")
+    parser.add_argument("--v3-user", default="", help="SNMPv3 user agents accept")
+    parser.add_argument("--v3-auth-key", default="", help="SNMPv3 auth key")
+    parser.add_argument("--v3-priv-key", default="", help="SNMPv3 privacy key")
+    parser.add_argument("--v3-auth-protocol", default="SHA", choices=sorted(AUTH_PROTOCOLS))
+    parser.add_argument("--v3-priv-protocol", default="AES", choices=sorted(PRIV_PROTOCOLS))
+    parser.add_argument("--agent-max-varbinds", type=int, default=0,
+                        help="Answer tooBig to requests with more varbinds than this (0 = no limit)")
+    parser.add_argument("--tcp-port", type=int, default=0,
+                        help="Also accept TCP connections on this port, for the scanner's TCP pre-filter")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for latency/loss/uptime")
+
+
+def simulator_from_args(args) -> SNMPAgentSimulator:
+    profiles = load_profiles(args.profiles) if args.profiles else DEFAULT_PROFILES
+    devices = build_devices(args.cidr, args.devices, profiles, args.seed)
+    return SNMPAgentSimulator(
+        devices, port=args.port, communities=args.agent_communities,
+        v3_user=args.v3_user, auth_key=args.v3_auth_key, priv_key=args.v3_priv_key,
+        auth_protocol=args.v3_auth_protocol, priv_protocol=args.v3_priv_protocol,
+        latency=parse_latency(args.latency_ms), loss=args.loss,
+        max_varbinds=args.agent_max_varbinds, tcp_port=args.tcp_port, seed=args.seed)
+
+
+async def run_simulator(args, ready=None, stop=None):
+    """Serve until stop (a threading/multiprocessing Event) is set, or forever"""
+    simulator = simulator_from_args(args)
+    await simulator.start()
+    if ready is not None:
+        ready.set()
+    try:
+        while stop is None or not stop.is_set():
+            await asyncio.sleep(0.2)
+    finally:
+        simulator.stop()
+    # Lets the benchmark tell whether the simulator, not the scanner, was the bottleneck
+    simulator.stats["cpu_s"] = round(time.process_time(), 3)
+    return simulator.stats
+
+
+def run_simulator_process(args, ready, stop, result_queue=None):
+    """multiprocessing target used by the benchmark harness"""
+    stats = asyncio.run(run_simulator(args, ready, stop))
+    if result_queue is not None:
+        result_queue.put(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many SNMP agents on loopback addresses")
+    add_simulator_arguments(parser)
+    args = parser.parse_args()
+
+    simulator = simulator_from_args(args)
+    first, last = simulator.devices[0].address, simulator.devices[-1].address
+    print(f"Simulating {len(simulator.devices)} SNMP agents on {first} - {last}, UDP port {args.port}")
+    print(f"Profiles: {args.profiles or 'built-in'}, latency {args.latency_ms} ms, loss {args.loss:.0%}")
+    print(f"Communities: {args.agent_communities}" + (f", SNMPv3 user: {args.v3_user}" if args.v3_user else ""))
+
+    async def serve():
+        await simulator.start()
+        print("Ready - Ctrl-C to stop")
+        try:
+            while True:
+                await asyncio.sleep(5)
+                print(f"requests={simulator.stats['requests']} responses={simulator.stats['responses']} "
+                      f"dropped={simulator.stats['dropped']} tooBig={simulator.stats['too_big']}")
+        finally:
+            simulator.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+
+if __name__ == "__main__":
+    main()
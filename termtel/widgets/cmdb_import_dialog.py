@@ -1,4 +1,6 @@
 import sys
+import gzip
+import json
 import sqlite3
 from pathlib import Path
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton,
@@ -9,6 +11,52 @@ from PyQt6.QtCore import Qt, QThread, pyqtSignal
 import yaml
 
 
+CAPTURE_ARCHIVE_SUFFIX = '.ndjson.gz'
+
+# Session fields filled from a record's get_facts
+SESSION_FACTS = {
+    'Model': 'model',
+    'SerialNumber': 'serial_number',
+    'SoftwareVersion': 'os_version',
+    'Vendor': 'vendor'
+}
+
+
+def is_capture_archive(path):
+    """Whether a selected source is a collector capture archive rather than a CMDB database"""
+    return str(path).endswith(CAPTURE_ARCHIVE_SUFFIX)
+
+
+def iter_capture_archive(path):
+    """Stream successful device records from a RapidCMDB collector capture archive"""
+    with gzip.open(path, 'rt') as f:
+        try:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get('success'):
+                    yield record
+        except EOFError:
+            # Archive from an interrupted run - every complete record has been read
+            return
+
+
+def iter_capture_archive_entries(path):
+    """
+    Device summaries for a capture archive, from its offset index when the run wrote one
+    so the site list does not have to decompress every config
+    """
+    index_path = Path(str(path)[:-len(CAPTURE_ARCHIVE_SUFFIX)] + '.index.json')
+    if index_path.exists():
+        with open(index_path) as f:
+            for entry in json.load(f).get('records', []):
+                if entry.get('success'):
+                    yield entry
+    else:
+        yield from iter_capture_archive(path)
+
+
 class CMDBImportThread(QThread):
     """Background thread for importing devices from CMDB"""
     progress_updated = pyqtSignal(int, str)
@@ -22,6 +70,10 @@ class CMDBImportThread(QThread):
         self.credential_mapping = credential_mapping
 
     def run(self):
+        if is_capture_archive(self.db_path):
+            self._run_archive()
+            return
+
         try:
             conn = sqlite3.connect(self.db_path)
             conn.row_factory = sqlite3.Row
@@ -105,6 +157,61 @@ class CMDBImportThread(QThread):
         except Exception as e:
             self.import_failed.emit(str(e))
 
+    def _run_archive(self):
+        """
+        Build sessions from a capture archive. Only the fields a session needs are kept per
+        device, from its latest record with get_facts; getter retries record no facts
+        """
+        try:
+            self.progress_updated.emit(0, "Reading capture archive")
+            selected = set(self.selected_sites)
+            devices = {}
+            for record in iter_capture_archive(self.db_path):
+                site_code = record.get('site_code') or 'UNKNOWN'
+                if site_code not in selected:
+                    continue
+                facts = record.get('data', {}).get('get_facts')
+                known = devices.get(record['device_name'])
+                if not facts and known and known['has_facts']:
+                    continue
+                devices[record['device_name']] = {
+                    'site_code': site_code,
+                    'device_ip': record['device_ip'],
+                    'napalm_driver': record.get('napalm_driver'),
+                    'has_facts': bool(facts),
+                    **{field: (facts or {}).get(key) or '' for field, key in SESSION_FACTS.items()}
+                }
+
+            imported_data = []
+            for site_code in self.selected_sites:
+                sessions = []
+                for device_name in sorted(devices):
+                    device = devices[device_name]
+                    if device['site_code'] != site_code:
+                        continue
+                    device_type = self._map_napalm_driver(device['napalm_driver'])
+                    sessions.append({
+                        'display_name': device_name,
+                        'host': device['device_ip'],
+                        'port': '22',  # Default SSH port
+                        'DeviceType': device_type,
+                        **{field: device[field] for field in SESSION_FACTS},
+                        'credsid': self.credential_mapping.get(f"{site_code}_{device_type}",
+                                                               self.credential_mapping.get('default', ''))
+                    })
+
+                if sessions:
+                    imported_data.append({
+                        'folder_name': f"{site_code} ({len(sessions)} devices)",
+                        'sessions': sessions
+                    })
+
+            self.progress_updated.emit(100, "Import completed")
+            self.import_completed.emit(imported_data)
+
+        except Exception as e:
+            self.import_failed.emit(str(e))
+
     def _map_napalm_driver(self, napalm_driver):
         """Map NAPALM driver names to session DeviceType"""
         driver_mapping = {
@@ -136,7 +243,7 @@ class CMDBImportDialog(QDialog):
         layout = QVBoxLayout(self)
 
         # Database selection
-        db_group = QGroupBox("CMDB Database")
+        db_group = QGroupBox("CMDB Database or Capture Archive")
         db_layout = QVBoxLayout(db_group)
 
         db_select_layout = QHBoxLayout()
@@ -248,9 +355,10 @@ class CMDBImportDialog(QDialog):
         """Select the CMDB database file"""
         db_path, _ = QFileDialog.getOpenFileName(
             self,
-            "Select RapidCMDB Database",
+            "Select RapidCMDB Database or Capture Archive",
             str(Path.home()),
-            "SQLite Database (*.db);;All Files (*.*)"
+            "RapidCMDB Sources (*.db *.ndjson.gz);;SQLite Database (*.db);;"
+            "Capture Archive (*.ndjson.gz);;All Files (*.*)"
         )
 
         if db_path and Path(db_path).exists():
@@ -269,7 +377,22 @@ class CMDBImportDialog(QDialog):
             return
 
         try:
-            conn = sqlite3.connect(self.db_path)
+            if is_capture_archive(self.db_path):
+                sites = self._load_archive_sites()
+            else:
+                sites = self._load_database_sites()
+            self._populate_sites(sites)
+
+            if not sites:
+                QMessageBox.information(self, "Info", "No active devices found in the database.")
+
+        except Exception as e:
+            QMessageBox.critical(self, "Database Error", f"Failed to load sites: {str(e)}")
+
+    def _load_database_sites(self):
+        """Site codes with device counts from the CMDB"""
+        conn = sqlite3.connect(self.db_path)
+        try:
             cursor = conn.cursor()
 
             # Query to get site information with device counts
@@ -285,34 +408,43 @@ class CMDBImportDialog(QDialog):
             """
 
             cursor.execute(query)
-            sites = cursor.fetchall()
+            return cursor.fetchall()
+        finally:
             conn.close()
 
-            # Populate the tree
-            self.sites_tree.clear()
-            for site_code, device_count, last_updated in sites:
-                item = QTreeWidgetItem(self.sites_tree)
-                item.setText(0, site_code)
-                item.setText(1, str(device_count))
-                item.setText(2, last_updated or "Unknown")
-                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
-                item.setCheckState(0, Qt.CheckState.Unchecked)
-
-                # Store site data
-                item.setData(0, Qt.ItemDataRole.UserRole, {
-                    'site_code': site_code,
-                    'device_count': device_count,
-                    'last_updated': last_updated
-                })
-
-            self.sites_tree.resizeColumnToContents(0)
-            self.sites_tree.resizeColumnToContents(1)
+    def _load_archive_sites(self):
+        """Site codes with device counts streamed from a capture archive"""
+        sites = {}
+        seen = set()
+        for record in iter_capture_archive_entries(self.db_path):
+            site_code = record.get('site_code') or 'UNKNOWN'
+            count, last_updated = sites.get(site_code, (0, None))
+            if record['device_name'] not in seen:
+                seen.add(record['device_name'])
+                count += 1
+            sites[site_code] = (count, max(filter(None, (last_updated, record.get('collection_time'))), default=None))
+        return [(site_code, count, last_updated) for site_code, (count, last_updated) in sorted(sites.items())]
+
+    def _populate_sites(self, sites):
+        """Fill the site tree from (site_code, device_count, last_updated) rows"""
+        self.sites_tree.clear()
+        for site_code, device_count, last_updated in sites:
+            item = QTreeWidgetItem(self.sites_tree)
+            item.setText(0, site_code)
+            item.setText(1, str(device_count))
+            item.setText(2, last_updated or "Unknown")
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(0, Qt.CheckState.Unchecked)
 
-            if not sites:
-                QMessageBox.information(self, "Info", "No active devices found in the database.")
+            # Store site data
+            item.setData(0, Qt.ItemDataRole.UserRole, {
+                'site_code': site_code,
+                'device_count': device_count,
+                'last_updated': last_updated
+            })
 
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Failed to load sites: {str(e)}")
+        self.sites_tree.resizeColumnToContents(0)
+        self.sites_tree.resizeColumnToContents(1)
 
     def select_all_sites(self):
         """Select all sites"""